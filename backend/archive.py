@@ -0,0 +1,276 @@
+"""Move old call history out of the database into monthly compressed files.
+
+`call_history` only grows. `archive_calls()` moves calls created before the
+retention window into one gzip-compressed JSON Lines file per month
+(``call_history-YYYY-MM.jsonl.gz`` under `ARCHIVE_DIR`), transcript and triage
+input included. `call_archive_months` records which months hold calls for each
+user, so `/call-history` can read a user's old calls back from just those
+files (`read_user_calls`). A user's decoded calls from a month file are kept
+in a small LRU (`ARCHIVE_CACHE_ENTRIES`), keyed by the file's size and mtime,
+so paging through history doesn't decompress the same month again.
+
+Rows are streamed in chunks of `ARCHIVE_CHUNK_ROWS`. Each chunk is appended to
+its month files as a new gzip member (the file stays one valid gzip stream),
+fsynced, and only then deleted from the database (search index entries
+included) in the same transaction that selected it. A crash in between leaves the calls in both places: readers skip
+archived copies of calls that are still in the database and drop repeats
+within a file, and the next run simply archives them again.
+
+Only settled calls (COMPLETED / ESCALATED) that are not their user's latest
+call are moved: the scheduler decides from the latest call whether a user is
+due, and webhooks may still arrive for unsettled ones. Calls left in a retry
+state therefore stay live however old they are, so archived calls are not
+necessarily older than live ones; `/call-history` merges the two by key. On PostgreSQL a chunk is
+claimed with FOR UPDATE SKIP LOCKED, so several nodes can run the job; give
+them a shared `PULSECALL_ARCHIVE_DIR`.
+
+Usage:
+    python archive.py                          # calls older than PULSECALL_ARCHIVE_RETENTION_DAYS
+    python archive.py --retention-days 90 --chunk-size 1000
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+from sqlalchemy import delete, exists, select
+
+import database
+from database import CallArchiveMonth, CallRecord, CallTranscript, SearchDocument, as_utc, decompress_text
+from models import ArchiveResult, CallState
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+ARCHIVE_DIR = os.getenv("PULSECALL_ARCHIVE_DIR", str(Path(__file__).parent / "archive"))
+ARCHIVE_RETENTION_DAYS = int(os.getenv("PULSECALL_ARCHIVE_RETENTION_DAYS", "365"))  # 0 = keep everything
+ARCHIVE_CHUNK_ROWS = int(os.getenv("PULSECALL_ARCHIVE_CHUNK_ROWS", "500"))
+ARCHIVE_INTERVAL_HOURS = float(os.getenv("PULSECALL_ARCHIVE_INTERVAL_HOURS", "24"))
+ARCHIVE_GZIP_LEVEL = int(os.getenv("PULSECALL_ARCHIVE_GZIP_LEVEL", "6"))
+ARCHIVE_CACHE_ENTRIES = int(os.getenv("PULSECALL_ARCHIVE_CACHE_ENTRIES", "256"))  # (month, user) pairs; 0 = off
+
+ARCHIVED_STATES = (CallState.COMPLETED, CallState.ESCALATED)
+
+_calls = CallRecord.__table__
+_transcripts = CallTranscript.__table__
+_months = CallArchiveMonth.__table__
+_search_docs = SearchDocument.__table__
+
+
+def month_path(month: str) -> Path:
+    return Path(ARCHIVE_DIR) / f"call_history-{month}.jsonl.gz"
+
+
+def _month_of(value: datetime) -> str:
+    return as_utc(value).strftime("%Y-%m")
+
+
+# ---------------------------------------------------------------------------
+# Writing
+# ---------------------------------------------------------------------------
+def _archivable(cutoff: datetime, chunk_size: int):
+    newer = _calls.alias("newer")
+    has_newer = exists().where(newer.c.user_id == _calls.c.user_id, newer.c.created_at > _calls.c.created_at)
+    return (
+        select(*_calls.c, _transcripts.c.transcript_text, _transcripts.c.triage_input)
+        .outerjoin(_transcripts, _transcripts.c.call_id == _calls.c.id)
+        .where(_calls.c.created_at < cutoff, _calls.c.state.in_(ARCHIVED_STATES), has_newer)
+        .order_by(_calls.c.created_at, _calls.c.id)
+        .limit(chunk_size)
+        .with_for_update(skip_locked=True, of=_calls)
+    )
+
+
+def _doc(row: Any) -> dict[str, Any]:
+    """One archive line: every call_history column plus the decompressed text."""
+    doc = {}
+    for key, value in row._mapping.items():
+        if isinstance(value, datetime):
+            value = as_utc(value).isoformat()
+        elif isinstance(value, CallState):
+            value = value.value
+        elif isinstance(value, bytes):
+            value = decompress_text(value)
+        doc[key] = value
+    return doc
+
+
+def _append(month: str, docs: list[dict[str, Any]]) -> None:
+    path = month_path(month)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("ab") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=ARCHIVE_GZIP_LEVEL, mtime=0) as out:
+            for doc in docs:
+                out.write(json.dumps(doc, separators=(",", ":")).encode() + b"\n")
+        raw.flush()
+        os.fsync(raw.fileno())
+
+
+def _record_months(conn, pairs: set[tuple[str, str]]) -> None:
+    users = {user_id for user_id, _ in pairs}
+    known = set(conn.execute(
+        select(_months.c.user_id, _months.c.month).where(_months.c.user_id.in_(users))
+    ).all())
+    new = [{"user_id": user_id, "month": month} for user_id, month in pairs - known]
+    if new:
+        conn.execute(_months.insert(), new)
+
+
+def archive_calls(
+    retention_days: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    now: Optional[datetime] = None,
+) -> ArchiveResult:
+    """Move settled calls older than the retention window into the monthly files."""
+    retention_days = ARCHIVE_RETENTION_DAYS if retention_days is None else retention_days
+    cutoff = (now or datetime.now(timezone.utc)) - timedelta(days=retention_days)
+    stmt = _archivable(cutoff, chunk_size or ARCHIVE_CHUNK_ROWS)
+    result = ArchiveResult(cutoff=cutoff)
+    while True:
+        with database.engine.begin() as conn:
+            rows = conn.execute(stmt).all()
+            if not rows:
+                break
+            by_month: dict[str, list[dict[str, Any]]] = defaultdict(list)
+            for row in rows:
+                by_month[_month_of(row.created_at)].append(_doc(row))
+            # Index first: on SQLite this takes the write lock before the slow part.
+            _record_months(conn, {(doc["user_id"], month) for month, docs in by_month.items() for doc in docs})
+            for month, docs in by_month.items():
+                _append(month, docs)
+                result.months[month] = result.months.get(month, 0) + len(docs)
+            ids = [row.id for row in rows]
+            conn.execute(delete(_search_docs).where(_search_docs.c.call_id.in_(ids)))
+            conn.execute(delete(_transcripts).where(_transcripts.c.call_id.in_(ids)))
+            conn.execute(delete(_calls).where(_calls.c.id.in_(ids)))
+        result.archived += len(rows)
+    if result.archived:
+        logger.info("Archived %d calls created before %s into %d monthly files", result.archived, cutoff.date(), len(result.months))
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+def archived_months() -> list[str]:
+    """Every month with an archive file, oldest first."""
+    prefix, suffix = "call_history-", ".jsonl.gz"
+    return sorted(path.name[len(prefix):-len(suffix)] for path in Path(ARCHIVE_DIR).glob(f"{prefix}*{suffix}"))
+
+
+def iter_month(month: str, user_id: Optional[str] = None) -> Iterator[dict[str, Any]]:
+    """Stream archived calls from a month file (file order), one user's or everyone's."""
+    path = month_path(month)
+    if not path.exists():
+        return
+    needle = None if user_id is None else f'"user_id":{json.dumps(user_id)}'.encode()
+    with gzip.open(path, "rb") as lines:
+        for line in lines:
+            if needle is None or needle in line:  # skip decoding other users' lines
+                doc = json.loads(line)
+                if user_id is None or doc["user_id"] == user_id:
+                    yield doc
+
+
+_month_cache: OrderedDict[tuple[str, str], tuple[tuple[int, int], list[dict[str, Any]]]] = OrderedDict()
+_month_cache_lock = threading.Lock()
+
+
+def _user_month(month: str, user_id: str) -> list[dict[str, Any]]:
+    """A user's archived calls in one month file, a re-archived copy replacing the first."""
+    try:
+        stat = month_path(month).stat()
+    except FileNotFoundError:
+        return []
+    version = (stat.st_size, stat.st_mtime_ns)  # appends change both
+    key = (month, user_id)
+    with _month_cache_lock:
+        cached = _month_cache.get(key)
+        if cached is not None and cached[0] == version:
+            _month_cache.move_to_end(key)
+            return cached[1]
+    docs = list({doc["id"]: doc for doc in iter_month(month, user_id)}.values())
+    if ARCHIVE_CACHE_ENTRIES > 0:
+        with _month_cache_lock:
+            _month_cache[key] = (version, docs)
+            _month_cache.move_to_end(key)
+            while len(_month_cache) > ARCHIVE_CACHE_ENTRIES:
+                _month_cache.popitem(last=False)
+    return docs
+
+
+def read_user_calls(
+    user_id: str,
+    limit: int,
+    before: Optional[tuple[datetime, str]] = None,
+    after: Optional[tuple[datetime, str]] = None,
+    state: Optional[CallState] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> list[dict[str, Any]]:
+    """Up to `limit` archived calls for a user, newest first.
+
+    `before` and `after` are (created_at, id) keyset bounds, both exclusive,
+    in the live `/call-history` order: `before` is the last call already
+    returned, `after` the oldest call the page can reach. Months outside the
+    bounds are not read.
+    """
+    before = (as_utc(before[0]), before[1]) if before else None
+    after = (as_utc(after[0]), after[1]) if after else None
+    since, until = as_utc(since), as_utc(until)
+    with database.engine.connect() as conn:
+        months = conn.execute(
+            select(_months.c.month).where(_months.c.user_id == user_id).order_by(_months.c.month.desc())
+        ).scalars().all()
+    found: list[dict[str, Any]] = []
+    for month in months:
+        if (since is not None and month < since.strftime("%Y-%m")) or (after and month < after[0].strftime("%Y-%m")):
+            break
+        if (until is not None and month > until.strftime("%Y-%m")) or (before and month > before[0].strftime("%Y-%m")):
+            continue
+        keyed = []
+        for doc in _user_month(month, user_id):
+            key = (datetime.fromisoformat(doc["created_at"]), doc["id"])
+            if (
+                (before is None or key < before)
+                and (after is None or key > after)
+                and (state is None or doc["state"] == state.value)
+                and (since is None or key[0] >= since)
+                and (until is None or key[0] < until)
+            ):
+                keyed.append((key, doc))
+        if keyed:
+            with database.engine.connect() as conn:
+                live = set(conn.execute(select(_calls.c.id).where(_calls.c.id.in_([doc["id"] for _, doc in keyed]))).scalars())
+            keyed.sort(key=lambda item: item[0], reverse=True)
+            found.extend(doc for _, doc in keyed if doc["id"] not in live)
+        if len(found) >= limit:
+            break
+    return found[:limit]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Archive old call history into monthly compressed files")
+    parser.add_argument("--retention-days", type=int, default=ARCHIVE_RETENTION_DAYS, help="Keep calls newer than this in the database")
+    parser.add_argument("--chunk-size", type=int, default=ARCHIVE_CHUNK_ROWS, help="Calls moved per transaction")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    database.init_db()
+    result = archive_calls(retention_days=args.retention_days, chunk_size=args.chunk_size)
+    print(result.model_dump_json(indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,391 @@
+"""Server-side audio handling — TTS profiles, PCM decoding and voice-activity trimming.
+
+Browser recordings posted for STT usually carry long stretches of leading and
+trailing silence. This module decodes the upload to mono PCM, finds the span
+that contains speech with a frame-level energy / zero-crossing VAD, and cuts
+the rest before the audio is forwarded upstream.
+
+On the way back out, campaigns pick a TTS audio profile (sample rate, codec,
+speed) and synthesized audio is kept in a small LRU cache keyed by it.
+
+Call recordings go through the same frame analysis to produce triage
+`AudioMetrics` locally, on a process pool, so triage does not have to wait for
+the provider's analytics pass — and the provider numbers can be cross-checked.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import io
+import logging
+import os
+import shutil
+import subprocess
+import wave
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Literal, Optional
+
+import numpy as np
+
+from models import AudioMetrics, MetricsCrosscheck, TtsProfile, VadReport
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Configuration (tuneable)
+# ---------------------------------------------------------------------------
+VAD_TRIM_ENABLED = os.getenv("PULSECALL_VAD_TRIM", "false").lower() in ("1", "true", "yes")
+AUDIO_WORKERS = int(os.getenv("PULSECALL_AUDIO_WORKERS", "2"))
+FFMPEG_BIN = shutil.which("ffmpeg")
+
+PCM_SAMPLE_RATE = 16000       # decode target for non-WAV uploads
+VAD_FRAME_MS = 20             # analysis frame length
+VAD_PADDING_MS = 250          # speech hangover kept on each side of the cut
+VAD_MIN_DBFS = -50.0          # frames below this are never speech
+VAD_NOISE_MARGIN_DB = 10.0    # speech must sit this far above the noise floor
+VAD_ZCR_MAX = 0.35            # quiet frames with a higher crossing rate are hiss
+
+LOCAL_AUDIO_METRICS = os.getenv("PULSECALL_LOCAL_AUDIO_METRICS", "false").lower() in ("1", "true", "yes")
+METRICS_WORKERS = int(os.getenv("PULSECALL_METRICS_WORKERS", "2"))  # 0 = run on the audio thread pool
+METRICS_SILENCE_DBFS = -50.0  # frames quieter than this count as silence
+METRICS_FLOOR_DBFS = -100.0   # reported level for empty / digital-silence audio
+CROSSCHECK_DB_TOLERANCE = 6.0          # provider vs local level gap worth flagging
+CROSSCHECK_SPEECH_TOLERANCE = 0.25     # provider vs local speech-probability gap worth flagging
+
+# Containers ffmpeg can stream-copy into a pipe without re-encoding.
+_COPY_FORMATS = {
+    "audio/webm": "webm",
+    "audio/ogg": "ogg",
+    "audio/mpeg": "mp3",
+    "audio/mp3": "mp3",
+}
+
+_executor = ThreadPoolExecutor(max_workers=AUDIO_WORKERS, thread_name_prefix="pulsecall-audio")
+
+
+# ---------------------------------------------------------------------------
+# TTS audio profiles
+# ---------------------------------------------------------------------------
+AudioProfileName = Literal["standard", "wideband", "narrowband", "telephony"]
+
+AUDIO_PROFILES: dict[str, dict[str, Any]] = {
+    # Browser playback default — what every campaign used before profiles.
+    "standard": {"sample_rate": 24000, "output_format": "mp3", "content_type": "audio/mpeg"},
+    # 16 kHz Opus — good speech quality at a fraction of the mp3 payload.
+    "wideband": {"sample_rate": 16000, "output_format": "opus", "content_type": "audio/ogg; codecs=opus"},
+    # 8 kHz mp3 for constrained links that still need a browser-playable codec.
+    "narrowband": {"sample_rate": 8000, "output_format": "mp3", "content_type": "audio/mpeg"},
+    # G.711 mu-law, the native format of phone trunks.
+    "telephony": {"sample_rate": 8000, "output_format": "mulaw", "content_type": "audio/basic"},
+}
+DEFAULT_AUDIO_PROFILE = "standard"
+# Who plays the audio back: the simulate page in a browser, or a telephony
+# bridge relaying to a phone trunk. Browsers cannot decode raw mu-law, so they
+# get the nearest playable profile instead.
+CallerType = Literal["browser", "phone"]
+BROWSER_PROFILE_FALLBACKS = {"telephony": "narrowband"}
+TTS_CACHE_SIZE = int(os.getenv("PULSECALL_TTS_CACHE_SIZE", "256"))
+
+
+def resolve_tts_profile(campaign: dict, caller: CallerType = "browser") -> TtsProfile:
+    """Build the TTS profile for a campaign and caller, falling back to the standard profile."""
+    name = campaign.get("audio_profile") or DEFAULT_AUDIO_PROFILE
+    if name not in AUDIO_PROFILES:
+        logger.warning("Unknown audio profile %r on campaign %s — using %s", name, campaign.get("id"), DEFAULT_AUDIO_PROFILE)
+        name = DEFAULT_AUDIO_PROFILE
+    if caller == "browser":
+        name = BROWSER_PROFILE_FALLBACKS.get(name, name)
+    speed = campaign.get("speech_speed")
+    return TtsProfile(name=name, speed=speed if speed is not None else 1.0, **AUDIO_PROFILES[name])
+
+
+class TtsCache:
+    """LRU cache of synthesized audio keyed by text, voice and audio profile."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, bytes] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(text: str, voice_id: str, profile: TtsProfile) -> tuple:
+        return (text, voice_id, profile.sample_rate, profile.output_format, profile.speed)
+
+    def get(self, key: tuple) -> Optional[bytes]:
+        audio = self._entries.get(key)
+        if audio is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return audio
+
+    def put(self, key: tuple, audio: bytes) -> None:
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = audio
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+tts_cache = TtsCache(TTS_CACHE_SIZE)
+
+
+# ---------------------------------------------------------------------------
+# Decoding / encoding
+# ---------------------------------------------------------------------------
+def _base_content_type(content_type: str) -> str:
+    return content_type.split(";", 1)[0].strip().lower()
+
+
+def decode_pcm(audio: bytes, content_type: str) -> Optional[tuple[np.ndarray, int]]:
+    """Decode audio to mono float32 samples in [-1, 1].
+
+    WAV is decoded in-process; anything else goes through ffmpeg when it is
+    installed. Returns None if the audio cannot be decoded.
+    """
+    if _base_content_type(content_type) in ("audio/wav", "audio/x-wav", "audio/wave"):
+        try:
+            with wave.open(io.BytesIO(audio)) as wf:
+                if wf.getsampwidth() != 2:
+                    return None
+                channels = wf.getnchannels()
+                rate = wf.getframerate()
+                raw = wf.readframes(wf.getnframes())
+        except (wave.Error, EOFError):
+            return None
+        samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+        if channels > 1:
+            samples = samples.reshape(-1, channels).mean(axis=1)
+        return samples, rate
+
+    if FFMPEG_BIN is None:
+        return None
+    try:
+        proc = subprocess.run(
+            [FFMPEG_BIN, "-v", "error", "-i", "pipe:0", "-f", "s16le", "-ac", "1", "-ar", str(PCM_SAMPLE_RATE), "pipe:1"],
+            input=audio,
+            capture_output=True,
+            timeout=30,
+            check=True,
+        )
+    except (subprocess.SubprocessError, OSError):
+        logger.warning("ffmpeg could not decode %s upload (%d bytes)", content_type, len(audio))
+        return None
+    samples = np.frombuffer(proc.stdout, dtype="<i2").astype(np.float32) / 32768.0
+    return samples, PCM_SAMPLE_RATE
+
+
+def encode_wav(samples: np.ndarray, sample_rate: int) -> bytes:
+    """Encode mono float32 samples as 16-bit PCM WAV."""
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767.0).astype("<i2")
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(pcm.tobytes())
+    return buf.getvalue()
+
+
+def _ffmpeg_cut(audio: bytes, fmt: str, start_sec: float, end_sec: float) -> Optional[bytes]:
+    """Cut [start_sec, end_sec] out of a compressed upload without re-encoding."""
+    if FFMPEG_BIN is None:
+        return None
+    try:
+        proc = subprocess.run(
+            [
+                FFMPEG_BIN, "-v", "error", "-i", "pipe:0",
+                "-ss", f"{start_sec:.3f}", "-to", f"{end_sec:.3f}",
+                "-c", "copy", "-f", fmt, "pipe:1",
+            ],
+            input=audio,
+            capture_output=True,
+            timeout=30,
+            check=True,
+        )
+    except (subprocess.SubprocessError, OSError):
+        return None
+    return proc.stdout or None
+
+
+# ---------------------------------------------------------------------------
+# Voice-activity detection
+# ---------------------------------------------------------------------------
+def _frame_levels(samples: np.ndarray, sample_rate: int) -> tuple[np.ndarray, np.ndarray, int]:
+    """Per-frame level (dBFS) and zero-crossing rate, plus the frame length."""
+    frame_len = max(1, sample_rate * VAD_FRAME_MS // 1000)
+    n_frames = len(samples) // frame_len
+    frames = samples[: n_frames * frame_len].reshape(n_frames, frame_len)
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    db = 20.0 * np.log10(rms + 1e-10)
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / frame_len
+    return db, zcr, frame_len
+
+
+def _speech_frames(db: np.ndarray, zcr: np.ndarray) -> np.ndarray:
+    """Classify frames as speech by energy above the noise floor and crossing rate."""
+    floor, ceiling = np.percentile(db, [10, 90])
+    # Noise floor + margin, but never above the loud frames themselves — a clip
+    # that is speech end-to-end has no floor to speak of.
+    threshold = max(VAD_MIN_DBFS, min(floor + VAD_NOISE_MARGIN_DB, ceiling - VAD_NOISE_MARGIN_DB))
+    return (db > threshold) & ((zcr < VAD_ZCR_MAX) | (db > threshold + VAD_NOISE_MARGIN_DB))
+
+
+def detect_speech_bounds(samples: np.ndarray, sample_rate: int) -> Optional[tuple[int, int]]:
+    """Return the (start, end) sample range that contains speech.
+
+    Frames are classified by energy relative to an estimated noise floor, with
+    the zero-crossing rate used to reject quiet broadband hiss. Returns None
+    when no frame looks like speech, so callers can leave the audio untouched.
+    """
+    db, zcr, frame_len = _frame_levels(samples, sample_rate)
+    n_frames = db.shape[0]
+    if n_frames == 0:
+        return None
+
+    speech = _speech_frames(db, zcr)
+    if not speech.any():
+        return None
+
+    pad = VAD_PADDING_MS // VAD_FRAME_MS
+    first = max(0, int(np.argmax(speech)) - pad)
+    last = min(n_frames, n_frames - int(np.argmax(speech[::-1])) + pad)
+    end = len(samples) if last == n_frames else last * frame_len
+    return first * frame_len, end
+
+
+def trim_silence(audio: bytes, content_type: str) -> tuple[bytes, str, VadReport]:
+    """Trim leading/trailing non-speech from an upload.
+
+    Returns (audio, content_type, report). The original bytes are returned
+    unchanged whenever decoding fails, no speech is found, or the trimmed
+    encoding would not be smaller than the upload.
+    """
+    report = VadReport(original_bytes=len(audio), forwarded_bytes=len(audio))
+
+    decoded = decode_pcm(audio, content_type)
+    if decoded is None:
+        return audio, content_type, report
+    samples, rate = decoded
+    report.original_sec = report.forwarded_sec = len(samples) / rate
+
+    bounds = detect_speech_bounds(samples, rate)
+    if bounds is None or bounds == (0, len(samples)):
+        return audio, content_type, report
+    start, end = bounds
+
+    candidates: list[tuple[bytes, str]] = []
+    fmt = _COPY_FORMATS.get(_base_content_type(content_type))
+    if fmt is not None:
+        cut = _ffmpeg_cut(audio, fmt, start / rate, end / rate)
+        if cut:
+            candidates.append((cut, content_type))
+    candidates.append((encode_wav(samples[start:end], rate), "audio/wav"))
+
+    trimmed, trimmed_type = min(candidates, key=lambda c: len(c[0]))
+    if len(trimmed) >= len(audio):
+        return audio, content_type, report
+
+    report.trimmed = True
+    report.forwarded_bytes = len(trimmed)
+    report.forwarded_sec = (end - start) / rate
+    report.bytes_saved = report.original_bytes - report.forwarded_bytes
+    report.seconds_saved = round(report.original_sec - report.forwarded_sec, 3)
+    return trimmed, trimmed_type, report
+
+
+async def trim_silence_async(audio: bytes, content_type: str) -> tuple[bytes, str, VadReport]:
+    """Run :func:`trim_silence` on the audio worker pool, off the event loop."""
+    loop = asyncio.get_running_loop()
+    trimmed, trimmed_type, report = await loop.run_in_executor(_executor, trim_silence, audio, content_type)
+    logger.info(
+        "VAD trim: trimmed=%s bytes %d -> %d (saved %d), seconds saved %.2f",
+        report.trimmed, report.original_bytes, report.forwarded_bytes, report.bytes_saved, report.seconds_saved,
+    )
+    return trimmed, trimmed_type, report
+
+
+# ---------------------------------------------------------------------------
+# Local call metrics (triage input computed from the recording)
+# ---------------------------------------------------------------------------
+_metrics_executor: Optional[ProcessPoolExecutor] = None
+
+
+def compute_audio_metrics(samples: np.ndarray, sample_rate: int) -> AudioMetrics:
+    """Triage `AudioMetrics` from mono PCM, using the same frames as the VAD.
+
+    ``avg_db`` is the energy-averaged frame level and ``peak_db`` the loudest
+    frame (both dBFS); ``speech_probability`` is the share of speech frames.
+    """
+    duration = len(samples) / sample_rate if sample_rate else 0.0
+    db, zcr, frame_len = _frame_levels(samples, sample_rate)
+    if db.shape[0] == 0:
+        return AudioMetrics(
+            avg_db=METRICS_FLOOR_DBFS,
+            peak_db=METRICS_FLOOR_DBFS,
+            speech_probability=0.0,
+            silence_duration_sec=round(duration, 3),
+            call_duration_sec=round(duration, 3),
+        )
+    frame_sec = frame_len / sample_rate
+    mean_power = float(np.mean(np.power(10.0, db / 10.0)))
+    return AudioMetrics(
+        avg_db=round(max(METRICS_FLOOR_DBFS, 10.0 * np.log10(mean_power)), 2),
+        peak_db=round(max(METRICS_FLOOR_DBFS, float(db.max())), 2),
+        speech_probability=round(float(np.mean(_speech_frames(db, zcr))), 3),
+        silence_duration_sec=round(float(np.count_nonzero(db < METRICS_SILENCE_DBFS)) * frame_sec, 3),
+        call_duration_sec=round(duration, 3),
+    )
+
+
+def metrics_from_recording(audio: bytes, content_type: str) -> Optional[AudioMetrics]:
+    """Decode a call recording and compute its metrics; None if it can't be decoded."""
+    decoded = decode_pcm(audio, content_type)
+    if decoded is None:
+        return None
+    samples, rate = decoded
+    return compute_audio_metrics(samples, rate)
+
+
+def _metrics_pool() -> ProcessPoolExecutor | ThreadPoolExecutor:
+    # Created on first use so importing this module never forks.
+    global _metrics_executor
+    if METRICS_WORKERS <= 0:
+        return _executor
+    if _metrics_executor is None:
+        _metrics_executor = ProcessPoolExecutor(max_workers=METRICS_WORKERS)
+    return _metrics_executor
+
+
+def shutdown_metrics_pool() -> None:
+    global _metrics_executor
+    if _metrics_executor is not None:
+        _metrics_executor.shutdown(wait=False, cancel_futures=True)
+        _metrics_executor = None
+
+
+async def metrics_from_recording_async(audio: bytes, content_type: str) -> Optional[AudioMetrics]:
+    """Run :func:`metrics_from_recording` on the metrics process pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_metrics_pool(), metrics_from_recording, audio, content_type)
+
+
+def crosscheck_metrics(provider: AudioMetrics, local: AudioMetrics) -> MetricsCrosscheck:
+    """Compare provider-supplied metrics with locally computed ones (provider − local)."""
+    check = MetricsCrosscheck(
+        avg_db_delta=round(provider.avg_db - local.avg_db, 2),
+        peak_db_delta=round(provider.peak_db - local.peak_db, 2),
+        speech_probability_delta=round(provider.speech_probability - local.speech_probability, 3),
+        silence_duration_delta=round(provider.silence_duration_sec - local.silence_duration_sec, 3),
+    )
+    check.agrees = (
+        abs(check.avg_db_delta) <= CROSSCHECK_DB_TOLERANCE
+        and abs(check.peak_db_delta) <= CROSSCHECK_DB_TOLERANCE
+        and abs(check.speech_probability_delta) <= CROSSCHECK_SPEECH_TOLERANCE
+    )
+    return check
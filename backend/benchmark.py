@@ -0,0 +1,298 @@
+"""Micro-benchmarks for triage, prompt building and serialization hot paths.
+
+Workloads are scaled-up versions of the `make_*_payload` factories in
+test_webhooks.py and the seed patients in main.py: long transcripts with word
+timestamps on every user word, patient profiles with long medication lists and
+call logs, and a store full of calls for the list endpoints.
+
+Usage:
+    python benchmark.py                               # run all → bench_results.json
+    python benchmark.py --quick                       # smaller workloads, fewer repeats
+    python benchmark.py --only triage                 # benchmarks whose name contains "triage"
+    python benchmark.py --save-baseline               # also write bench_baseline.json
+    python benchmark.py --baseline bench_baseline.json --tolerance 0.25
+                                                      # flag regressions (exit code 1)
+    python benchmark.py --db-scaling                  # webhook lookup cost vs call_history size
+"""
+
+from __future__ import annotations
+
+import argparse
+import copy
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import timeit
+from datetime import datetime, timezone
+from types import ModuleType
+from typing import Any, Callable
+
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import bindparam, create_engine, event, select, text
+
+from models import FastPostCallPayload, SmallestAIPostCallPayload, TranscriptSegment
+from speech_features import transcript_speech_features
+from test_webhooks import SCENARIOS, _timed_words, make_normal_speech_payload
+from triage import analyze_vitals, analyze_vitals_batch, payloads_to_columns
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+DEFAULT_RESULTS_PATH = "bench_results.json"
+DEFAULT_BASELINE_PATH = "bench_baseline.json"
+DEFAULT_TOLERANCE = 0.25     # median slower than baseline by more than this → regression
+REPEATS = 7
+QUICK_REPEATS = 3
+MIN_SAMPLE_SEC = 0.05        # each repeat runs the op enough times to take at least this long
+DB_SCALING_SIZES = (1_000, 10_000, 100_000)
+
+_USER_LINE = "The swelling is a bit better today and I did my exercises twice but the knee is still stiff"
+
+
+# ---------------------------------------------------------------------------
+# Workloads
+# ---------------------------------------------------------------------------
+def long_transcript_payload(turns: int) -> SmallestAIPostCallPayload:
+    """Normal-speech payload stretched to ``turns`` exchanges, every user word timed."""
+    payload = make_normal_speech_payload()
+    agent, user = payload.transcript
+    transcript: list[TranscriptSegment] = []
+    t = 0.0
+    for _ in range(turns):
+        transcript.append(agent.model_copy(update={"start": t, "end": t + 3.5}))
+        words = _timed_words(_USER_LINE, t + 4.0, 0.3, 0.15, [0.95, 0.9, 0.85])
+        transcript.append(user.model_copy(update={"text": _USER_LINE, "start": t + 4.0, "end": words[-1].end, "word_timestamps": words}))
+        t = words[-1].end + 1.0
+    payload.transcript = transcript
+    payload.audio_metrics.call_duration_sec = t
+    return payload
+
+
+def large_patient_data(base: dict[str, Any], scale: int) -> dict[str, Any]:
+    """A seed patient profile with ``scale``× the history, medications and call logs."""
+    pd = copy.deepcopy(base)
+    pd["surgicalHistory"] = [dict(s, notes=f"{s.get('notes', '')} (entry {i})") for i in range(scale) for s in base.get("surgicalHistory", [])]
+    pd["medications"] = [dict(m, name=f"{m.get('name', '')} #{i}") for i in range(scale) for m in base.get("medications", [])]
+    pd["postOpInstructions"] = list(base.get("postOpInstructions", [])) * scale
+    pd["previousCalls"] = [dict(c, date=f"{c.get('date', '')}-{i}") for i in range(scale * 10) for c in base.get("previousCalls", [])]
+    return pd
+
+
+def fill_calls(main: ModuleType, count: int, turns: int) -> None:
+    """Populate the store with ``count`` ended calls of ``turns`` exchanges."""
+    demo = main.store["calls"]["call_demo_001"]
+    transcript = demo["transcript"] * turns
+    for i in range(count):
+        call_id = f"call_bench_{i:05d}"
+        main.store["calls"][call_id] = dict(demo, id=call_id, call_id=call_id, ended_at=f"2026-01-01T00:00:{i % 60:02d}+00:00", transcript=transcript)
+
+
+# ---------------------------------------------------------------------------
+# Benchmarks
+# ---------------------------------------------------------------------------
+def build_benchmarks(main: ModuleType, quick: bool = False) -> dict[str, Callable[[], Any]]:
+    """Name → zero-argument callable. Workloads are built here, outside the timed region."""
+    turns = 20 if quick else 200
+    scenarios = [factory() for _, factory in SCENARIOS]
+    long_payload = long_transcript_payload(turns)
+    long_dict = long_payload.model_dump(mode="json")
+    long_json = long_payload.model_dump_json()
+    batch_columns = payloads_to_columns(scenarios * (20 if quick else 500))
+
+    seed = main.SEED_PATIENTS[0]
+    campaign = dict(main.store["campaigns"][seed["campaign_id"]])
+    campaign["patient_data"] = large_patient_data(seed["patient_data"], 5 if quick else 50)
+    campaign["patient_context"] = ""
+
+    fill_calls(main, 50 if quick else 1000, 5 if quick else 20)
+
+    def list_json(endpoint: Callable[..., Any]) -> Callable[[], str]:
+        # What FastAPI does for an endpoint without a response_model, for one default-size page.
+        return lambda: json.dumps(jsonable_encoder(endpoint(Response(), limit=main.PAGE_DEFAULT_LIMIT)))
+
+    return {
+        "triage.analyze_vitals[scenarios]": lambda: [analyze_vitals(p) for p in scenarios],
+        "triage.analyze_vitals[long_transcript]": lambda: analyze_vitals(long_payload),
+        "triage.analyze_vitals_batch[columns]": lambda: analyze_vitals_batch(**batch_columns),
+        "triage.speech_features[long_transcript]": lambda: transcript_speech_features(long_payload.transcript),
+        "prompt.build_patient_context[large]": lambda: main._build_patient_context(campaign["patient_data"]),
+        "prompt.build_system_prompt[large]": lambda: main._build_system_prompt(campaign),
+        "pydantic.validate_post_call[dict]": lambda: SmallestAIPostCallPayload.model_validate(long_dict),
+        "pydantic.validate_post_call[json]": lambda: SmallestAIPostCallPayload.model_validate_json(long_json),
+        "pydantic.decode_webhook[fast]": lambda: main.decode_webhook_body(long_json, FastPostCallPayload, SmallestAIPostCallPayload),
+        "serialize.list_calls": list_json(main.list_calls),
+        "serialize.list_campaigns": list_json(main.list_campaigns),
+    }
+
+
+def time_benchmark(fn: Callable[[], Any], repeats: int = REPEATS, min_sample_sec: float = MIN_SAMPLE_SEC) -> dict[str, Any]:
+    """Median / min time per call in microseconds."""
+    timer = timeit.Timer(fn)
+    number = 1
+    while timer.timeit(number) < min_sample_sec:
+        number *= 2
+    samples = [t / number * 1e6 for t in timer.repeat(repeat=repeats, number=number)]
+    return {
+        "median_us": round(statistics.median(samples), 3),
+        "min_us": round(min(samples), 3),
+        "number": number,
+        "repeats": repeats,
+    }
+
+
+def run_benchmarks(
+    main: ModuleType,
+    quick: bool = False,
+    only: str = "",
+    min_sample_sec: float = MIN_SAMPLE_SEC,
+) -> dict[str, Any]:
+    benchmarks = build_benchmarks(main, quick=quick)
+    results = {}
+    for name, fn in benchmarks.items():
+        if only and only not in name:
+            continue
+        results[name] = time_benchmark(fn, QUICK_REPEATS if quick else REPEATS, min_sample_sec)
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "quick": quick,
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict[str, Any], baseline: dict[str, Any], tolerance: float = DEFAULT_TOLERANCE) -> list[dict[str, Any]]:
+    """Compare median timings against a baseline run; one row per benchmark."""
+    rows = []
+    base_results = baseline.get("results", {})
+    for name, result in current["results"].items():
+        base = base_results.get(name)
+        if base is None:
+            rows.append({"name": name, "current_us": result["median_us"], "baseline_us": None, "ratio": None, "status": "new"})
+            continue
+        ratio = result["median_us"] / base["median_us"] if base["median_us"] else float("inf")
+        if ratio > 1 + tolerance:
+            status = "regression"
+        elif ratio < 1 - tolerance:
+            status = "improved"
+        else:
+            status = "ok"
+        rows.append({"name": name, "current_us": result["median_us"], "baseline_us": base["median_us"], "ratio": round(ratio, 3), "status": status})
+    return rows
+
+
+# ---------------------------------------------------------------------------
+# Database lookup scaling
+# ---------------------------------------------------------------------------
+def lookup_scaling(
+    sizes: tuple[int, ...] = DB_SCALING_SIZES,
+    repeats: int = QUICK_REPEATS,
+    min_sample_sec: float = MIN_SAMPLE_SEC,
+) -> list[dict[str, Any]]:
+    """Time the webhook's ``smallest_call_id`` lookup against call_history sizes.
+
+    Each size gets a scratch database with the current schema; the lookup is
+    timed with the index, then again after dropping it (the pre-index cost).
+    """
+    import database  # imported here so _import_main can still point it at a scratch file
+
+    rows = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine(f"sqlite:///{tmp}/bench.db")
+            event.listen(engine, "connect", database._apply_pragmas)
+            database.Base.metadata.create_all(engine)
+            with engine.begin() as conn:
+                conn.execute(
+                    database.CallRecord.__table__.insert(),
+                    [
+                        {"id": f"call_{i:07d}", "user_id": f"usr_{i % 500:04d}", "state": "COMPLETED", "smallest_call_id": f"smallest_{i:07d}"}
+                        for i in range(size)
+                    ],
+                )
+            stmt = select(database.CallRecord.id).where(database.CallRecord.smallest_call_id == bindparam("sid"))
+            params = {"sid": f"smallest_{size // 2:07d}"}
+            with engine.connect() as conn:
+                indexed = time_benchmark(lambda: conn.execute(stmt, params).first(), repeats, min_sample_sec)
+                conn.execute(text("DROP INDEX ix_call_history_smallest_call_id"))
+                scan = time_benchmark(lambda: conn.execute(stmt, params).first(), repeats, min_sample_sec)
+            engine.dispose()
+        rows.append({"rows": size, "indexed_us": indexed["median_us"], "full_scan_us": scan["median_us"]})
+    return rows
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+def _import_main() -> ModuleType:
+    # main pulls in claude.py, which refuses to import without a key. Nothing
+    # here calls the network, so a placeholder is enough.
+    os.environ.setdefault("OPENROUTER_API_KEY", "benchmark-placeholder")
+    # fill_calls writes a thousand calls; keep them out of the real database.
+    os.environ.pop("PULSECALL_DATABASE_URL", None)
+    os.environ["PULSECALL_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="pulsecall-bench-"), "bench.db")
+    import main
+
+    main.init_db()
+    main.seed_example_data()
+    return main
+
+
+def run_cli() -> int:
+    parser = argparse.ArgumentParser(description="PulseCall hot-path micro-benchmarks")
+    parser.add_argument("--quick", action="store_true", help="Smaller workloads and fewer repeats")
+    parser.add_argument("--only", default="", help="Run only benchmarks whose name contains this")
+    parser.add_argument("--output", default=DEFAULT_RESULTS_PATH, help="Where to write results JSON")
+    parser.add_argument("--baseline", default=None, help="Baseline results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed slowdown ratio (0.25 = 25%%)")
+    parser.add_argument("--save-baseline", action="store_true", help=f"Also write results to {DEFAULT_BASELINE_PATH}")
+    parser.add_argument("--db-scaling", action="store_true", help="Only time the webhook call lookup against table size")
+    parser.add_argument("--db-sizes", default=",".join(map(str, DB_SCALING_SIZES)), help="Comma-separated row counts for --db-scaling")
+    args = parser.parse_args()
+
+    if args.db_scaling:
+        print(f"{'rows':>10} {'indexed µs':>12} {'full scan µs':>14}")
+        for row in lookup_scaling(tuple(int(n) for n in args.db_sizes.split(","))):
+            print(f"{row['rows']:>10} {row['indexed_us']:>12.1f} {row['full_scan_us']:>14.1f}")
+        return 0
+
+    baseline = None
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results = run_benchmarks(_import_main(), quick=args.quick, only=args.only)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(DEFAULT_BASELINE_PATH, "w") as f:
+            json.dump(results, f, indent=2)
+
+    print("=" * 72)
+    print("BENCHMARKS")
+    print("=" * 72)
+    if baseline is None:
+        for name, r in results["results"].items():
+            print(f"  {name:<45} {r['median_us']:>12.1f} µs  (min {r['min_us']:.1f})")
+        return 0
+
+    rows = compare(results, baseline, args.tolerance)
+    for row in rows:
+        marker = {"regression": "❌", "improved": "⚡", "new": "🆕"}.get(row["status"], "✅")
+        base = f"{row['baseline_us']:.1f}" if row["baseline_us"] is not None else "-"
+        ratio = f"x{row['ratio']:.2f}" if row["ratio"] is not None else ""
+        print(f"  {marker} {row['name']:<45} {row['current_us']:>12.1f} µs  (baseline {base}) {ratio}")
+    regressions = [r for r in rows if r["status"] == "regression"]
+    print()
+    print(f"Results: {len(regressions)} regression(s) out of {len(rows)} benchmarks (tolerance {args.tolerance:.0%})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_cli())
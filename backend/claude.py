@@ -88,7 +88,11 @@ PROCESS_CALL_TOOL = {
 }
 
 
-def process_transcript(transcript: list[dict[str, str]], escalation_keywords: list[str]) -> dict:
+def process_transcript(
+    transcript: list[dict[str, str]],
+    escalation_keywords: list[str],
+    model: str = ANALYSIS_MODEL,
+) -> dict:
     formatted = "\n".join(
         f"{'Recipient' if t['role'] == 'user' else 'Agent'}: {t['content']}"
         for t in transcript
@@ -103,7 +107,7 @@ def process_transcript(transcript: list[dict[str, str]], escalation_keywords: li
     )
 
     payload = {
-        "model": ANALYSIS_MODEL,
+        "model": model,
         "messages": [{"role": "user", "content": prompt}],
         "response_format": {"type": "json_object"},
         "max_tokens": 1024,
@@ -1,28 +1,141 @@
-"""SQLite database for call history and retry tracking via SQLAlchemy."""
+"""Database for call history and retry tracking via SQLAlchemy.
+
+SQLite (`PULSECALL_DB_PATH`) is the default. Setting `PULSECALL_DATABASE_URL`
+to a PostgreSQL URL lets several API and worker nodes share one database;
+the psycopg 3 driver serves both engines and connections are pooled.
+
+Routes and the scheduler use the async engine (aiosqlite / psycopg) through
+`get_session` / `AsyncSessionLocal`; the sync engine remains for schema
+setup and offline tools such as retriage.py. SQLite connections open in WAL
+mode, so dashboard reads don't wait on webhook writes, with a busy timeout
+instead of failing immediately when another writer holds the lock.
+
+The dashboard entities (campaigns, conversations, calls, escalations,
+trends) are JSON documents in their own tables, read and written through
+entity_store.py.
+"""
 
 from __future__ import annotations
 
+import json
+import logging
 import os
+import zlib
 from datetime import datetime, timezone
+from typing import AsyncIterator, Optional
 
 from sqlalchemy import (
+    DDL,
+    JSON,
     Column,
     DateTime,
     Enum,
+    ForeignKey,
+    Index,
     Integer,
+    LargeBinary,
     String,
     Text,
     create_engine,
+    event,
+    func,
+    inspect,
+    literal_column,
+    make_url,
+    text,
 )
-from sqlalchemy.orm import DeclarativeBase, Session, sessionmaker
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import DeclarativeBase, Session, relationship, sessionmaker
 
 from models import CallState
 
+try:
+    import zstandard
+except ImportError:  # zlib only
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
 DB_PATH = os.getenv("PULSECALL_DB_PATH", "pulsecall.db")
-DATABASE_URL = f"sqlite:///{DB_PATH}"
+DATABASE_URL = os.getenv("PULSECALL_DATABASE_URL") or f"sqlite:///{DB_PATH}"
+
+# Connection pool (PostgreSQL; SQLite keeps SQLAlchemy's defaults). Sized per
+# process: nodes × workers × (pool + overflow) must fit max_connections.
+DB_POOL_SIZE = int(os.getenv("PULSECALL_DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("PULSECALL_DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT_SEC = float(os.getenv("PULSECALL_DB_POOL_TIMEOUT_SEC", "30"))
+DB_POOL_RECYCLE_SEC = int(os.getenv("PULSECALL_DB_POOL_RECYCLE_SEC", "1800"))  # under typical idle timeouts
+
+# Codec for new transcript blobs; stored blobs of either codec stay readable.
+TRANSCRIPT_CODEC = os.getenv("PULSECALL_TRANSCRIPT_CODEC", "zstd" if zstandard else "zlib")
+TRANSCRIPT_ZSTD_LEVEL = int(os.getenv("PULSECALL_TRANSCRIPT_ZSTD_LEVEL", "9"))
+TRANSCRIPT_ZLIB_LEVEL = int(os.getenv("PULSECALL_TRANSCRIPT_ZLIB_LEVEL", "6"))
+
+# Applied to every new connection (sync and async).
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",          # readers don't block on the writer (and vice versa)
+    "synchronous": "NORMAL",        # safe with WAL; fsync at checkpoints, not every commit
+    "busy_timeout": int(os.getenv("PULSECALL_SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "cache_size": -int(os.getenv("PULSECALL_SQLITE_CACHE_KB", "20000")),  # negative = KiB
+    "temp_store": "MEMORY",
+}
+
+
+def _apply_pragmas(dbapi_conn, _record) -> None:
+    cursor = dbapi_conn.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def _engine_urls(url: str) -> tuple[str, str]:
+    """(sync, async) URLs for the configured database."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        return url, parsed.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    if parsed.get_backend_name() == "postgresql":
+        psycopg = parsed.set(drivername="postgresql+psycopg").render_as_string(hide_password=False)
+        return psycopg, psycopg
+    raise ValueError(f"Unsupported database URL: {parsed.render_as_string()}")
+
+
+SYNC_DATABASE_URL, ASYNC_DATABASE_URL = _engine_urls(DATABASE_URL)
+IS_SQLITE = make_url(DATABASE_URL).get_backend_name() == "sqlite"
+
+if IS_SQLITE:
+    _engine_options: dict = {"connect_args": {"check_same_thread": False}}
+    _async_engine_options: dict = {}
+else:
+    _engine_options = _async_engine_options = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT_SEC,
+        "pool_recycle": DB_POOL_RECYCLE_SEC,
+        "pool_pre_ping": True,  # drop connections the server or a proxy closed
+    }
+
+engine = create_engine(SYNC_DATABASE_URL, echo=False, **_engine_options)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, echo=False, **_async_engine_options)
+if IS_SQLITE:
+    event.listen(engine, "connect", _apply_pragmas)
+    event.listen(async_engine.sync_engine, "connect", _apply_pragmas)
 
-engine = create_engine(DATABASE_URL, echo=False, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+class AppSession(Session):
+    """Session class behind both factories, so flush hooks (see rollups.py) see every ORM write."""
+
+
+SessionLocal = sessionmaker(bind=engine, class_=AppSession, autoflush=False, autocommit=False)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, sync_session_class=AppSession, autoflush=False, expire_on_commit=False
+)
 
 
 class Base(DeclarativeBase):
@@ -31,23 +144,37 @@ class Base(DeclarativeBase):
 
 class UserRecord(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # /users pages, newest first, optionally for one campaign.
+        Index("ix_users_created_at", "created_at"),
+        Index("ix_users_campaign_created", "campaign_id", "created_at"),
+        # Bulk import dedupe (see user_import.py); NULL for users created one at a time.
+        Index("ix_users_import_key", "import_key", unique=True),
+    )
 
     id = Column(String, primary_key=True)
     name = Column(String, nullable=False)
     phone = Column(String, nullable=False)
     email = Column(String, nullable=True)
     campaign_id = Column(String, nullable=True)
-    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    import_key = Column(String, nullable=True)
 
 
 class CallRecord(Base):
     __tablename__ = "call_history"
+    __table_args__ = (
+        # Scheduler: latest call per user.
+        Index("ix_call_history_user_created", "user_id", "created_at"),
+        # Retry selection: calls in a retry state whose retry time has come.
+        Index("ix_call_history_state_next_retry", "state", "next_retry_at"),
+    )
 
     id = Column(String, primary_key=True)
-    user_id = Column(String, nullable=False, index=True)
+    user_id = Column(String, nullable=False)
     campaign_id = Column(String, nullable=True)
     state = Column(
-        Enum(CallState),
+        Enum(CallState, name="call_state"),  # native enum type on PostgreSQL, VARCHAR on SQLite
         nullable=False,
         default=CallState.PENDING,
     )
@@ -55,30 +182,471 @@ class CallRecord(Base):
     max_retries = Column(Integer, default=3)
     triage_classification = Column(String, nullable=True)
     triage_reason = Column(String, nullable=True)
-    transcript_text = Column(Text, nullable=True)
+    local_audio_metrics = Column(Text, nullable=True)  # JSON: metrics computed from the recording + crosscheck
     summary = Column(Text, nullable=True)
     sentiment_score = Column(Integer, nullable=True)
-    detected_flags = Column(Text, nullable=True)  # JSON-encoded list
+    detected_flags = Column(JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), "postgresql"), nullable=True)  # list[str]
     recommended_action = Column(Text, nullable=True)
     escalation_reason = Column(Text, nullable=True)
-    smallest_call_id = Column(String, nullable=True)
-    started_at = Column(DateTime, nullable=True)
-    ended_at = Column(DateTime, nullable=True)
-    next_retry_at = Column(DateTime, nullable=True)
-    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
-    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+    smallest_call_id = Column(String, nullable=True, unique=True, index=True)  # webhook lookup key
+    # timestamptz on PostgreSQL; SQLite stores them naive, see as_utc().
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    ended_at = Column(DateTime(timezone=True), nullable=True)
+    next_retry_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    updated_at = Column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc)
+    )
+
+    # Transcript and triage input live compressed in call_transcripts, so
+    # scans of call_history never read them. Async code must load them with
+    # selectinload(CallRecord.transcript) before using the properties below.
+    transcript = relationship("CallTranscript", uselist=False, cascade="all, delete-orphan", passive_deletes=True)
+
+    @property
+    def transcript_text(self) -> Optional[str]:
+        return decompress_text(self.transcript.transcript_text) if self.transcript else None
+
+    @transcript_text.setter
+    def transcript_text(self, value: Optional[str]) -> None:
+        self._transcript_row().transcript_text = compress_text(value)
+
+    @property
+    def triage_input(self) -> Optional[str]:
+        """JSON: audio_metrics, transcript, emotions (see triage.triage_input_json)."""
+        return decompress_text(self.transcript.triage_input) if self.transcript else None
+
+    @triage_input.setter
+    def triage_input(self, value: Optional[str]) -> None:
+        self._transcript_row().triage_input = compress_text(value)
+
+    def _transcript_row(self) -> "CallTranscript":
+        if self.transcript is None:
+            self.transcript = CallTranscript()
+        return self.transcript
+
+
+class CallTranscript(Base):
+    """Compressed large text for one call_history row (see compress_text)."""
+
+    __tablename__ = "call_transcripts"
+
+    call_id = Column(String, ForeignKey("call_history.id", ondelete="CASCADE"), primary_key=True)
+    transcript_text = Column(LargeBinary, nullable=True)
+    triage_input = Column(LargeBinary, nullable=True)
+
+
+class CallArchiveMonth(Base):
+    """Which monthly archive files (see archive.py) hold calls for a user."""
+
+    __tablename__ = "call_archive_months"
+
+    user_id = Column(String, primary_key=True)
+    month = Column(String, primary_key=True)  # "YYYY-MM", the call's created_at month (UTC)
+
+
+# ---------------------------------------------------------------------------
+# Transcript compression
+# ---------------------------------------------------------------------------
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def compress_text(value: Optional[str]) -> Optional[bytes]:
+    if value is None:
+        return None
+    raw = value.encode("utf-8")
+    if TRANSCRIPT_CODEC == "zstd":
+        if zstandard is None:
+            raise RuntimeError("PULSECALL_TRANSCRIPT_CODEC=zstd needs the zstandard package")
+        return zstandard.ZstdCompressor(level=TRANSCRIPT_ZSTD_LEVEL).compress(raw)
+    return zlib.compress(raw, TRANSCRIPT_ZLIB_LEVEL)
+
+
+def decompress_text(blob: Optional[bytes]) -> Optional[str]:
+    """Inverse of compress_text for either codec (zstd frames are recognised by their magic)."""
+    if blob is None:
+        return None
+    if blob[:4] == _ZSTD_MAGIC:
+        if zstandard is None:
+            raise RuntimeError("This transcript is zstd-compressed; install the zstandard package")
+        return zstandard.ZstdDecompressor().decompress(blob).decode("utf-8")
+    return zlib.decompress(blob).decode("utf-8")
+
+
+# ---------------------------------------------------------------------------
+# Dashboard entities (see entity_store.py)
+#
+# Each row holds the API document as JSON in `data`; the other columns are
+# copies of the fields lists filter and sort on. Timestamps are the ISO
+# strings the documents carry, which sort chronologically. `version` goes up
+# on every write, so concurrent workers can update a row optimistically.
+# ---------------------------------------------------------------------------
+class CampaignRecord(Base):
+    __tablename__ = "campaigns"
+
+    id = Column(String, primary_key=True)
+    created_at = Column(String, nullable=True, index=True)
+    data = Column(Text, nullable=False)
+    version = Column(Integer, nullable=False, default=1, server_default="0")
+
+
+class ConversationRecord(Base):
+    __tablename__ = "conversations"
+
+    id = Column(String, primary_key=True)
+    campaign_id = Column(String, nullable=True, index=True)
+    status = Column(String, nullable=True)
+    started_at = Column(String, nullable=True, index=True)
+    data = Column(Text, nullable=False)
+    version = Column(Integer, nullable=False, default=1, server_default="0")
+
+
+class CampaignCallRecord(Base):
+    """An ended campaign conversation (`/calls`), not an outbound `call_history` row."""
+
+    __tablename__ = "campaign_calls"
+
+    id = Column(String, primary_key=True)
+    campaign_id = Column(String, nullable=True, index=True)
+    ended_at = Column(String, nullable=True, index=True)
+    sentiment_score = Column(Integer, nullable=True)
+    escalation_id = Column(String, nullable=True)
+    data = Column(Text, nullable=False)
+    version = Column(Integer, nullable=False, default=1, server_default="0")
+
+
+class EscalationRecord(Base):
+    __tablename__ = "escalations"
+    __table_args__ = (Index("ix_escalations_status_priority", "status", "priority"),)
+
+    id = Column(String, primary_key=True)
+    campaign_id = Column(String, nullable=True)
+    status = Column(String, nullable=True)
+    priority = Column(String, nullable=True)
+    created_at = Column(String, nullable=True)
+    data = Column(Text, nullable=False)
+    version = Column(Integer, nullable=False, default=1, server_default="0")
+
+
+class PatientTrendRecord(Base):
+    __tablename__ = "patient_trends"
+
+    id = Column(String, primary_key=True)  # patient id
+    updated_at = Column(String, nullable=True)
+    data = Column(Text, nullable=False)
+    version = Column(Integer, nullable=False, default=1, server_default="0")
+
+
+# ---------------------------------------------------------------------------
+# Analytics rollups: running totals per campaign and UTC day, adjusted in the
+# transaction of every call write (see rollups.py).
+# ---------------------------------------------------------------------------
+class CallRollup(Base):
+    __tablename__ = "call_rollups"
+
+    campaign_id = Column(String, primary_key=True)  # "" for calls without a campaign
+    day = Column(String, primary_key=True)  # "YYYY-MM-DD", the UTC day the call was placed
+    calls = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+    escalated = Column(Integer, nullable=False, default=0)
+    # Attempts that ended busy or silent and were rescheduled; the retry is a new call.
+    retried = Column(Integer, nullable=False, default=0)
+    sentiment_total = Column(Integer, nullable=False, default=0)
+    sentiment_calls = Column(Integer, nullable=False, default=0)  # calls with a sentiment_score
+
+
+class CallTriageRollup(Base):
+    __tablename__ = "call_triage_rollups"
+
+    campaign_id = Column(String, primary_key=True)
+    day = Column(String, primary_key=True)
+    classification = Column(String, primary_key=True)
+    calls = Column(Integer, nullable=False, default=0)
+
+
+# ---------------------------------------------------------------------------
+# Full-text search (see search.py): one row of plain text per searchable call.
+# On SQLite the FTS5 table `call_search` indexes it (external content, synced
+# by triggers); on PostgreSQL a GIN index over `search_vector` does.
+# ---------------------------------------------------------------------------
+SEARCH_FTS_TABLE = "call_search"
+SEARCH_LANGUAGE = literal_column("'english'::regconfig")  # a constant, so queries match the index expression
+
+
+def search_vector(flags, summary, transcript):
+    """PostgreSQL tsvector of a search document: flags weigh most, then summary, then transcript."""
+    def weighted(column, weight: str):
+        # Literals, not bound parameters, or the planner can't match the index expression.
+        text_value = func.coalesce(column, literal_column("''"))
+        return func.setweight(func.to_tsvector(SEARCH_LANGUAGE, text_value), literal_column(f"'{weight}'"))
+    return weighted(flags, "A").op("||")(weighted(summary, "B")).op("||")(weighted(transcript, "D"))
+
+
+class SearchDocument(Base):
+    __tablename__ = "search_documents"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)  # the FTS5 rowid
+    call_id = Column(String, nullable=False, unique=True)
+    kind = Column(String, nullable=False)  # "outbound" (call_history) or "campaign" (campaign_calls)
+    campaign_id = Column(String, nullable=True)
+    user_id = Column(String, nullable=True)
+    placed_at = Column(String, nullable=True)  # ISO UTC, like the dashboard entity timestamps
+    transcript = Column(Text, nullable=True)
+    summary = Column(Text, nullable=True)
+    flags = Column(Text, nullable=True)  # detected flags, one per line
+
+    __table_args__ = (
+        Index("ix_search_documents_vector", search_vector(flags, summary, transcript), postgresql_using="gin")
+        .ddl_if(dialect="postgresql"),
+    )
+
+
+_SEARCH_FTS_COLUMNS = "transcript, summary, flags"
+for _statement in (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_FTS_TABLE} USING fts5({_SEARCH_FTS_COLUMNS}, "
+    "content='search_documents', content_rowid='id', tokenize='porter unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER IF NOT EXISTS search_documents_ai AFTER INSERT ON search_documents BEGIN "
+    f"INSERT INTO {SEARCH_FTS_TABLE} (rowid, {_SEARCH_FTS_COLUMNS}) VALUES (new.id, new.transcript, new.summary, new.flags); END",
+    f"CREATE TRIGGER IF NOT EXISTS search_documents_ad AFTER DELETE ON search_documents BEGIN "
+    f"INSERT INTO {SEARCH_FTS_TABLE} ({SEARCH_FTS_TABLE}, rowid, {_SEARCH_FTS_COLUMNS}) "
+    "VALUES ('delete', old.id, old.transcript, old.summary, old.flags); END",
+    f"CREATE TRIGGER IF NOT EXISTS search_documents_au AFTER UPDATE ON search_documents BEGIN "
+    f"INSERT INTO {SEARCH_FTS_TABLE} ({SEARCH_FTS_TABLE}, rowid, {_SEARCH_FTS_COLUMNS}) "
+    "VALUES ('delete', old.id, old.transcript, old.summary, old.flags); "
+    f"INSERT INTO {SEARCH_FTS_TABLE} (rowid, {_SEARCH_FTS_COLUMNS}) VALUES (new.id, new.transcript, new.summary, new.flags); END",
+):
+    event.listen(SearchDocument.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+
+
+_CONFLICT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def conflict_insert(table):
+    """INSERT for the configured backend that supports ON CONFLICT DO NOTHING / DO UPDATE."""
+    return _CONFLICT_INSERTS[engine.dialect.name](table)
+
+
+def as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Timestamps read back from SQLite are naive UTC; make them comparable with aware ones."""
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
 
 
 def init_db() -> None:
-    """Create all tables if they don't exist."""
+    """Create all tables if they don't exist and bring older databases up to date."""
+    fresh = not inspect(engine).has_table(CallRecord.__tablename__)
     Base.metadata.create_all(bind=engine)
+    if fresh:
+        # create_all just built the current schema; there is nothing to upgrade.
+        with engine.begin() as conn:
+            _set_schema_version(conn, SCHEMA_VERSION)
+        return
+    _add_missing_columns()
+    migrate()
 
 
-def get_db() -> Session:
-    """Yield a database session."""
-    db = SessionLocal()
-    try:
-        return db
-    except Exception:
-        db.close()
-        raise
+def _add_missing_columns() -> None:
+    """Add nullable columns introduced after a table was first created.
+
+    `create_all` never alters existing tables, so databases created by an
+    older build get new columns appended here instead.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {col["name"] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                col_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {col_type}'))
+
+
+# ---------------------------------------------------------------------------
+# Schema revisions (PRAGMA user_version on SQLite, schema_version elsewhere)
+# ---------------------------------------------------------------------------
+def _schema_version(conn) -> int:
+    if conn.dialect.name == "sqlite":
+        return conn.execute(text("PRAGMA user_version")).scalar()
+    conn.execute(text("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)"))
+    return conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar() or 0
+
+
+def _set_schema_version(conn, version: int) -> None:
+    if conn.dialect.name == "sqlite":
+        conn.execute(text(f"PRAGMA user_version = {version}"))
+        return
+    _schema_version(conn)  # creates the table if needed
+    conn.execute(text("DELETE FROM schema_version"))
+    conn.execute(text("INSERT INTO schema_version (version) VALUES (:v)"), {"v": version})
+
+
+def _dedupe_smallest_call_ids(conn) -> None:
+    # Older builds could store the same provider call id twice; webhooks only
+    # ever matched the first row, so keep that one and detach the rest.
+    cleared = conn.execute(text(
+        "UPDATE call_history SET smallest_call_id = NULL "
+        "WHERE smallest_call_id IS NOT NULL AND rowid NOT IN "
+        "(SELECT MIN(rowid) FROM call_history WHERE smallest_call_id IS NOT NULL GROUP BY smallest_call_id)"
+    )).rowcount
+    if cleared:
+        logger.warning("Cleared %d duplicate smallest_call_id values before adding the unique index", cleared)
+
+
+def _add_call_history_indexes(conn) -> None:
+    _dedupe_smallest_call_ids(conn)
+    conn.execute(text("DROP INDEX IF EXISTS ix_call_history_user_id"))
+    conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_call_history_smallest_call_id ON call_history (smallest_call_id)"
+    ))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_call_history_user_created ON call_history (user_id, created_at)"))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_call_history_state_next_retry ON call_history (state, next_retry_at)"
+    ))
+    conn.execute(text("ANALYZE call_history"))
+
+
+MIGRATION_CHUNK_ROWS = 500
+
+
+def _split_out_transcripts(conn) -> None:
+    # Move inline transcript_text / triage_input into compressed
+    # call_transcripts rows, a chunk at a time, then drop the columns.
+    legacy = [c for c in ("transcript_text", "triage_input")
+              if c in {col["name"] for col in inspect(conn).get_columns("call_history")}]
+    if not legacy:
+        return
+    columns = ", ".join(legacy)
+    present = " OR ".join(f"{c} IS NOT NULL" for c in legacy)
+    moved, after = 0, ""
+    while True:
+        rows = conn.execute(
+            text(f"SELECT id, {columns} FROM call_history WHERE id > :after AND ({present}) ORDER BY id LIMIT :n"),
+            {"after": after, "n": MIGRATION_CHUNK_ROWS},
+        ).all()
+        if not rows:
+            break
+        conn.execute(
+            CallTranscript.__table__.insert(),
+            [{"call_id": row[0], **{c: compress_text(v) for c, v in zip(legacy, row[1:])}} for row in rows],
+        )
+        moved += len(rows)
+        after = rows[-1][0]
+    for column in legacy:
+        conn.execute(text(f"ALTER TABLE call_history DROP COLUMN {column}"))
+    logger.info("Moved %d transcripts to call_transcripts (%s)", moved, TRANSCRIPT_CODEC)
+
+
+def _add_list_indexes(conn) -> None:
+    # Indexes behind the paginated list endpoints (see pagination.py).
+    for name, table, columns in (
+        ("ix_users_created_at", "users", "created_at"),
+        ("ix_users_campaign_created", "users", "campaign_id, created_at"),
+        ("ix_campaigns_created_at", "campaigns", "created_at"),
+        ("ix_conversations_started_at", "conversations", "started_at"),
+    ):
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
+    # Keyset pages skip rows whose sort key is NULL; older builds could leave it unset.
+    # Bound through the DateTime type so SQLite gets the same text format as other rows.
+    now = datetime.now(timezone.utc)
+    users, calls = UserRecord.__table__, CallRecord.__table__
+    conn.execute(users.update().where(users.c.created_at.is_(None)).values(created_at=now))
+    conn.execute(
+        calls.update()
+        .where(calls.c.created_at.is_(None))
+        .values(created_at=func.coalesce(calls.c.started_at, calls.c.updated_at, now))
+    )
+    # campaign_calls.escalation_id (for /calls?escalated=) was only in the JSON document.
+    after = ""
+    while True:
+        rows = conn.execute(
+            text("SELECT id, data FROM campaign_calls WHERE id > :after ORDER BY id LIMIT :n"),
+            {"after": after, "n": MIGRATION_CHUNK_ROWS},
+        ).all()
+        if not rows:
+            break
+        updates = [{"id": key, "e": json.loads(data).get("escalation_id")} for key, data in rows]
+        updates = [u for u in updates if u["e"]]
+        if updates:
+            conn.execute(text("UPDATE campaign_calls SET escalation_id = :e WHERE id = :id"), updates)
+        after = rows[-1][0]
+
+
+def _add_user_import_key_index(conn) -> None:
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ix_users_import_key ON users (import_key)"))
+
+
+ENTITY_TABLES = ("campaigns", "conversations", "campaign_calls", "escalations", "patient_trends")
+
+
+def _add_entity_versions(conn) -> None:
+    columns = {table: {c["name"] for c in inspect(conn).get_columns(table)} for table in ENTITY_TABLES}
+    for table in ENTITY_TABLES:
+        if "version" not in columns[table]:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN version INTEGER NOT NULL DEFAULT 0"))
+
+
+def _build_rollups(conn) -> None:
+    import rollups  # imports this module
+
+    result = rollups.rebuild_rollups(conn)
+    logger.info(
+        "Built %d analytics rollup buckets from %d calls, %d campaign calls and %d archived calls",
+        result.buckets, result.calls, result.campaign_calls, result.archived_calls,
+    )
+
+
+def _build_search_index(conn) -> None:
+    import search  # imports this module
+
+    result = search.reindex(conn)
+    logger.info("Indexed %d calls for full-text search", result.documents)
+
+
+# (version, description, upgrade) — append only; each runs once per database file.
+MIGRATIONS = [
+    (1, "call_history indexes for webhook, scheduler and retry lookups", _add_call_history_indexes),
+    (2, "compressed transcripts split out of call_history", _split_out_transcripts),
+    (3, "indexes and backfills for paginated list endpoints", _add_list_indexes),
+    (4, "unique users.import_key for idempotent bulk imports", _add_user_import_key_index),
+    (5, "per-campaign, per-day analytics rollups built from existing calls", _build_rollups),
+    (6, "full-text search index over call transcripts, summaries and flags", _build_search_index),
+    (7, "row versions on dashboard entities for optimistic concurrency", _add_entity_versions),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def migrate(bind=None) -> int:
+    """Apply pending schema revisions in place; return the resulting version.
+
+    SQLite files are vacuumed after an upgrade so space freed by it is released.
+    """
+    bind = bind or engine
+    upgraded = False
+    with bind.begin() as conn:
+        version = _schema_version(conn)
+        for target, description, upgrade in MIGRATIONS:
+            if target <= version:
+                continue
+            logger.info("Migrating database to schema version %d: %s", target, description)
+            upgrade(conn)
+            _set_schema_version(conn, target)
+            version = target
+            upgraded = True
+    if upgraded and bind.dialect.name == "sqlite":
+        # Give the space freed by rewritten tables back to the filesystem.
+        with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("VACUUM"))
+    return version
+
+
+async def get_session() -> AsyncIterator[AsyncSession]:
+    """FastAPI dependency: one async session per request, always closed."""
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+async def dispose_engines() -> None:
+    await async_engine.dispose()
+    engine.dispose()
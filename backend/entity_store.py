@@ -0,0 +1,493 @@
+"""Database-backed store for campaigns, conversations, calls, escalations and trends.
+
+`store[bucket]` keeps the dict interface main.py has always used, but each
+bucket is a table (see the dashboard entities in database.py) fronted by an
+in-process cache:
+
+- Reads are read-through: `get` serves from the cache and loads misses from
+  the database. Clean entries expire after `STORE_CACHE_TTL_SEC`, so another
+  worker's writes are picked up without any cross-process invalidation.
+- `bucket[key] = doc` writes through immediately, so a new campaign or
+  escalation is visible to every worker as soon as the request returns.
+  `bucket.setdefault(key, doc)` creates a row only if no worker has yet.
+- Changes to an existing document (conversation history appends,
+  acknowledgements, trend updates) go through `bucket.modify(key, mutate)`:
+  `mutate(doc)` runs on the cached document at once and is queued for
+  write-behind. Everything updated within `STORE_FLUSH_INTERVAL_SEC` goes out
+  in one transaction, or sooner once `STORE_FLUSH_BATCH` documents are waiting.
+- Writes are optimistic. Every row carries a `version`; a flush locks the rows
+  it writes and, where another worker has written a row since this one read
+  it, replays the queued mutations on the stored document instead of
+  overwriting it. Each `UPDATE` is conditional on the version it replaced.
+- Scans (`values`, `rows`, `len`, iteration) flush pending writes first, so
+  lists always reflect every mutation made in this process.
+- The bucket uses the sync engine; async routes call `aget`, `aset` and
+  `amodify`, which run any database work on a worker thread.
+- A bucket's `on_write` hooks get (key, stored, new) document triples inside
+  the transaction that writes them; the `calls` bucket uses them to keep the
+  analytics rollups (rollups.py) and the search index (search.py) in step.
+
+`EntityStore.flush()` writes whatever is still queued; call it on shutdown.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import Any, Callable, Iterator, Optional, Sequence
+
+from sqlalchemy import Connection, Row, Select, delete, func, select, update
+
+import database
+import rollups
+import search
+from database import (
+    CampaignCallRecord,
+    CampaignRecord,
+    ConversationRecord,
+    EscalationRecord,
+    PatientTrendRecord,
+)
+from models import PatientTrend
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+STORE_CACHE_SIZE = int(os.getenv("PULSECALL_STORE_CACHE_SIZE", "2048"))  # entries per bucket
+STORE_CACHE_TTL_SEC = float(os.getenv("PULSECALL_STORE_CACHE_TTL_SEC", "5"))  # 0 = always re-read
+STORE_FLUSH_INTERVAL_SEC = float(os.getenv("PULSECALL_STORE_FLUSH_INTERVAL_SEC", "0.25"))
+STORE_FLUSH_BATCH = int(os.getenv("PULSECALL_STORE_FLUSH_BATCH", "256"))
+STORE_FLUSH_ATTEMPTS = 3  # a flush that loses a version race is re-read and replayed
+
+
+def _dumps(doc: dict[str, Any]) -> str:
+    return json.dumps(doc, separators=(",", ":"))
+
+
+# Called with (key, stored document or None, new document or None) triples before they are written.
+WriteHook = Callable[[Connection, list[tuple[str, Optional[Any], Optional[Any]]]], None]
+# Changes a document in place; replayed on the stored copy if another worker wrote it first.
+Mutation = Callable[[Any], Any]
+
+
+class StaleWriteError(RuntimeError):
+    """A versioned write matched no row; the flush is rolled back and retried."""
+
+
+class _Pending:
+    """A document with mutations not yet written, and the row version they build on."""
+
+    __slots__ = ("doc", "version", "mutations")
+
+    def __init__(self, doc: Any, version: int) -> None:
+        self.doc = doc
+        self.version = version
+        self.mutations: list[Mutation] = []
+
+
+class EntityBucket(MutableMapping):
+    """One entity table behind a read-through cache with write-behind mutations."""
+
+    def __init__(
+        self,
+        store: "EntityStore",
+        model: type,
+        columns: Callable[[Any], dict[str, Any]],
+        encode: Callable[[Any], str] = _dumps,
+        decode: Callable[[str], Any] = json.loads,
+        on_write: Sequence[WriteHook] = (),
+    ) -> None:
+        self._store = store
+        self.table = model.__table__
+        self._columns = columns
+        self._encode = encode
+        self._decode = decode
+        self._on_write = on_write
+        self._lock = threading.RLock()
+        self._cache: OrderedDict[str, tuple[Any, int, float]] = OrderedDict()
+        self._dirty: dict[str, _Pending] = {}
+        self.conflicts = 0  # writes replayed on a row another worker had changed
+
+    # -- cache --------------------------------------------------------------
+    def _entry(self, key: str) -> Optional[tuple[Any, int]]:
+        """(document, row version) from the cache, or None."""
+        pending = self._dirty.get(key)
+        if pending is not None:
+            return pending.doc, pending.version
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        doc, version, loaded_at = entry
+        if time.monotonic() - loaded_at > STORE_CACHE_TTL_SEC:
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return doc, version
+
+    def _cached(self, key: str) -> Optional[Any]:
+        entry = self._entry(key)
+        return entry[0] if entry is not None else None
+
+    def _remember(self, key: str, doc: Any, version: int) -> None:
+        self._cache[key] = (doc, version, time.monotonic())
+        self._cache.move_to_end(key)
+        while len(self._cache) > STORE_CACHE_SIZE:
+            self._cache.popitem(last=False)  # dirty documents stay pinned in _dirty
+
+    def _row(self, key: str, doc: Any) -> dict[str, Any]:
+        return {"id": key, **self._columns(doc), "data": self._encode(doc)}
+
+    def _load(self, key: str) -> Optional[tuple[Any, int]]:
+        """Read `key` through the cache: (document, row version), or None if there is no row."""
+        with self._lock:
+            entry = self._entry(key)
+            if entry is not None:
+                return entry
+        with database.engine.connect() as conn:
+            row = conn.execute(select(self.table.c.data, self.table.c.version).where(self.table.c.id == key)).first()
+        if row is None:
+            return None
+        with self._lock:
+            entry = self._entry(key)  # a concurrent write wins over what we just read
+            if entry is None:
+                entry = self._decode(row.data), row.version
+                self._remember(key, *entry)
+        return entry
+
+    def _notify(self, conn: Connection, docs: dict[str, Any]) -> None:
+        """Hand the write hooks each stored document with what is about to replace it."""
+        if not self._on_write:
+            return
+        stored = {
+            key: self._decode(data)
+            for key, data in conn.execute(select(self.table.c.id, self.table.c.data).where(self.table.c.id.in_(list(docs))))
+        }
+        changes = [(key, stored.get(key), doc) for key, doc in docs.items()]
+        for hook in self._on_write:
+            hook(conn, changes)
+
+    # -- mapping interface ----------------------------------------------------
+    def get(self, key: str, default: Any = None) -> Any:
+        entry = self._load(key)
+        return entry[0] if entry is not None else default
+
+    def __getitem__(self, key: str) -> Any:
+        doc = self.get(key)
+        if doc is None:
+            raise KeyError(key)
+        return doc
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and self.get(key) is not None
+
+    def __setitem__(self, key: str, doc: Any) -> None:
+        """Write `doc` through, replacing whatever is stored (and any queued updates)."""
+        with self._store.write_lock:
+            with self._lock:
+                self._dirty.pop(key, None)
+                self._cache.pop(key, None)
+                row = self._row(key, doc)
+            with database.engine.begin() as conn:
+                self._notify(conn, {key: doc})
+                version = conn.execute(self._upsert().returning(self.table.c.version), [row]).scalar_one()
+            with self._lock:
+                if key not in self._dirty:
+                    self._remember(key, doc, version)
+
+    def setdefault(self, key: str, default: Any = None) -> Any:
+        """Create `key` as `default` unless some worker already has; return the stored document."""
+        if self._load(key) is None:
+            with self._store.write_lock:
+                with database.engine.begin() as conn:
+                    stmt = database.conflict_insert(self.table).on_conflict_do_nothing(index_elements=[self.table.c.id])
+                    if self._on_write and conn.execute(select(self.table.c.id).where(self.table.c.id == key)).first() is None:
+                        self._notify(conn, {key: default})
+                    conn.execute(stmt, [self._row(key, default)])
+        return self[key]
+
+    def __delitem__(self, key: str) -> None:
+        with self._store.write_lock:
+            with self._lock:
+                self._dirty.pop(key, None)
+                self._cache.pop(key, None)
+            with database.engine.begin() as conn:
+                self._notify(conn, {key: None})
+                if not conn.execute(delete(self.table).where(self.table.c.id == key)).rowcount:
+                    raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        self._store.flush()
+        with database.engine.connect() as conn:
+            keys = conn.execute(select(self.table.c.id).order_by(self.table.c.id)).scalars().all()
+        return iter(keys)
+
+    def __len__(self) -> int:
+        self._store.flush()
+        with database.engine.connect() as conn:
+            return conn.execute(select(func.count()).select_from(self.table)).scalar()
+
+    def _fresh(self, key: str, data: str, version: int) -> Any:
+        """The document for a row just read; call with `_lock` held.
+
+        A queued write or a cached copy at least as new as the row is reused;
+        otherwise the row is decoded and replaces the stale cache entry.
+        """
+        entry = self._entry(key)
+        if entry is not None and (key in self._dirty or entry[1] >= version):
+            return entry[0]
+        doc = self._decode(data)
+        self._remember(key, doc, version)
+        return doc
+
+    def values(self) -> list[Any]:  # type: ignore[override]
+        """Every document, ordered by key; cached objects are reused unless the row is newer."""
+        self._store.flush()
+        t = self.table
+        with database.engine.connect() as conn:
+            rows = conn.execute(select(t.c.id, t.c.data, t.c.version).order_by(t.c.id)).all()
+        with self._lock:
+            return [self._fresh(key, data, version) for key, data, version in rows]
+
+    def rows(self, stmt: Select) -> list[tuple[Any, Row]]:
+        """Run `stmt` over this table after flushing; pair each row with its document.
+
+        `stmt` must select the `id` and `data` columns; list endpoints build it
+        with their filters and keyset bounds (see pagination.py). The `version`
+        column is added when missing, so a row newer than the cache wins.
+        """
+        self._store.flush()
+        if "version" not in stmt.selected_columns:
+            stmt = stmt.add_columns(self.table.c.version)
+        with database.engine.connect() as conn:
+            rows = conn.execute(stmt).all()
+        with self._lock:
+            return [(self._fresh(row.id, row.data, row.version), row) for row in rows]
+
+    def clear(self) -> None:
+        with self._store.write_lock:
+            with self._lock:
+                self._dirty.clear()
+                self._cache.clear()
+            with database.engine.begin() as conn:
+                if self._on_write:
+                    self._notify(conn, {key: None for key in conn.execute(select(self.table.c.id)).scalars()})
+                conn.execute(delete(self.table))
+
+    # -- async access ---------------------------------------------------------
+    async def aget(self, key: str, default: Any = None) -> Any:
+        """`get` for async routes: cache hits return at once, misses load on a worker thread."""
+        with self._lock:
+            doc = self._cached(key)
+        if doc is not None:
+            return doc
+        return await asyncio.to_thread(self.get, key, default)
+
+    async def aset(self, key: str, doc: Any) -> None:
+        await asyncio.to_thread(self.__setitem__, key, doc)
+
+    async def amodify(self, key: str, mutate: Mutation) -> Any:
+        return await asyncio.to_thread(self.modify, key, mutate)
+
+    # -- write-behind ---------------------------------------------------------
+    def modify(self, key: str, mutate: Mutation) -> Any:
+        """Apply `mutate` to the document now and queue it for the next batched write.
+
+        Returns what `mutate` returned. Raises KeyError if there is no such document.
+        """
+        entry = self._load(key)
+        if entry is None:
+            raise KeyError(key)
+        with self._lock:
+            entry = self._entry(key) or entry
+            pending = self._dirty.get(key)
+            if pending is None:
+                pending = self._dirty[key] = _Pending(*entry)
+            result = mutate(pending.doc)
+            pending.mutations.append(mutate)
+            self._remember(key, pending.doc, pending.version)
+            queued = len(self._dirty)
+        self._store.schedule_flush(urgent=queued >= STORE_FLUSH_BATCH)
+        return result
+
+    def _take_dirty(self) -> dict[str, _Pending]:
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+            return dirty
+
+    def _requeue(self, dirty: dict[str, _Pending]) -> None:
+        with self._lock:
+            for key, pending in dirty.items():
+                newer = self._dirty.get(key)
+                if newer is not None:
+                    if newer.doc is not pending.doc:
+                        for mutate in newer.mutations:
+                            mutate(pending.doc)
+                    pending.mutations.extend(newer.mutations)
+                self._dirty[key] = pending
+                self._remember(key, pending.doc, pending.version)
+
+    def _write_dirty(self, conn: Connection, dirty: dict[str, _Pending]) -> dict[str, tuple[Any, int]]:
+        """Write queued documents with versioned UPDATEs; return what was written per key.
+
+        Rows are locked first (FOR UPDATE; SQLite has a single writer anyway).
+        Where a row moved past the version the mutations were made on, they are
+        replayed on the stored document. Rows deleted meanwhile are dropped.
+        """
+        t = self.table
+        stored = {
+            row.id: row
+            for row in conn.execute(
+                select(t.c.id, t.c.data, t.c.version).where(t.c.id.in_(list(dirty))).with_for_update()
+            )
+        }
+        docs: dict[str, tuple[Any, int]] = {}
+        for key, pending in dirty.items():
+            row = stored.get(key)
+            if row is None:
+                logger.warning("Dropping queued update of %s/%s: the row was deleted", t.name, key)
+                continue
+            doc = pending.doc
+            if row.version != pending.version:
+                self.conflicts += 1
+                doc = self._decode(row.data)
+                for mutate in pending.mutations:
+                    mutate(doc)
+            docs[key] = (doc, row.version)
+        if not docs:
+            return {}
+        self._notify(conn, {key: doc for key, (doc, _) in docs.items()})
+        for key, (doc, version) in docs.items():
+            row = {name: value for name, value in self._row(key, doc).items() if name != "id"}
+            result = conn.execute(
+                update(t).where(t.c.id == key, t.c.version == version).values(**row, version=version + 1)
+            )
+            if result.rowcount != 1:
+                raise StaleWriteError(f"{t.name}/{key} changed during the flush")
+        return {key: (doc, version + 1) for key, (doc, version) in docs.items()}
+
+    def _written(self, dirty: dict[str, _Pending], written: dict[str, tuple[Any, int]]) -> None:
+        """Bring the cache up to the versions just written."""
+        with self._lock:
+            for key, (doc, version) in written.items():
+                pending = self._dirty.get(key)
+                if pending is None:
+                    self._remember(key, doc, version)
+                elif pending.doc is doc:
+                    # Updated again during the flush, on top of what was just written.
+                    pending.version = version
+                    self._remember(key, doc, version)
+                # Otherwise the next flush sees the version moved and replays.
+
+    def _upsert(self):
+        stmt = database.conflict_insert(self.table)
+        set_ = {c.name: stmt.excluded[c.name] for c in self.table.c if c.name not in ("id", "version")}
+        return stmt.on_conflict_do_update(
+            index_elements=[self.table.c.id],
+            set_={**set_, "version": self.table.c.version + 1},
+        )
+
+
+class EntityStore(dict):
+    """The `store` buckets plus the write-behind timer they share."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.write_lock = threading.Lock()
+        self._timer_lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self.flushes = 0  # batches written by write-behind
+
+    def bucket(self, name: str, model: type, columns: Callable[[Any], dict[str, Any]], **codec: Any) -> EntityBucket:
+        self[name] = EntityBucket(self, model, columns, **codec)
+        return self[name]
+
+    def schedule_flush(self, urgent: bool = False) -> None:
+        if urgent:
+            self.flush()
+            return
+        with self._timer_lock:
+            if self._timer is None:
+                self._timer = threading.Timer(STORE_FLUSH_INTERVAL_SEC, self._timed_flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _timed_flush(self) -> None:
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Write-behind flush failed; retrying")
+            self.schedule_flush()
+
+    def flush(self) -> int:
+        """Write every queued mutation in one transaction; return how many documents."""
+        with self._timer_lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        with self.write_lock:
+            for attempt in range(1, STORE_FLUSH_ATTEMPTS + 1):
+                batches = [(bucket, bucket._take_dirty()) for bucket in self.values()]
+                batches = [(bucket, dirty) for bucket, dirty in batches if dirty]
+                if not batches:
+                    return 0
+                try:
+                    with database.engine.begin() as conn:
+                        written = [bucket._write_dirty(conn, dirty) for bucket, dirty in batches]
+                    break
+                except Exception as exc:
+                    for bucket, dirty in batches:
+                        bucket._requeue(dirty)
+                    if not isinstance(exc, StaleWriteError) or attempt == STORE_FLUSH_ATTEMPTS:
+                        raise
+                    logger.info("Write-behind lost a version race (%s); replaying", exc)
+            for (bucket, dirty), docs in zip(batches, written):
+                bucket._written(dirty, docs)
+        self.flushes += 1
+        return sum(len(docs) for docs in written)
+
+
+def create_store() -> EntityStore:
+    store = EntityStore()
+    store.bucket("campaigns", CampaignRecord, lambda c: {"created_at": c.get("created_at")})
+    store.bucket(
+        "conversations",
+        ConversationRecord,
+        lambda c: {"campaign_id": c.get("campaign_id"), "status": c.get("status"), "started_at": c.get("started_at")},
+    )
+    store.bucket(
+        "calls",
+        CampaignCallRecord,
+        lambda c: {
+            "campaign_id": c.get("campaign_id"),
+            "ended_at": c.get("ended_at"),
+            "sentiment_score": c.get("sentiment_score"),
+            "escalation_id": c.get("escalation_id"),
+        },
+        on_write=(rollups.campaign_calls_written, search.campaign_calls_written),
+    )
+    store.bucket(
+        "escalations",
+        EscalationRecord,
+        lambda e: {
+            "campaign_id": e.get("campaign_id"),
+            "status": e.get("status"),
+            "priority": e.get("priority"),
+            "created_at": e.get("created_at"),
+        },
+    )
+    store.bucket(
+        "trends",
+        PatientTrendRecord,
+        lambda t: {"updated_at": t.updated_at},
+        encode=lambda t: t.model_dump_json(),
+        decode=PatientTrend.model_validate_json,
+    )
+    return store
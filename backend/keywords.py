@@ -0,0 +1,144 @@
+"""Multi-pattern keyword matching with an Aho-Corasick automaton.
+
+Triage (`DISTRESS_KEYWORDS`), the live distress monitor and the campaign
+`escalation_keywords` fallback all need "which of these phrases appear in this
+transcript". Instead of one substring search per keyword, the keyword set is
+compiled once into an automaton that reports every hit in a single pass.
+
+Matches are word-boundary aware: a keyword must start at a word boundary and
+end at one, optionally followed by a plain inflection (`s`, `es`, `ed`, `ing`).
+So "hurt" matches "hurts" but "help" no longer matches "helpful" and "pop" no
+longer matches "popular".
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from functools import lru_cache
+from typing import Iterable, NamedTuple, Optional
+
+# Suffixes a keyword may carry and still count as a whole-word hit.
+INFLECTION_SUFFIXES = ("ing", "es", "ed", "s")
+
+_NORMALIZE = str.maketrans({"’": "'", "‘": "'"})
+
+
+class KeywordHit(NamedTuple):
+    keyword: str
+    segment: int
+    start: int
+    end: int
+
+
+def normalize_keyword(keyword: str) -> str:
+    """Canonical form used for matching and for reporting hits."""
+    return keyword.lower().translate(_NORMALIZE).strip()
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch in "_'"
+
+
+def _left_boundary(text: str, start: int) -> bool:
+    return start == 0 or not _is_word_char(text[start - 1])
+
+
+def _right_boundary(text: str, end: int) -> bool:
+    if end == len(text) or not _is_word_char(text[end]):
+        return True
+    for suffix in INFLECTION_SUFFIXES:
+        stop = end + len(suffix)
+        if text.startswith(suffix, end) and (stop == len(text) or not _is_word_char(text[stop])):
+            return True
+    return False
+
+
+class KeywordAutomaton:
+    """Compiled, case-insensitive Aho-Corasick automaton over a keyword set."""
+
+    def __init__(self, keywords: Iterable[str]) -> None:
+        self.keywords: list[str] = []
+        seen: set[str] = set()
+        for kw in keywords:
+            norm = normalize_keyword(kw)
+            if norm and norm not in seen:
+                seen.add(norm)
+                self.keywords.append(norm)
+        self.max_len = max((len(kw) for kw in self.keywords), default=0)
+
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[tuple[int, ...]] = [()]
+        self._build()
+
+    def _build(self) -> None:
+        goto, fail = self._goto, self._fail
+        out: list[list[int]] = [[]]
+        for idx, kw in enumerate(self.keywords):
+            state = 0
+            for ch in kw:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    fail.append(0)
+                    out.append([])
+                state = nxt
+            out[state].append(idx)
+
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fallback = goto[f].get(ch, 0)
+                fail[nxt] = fallback if fallback != nxt else 0
+                out[nxt].extend(out[fail[nxt]])
+        self._out = [tuple(o) for o in out]
+
+    def scan(self, text: str, segment: int = 0) -> list[KeywordHit]:
+        """Return every whole-word keyword hit in ``text``, in order of position."""
+        text = text.lower().translate(_NORMALIZE)
+        goto, fail, out, keywords = self._goto, self._fail, self._out, self.keywords
+        hits: list[KeywordHit] = []
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for idx in out[state]:
+                kw = keywords[idx]
+                start = i + 1 - len(kw)
+                if _left_boundary(text, start) and _right_boundary(text, i + 1):
+                    hits.append(KeywordHit(kw, segment, start, i + 1))
+        hits.sort(key=lambda h: (h.start, -h.end))
+        return hits
+
+    def scan_segments(self, segments: Iterable[str]) -> list[KeywordHit]:
+        """One pass over a transcript, reporting hits with their segment index."""
+        hits: list[KeywordHit] = []
+        for i, text in enumerate(segments):
+            hits.extend(self.scan(text, segment=i))
+        return hits
+
+    def first(self, segments: Iterable[str]) -> Optional[KeywordHit]:
+        """Earliest hit in transcript order, or None."""
+        for i, text in enumerate(segments):
+            hits = self.scan(text, segment=i)
+            if hits:
+                return hits[0]
+        return None
+
+
+@lru_cache(maxsize=256)
+def compile_keywords(keywords: tuple[str, ...]) -> KeywordAutomaton:
+    """Compile (and cache) an automaton for a keyword tuple.
+
+    Campaigns pass their `escalation_keywords` as a tuple, so each distinct
+    keyword list is compiled once and reused across calls.
+    """
+    return KeywordAutomaton(keywords)
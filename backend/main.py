@@ -1,34 +1,104 @@
 from __future__ import annotations
 
+import asyncio
 import base64
 import json
 import logging
 import os
 import re
+import threading
+import time
+from collections import OrderedDict
 from contextlib import asynccontextmanager
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 from pathlib import Path
-from typing import Any, Literal, Optional
+from typing import Any, Literal, NamedTuple, Optional
 from uuid import uuid4
 
 import httpx
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-
+from pydantic import BaseModel, Field, ValidationError
+from sqlalchemy import case, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from archive import read_user_calls
+from audio import (
+    LOCAL_AUDIO_METRICS,
+    VAD_TRIM_ENABLED,
+    AudioProfileName,
+    CallerType,
+    TtsCache,
+    crosscheck_metrics,
+    metrics_from_recording_async,
+    resolve_tts_profile,
+    shutdown_metrics_pool,
+    trim_silence_async,
+    tts_cache,
+)
 from claude import respond, process_transcript
-from database import CallRecord as DBCallRecord, SessionLocal, UserRecord, init_db, get_db
+from database import (
+    CallRecord as DBCallRecord,
+    CallTranscript,
+    SessionLocal,
+    UserRecord,
+    as_utc,
+    dispose_engines,
+    get_session,
+    init_db,
+)
+from entity_store import create_store
+from keywords import compile_keywords, normalize_keyword
 from models import (
+    AnalyticsReport,
+    AudioMetrics,
     CallState,
+    FastAnalyticsPayload,
+    FastPostCallPayload,
     OutboundCallRequest,
+    TtsProfile,
     SmallestAIAnalyticsPayload,
     SmallestAIPostCallPayload,
     TriageClassification,
+    PatientTrend,
+    PrescreenResult,
+    SearchHit,
+    TriageRuleConfig,
+    UserImportReport,
 )
 from notifier import send_escalation_sms
+from pagination import (
+    NEXT_CURSOR_HEADER,
+    PAGE_DEFAULT_LIMIT,
+    PAGE_MAX_LIMIT,
+    SortKey,
+    as_utc_bound,
+    decode_cursor,
+    iso_utc,
+    page_of,
+    paginate,
+)
+from prescreen import (
+    NEGATIVE_MARKERS,
+    POSITIVE_MARKERS,
+    PRESCREEN_CHEAP_MODEL,
+    local_analysis,
+    negated_wellbeing,
+    prescreen_stats,
+    prescreen_transcript,
+)
+from rollups import GroupBy, query_analytics
 from scheduler import place_outbound_call, schedule_retry, start_scheduler, stop_scheduler
-from triage import analyze_vitals
+from search import SearchKind, search_hit, search_statement
+from tracing import TurnTrace, tracer
+from triage import DISTRESS_KEYWORDS, LiveDistressMatcher, analyze_vitals, triage_input_json
+from trends import alert_reason, extract_pain_level, record_call
+from triage_rules import rule_registry
+from user_import import ImportFormat, import_format, import_users
 
 # Load env
 env_path = Path(__file__).parent / ".env"
@@ -37,6 +107,22 @@ load_dotenv(dotenv_path=env_path)
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY", "")
 SMALLEST_AI_API_KEY = os.getenv("SMALLEST_AI_API_KEY", "")
 VOICE_LLM_MODEL = "openai/gpt-4o-mini"  # openai/gpt-oss-20b:free
+FAST_WEBHOOK_DECODING = os.getenv("PULSECALL_FAST_WEBHOOKS", "true").lower() in ("1", "true", "yes")
+# Webhook recording_url values are only fetched over https from these hosts (and
+# their subdomains); the Smallest.ai API key is only ever sent to SMALLEST_AI_HOSTS.
+SMALLEST_AI_HOSTS = ("smallest.ai",)
+RECORDING_HOSTS = tuple(
+    h.strip().lower() for h in os.getenv("PULSECALL_RECORDING_HOSTS", ",".join(SMALLEST_AI_HOSTS)).split(",") if h.strip()
+)
+RECORDING_MAX_BYTES = int(os.getenv("PULSECALL_RECORDING_MAX_BYTES", str(50 * 1024 * 1024)))
+RECORDING_MAX_REDIRECTS = 3
+
+try:
+    import orjson
+
+    _loads_json = orjson.loads
+except ImportError:  # fall back to the stdlib parser
+    _loads_json = json.loads
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
@@ -45,9 +131,13 @@ logging.basicConfig(level=logging.INFO)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     init_db()
+    seed_example_data()
     start_scheduler()
     yield
     stop_scheduler()
+    shutdown_metrics_pool()
+    store.flush()
+    await dispose_engines()
 
 
 app = FastAPI(title="PulseCall MVP API", version="0.1.0", lifespan=lifespan)
@@ -58,6 +148,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 
@@ -80,6 +171,8 @@ class CampaignCreate(BaseModel):
     patient_context: Optional[str] = None
     patient_data: Optional[dict] = None
     voice_id: Optional[str] = "rachel"
+    audio_profile: Optional[AudioProfileName] = "standard"
+    speech_speed: Optional[float] = Field(1.0, ge=0.5, le=2.0)
 
 
 class CampaignOut(CampaignCreate):
@@ -113,25 +206,23 @@ class EndCallOut(BaseModel):
 
 
 # -----------------------------
-# In-memory store
+# Entity store
 # -----------------------------
-store: dict[str, dict[str, Any]] = {
-    "campaigns": {},
-    "conversations": {},
-    "calls": {},
-    "escalations": {},
-}
+# campaigns, conversations, calls, escalations and trends (patient id →
+# PatientTrend) live in SQLite behind a read-through, write-behind cache.
+# Change an existing document with `store[bucket].modify(id, mutate)`;
+# async routes use `aget` / `aset` / `amodify` to keep the event loop free.
+store = create_store()
 
 
 def now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 def fallback_sentiment(text: str) -> int:
-    negative_markers = ("angry", "upset", "cancel", "frustrated", "bad", "hate")
     lowered = text.lower()
-    if any(marker in lowered for marker in negative_markers):
+    if any(marker in lowered for marker in NEGATIVE_MARKERS) or negated_wellbeing(lowered):
         return 2
-    if "thank" in lowered or "great" in lowered:
+    if any(marker in lowered for marker in POSITIVE_MARKERS):
         return 4
     return 3
 
@@ -149,8 +240,9 @@ def fallback_summary(transcript: list[dict[str, str]]) -> str:
 def fallback_flags(transcript: list[dict[str, str]], keywords: list[str]) -> list[str]:
     if not keywords:
         return []
-    joined = " ".join(turn["content"] for turn in transcript).lower()
-    return [kw for kw in keywords if kw.lower() in joined]
+    automaton = compile_keywords(tuple(keywords))
+    found = {hit.keyword for hit in automaton.scan_segments(turn["content"] for turn in transcript)}
+    return [kw for kw in keywords if normalize_keyword(kw) in found]
 
 
 def recommended_action_for_flags(flags: list[str]) -> str:
@@ -434,8 +526,11 @@ SEED_PATIENTS = [
 
 
 def seed_example_data() -> None:
+    """Add the demo campaigns and call; ones already in the database are left as they are."""
     for sp in SEED_PATIENTS:
         campaign_id = sp["campaign_id"]
+        if campaign_id in store["campaigns"]:
+            continue
         pd = sp["patient_data"]
         patient_context = _build_patient_context(pd)
 
@@ -450,13 +545,18 @@ def seed_example_data() -> None:
             "patient_context": patient_context,
             "patient_data": pd,
             "voice_id": sp.get("voice_id", "rachel"),
+            "audio_profile": sp.get("audio_profile", "standard"),
+            "speech_speed": sp.get("speech_speed", 1.0),
             "created_at": now_iso(),
         }
         store["campaigns"][campaign_id] = campaign
+        for prev in pd.get("previousCalls", []):
+            record_call(store["trends"], campaign_id, pain=prev.get("painLevel"), at=prev.get("date"))
 
     # Add a sample call for the first campaign
     call_id = "call_demo_001"
-    escalation_id = "esc_demo_001"
+    if call_id in store["calls"]:
+        return
     store["calls"][call_id] = {
         "id": call_id,
         "call_id": call_id,
@@ -475,9 +575,7 @@ def seed_example_data() -> None:
         "recommended_action": "No escalation required. Follow up in normal workflow.",
         "escalation_id": None,
     }
-
-
-seed_example_data()
+    record_call(store["trends"], "cmp_demo_001", call_id=call_id, sentiment=4, pain=4, flags=0, at=store["calls"][call_id]["ended_at"])
 
 def get_campaign(campaign_id: str):
     campaign = store["campaigns"].get(campaign_id)
@@ -488,12 +586,86 @@ def get_campaign(campaign_id: str):
 def get_conversation(conversation_id: str): 
     conversation = store["conversations"].get(conversation_id)
     if not conversation:
-        raise HTTPException(status_code=404, detail=f"Conversation {conversation_id} not found. The server might have restarted.")
+        raise HTTPException(status_code=404, detail=f"Conversation {conversation_id} not found.")
     return conversation
 
 def get_client_text(history: list[dict[str, str]]) -> str:
     return " ".join(d["content"] for d in history if d["role"] == "user")
 
+
+# -----------------------------
+# Live distress monitoring
+# -----------------------------
+LIVE_MONITOR_MAX_CONVERSATIONS = int(os.getenv("PULSECALL_LIVE_MONITOR_MAX", "1000"))
+live_monitors: OrderedDict[str, LiveDistressMatcher] = OrderedDict()
+# Turns are checked on worker threads (asyncio.to_thread), so the registry is
+# guarded here and each matcher by its own lock.
+live_monitors_lock = threading.Lock()
+
+
+def _live_monitor(campaign: dict, conversation_id: Optional[str]) -> LiveDistressMatcher:
+    """Matcher for a live conversation; a throwaway one when the turn has no id."""
+    keywords = DISTRESS_KEYWORDS.union(campaign.get("escalation_keywords") or [])
+    if conversation_id is None:
+        return LiveDistressMatcher(keywords)
+    with live_monitors_lock:
+        monitor = live_monitors.get(conversation_id)
+        if monitor is None:
+            monitor = live_monitors[conversation_id] = LiveDistressMatcher(keywords)
+            while len(live_monitors) > LIVE_MONITOR_MAX_CONVERSATIONS:
+                live_monitors.popitem(last=False)
+        else:
+            live_monitors.move_to_end(conversation_id)
+    return monitor
+
+
+def check_live_distress(campaign: dict, conversation_id: Optional[str], text: str) -> Optional[str]:
+    """Scan one piece of live patient speech and escalate on the first distress hit.
+
+    The first hit opens a high-priority escalation and fires the SMS on a
+    background thread; later hits in the same conversation are appended to it.
+    Returns the escalation id when this text produced new hits.
+    """
+    monitor = _live_monitor(campaign, conversation_id)
+    # Held until the escalation is recorded, so concurrent turns of one
+    # conversation neither interleave in the matcher nor open two escalations.
+    with monitor.lock:
+        hits = monitor.feed(text)
+        if not hits:
+            return None
+
+        if monitor.escalation_id and monitor.escalation_id in store["escalations"]:
+            def add_hits(escalation: dict) -> None:
+                escalation["detected_flags"].extend(hits)
+                escalation["reason"] = f"Live distress keywords detected: {', '.join(escalation['detected_flags'])}"
+
+            store["escalations"].modify(monitor.escalation_id, add_hits)
+            return monitor.escalation_id
+
+        escalation_id = f"esc_{uuid4().hex[:10]}"
+        monitor.escalation_id = escalation_id
+        reason = f"Live distress keywords detected: {', '.join(hits)}"
+        store["escalations"][escalation_id] = {
+            "id": escalation_id,
+            "call_id": None,
+            "conversation_id": conversation_id,
+            "campaign_id": campaign["id"],
+            "priority": "high",
+            "status": "open",
+            "reason": reason,
+            "detected_flags": list(hits),
+            "created_at": now_iso(),
+            "acknowledged_at": None,
+        }
+        logger.warning("Live escalation %s: campaign=%s conversation=%s hits=%s", escalation_id, campaign["id"], conversation_id, hits)
+
+        recipient_name = (campaign.get("patient_data") or {}).get("name") or campaign.get("name", campaign["id"])
+        threading.Thread(
+            target=lambda: send_escalation_sms(user_name=recipient_name, triage_reason=reason, call_id=conversation_id or escalation_id),
+            daemon=True,
+        ).start()
+        return escalation_id
+
 # -----------------------------
 # Routes
 # -----------------------------
@@ -503,11 +675,63 @@ def read_root() -> dict[str, str]:
     return {"service": "PulseCall MVP API", "status": "ok"}
 
 
+# List endpoints return one keyset page (see pagination.py): `limit` rows,
+# and an X-Next-Cursor header to pass back as `cursor` while more remain.
+PageLimit = Query(PAGE_DEFAULT_LIMIT, ge=1, le=PAGE_MAX_LIMIT)
+
+
+def keyset_page(stmt, keys: list[SortKey], cursor: Optional[str], limit: int):
+    try:
+        return paginate(stmt, keys, cursor, limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def newest_first(column) -> SortKey:
+    # Entity timestamps are nullable ISO strings; sort a missing one as oldest.
+    return SortKey(func.coalesce(column, "").label(column.key), descending=True)
+
+
+def list_entities(
+    bucket_name: str,
+    keys: list[SortKey],
+    filters: list,
+    cursor: Optional[str],
+    limit: int,
+    response: Response,
+) -> list[Any]:
+    """One page of documents from an entity bucket; `keys` must end with the id column."""
+    bucket = store[bucket_name]
+    stmt = select(bucket.table.c.data, *(key.column for key in keys)).where(*filters)
+    pairs = bucket.rows(keyset_page(stmt, keys, cursor, limit))
+    rows, next_cursor = page_of([row for _, row in pairs], keys, limit)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return [doc for doc, _ in pairs[: len(rows)]]
+
+
+def date_range(column, since: Optional[datetime], until: Optional[datetime], iso: bool = True) -> list:
+    """`since <= column < until` filters; `iso` for the entity tables' ISO-string timestamps."""
+    bound = iso_utc if iso else as_utc_bound
+    filters = []
+    if since is not None:
+        filters.append(column >= bound(since))
+    if until is not None:
+        filters.append(column < bound(until))
+    return filters
+
+
 @app.get("/campaigns")
-def list_campaigns() -> list[dict[str, Any]]:
-    campaigns = list(store["campaigns"].values())
-    campaigns.sort(key=lambda c: c.get("created_at", ""), reverse=True)
-    return campaigns
+def list_campaigns(
+    response: Response,
+    limit: int = PageLimit,
+    cursor: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> list[dict[str, Any]]:
+    table = store["campaigns"].table
+    keys = [newest_first(table.c.created_at), SortKey(table.c.id, descending=True)]
+    return list_entities("campaigns", keys, date_range(table.c.created_at, since, until), cursor, limit, response)
 
 
 @app.get("/campaigns/{campaign_id}")
@@ -580,10 +804,11 @@ def get_response(campaign_id: str, conversation_id: str, message: str):
         raise HTTPException(status_code=500, detail=f"Claude API Error: {str(e)}")
     
     # Only update the actual history if the API call was successful
-    conversation["history"] = current_history + [{
+    turn = [current_history[-1], {
         "role": "assistant",
         "content": response
     }]
+    store["conversations"].modify(conversation_id, lambda c: c["history"].extend(turn))
 
     return response    
 
@@ -600,6 +825,43 @@ class EndCallOut(BaseModel):
     escalation_id: Optional[str] = None
 """
 
+def track_patient_trend(
+    patient_id: str,
+    campaign_id: Optional[str],
+    call_id: str,
+    sentiment_score: Optional[int],
+    patient_texts: list[str],
+    detected_flags: list[str],
+) -> Optional[dict[str, Any]]:
+    """Fold a completed call into the patient's trend; open an escalation if it deteriorates."""
+    raised = record_call(
+        store["trends"],
+        patient_id,
+        call_id=call_id,
+        sentiment=sentiment_score,
+        pain=extract_pain_level(patient_texts),
+        flags=len(detected_flags),
+        at=now_iso(),
+    )
+    if not raised:
+        return None
+    escalation_id = f"esc_{uuid4().hex[:10]}"
+    escalation = {
+        "id": escalation_id,
+        "call_id": call_id,
+        "campaign_id": campaign_id,
+        "priority": "high",
+        "status": "open",
+        "reason": alert_reason(store["trends"][patient_id], raised),
+        "detected_flags": raised,
+        "created_at": now_iso(),
+        "acknowledged_at": None,
+    }
+    store["escalations"][escalation_id] = escalation
+    logger.warning("Trend escalation for patient %s: %s", patient_id, escalation["reason"])
+    return escalation
+
+
 @app.post("/campaigns/{campaign_id}/{conversation_id}/end", response_model=EndCallOut)
 def end_call(campaign_id: str, conversation_id: str) -> EndCallOut:
     conversation = get_conversation(conversation_id)
@@ -609,9 +871,9 @@ def end_call(campaign_id: str, conversation_id: str) -> EndCallOut:
         raise HTTPException(status_code=400, detail="Conversation already ended")
 
     ended_at = now_iso()
-    conversation["status"] = "inactive"
-    conversation["end_time"] = ended_at
-    conversation["ended_at"] = ended_at
+    store["conversations"].modify(
+        conversation_id, lambda c: c.update(status="inactive", end_time=ended_at, ended_at=ended_at)
+    )
     campaign = store["campaigns"][conversation["campaign_id"]]
     history = conversation["history"]
 
@@ -646,6 +908,17 @@ def end_call(campaign_id: str, conversation_id: str) -> EndCallOut:
         }
         store["escalations"][escalation_id] = escalation
 
+    trend_escalation = track_patient_trend(
+        campaign["id"],
+        campaign["id"],
+        call_id,
+        sentiment_score,
+        [m["content"] for m in history if m.get("role") == "user"],
+        detected_flags,
+    )
+    if escalation_id is None and trend_escalation is not None:
+        escalation_id = trend_escalation["id"]
+
     call = {
         "call_id": call_id,
         "conversation_id": conversation_id,
@@ -666,17 +939,43 @@ def end_call(campaign_id: str, conversation_id: str) -> EndCallOut:
 
 
 @app.get("/conversations")
-def list_conversations() -> list[dict[str, Any]]:
-    calls = list(store["conversations"].values())
-    calls.sort(key=lambda c: c.get("ended_at", ""), reverse=True)
-    return calls
+def list_conversations(
+    response: Response,
+    limit: int = PageLimit,
+    cursor: Optional[str] = None,
+    campaign_id: Optional[str] = None,
+    status: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> list[dict[str, Any]]:
+    table = store["conversations"].table
+    keys = [newest_first(table.c.started_at), SortKey(table.c.id, descending=True)]
+    filters = date_range(table.c.started_at, since, until)
+    if campaign_id is not None:
+        filters.append(table.c.campaign_id == campaign_id)
+    if status is not None:
+        filters.append(table.c.status == status)
+    return list_entities("conversations", keys, filters, cursor, limit, response)
 
 
 @app.get("/calls")
-def list_calls() -> list[dict[str, Any]]:
-    calls = list(store["calls"].values())
-    calls.sort(key=lambda c: c.get("ended_at", ""), reverse=True)
-    return calls
+def list_calls(
+    response: Response,
+    limit: int = PageLimit,
+    cursor: Optional[str] = None,
+    campaign_id: Optional[str] = None,
+    escalated: Optional[bool] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> list[dict[str, Any]]:
+    table = store["calls"].table
+    keys = [newest_first(table.c.ended_at), SortKey(table.c.id, descending=True)]
+    filters = date_range(table.c.ended_at, since, until)
+    if campaign_id is not None:
+        filters.append(table.c.campaign_id == campaign_id)
+    if escalated is not None:
+        filters.append(table.c.escalation_id.isnot(None) if escalated else table.c.escalation_id.is_(None))
+    return list_entities("calls", keys, filters, cursor, limit, response)
 
 
 @app.get("/calls/{call_id}")
@@ -688,26 +987,93 @@ def get_call_detail(call_id: str):
 
 
 @app.get("/escalations")
-def list_escalations() -> list[dict[str, Any]]:
-    priority_order = {"high": 0, "medium": 1, "low": 2}
-    escalations = list(store["escalations"].values())
-    escalations.sort(
-        key=lambda e: (
-            priority_order.get(e.get("priority", "low"), 3),
-            e.get("created_at", ""),
-        )
-    )
-    return escalations
+def list_escalations(
+    response: Response,
+    limit: int = PageLimit,
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    campaign_id: Optional[str] = None,
+    priority: Optional[Literal["high", "medium", "low"]] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> list[dict[str, Any]]:
+    """Highest priority first, oldest first within a priority."""
+    table = store["escalations"].table
+    rank = case({"high": 0, "medium": 1, "low": 2}, value=table.c.priority, else_=3).label("priority_rank")
+    keys = [SortKey(rank), SortKey(func.coalesce(table.c.created_at, "").label("created_at")), SortKey(table.c.id)]
+    filters = date_range(table.c.created_at, since, until)
+    if status is not None:
+        filters.append(table.c.status == status)
+    if campaign_id is not None:
+        filters.append(table.c.campaign_id == campaign_id)
+    if priority is not None:
+        filters.append(table.c.priority == priority)
+    return list_entities("escalations", keys, filters, cursor, limit, response)
+
+
+@app.get("/analytics", response_model=AnalyticsReport)
+async def get_analytics(
+    campaign_id: Optional[str] = None,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    group_by: GroupBy = "campaign_day",
+) -> AnalyticsReport:
+    """Call outcomes per campaign and day from the rollups; `until` is exclusive."""
+    return await query_analytics(campaign_id, since, until, group_by)
+
+
+@app.get("/search", response_model=list[SearchHit])
+async def search_calls(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=500),
+    kind: Optional[SearchKind] = None,
+    campaign_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = PageLimit,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_session),
+) -> list[SearchHit]:
+    """Calls whose transcript, summary or flags match `q`, best first, with highlighted snippets."""
+    try:
+        stmt, keys = search_statement(q, kind, campaign_id, since, until)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    hits, next_cursor = page_of((await db.execute(keyset_page(stmt, keys, cursor, limit))).all(), keys, limit)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return [search_hit(row) for row in hits]
+
+
+@app.get("/trends", response_model=list[PatientTrend])
+def list_trends():
+    """Per-patient trends, patients with active alerts first."""
+    trends = list(store["trends"].values())
+    trends.sort(key=lambda t: (not t.active_alerts, t.patient_id))
+    return trends
+
+
+@app.get("/trends/{patient_id}", response_model=PatientTrend)
+def get_trend(patient_id: str):
+    trend = store["trends"].get(patient_id)
+    if trend is None:
+        raise HTTPException(status_code=404, detail="No trend for patient")
+    return trend
 
 
 @app.patch("/escalations/{escalation_id}/acknowledge")
 def acknowledge_escalation(escalation_id: str):
-    escalation = store["escalations"].get(escalation_id)
-    if not escalation:
+    acknowledged_at = now_iso()
+
+    def acknowledge(escalation: dict) -> dict:
+        escalation["status"] = "acknowledged"
+        escalation["acknowledged_at"] = acknowledged_at
+        return escalation
+
+    try:
+        return store["escalations"].modify(escalation_id, acknowledge)
+    except KeyError:
         raise HTTPException(status_code=404, detail="Escalation not found")
-    escalation["status"] = "acknowledged"
-    escalation["acknowledged_at"] = now_iso()
-    return escalation
 
 
 # =====================================================================
@@ -721,89 +1087,311 @@ class UserCreate(BaseModel):
 
 
 @app.post("/users")
-def create_user(payload: UserCreate):
-    db = get_db()
+async def create_user(payload: UserCreate, db: AsyncSession = Depends(get_session)):
+    user_id = f"usr_{uuid4().hex[:10]}"
+    user = UserRecord(
+        id=user_id,
+        name=payload.name,
+        phone=payload.phone,
+        email=payload.email,
+        campaign_id=payload.campaign_id,
+    )
+    db.add(user)
+    await db.commit()
+    return {"id": user_id, "name": payload.name, "phone": payload.phone, "campaign_id": payload.campaign_id}
+
+
+@app.post("/users/import", response_model=UserImportReport)
+async def bulk_import_users(
+    request: Request,
+    format: Optional[ImportFormat] = None,
+    campaign_id: Optional[str] = None,
+):
+    """Enrol users from a streamed CSV or NDJSON body (see user_import.py).
+
+    `campaign_id` applies to rows that don't name one. Re-uploading a file
+    skips the users it already created.
+    """
+    fmt = format or import_format(request.headers.get("content-type", ""))
+    if fmt is None:
+        raise HTTPException(status_code=415, detail="Send text/csv or application/x-ndjson, or pass ?format=csv|ndjson")
+    if campaign_id is not None and await store["campaigns"].aget(campaign_id) is None:
+        raise HTTPException(status_code=404, detail="Campaign not found")
     try:
-        user_id = f"usr_{uuid4().hex[:10]}"
-        user = UserRecord(
-            id=user_id,
-            name=payload.name,
-            phone=payload.phone,
-            email=payload.email,
-            campaign_id=payload.campaign_id,
+        return await import_users(
+            request.stream(),
+            fmt,
+            default_campaign_id=campaign_id,
+            campaign_exists=lambda cid: cid in store["campaigns"],
+        )
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=400,
+            detail=f"{exc}; any rows before it were imported, so re-upload the corrected file to continue",
         )
-        db.add(user)
-        db.commit()
-        return {"id": user_id, "name": payload.name, "phone": payload.phone, "campaign_id": payload.campaign_id}
-    finally:
-        db.close()
 
 
 @app.get("/users")
-def list_users():
-    db = get_db()
-    try:
-        users = db.query(UserRecord).all()
-        return [
-            {"id": u.id, "name": u.name, "phone": u.phone, "email": u.email, "campaign_id": u.campaign_id}
-            for u in users
-        ]
-    finally:
-        db.close()
+async def list_users(
+    response: Response,
+    limit: int = PageLimit,
+    cursor: Optional[str] = None,
+    campaign_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_session),
+):
+    keys = [SortKey(UserRecord.created_at, descending=True), SortKey(UserRecord.id, descending=True)]
+    stmt = select(UserRecord).where(*date_range(UserRecord.created_at, since, until, iso=False))
+    if campaign_id is not None:
+        stmt = stmt.where(UserRecord.campaign_id == campaign_id)
+    users, next_cursor = page_of((await db.scalars(keyset_page(stmt, keys, cursor, limit))).all(), keys, limit)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return [
+        {"id": u.id, "name": u.name, "phone": u.phone, "email": u.email, "campaign_id": u.campaign_id}
+        for u in users
+    ]
+
+
+CALL_HISTORY_FIELDS = (
+    "id", "user_id", "state", "retry_count", "triage_classification", "triage_reason", "summary",
+    "sentiment_score", "detected_flags", "escalation_reason", "started_at", "ended_at", "created_at",
+)
+
+
+class HistoryRow(NamedTuple):
+    created_at: datetime
+    id: str
+    entry: dict[str, Any]
+
+
+def call_history_entry(r: DBCallRecord) -> dict[str, Any]:
+    return {
+        "id": r.id,
+        "user_id": r.user_id,
+        "state": r.state.value if r.state else None,
+        "retry_count": r.retry_count,
+        "triage_classification": r.triage_classification,
+        "triage_reason": r.triage_reason,
+        "summary": r.summary,
+        "sentiment_score": r.sentiment_score,
+        "detected_flags": r.detected_flags or [],
+        "escalation_reason": r.escalation_reason,
+        "started_at": r.started_at.isoformat() if r.started_at else None,
+        "ended_at": r.ended_at.isoformat() if r.ended_at else None,
+        "created_at": r.created_at.isoformat() if r.created_at else None,
+        "archived": False,
+    }
+
+
+def archived_call_history_entry(doc: dict[str, Any]) -> dict[str, Any]:
+    entry = {field: doc.get(field) for field in CALL_HISTORY_FIELDS}
+    entry["detected_flags"] = entry["detected_flags"] or []
+    entry["archived"] = True
+    return entry
 
 
 @app.get("/call-history/{user_id}")
-def get_user_call_history(user_id: str):
-    db = get_db()
-    try:
-        records = (
-            db.query(DBCallRecord)
-            .filter(DBCallRecord.user_id == user_id)
-            .order_by(DBCallRecord.created_at.desc())
-            .all()
+async def get_user_call_history(
+    user_id: str,
+    response: Response,
+    limit: int = PageLimit,
+    cursor: Optional[str] = None,
+    state: Optional[CallState] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    include_archived: bool = True,
+    db: AsyncSession = Depends(get_session),
+):
+    """A user's calls, newest first, live and archived merged in one keyset order.
+
+    Calls still waiting on a retry are never archived, so archived calls can be
+    newer than live ones; each page takes the archived calls between the cursor
+    and the oldest live call the page reaches.
+    """
+    keys = [SortKey(DBCallRecord.created_at, descending=True), SortKey(DBCallRecord.id, descending=True)]
+    stmt = select(DBCallRecord).where(
+        DBCallRecord.user_id == user_id, *date_range(DBCallRecord.created_at, since, until, iso=False)
+    )
+    if state is not None:
+        stmt = stmt.where(DBCallRecord.state == state)
+    records = (await db.scalars(keyset_page(stmt, keys, cursor, limit))).all()
+    rows = [HistoryRow(as_utc(r.created_at), r.id, call_history_entry(r)) for r in records]
+    if include_archived:
+        before = tuple(decode_cursor(cursor, keys)) if cursor else None
+        after = (rows[-1].created_at, rows[-1].id) if len(rows) > limit else None
+        archived = await asyncio.to_thread(
+            read_user_calls, user_id, limit + 1, before=before, after=after, state=state, since=since, until=until
         )
-        return [
-            {
-                "id": r.id,
-                "user_id": r.user_id,
-                "state": r.state.value if r.state else None,
-                "retry_count": r.retry_count,
-                "triage_classification": r.triage_classification,
-                "triage_reason": r.triage_reason,
-                "summary": r.summary,
-                "sentiment_score": r.sentiment_score,
-                "detected_flags": json.loads(r.detected_flags) if r.detected_flags else [],
-                "escalation_reason": r.escalation_reason,
-                "started_at": r.started_at.isoformat() if r.started_at else None,
-                "ended_at": r.ended_at.isoformat() if r.ended_at else None,
-                "created_at": r.created_at.isoformat() if r.created_at else None,
-            }
-            for r in records
+        rows += [
+            HistoryRow(datetime.fromisoformat(doc["created_at"]), doc["id"], archived_call_history_entry(doc))
+            for doc in archived
         ]
-    finally:
-        db.close()
+        rows.sort(key=lambda row: (row.created_at, row.id), reverse=True)
+    rows, next_cursor = page_of(rows, keys, limit)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return [row.entry for row in rows]
 
 
 # =====================================================================
 # Smallest.ai webhook handlers
 # =====================================================================
-@app.post("/webhooks/smallest/post-call")
-async def webhook_post_call(payload: SmallestAIPostCallPayload):
+def decode_webhook_body(body: bytes, fast_model: type[BaseModel], full_model: type[BaseModel]) -> BaseModel:
+    """Parse a webhook body into a payload model.
+
+    The fast path parses with orjson and validates into the Fast* payload
+    models, which pack each segment's word timestamps into flat arrays instead
+    of one WordTimestamp object per word. Errors surface as the same 422
+    FastAPI would return for a declared body parameter.
+    """
+    try:
+        if not FAST_WEBHOOK_DECODING:
+            return full_model.model_validate_json(body)
+        try:
+            data = _loads_json(body)
+        except ValueError as exc:
+            raise RequestValidationError(
+                [{"type": "json_invalid", "loc": ("body", 0), "msg": "JSON decode error", "input": {}, "ctx": {"error": str(exc)}}]
+            )
+        return fast_model.model_validate(data)
+    except ValidationError as exc:
+        raise RequestValidationError(
+            [{**err, "loc": ("body", *err["loc"])} for err in exc.errors(include_url=False)]
+        )
+
+
+def webhook_body_schema(model: type[BaseModel]) -> dict[str, Any]:
+    """``openapi_extra`` documenting ``model`` as the body of a raw-``Request`` route.
+
+    The webhooks read the body themselves (see :func:`decode_webhook_body`), so
+    FastAPI cannot infer it; nested models are inlined so the schema has no
+    dangling ``$defs`` references.
+    """
+    schema = model.model_json_schema()
+    defs = schema.pop("$defs", {})
+
+    def inline(node: Any) -> Any:
+        if isinstance(node, dict):
+            if "$ref" in node:
+                return inline(defs[node["$ref"].rsplit("/", 1)[-1]])
+            return {key: inline(value) for key, value in node.items()}
+        if isinstance(node, list):
+            return [inline(value) for value in node]
+        return node
+
+    return {"requestBody": {"required": True, "content": {"application/json": {"schema": inline(schema)}}}}
+
+
+def _host_matches(host: str, allowed: tuple[str, ...]) -> bool:
+    host = host.lower().rstrip(".")
+    return any(host == name or host.endswith("." + name) for name in allowed)
+
+
+async def _fetch_recording(url: str) -> Optional[tuple[bytes, str]]:
+    """Download a call recording; None if it can't be fetched.
+
+    The URL comes from an unauthenticated webhook, so only https URLs on
+    PULSECALL_RECORDING_HOSTS are fetched, each redirect hop is checked the
+    same way, the API key goes only to Smallest.ai hosts, and the download is
+    streamed and abandoned past PULSECALL_RECORDING_MAX_BYTES.
+    """
+    try:
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            for _ in range(RECORDING_MAX_REDIRECTS + 1):
+                target = httpx.URL(url)
+                if target.scheme != "https" or not _host_matches(target.host, RECORDING_HOSTS):
+                    logger.warning("Refusing to fetch call recording from disallowed URL %s", url)
+                    return None
+                headers = {}
+                if SMALLEST_AI_API_KEY and _host_matches(target.host, SMALLEST_AI_HOSTS):
+                    headers["Authorization"] = f"Bearer {SMALLEST_AI_API_KEY}"
+                async with client.stream("GET", target, headers=headers) as res:
+                    if res.is_redirect:
+                        url = str(target.join(res.headers["location"]))
+                        continue
+                    if res.status_code != 200:
+                        logger.warning("Call recording fetch failed: %s → %d", url, res.status_code)
+                        return None
+                    declared = res.headers.get("content-length", "")
+                    if declared.isdigit() and int(declared) > RECORDING_MAX_BYTES:
+                        logger.warning("Call recording %s is too large (%s bytes)", url, declared)
+                        return None
+                    audio = bytearray()
+                    async for chunk in res.aiter_bytes():
+                        audio.extend(chunk)
+                        if len(audio) > RECORDING_MAX_BYTES:
+                            logger.warning("Call recording %s exceeds %d bytes; abandoned", url, RECORDING_MAX_BYTES)
+                            return None
+                    return bytes(audio), res.headers.get("content-type", "audio/wav")
+    except (httpx.HTTPError, httpx.InvalidURL):
+        logger.warning("Could not fetch call recording %s", url, exc_info=True)
+        return None
+    logger.warning("Too many redirects fetching call recording %s", url)
+    return None
+
+
+async def _local_audio_metrics(audio: bytes, content_type: str, provider: Optional[AudioMetrics]) -> Optional[dict[str, Any]]:
+    """Compute metrics from a recording and cross-check them against the provider's."""
+    local = await metrics_from_recording_async(audio, content_type)
+    if local is None:
+        return None
+    report: dict[str, Any] = {"metrics": local.model_dump(), "crosscheck": None}
+    if provider is not None:
+        check = crosscheck_metrics(provider, local)
+        report["crosscheck"] = check.model_dump()
+        if not check.agrees:
+            logger.warning("Provider audio metrics disagree with the recording: %s", check.model_dump())
+    return report
+
+
+def _recheck_local_metrics(call_record: DBCallRecord, provider: AudioMetrics) -> None:
+    """Cross-check late provider metrics against ones already computed locally."""
+    if not call_record.local_audio_metrics:
+        return
+    report = json.loads(call_record.local_audio_metrics)
+    check = crosscheck_metrics(provider, AudioMetrics.model_validate(report["metrics"]))
+    report["crosscheck"] = check.model_dump()
+    call_record.local_audio_metrics = json.dumps(report)
+    if not check.agrees:
+        logger.warning("Provider analytics disagree with local metrics for call %s: %s", call_record.id, check.model_dump())
+
+
+def analyze_transcript(history: list[dict[str, str]], screen: PrescreenResult) -> dict[str, Any]:
+    """Post-call analysis at the depth the pre-screen chose."""
+    prescreen_stats.record(screen.route)
+    if screen.route == "local":
+        return local_analysis(history)
+    started = time.perf_counter()
+    if screen.route == "cheap":
+        result = process_transcript(history, [], model=PRESCREEN_CHEAP_MODEL)
+    else:
+        result = process_transcript(history, [])
+    prescreen_stats.observe_llm(screen.route, time.perf_counter() - started)
+    return result
+
+
+@app.post("/webhooks/smallest/post-call", openapi_extra=webhook_body_schema(SmallestAIPostCallPayload))
+async def webhook_post_call(request: Request, db: AsyncSession = Depends(get_session)):
     """Handle post-conversation webhook from Smallest.ai.
 
     Runs acoustic triage, updates call state, and triggers
-    escalation or retry as needed.
+    escalation or retry as needed. With PULSECALL_LOCAL_AUDIO_METRICS on and a
+    ``recording_url`` in the payload, triage uses metrics computed from the
+    recording itself and the provider's numbers are only cross-checked.
     """
+    payload = decode_webhook_body(await request.body(), FastPostCallPayload, SmallestAIPostCallPayload)
     logger.info("Post-call webhook received: call_id=%s user_id=%s status=%s", payload.call_id, payload.user_id, payload.status)
 
-    db = get_db()
+    # Find the call record by smallest_call_id; triage input and transcript get written.
+    lookup = (
+        select(DBCallRecord)
+        .options(selectinload(DBCallRecord.transcript))
+        .where(DBCallRecord.smallest_call_id == payload.call_id)
+    )
     try:
-        # Find the call record by smallest_call_id
-        call_record = (
-            db.query(DBCallRecord)
-            .filter(DBCallRecord.smallest_call_id == payload.call_id)
-            .first()
-        )
+        call_record = await db.scalar(lookup)
 
         if call_record is None:
             # Create one if webhook arrived before our record (race condition)
@@ -815,21 +1403,35 @@ async def webhook_post_call(payload: SmallestAIPostCallPayload):
                 smallest_call_id=payload.call_id,
                 started_at=datetime.now(timezone.utc),
                 created_at=datetime.now(timezone.utc),
+                transcript=CallTranscript(),
             )
             db.add(call_record)
-            db.commit()
+            try:
+                await db.commit()
+            except IntegrityError:
+                # A concurrent delivery of the same webhook created it first.
+                await db.rollback()
+                call_record = await db.scalar(lookup)
 
         # Handle non-completed calls (busy, no_answer, failed)
         if payload.status in ("busy", "no_answer", "failed"):
             call_record.state = CallState.BUSY_RETRY
             call_record.triage_reason = f"Call status: {payload.status}"
-            schedule_retry(call_record, delay_minutes=10, db=db)
+            await schedule_retry(call_record, delay_minutes=10, db=db)
             return {"status": "retry_scheduled", "call_id": call_record.id}
 
+        if LOCAL_AUDIO_METRICS and payload.recording_url:
+            recording = await _fetch_recording(payload.recording_url)
+            report = await _local_audio_metrics(*recording, payload.audio_metrics) if recording else None
+            if report is not None:
+                call_record.local_audio_metrics = json.dumps(report)
+                payload = payload.model_copy(update={"audio_metrics": AudioMetrics.model_validate(report["metrics"])})
+
         # Run acoustic triage
         triage_result = analyze_vitals(payload)
         call_record.triage_classification = triage_result.classification.value
         call_record.triage_reason = triage_result.reason
+        call_record.triage_input = triage_input_json(payload)
         call_record.ended_at = datetime.now(timezone.utc)
 
         logger.info(
@@ -847,10 +1449,10 @@ async def webhook_post_call(payload: SmallestAIPostCallPayload):
             # IMMEDIATE ESCALATION
             call_record.state = CallState.ESCALATED
             call_record.escalation_reason = triage_result.reason
-            db.commit()
+            await db.commit()
 
             # Look up user name for the SMS
-            user = db.query(UserRecord).filter(UserRecord.id == payload.user_id).first()
+            user = await db.get(UserRecord, payload.user_id)
             user_name = user.name if user else payload.user_id
 
             send_escalation_sms(
@@ -861,7 +1463,7 @@ async def webhook_post_call(payload: SmallestAIPostCallPayload):
 
             # Also add to in-memory escalation store for dashboard
             esc_id = f"esc_{uuid4().hex[:10]}"
-            store["escalations"][esc_id] = {
+            await store["escalations"].aset(esc_id, {
                 "id": esc_id,
                 "call_id": call_record.id,
                 "campaign_id": payload.campaign_id,
@@ -871,36 +1473,39 @@ async def webhook_post_call(payload: SmallestAIPostCallPayload):
                 "detected_flags": [triage_result.classification.value],
                 "created_at": now_iso(),
                 "acknowledged_at": None,
-            }
+            })
 
             return {"status": "escalated", "call_id": call_record.id, "reason": triage_result.reason}
 
         elif triage_result.action == "SCHEDULE_RETRY":
-            schedule_retry(call_record, delay_minutes=triage_result.retry_delay_minutes or 20, db=db)
+            await schedule_retry(call_record, delay_minutes=triage_result.retry_delay_minutes or 20, db=db)
             return {"status": "retry_scheduled", "call_id": call_record.id, "delay_minutes": triage_result.retry_delay_minutes}
 
         elif triage_result.action == "ANALYZE_TRANSCRIPT":
-            # Speech detected — run Claude post-call analysis
+            # Speech detected — pre-screen locally, then run Claude post-call analysis if needed
             history = [
                 {"role": "user" if seg.speaker == "user" else "assistant", "content": seg.text}
                 for seg in payload.transcript
             ]
+            campaign = await store["campaigns"].aget(payload.campaign_id) if payload.campaign_id else None
+            screen = prescreen_transcript(history, campaign["escalation_keywords"] if campaign else [])
+            logger.info("Pre-screen: call=%s route=%s (%s)", call_record.id, screen.route, screen.reason)
             try:
-                result = process_transcript(history, [])
+                result = await asyncio.to_thread(analyze_transcript, history, screen)
                 call_record.summary = result["summary"]
                 call_record.sentiment_score = result["sentiment_score"]
-                call_record.detected_flags = json.dumps(result["detected_flags"])
+                call_record.detected_flags = result["detected_flags"]
                 call_record.recommended_action = result["recommended_action"]
             except Exception:
                 logger.exception("Claude post-call analysis failed for call %s", call_record.id)
 
             call_record.state = CallState.COMPLETED
-            db.commit()
+            await db.commit()
 
             # Check if Claude found flags that need escalation
-            flags = json.loads(call_record.detected_flags) if call_record.detected_flags else []
+            flags = call_record.detected_flags or []
             if flags:
-                user = db.query(UserRecord).filter(UserRecord.id == payload.user_id).first()
+                user = await db.get(UserRecord, payload.user_id)
                 user_name = user.name if user else payload.user_id
                 send_escalation_sms(
                     user_name=user_name,
@@ -908,7 +1513,7 @@ async def webhook_post_call(payload: SmallestAIPostCallPayload):
                     call_id=call_record.id,
                 )
                 esc_id = f"esc_{uuid4().hex[:10]}"
-                store["escalations"][esc_id] = {
+                await store["escalations"].aset(esc_id, {
                     "id": esc_id,
                     "call_id": call_record.id,
                     "campaign_id": payload.campaign_id,
@@ -918,52 +1523,71 @@ async def webhook_post_call(payload: SmallestAIPostCallPayload):
                     "detected_flags": flags,
                     "created_at": now_iso(),
                     "acknowledged_at": None,
-                }
+                })
+
+            trend_escalation = await asyncio.to_thread(
+                track_patient_trend,
+                payload.user_id,
+                payload.campaign_id,
+                call_record.id,
+                call_record.sentiment_score,
+                [seg.text for seg in payload.transcript if seg.speaker == "user"],
+                flags,
+            )
+            if trend_escalation is not None:
+                user = await db.get(UserRecord, payload.user_id)
+                send_escalation_sms(
+                    user_name=user.name if user else payload.user_id,
+                    triage_reason=trend_escalation["reason"],
+                    call_id=call_record.id,
+                )
 
             return {"status": "completed", "call_id": call_record.id, "summary": call_record.summary}
 
         # Default: mark completed
         call_record.state = CallState.COMPLETED
-        db.commit()
+        await db.commit()
         return {"status": "completed", "call_id": call_record.id}
 
     except Exception:
         logger.exception("Error processing post-call webhook")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="Webhook processing failed")
-    finally:
-        db.close()
 
 
-@app.post("/webhooks/smallest/analytics")
-async def webhook_analytics(payload: SmallestAIAnalyticsPayload):
+@app.post("/webhooks/smallest/analytics", openapi_extra=webhook_body_schema(SmallestAIAnalyticsPayload))
+async def webhook_analytics(request: Request, db: AsyncSession = Depends(get_session)):
     """Handle analytics-completed webhook from Smallest.ai.
 
     This fires after Smallest.ai finishes deeper analysis. We re-run triage
     with the updated metrics and update the call record.
     """
+    payload = decode_webhook_body(await request.body(), FastAnalyticsPayload, SmallestAIAnalyticsPayload)
     logger.info("Analytics webhook received: call_id=%s user_id=%s", payload.call_id, payload.user_id)
 
-    db = get_db()
     try:
-        call_record = (
-            db.query(DBCallRecord)
-            .filter(DBCallRecord.smallest_call_id == payload.call_id)
-            .first()
+        call_record = await db.scalar(
+            select(DBCallRecord)
+            .options(selectinload(DBCallRecord.transcript))
+            .where(DBCallRecord.smallest_call_id == payload.call_id)
         )
         if call_record is None:
             logger.warning("Analytics webhook for unknown call: %s", payload.call_id)
             return {"status": "ignored", "reason": "call_not_found"}
 
+        _recheck_local_metrics(call_record, payload.audio_metrics)
+
         # If already escalated or completed, just log
         if call_record.state in (CallState.ESCALATED, CallState.COMPLETED):
             logger.info("Call %s already %s — analytics noted", call_record.id, call_record.state.value)
+            await db.commit()
             return {"status": "already_processed", "call_id": call_record.id}
 
         # Build a post-call payload from analytics data for triage
         post_call = SmallestAIPostCallPayload(
             call_id=payload.call_id,
             user_id=payload.user_id,
+            campaign_id=call_record.campaign_id,
             status="completed",
             audio_metrics=payload.audio_metrics,
             transcript=payload.transcript,
@@ -973,13 +1597,14 @@ async def webhook_analytics(payload: SmallestAIAnalyticsPayload):
 
         call_record.triage_classification = triage_result.classification.value
         call_record.triage_reason = triage_result.reason
+        call_record.triage_input = triage_input_json(post_call)
 
         if triage_result.escalate:
             call_record.state = CallState.ESCALATED
             call_record.escalation_reason = triage_result.reason
-            db.commit()
+            await db.commit()
 
-            user = db.query(UserRecord).filter(UserRecord.id == payload.user_id).first()
+            user = await db.get(UserRecord, payload.user_id)
             user_name = user.name if user else payload.user_id
             send_escalation_sms(
                 user_name=user_name,
@@ -988,60 +1613,107 @@ async def webhook_analytics(payload: SmallestAIAnalyticsPayload):
             )
             return {"status": "escalated", "call_id": call_record.id}
 
-        db.commit()
+        await db.commit()
         return {"status": "updated", "call_id": call_record.id, "classification": triage_result.classification.value}
 
     except Exception:
         logger.exception("Error processing analytics webhook")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="Analytics webhook processing failed")
-    finally:
-        db.close()
+
+
+@app.post("/calls/{call_id}/audio-metrics")
+async def upload_call_recording(call_id: str, request: Request, db: AsyncSession = Depends(get_session)):
+    """Compute audio metrics from an uploaded call recording.
+
+    The result is stored on the call and cross-checked against the
+    metrics triage last ran on, if any.
+    """
+    audio = await request.body()
+    content_type = request.headers.get("content-type", "audio/wav")
+
+    call_record = await db.get(DBCallRecord, call_id, options=[selectinload(DBCallRecord.transcript)])
+    if call_record is None:
+        raise HTTPException(status_code=404, detail="Call not found")
+    provider = None
+    if call_record.triage_input:
+        provider = AudioMetrics.model_validate(json.loads(call_record.triage_input)["audio_metrics"])
+    report = await _local_audio_metrics(audio, content_type, provider)
+    if report is None:
+        raise HTTPException(status_code=415, detail=f"Could not decode {content_type} recording")
+    call_record.local_audio_metrics = json.dumps(report)
+    await db.commit()
+    return {"call_id": call_id, **report}
+
+
+# =====================================================================
+# Triage rule table (hot-reloadable)
+# =====================================================================
+@app.get("/triage/rules")
+def get_triage_rules():
+    """Current triage rule table and per-campaign parameter overrides."""
+    return rule_registry.config.model_dump(mode="json")
+
+
+@app.put("/triage/rules")
+def update_triage_rules(config: TriageRuleConfig):
+    """Compile and install a new rule table; takes effect on the next call."""
+    try:
+        rule_registry.save(config)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return {"status": "installed", "version": config.default.version, "campaigns": sorted(config.campaigns)}
+
+
+@app.post("/triage/rules/reload")
+def reload_triage_rules():
+    """Re-read the rule file named by PULSECALL_TRIAGE_RULES."""
+    try:
+        rule_registry.reload()
+    except (OSError, ValueError) as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return {"status": "reloaded", "version": rule_registry.config.default.version}
 
 
 # =====================================================================
 # Manual trigger: place an outbound call now
 # =====================================================================
 @app.post("/calls/outbound")
-async def trigger_outbound_call(user_id: str, campaign_id: Optional[str] = None):
+async def trigger_outbound_call(user_id: str, campaign_id: Optional[str] = None, db: AsyncSession = Depends(get_session)):
     """Manually trigger an outbound call for a specific user."""
-    db = get_db()
-    try:
-        user = db.query(UserRecord).filter(UserRecord.id == user_id).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-
-        call_id = f"call_{uuid4().hex[:10]}"
-        now = datetime.now(timezone.utc)
-        call_record = DBCallRecord(
-            id=call_id,
-            user_id=user.id,
-            campaign_id=campaign_id or user.campaign_id,
-            state=CallState.PENDING,
-            started_at=now,
-            created_at=now,
-        )
-        db.add(call_record)
-        db.commit()
-
-        request = OutboundCallRequest(
-            user_id=user.id,
-            user_name=user.name,
-            phone_number=user.phone,
-            campaign_id=campaign_id or user.campaign_id,
-        )
-        smallest_call_id = await place_outbound_call(request)
+    user = await db.get(UserRecord, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
 
-        if smallest_call_id:
-            call_record.smallest_call_id = smallest_call_id
-            db.commit()
-            return {"status": "call_placed", "call_id": call_id, "smallest_call_id": smallest_call_id}
-        else:
-            call_record.state = CallState.BUSY_RETRY
-            db.commit()
-            raise HTTPException(status_code=502, detail="Failed to place outbound call")
-    finally:
-        db.close()
+    call_id = f"call_{uuid4().hex[:10]}"
+    now = datetime.now(timezone.utc)
+    call_record = DBCallRecord(
+        id=call_id,
+        user_id=user.id,
+        campaign_id=campaign_id or user.campaign_id,
+        state=CallState.PENDING,
+        started_at=now,
+        created_at=now,
+    )
+    db.add(call_record)
+    await db.commit()
+
+    request = OutboundCallRequest(
+        user_id=user.id,
+        user_name=user.name,
+        phone_number=user.phone,
+        campaign_id=campaign_id or user.campaign_id,
+    )
+    smallest_call_id = await place_outbound_call(request)
+
+    if smallest_call_id:
+        call_record.smallest_call_id = smallest_call_id
+        await db.commit()
+        return {"status": "call_placed", "call_id": call_id, "smallest_call_id": smallest_call_id}
+    else:
+        call_record.state = CallState.BUSY_RETRY
+        await db.commit()
+        raise HTTPException(status_code=502, detail="Failed to place outbound call")
 
 
 # =====================================================================
@@ -1069,35 +1741,42 @@ class VoiceChatRequest(BaseModel):
     transcription: Optional[str] = None
     history: list[dict[str, str]] = Field(default_factory=list)
     trigger: Optional[str] = None
+    conversation_id: Optional[str] = None
+    caller: CallerType = "browser"
 
 
 class VoiceSummaryRequest(BaseModel):
     history: list[dict[str, str]]
 
 
-@app.post("/voice/chat")
-async def voice_chat(payload: VoiceChatRequest):
-    """LLM + TTS: get AI text response and synthesized audio."""
-    if not OPENROUTER_API_KEY:
-        raise HTTPException(status_code=500, detail="OPENROUTER_API_KEY not configured")
-    if not SMALLEST_AI_API_KEY:
-        raise HTTPException(status_code=500, detail="SMALLEST_AI_API_KEY not configured")
+OPENROUTER_CHAT_URL = "https://openrouter.ai/api/v1/chat/completions"
+SMALLEST_TTS_URL = "https://waves-api.smallest.ai/api/v1/lightning-v3.1/get_speech"
+SMALLEST_STT_URL = "https://waves-api.smallest.ai/api/v1/lightning/get_text?model=lightning&language=en"
+ENDING_PATTERN = re.compile(r"\b(goodbye|good bye|bye|take care|have a (good|great|nice) (day|evening|night|one))\b", re.IGNORECASE)
 
-    campaign = store["campaigns"].get(payload.campaign_id)
-    if not campaign:
-        raise HTTPException(status_code=404, detail="Campaign not found")
 
-    if not payload.transcription and payload.trigger != "initial":
-        raise HTTPException(status_code=400, detail="No transcription provided")
+def _openrouter_headers() -> dict[str, str]:
+    return {
+        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
+        "Content-Type": "application/json",
+        "HTTP-Referer": "http://localhost:3000",
+        "X-Title": "PulseCall",
+    }
 
-    system_prompt = _build_system_prompt(campaign)
-    past_messages = payload.history or []
-    turn_number = len([m for m in past_messages if m.get("role") == "user"]) + 1
+
+def _build_voice_messages(
+    system_prompt: str,
+    history: list[dict[str, str]],
+    transcription: Optional[str],
+    trigger: Optional[str],
+) -> list[dict[str, str]]:
+    """Assemble the OpenRouter message list for one voice turn."""
+    turn_number = len([m for m in history if m.get("role") == "user"]) + 1
 
     messages: list[dict[str, str]] = [{"role": "system", "content": system_prompt}]
-    messages.extend(past_messages)
+    messages.extend(history)
 
-    if payload.trigger == "initial":
+    if trigger == "initial":
         messages.append({
             "role": "system",
             "content": "The patient has picked up the phone. Start the conversation with STEP 1 immediately.",
@@ -1105,92 +1784,374 @@ async def voice_chat(payload: VoiceChatRequest):
     else:
         messages.append({
             "role": "user",
-            "content": payload.transcription or "",
+            "content": transcription or "",
         })
         messages.append({
             "role": "system",
             "content": f"This is turn {turn_number}. Continue the flow naturally.",
         })
+    return messages
 
-    # 1. LLM call via OpenRouter (free → paid fallback)
-    or_headers = {
-        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-        "Content-Type": "application/json",
-        "HTTP-Referer": "http://localhost:3000",
-        "X-Title": "PulseCall",
-    }
+
+async def _voice_llm_reply(
+    client: httpx.AsyncClient,
+    messages: list[dict[str, str]],
+    trace: TurnTrace,
+) -> tuple[str, bool]:
+    """Call the voice LLM and return (clean_reply, is_ending).
+
+    The completion is streamed so the time to its first token is traced
+    (llm_first_token) alongside the full response (llm_total).
+    """
     llm_payload = {
         "model": VOICE_LLM_MODEL,
         "max_tokens": 300,
         "messages": messages,
+        "stream": True,
     }
-
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        llm_res = await client.post("https://openrouter.ai/api/v1/chat/completions", headers=or_headers, json=llm_payload)
-        if llm_res.status_code != 200:
-            logger.error("OpenRouter error: %s", llm_res.text)
-            raise HTTPException(status_code=llm_res.status_code, detail=llm_res.text)
-
-        reply = llm_res.json().get("choices", [{}])[0].get("message", {}).get("content", "")
+    parts: list[str] = []
+    with trace.span("llm_total"):
+        started = time.perf_counter()
+        async with client.stream("POST", OPENROUTER_CHAT_URL, headers=_openrouter_headers(), json=llm_payload) as llm_res:
+            if llm_res.status_code != 200:
+                await llm_res.aread()
+                logger.error("OpenRouter error: %s", llm_res.text)
+                raise HTTPException(status_code=llm_res.status_code, detail=llm_res.text)
+            async for line in llm_res.aiter_lines():
+                # Server-sent events; ": ..." keep-alive comments and blank lines are skipped.
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                chunk = json.loads(data)
+                if "error" in chunk:
+                    logger.error("OpenRouter stream error: %s", chunk["error"])
+                    raise HTTPException(status_code=502, detail=str(chunk["error"]))
+                delta = (chunk.get("choices") or [{}])[0].get("delta", {}).get("content") or ""
+                if delta and not parts:
+                    trace.record("llm_first_token", (time.perf_counter() - started) * 1000.0)
+                if delta:
+                    parts.append(delta)
+    reply = "".join(parts)
 
     # Detect ending via [END_CALL] marker or fallback regex
     is_ending = "[END_CALL]" in reply
     # Clean the marker from the reply text
     clean_reply = reply.replace("[END_CALL]", "").strip()
     if not is_ending:
-        ending_patterns = re.compile(r"\b(goodbye|good bye|bye|take care|have a (good|great|nice) (day|evening|night|one))\b", re.IGNORECASE)
-        is_ending = bool(ending_patterns.search(clean_reply))
-
-    # 2. TTS via Smallest.ai
-    voice_id = campaign.get("voice_id", "rachel")
-    audio_base64 = None
+        is_ending = bool(ENDING_PATTERN.search(clean_reply))
+    return clean_reply, is_ending
+
+
+async def _synthesize_speech(
+    client: httpx.AsyncClient,
+    text: str,
+    voice_id: str,
+    profile: TtsProfile,
+    trace: TurnTrace,
+) -> Optional[bytes]:
+    """TTS via Smallest.ai in the campaign's audio profile.
+
+    Returns raw audio bytes, or None on failure. Results are cached per
+    text, voice and profile, so repeated prompts skip synthesis. The audio is
+    streamed so the time to its first byte is traced (tts_first_byte).
+    """
+    cache_key = TtsCache.key(text, voice_id, profile)
+    lookup_started = time.perf_counter()
+    cached = tts_cache.get(cache_key)
+    if cached is not None:
+        # Traced as its own stage so cache hits stay visible without pulling tts_total down.
+        trace.record("tts_cache_hit", (time.perf_counter() - lookup_started) * 1000.0)
+        return cached
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            tts_res = await client.post(
-                "https://waves-api.smallest.ai/api/v1/lightning-v3.1/get_speech",
+        with trace.span("tts_total"):
+            started = time.perf_counter()
+            async with client.stream(
+                "POST",
+                SMALLEST_TTS_URL,
                 headers={
                     "Authorization": f"Bearer {SMALLEST_AI_API_KEY}",
                     "Content-Type": "application/json",
                 },
                 json={
-                    "text": clean_reply,
+                    "text": text,
                     "voice_id": voice_id,
-                    "sample_rate": 24000,
-                    "speed": 1,
-                    "output_format": "mp3",
+                    "sample_rate": profile.sample_rate,
+                    "speed": profile.speed,
+                    "output_format": profile.output_format,
                 },
-            )
-            if tts_res.status_code == 200:
-                audio_base64 = base64.b64encode(tts_res.content).decode("utf-8")
-            else:
-                logger.error("TTS error: %s", tts_res.text)
+            ) as tts_res:
+                if tts_res.status_code != 200:
+                    await tts_res.aread()
+                    logger.error("TTS error: %s", tts_res.text)
+                    return None
+                audio = bytearray()
+                async for chunk in tts_res.aiter_bytes():
+                    if chunk and not audio:
+                        trace.record("tts_first_byte", (time.perf_counter() - started) * 1000.0)
+                    audio.extend(chunk)
+        tts_cache.put(cache_key, bytes(audio))
+        return bytes(audio)
     except Exception as e:
         logger.error("TTS request failed: %s", e)
+    return None
 
-    return {"reply": clean_reply, "audio": audio_base64, "isEnding": is_ending}
+
+async def _transcribe_audio(
+    client: httpx.AsyncClient,
+    audio: bytes,
+    content_type: str,
+    trace: TurnTrace,
+) -> dict[str, Any]:
+    """STT via Smallest.ai. Raises HTTPException on upstream failure."""
+    with trace.span("stt"):
+        res = await client.post(
+            SMALLEST_STT_URL,
+            headers={
+                "Authorization": f"Bearer {SMALLEST_AI_API_KEY}",
+                "Content-Type": content_type,
+            },
+            content=audio,
+        )
+    if res.status_code != 200:
+        raise HTTPException(status_code=res.status_code, detail=res.text)
+    return res.json()
+
+
+@app.post("/voice/chat")
+async def voice_chat(payload: VoiceChatRequest):
+    """LLM + TTS: get AI text response and synthesized audio."""
+    if not OPENROUTER_API_KEY:
+        raise HTTPException(status_code=500, detail="OPENROUTER_API_KEY not configured")
+    if not SMALLEST_AI_API_KEY:
+        raise HTTPException(status_code=500, detail="SMALLEST_AI_API_KEY not configured")
+
+    campaign = await store["campaigns"].aget(payload.campaign_id)
+    if not campaign:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+
+    if not payload.transcription and payload.trigger != "initial":
+        raise HTTPException(status_code=400, detail="No transcription provided")
+
+    escalation_id = None
+    if payload.transcription:
+        escalation_id = await asyncio.to_thread(check_live_distress, campaign, payload.conversation_id, payload.transcription)
+
+    trace = tracer.start_turn("chat", payload.campaign_id, payload.conversation_id)
+    try:
+        with trace.span("prompt_build"):
+            system_prompt = _build_system_prompt(campaign)
+            messages = _build_voice_messages(system_prompt, payload.history or [], payload.transcription, payload.trigger)
+
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            # 1. LLM call via OpenRouter
+            clean_reply, is_ending = await _voice_llm_reply(client, messages, trace)
+            # 2. TTS via Smallest.ai
+            profile = resolve_tts_profile(campaign, payload.caller)
+            audio = await _synthesize_speech(client, clean_reply, campaign.get("voice_id", "rachel"), profile, trace)
+
+        with trace.span("serialization"):
+            audio_base64 = base64.b64encode(audio).decode("utf-8") if audio else None
+        return {
+            "reply": clean_reply,
+            "audio": audio_base64,
+            "audioContentType": profile.content_type if audio else None,
+            "isEnding": is_ending,
+            "escalationId": escalation_id,
+        }
+    finally:
+        tracer.finish(trace)
+
+
+async def _transcribe_with_vad(
+    client: httpx.AsyncClient,
+    audio: bytes,
+    content_type: str,
+    vad: Optional[bool],
+    trace: TurnTrace,
+) -> dict[str, Any]:
+    """STT with optional silence trimming; adds a ``vad`` report when trimming ran."""
+    use_vad = VAD_TRIM_ENABLED if vad is None else vad
+    if not use_vad:
+        return await _transcribe_audio(client, audio, content_type, trace)
+
+    with trace.span("vad_trim"):
+        trimmed, trimmed_type, report = await trim_silence_async(audio, content_type)
+    result = await _transcribe_audio(client, trimmed, trimmed_type, trace)
+    result["vad"] = report.model_dump()
+    return result
 
 
 @app.post("/voice/transcribe")
-async def voice_transcribe(request: Request):
-    """STT: convert audio to text via Smallest.ai."""
+async def voice_transcribe(
+    request: Request,
+    vad: Optional[bool] = None,
+    campaign_id: Optional[str] = None,
+    conversation_id: Optional[str] = None,
+):
+    """STT: convert audio to text via Smallest.ai.
+
+    Pass ``vad=true`` (or set PULSECALL_VAD_TRIM) to trim leading/trailing
+    silence before upload; the response then includes the bytes and seconds saved.
+    ``campaign_id``/``conversation_id`` only key the latency trace.
+    """
     if not SMALLEST_AI_API_KEY:
         raise HTTPException(status_code=500, detail="SMALLEST_AI_API_KEY not configured")
 
-    audio_buffer = await request.body()
-    content_type = request.headers.get("content-type", "audio/webm")
+    trace = tracer.start_turn("transcribe", campaign_id, conversation_id)
+    try:
+        with trace.span("stt_upload"):
+            audio_buffer = await request.body()
+        content_type = request.headers.get("content-type", "audio/webm")
+
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            return await _transcribe_with_vad(client, audio_buffer, content_type, vad, trace)
+    finally:
+        tracer.finish(trace)
+
+
+@app.websocket("/voice/session/{campaign_id}")
+async def voice_session(websocket: WebSocket, campaign_id: str, caller: CallerType = "browser"):
+    """Stateful voice call: STT -> LLM -> TTS over one socket.
+
+    The server keeps the conversation history and the built system prompt for
+    the lifetime of the socket, and reuses one upstream HTTP client, so each
+    turn only carries the new audio.
+
+    Client -> server:
+      - ``{"type": "start"}``: agent speaks first (greeting turn)
+      - binary frames: audio chunks for the current user turn
+      - ``{"type": "audio_end", "content_type": "audio/webm", "vad": bool}``:
+        transcribe the buffered audio (optionally silence-trimmed) and respond
+      - ``{"type": "text", "text": "..."}``: respond to already-transcribed text
+      - ``{"type": "end"}``: finish the session
+
+    Each turn is traced under the campaign with a per-socket conversation id.
+    ``?caller=phone`` (a telephony bridge) gets the campaign's audio profile
+    as is; browser callers get a browser-playable variant of it.
+
+    Server -> client (pushed as soon as each stage completes):
+      - ``{"type": "transcription", "text": "...", "vad": {...} | null}``
+      - ``{"type": "escalation", "id": "...", "flags": [...]}`` when the patient's
+        speech contains a distress or campaign escalation keyword
+      - ``{"type": "reply", "text": "...", "isEnding": bool, "audio": bool, "contentType": "..."}``
+      - one binary frame with the synthesized audio (campaign audio profile)
+        when ``audio`` is true
+      - ``{"type": "ended", "history": [...]}``
+      - ``{"type": "error", "detail": "..."}``
+    """
+    await websocket.accept()
+
+    campaign = await store["campaigns"].aget(campaign_id)
+    if not campaign:
+        await websocket.send_json({"type": "error", "detail": "Campaign not found"})
+        await websocket.close(code=4404)
+        return
+    if not OPENROUTER_API_KEY or not SMALLEST_AI_API_KEY:
+        await websocket.send_json({"type": "error", "detail": "Voice API keys not configured"})
+        await websocket.close(code=1011)
+        return
+
+    session_id = str(uuid4())
+    system_prompt = _build_system_prompt(campaign)
+    voice_id = campaign.get("voice_id", "rachel")
+    profile = resolve_tts_profile(campaign, caller)
+    history: list[dict[str, str]] = []
+    audio_buffer = bytearray()
+
+    async def run_turn(
+        client: httpx.AsyncClient,
+        transcription: Optional[str],
+        trigger: Optional[str],
+        trace: TurnTrace,
+    ) -> None:
+        with trace.span("prompt_build"):
+            messages = _build_voice_messages(system_prompt, history, transcription, trigger)
+        clean_reply, is_ending = await _voice_llm_reply(client, messages, trace)
+        if trigger != "initial":
+            history.append({"role": "user", "content": transcription or ""})
+        history.append({"role": "assistant", "content": clean_reply})
+
+        audio = await _synthesize_speech(client, clean_reply, voice_id, profile, trace)
+        with trace.span("serialization"):
+            await websocket.send_json({
+                "type": "reply",
+                "text": clean_reply,
+                "isEnding": is_ending,
+                "audio": audio is not None,
+                "contentType": profile.content_type,
+            })
+            if audio is not None:
+                await websocket.send_bytes(audio)
+
+    async def notify_live_distress(text: str) -> None:
+        escalation_id = await asyncio.to_thread(check_live_distress, campaign, session_id, text)
+        if escalation_id:
+            escalation = await store["escalations"].aget(escalation_id)
+            await websocket.send_json({"type": "escalation", "id": escalation_id, "flags": escalation["detected_flags"]})
 
     async with httpx.AsyncClient(timeout=30.0) as client:
-        res = await client.post(
-            "https://waves-api.smallest.ai/api/v1/lightning/get_text?model=lightning&language=en",
-            headers={
-                "Authorization": f"Bearer {SMALLEST_AI_API_KEY}",
-                "Content-Type": content_type,
-            },
-            content=audio_buffer,
-        )
-        if res.status_code != 200:
-            raise HTTPException(status_code=res.status_code, detail=res.text)
-        return res.json()
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("bytes") is not None:
+                    audio_buffer.extend(message["bytes"])
+                    continue
+
+                try:
+                    event = json.loads(message.get("text") or "{}")
+                except json.JSONDecodeError:
+                    await websocket.send_json({"type": "error", "detail": "Invalid JSON message"})
+                    continue
+                event_type = event.get("type")
+                trace = tracer.start_turn(f"session_{event_type}", campaign_id, session_id)
+
+                try:
+                    if event_type == "start":
+                        await run_turn(client, None, "initial", trace)
+                    elif event_type == "audio_end":
+                        audio = bytes(audio_buffer)
+                        audio_buffer.clear()
+                        if not audio:
+                            await websocket.send_json({"type": "error", "detail": "No audio received"})
+                            continue
+                        stt = await _transcribe_with_vad(client, audio, event.get("content_type", "audio/webm"), event.get("vad"), trace)
+                        text = stt.get("transcription") or ""
+                        await websocket.send_json({"type": "transcription", "text": text, "vad": stt.get("vad")})
+                        if not text:
+                            continue
+                        await notify_live_distress(text)
+                        await run_turn(client, text, None, trace)
+                    elif event_type == "text":
+                        if not event.get("text"):
+                            await websocket.send_json({"type": "error", "detail": "No transcription provided"})
+                            continue
+                        await notify_live_distress(event["text"])
+                        await run_turn(client, event["text"], None, trace)
+                    elif event_type == "end":
+                        await websocket.send_json({"type": "ended", "history": history})
+                        await websocket.close()
+                        break
+                    else:
+                        await websocket.send_json({"type": "error", "detail": f"Unknown message type: {event_type}"})
+                except HTTPException as e:
+                    await websocket.send_json({"type": "error", "detail": e.detail})
+                except httpx.HTTPError as e:
+                    # Upstream timeouts and connection failures end the turn, not the session.
+                    logger.warning("Voice session %s: upstream request failed: %r", session_id, e)
+                    await websocket.send_json({"type": "error", "detail": f"Upstream request failed: {type(e).__name__}"})
+                finally:
+                    if trace.spans:
+                        tracer.finish(trace)
+        except WebSocketDisconnect:
+            pass
+
+    with live_monitors_lock:
+        live_monitors.pop(session_id, None)
+    logger.info("Voice session closed: campaign=%s turns=%d", campaign_id, len(history))
 
 
 @app.post("/voice/summary")
@@ -1207,12 +2168,6 @@ async def voice_summary(payload: VoiceSummaryRequest):
         for msg in payload.history
     )
 
-    or_headers = {
-        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-        "Content-Type": "application/json",
-        "HTTP-Referer": "http://localhost:3000",
-        "X-Title": "PulseCall",
-    }
     summary_payload = {
         "model": VOICE_LLM_MODEL,
         "max_tokens": 500,
@@ -1223,7 +2178,7 @@ async def voice_summary(payload: VoiceSummaryRequest):
     }
 
     async with httpx.AsyncClient(timeout=30.0) as client:
-        res = await client.post("https://openrouter.ai/api/v1/chat/completions", headers=or_headers, json=summary_payload)
+        res = await client.post(OPENROUTER_CHAT_URL, headers=_openrouter_headers(), json=summary_payload)
         if res.status_code != 200:
             raise HTTPException(status_code=res.status_code, detail=res.text)
 
@@ -1236,3 +2191,22 @@ async def voice_summary(payload: VoiceSummaryRequest):
         raise HTTPException(status_code=500, detail="Failed to parse summary")
 
     return json.loads(json_match.group())
+
+
+# =====================================================================
+# Debug: voice turn latency
+# =====================================================================
+@app.get("/debug/latency")
+def get_voice_latency(
+    campaign_id: Optional[str] = None,
+    conversation_id: Optional[str] = None,
+    limit: int = 50,
+):
+    """Per-stage latency histograms and recent turn breakdowns for voice turns."""
+    return tracer.snapshot(campaign_id=campaign_id, conversation_id=conversation_id, limit=limit)
+
+
+@app.get("/debug/prescreen")
+def get_prescreen_stats():
+    """Post-call pre-screen routes, LLM calls avoided and LLM seconds saved."""
+    return prescreen_stats.snapshot()
@@ -2,10 +2,13 @@
 
 from __future__ import annotations
 
+from array import array
+from datetime import datetime
 from enum import Enum
-from typing import Optional
+from operator import itemgetter
+from typing import Any, Literal, NamedTuple, Optional, Union
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_serializer, field_validator, model_validator
 
 
 # ---------------------------------------------------------------------------
@@ -27,6 +30,7 @@ class TriageClassification(str, Enum):
     CRITICAL_SILENCE = "CRITICAL_SILENCE"
     LIKELY_SLEEPING = "LIKELY_SLEEPING"
     SPEECH_DETECTED = "SPEECH_DETECTED"
+    IMPAIRED_SPEECH = "IMPAIRED_SPEECH"
 
 
 # ---------------------------------------------------------------------------
@@ -77,6 +81,7 @@ class SmallestAIPostCallPayload(BaseModel):
     audio_metrics: AudioMetrics
     transcript: list[TranscriptSegment] = Field(default_factory=list)
     emotions: list[EmotionDetection] = Field(default_factory=list)
+    recording_url: Optional[str] = None
     metadata: dict = Field(default_factory=dict)
 
 
@@ -91,6 +96,128 @@ class SmallestAIAnalyticsPayload(BaseModel):
     sentiment: Optional[str] = None
 
 
+# ---------------------------------------------------------------------------
+# Word-timing speech features (derived from word timestamps)
+# ---------------------------------------------------------------------------
+class SpeechFeatures(BaseModel):
+    word_count: int = 0
+    speaking_sec: float = 0.0
+    speech_rate_wpm: float = 0.0
+    pause_count: int = 0
+    mean_pause_sec: float = 0.0
+    p90_pause_sec: float = 0.0
+    longest_gap_sec: float = 0.0
+    low_confidence_ratio: float = 0.0
+    mean_confidence: float = 1.0
+
+
+# ---------------------------------------------------------------------------
+# Fast-path webhook decoding — word timestamps packed into flat arrays
+# ---------------------------------------------------------------------------
+class PackedWords(NamedTuple):
+    """Word timestamps of one segment as parallel float64 arrays (8 bytes/value)."""
+    words: tuple[str, ...]
+    start: array
+    end: array
+    confidence: array
+
+    @classmethod
+    def pack(cls, raw: list[Any]) -> "PackedWords":
+        if raw and not isinstance(raw[0], dict):
+            raw = [w.model_dump() if isinstance(w, BaseModel) else w for w in raw]
+        try:
+            return cls(
+                tuple(map(itemgetter("word"), raw)),
+                array("d", map(itemgetter("start"), raw)),
+                array("d", map(itemgetter("end"), raw)),
+                array("d", [w.get("confidence", 1.0) for w in raw]),
+            )
+        except (KeyError, TypeError) as exc:
+            raise ValueError(f"invalid word timestamp: {exc}") from exc
+
+
+class FastTranscriptSegment(TranscriptSegment):
+    """Transcript segment whose word timestamps skip per-word model objects."""
+    word_timestamps: Any = Field(default_factory=lambda: PackedWords.pack([]))
+
+    @field_validator("word_timestamps", mode="before")
+    @classmethod
+    def _pack_words(cls, value: Any) -> PackedWords:
+        if isinstance(value, PackedWords):
+            return value
+        if not isinstance(value, list):
+            raise ValueError("word_timestamps must be a list")
+        return PackedWords.pack(value)
+
+    @field_serializer("word_timestamps")
+    def _unpack_words(self, value: PackedWords) -> list[dict[str, Any]]:
+        return [
+            {"word": w, "start": s, "end": e, "confidence": c}
+            for w, s, e, c in zip(value.words, value.start, value.end, value.confidence)
+        ]
+
+
+class FastPostCallPayload(SmallestAIPostCallPayload):
+    transcript: list[FastTranscriptSegment] = Field(default_factory=list)
+
+
+class FastAnalyticsPayload(SmallestAIAnalyticsPayload):
+    transcript: list[FastTranscriptSegment] = Field(default_factory=list)
+
+
+# ---------------------------------------------------------------------------
+# Triage rule table (data form of the acoustic cascade, see triage_rules.py)
+# ---------------------------------------------------------------------------
+MetricField = Literal["avg_db", "peak_db", "speech_probability", "silence_duration_sec", "call_duration_sec"]
+
+
+class TriageCondition(BaseModel):
+    """`field op value`, or `field op relative_to + value` when relative_to is set.
+
+    `value` is a number or the name of a rule-set parameter.
+    """
+    field: MetricField
+    op: Literal["<", "<=", ">", ">="]
+    value: Union[float, str]
+    relative_to: Optional[MetricField] = None
+
+
+class TriageRule(BaseModel):
+    name: str
+    when: list[TriageCondition] = Field(default_factory=list, description="All must hold; empty = always")
+    classification: TriageClassification
+    action: Literal["IMMEDIATE_ESCALATION", "SCHEDULE_RETRY", "ANALYZE_TRANSCRIPT"]
+    retry_delay_minutes: Optional[Union[int, str]] = None
+    escalate: bool = False
+    reason: str = Field(description="Format template over the audio metric fields")
+    check_speech_features: bool = False
+
+
+class TriageRuleSet(BaseModel):
+    version: str = "default"
+    params: dict[str, float] = Field(default_factory=dict)
+    rules: list[TriageRule] = Field(description="Evaluated in order; the last rule must be unconditional")
+
+
+class TriageRuleConfig(BaseModel):
+    default: TriageRuleSet
+    campaigns: dict[str, dict[str, float]] = Field(
+        default_factory=dict, description="Per-campaign parameter overrides"
+    )
+
+    @model_validator(mode="after")
+    def _known_overrides(self) -> "TriageRuleConfig":
+        # A misspelled parameter would otherwise be accepted and silently ignored.
+        for campaign_id, overrides in self.campaigns.items():
+            unknown = sorted(set(overrides) - set(self.default.params))
+            if unknown:
+                raise ValueError(
+                    f"Campaign {campaign_id!r} overrides unknown parameters: {', '.join(unknown)} "
+                    f"(known: {', '.join(sorted(self.default.params))})"
+                )
+        return self
+
+
 # ---------------------------------------------------------------------------
 # Triage result
 # ---------------------------------------------------------------------------
@@ -100,6 +227,166 @@ class TriageResult(BaseModel):
     action: str
     retry_delay_minutes: Optional[int] = None
     escalate: bool = False
+    speech_features: Optional[SpeechFeatures] = None
+
+
+# ---------------------------------------------------------------------------
+# TTS audio profile (resolved per campaign)
+# ---------------------------------------------------------------------------
+class TtsProfile(BaseModel):
+    name: str
+    sample_rate: int
+    output_format: str
+    content_type: str
+    speed: float = 1.0
+
+
+# ---------------------------------------------------------------------------
+# Voice-activity trimming report (STT preprocessing)
+# ---------------------------------------------------------------------------
+class VadReport(BaseModel):
+    trimmed: bool = False
+    original_bytes: int = 0
+    forwarded_bytes: int = 0
+    bytes_saved: int = 0
+    original_sec: float = 0.0
+    forwarded_sec: float = 0.0
+    seconds_saved: float = 0.0
+
+
+# ---------------------------------------------------------------------------
+# Re-triage job progress (checkpointed between chunks)
+# ---------------------------------------------------------------------------
+class RetriageProgress(BaseModel):
+    last_id: Optional[str] = None
+    scanned: int = 0
+    changed: int = 0
+    escalations_added: int = 0
+    escalations_cleared: int = 0
+    errors: int = 0
+    applied: int = 0
+    transitions: dict[str, int] = Field(default_factory=dict)
+    done: bool = False
+
+
+# ---------------------------------------------------------------------------
+# Call history archival run (see archive.py)
+# ---------------------------------------------------------------------------
+class ArchiveResult(BaseModel):
+    cutoff: datetime
+    archived: int = 0
+    months: dict[str, int] = Field(default_factory=dict)  # "YYYY-MM" -> calls written
+
+
+# ---------------------------------------------------------------------------
+# Bulk user import (see user_import.py)
+# ---------------------------------------------------------------------------
+class UserImportError(BaseModel):
+    line: int
+    error: str
+
+
+class UserImportReport(BaseModel):
+    rows: int = 0
+    created: int = 0
+    skipped: int = 0  # already imported (earlier upload or earlier in this file)
+    failed: int = 0
+    errors: list[UserImportError] = Field(default_factory=list)  # first PULSECALL_IMPORT_MAX_ERRORS only
+
+
+# ---------------------------------------------------------------------------
+# Analytics rollups (see rollups.py)
+# ---------------------------------------------------------------------------
+class AnalyticsBucket(BaseModel):
+    campaign_id: Optional[str] = None  # None when grouped by day only, or for calls without a campaign
+    day: Optional[str] = None  # "YYYY-MM-DD"; None when grouped by campaign only
+    calls: int = 0
+    completed: int = 0
+    escalated: int = 0
+    retried: int = 0
+    escalation_rate: float = 0.0
+    avg_sentiment: Optional[float] = None
+    triage: dict[str, int] = Field(default_factory=dict)  # classification -> calls
+
+
+class AnalyticsReport(BaseModel):
+    group_by: Literal["campaign_day", "day", "campaign"]
+    totals: AnalyticsBucket
+    buckets: list[AnalyticsBucket] = Field(default_factory=list)
+
+
+class RollupRebuildResult(BaseModel):
+    calls: int = 0  # call_history rows
+    campaign_calls: int = 0
+    archived_calls: int = 0
+    buckets: int = 0
+
+
+# ---------------------------------------------------------------------------
+# Full-text search over calls (see search.py)
+# ---------------------------------------------------------------------------
+class SearchHit(BaseModel):
+    call_id: str
+    kind: Literal["outbound", "campaign"]  # call_history row or ended campaign conversation
+    campaign_id: Optional[str] = None
+    user_id: Optional[str] = None
+    placed_at: Optional[str] = None
+    summary: Optional[str] = None
+    detected_flags: list[str] = Field(default_factory=list)
+    snippet: str = Field(description="Best-matching fragment, HTML-escaped, matches wrapped in <mark></mark>")
+    score: float = Field(description="Relevance; higher is better, comparable within one query only")
+
+
+class SearchReindexResult(BaseModel):
+    calls: int = 0  # call_history rows scanned
+    campaign_calls: int = 0
+    documents: int = 0  # calls with text to index
+
+
+# ---------------------------------------------------------------------------
+# Provider vs locally computed audio metrics
+# ---------------------------------------------------------------------------
+class MetricsCrosscheck(BaseModel):
+    avg_db_delta: float = 0.0
+    peak_db_delta: float = 0.0
+    speech_probability_delta: float = 0.0
+    silence_duration_delta: float = 0.0
+    agrees: bool = True
+
+
+# ---------------------------------------------------------------------------
+# Transcript pre-screen (how much LLM analysis a call needs, see prescreen.py)
+# ---------------------------------------------------------------------------
+class PrescreenResult(BaseModel):
+    route: Literal["local", "cheap", "full"]
+    reason: str
+    user_words: int = 0
+    concern_score: float = 0.0
+    routine_score: float = 0.0
+    routine_coverage: float = 0.0  # share of content words in the routine vocabulary
+    keyword_hits: list[str] = Field(default_factory=list)
+    negative_markers: list[str] = Field(default_factory=list)
+
+
+# ---------------------------------------------------------------------------
+# Per-patient trends (incremental deterioration detection, see trends.py)
+# ---------------------------------------------------------------------------
+class TrendSeries(BaseModel):
+    level: float = Field(description="Smoothed value")
+    slope: float = Field(0.0, description="Smoothed change per call")
+    last: float
+    count: int = 1
+
+
+class PatientTrend(BaseModel):
+    patient_id: str
+    calls: int = 0
+    sentiment: Optional[TrendSeries] = None
+    pain: Optional[TrendSeries] = None
+    flags: Optional[TrendSeries] = None
+    active_alerts: list[str] = Field(default_factory=list)
+    last_call_id: Optional[str] = None
+    updated_at: Optional[str] = None
 
 
 # ---------------------------------------------------------------------------
@@ -0,0 +1,105 @@
+"""Keyset (cursor) pagination for the list endpoints.
+
+A page is ``limit`` rows in a fixed order over one or more sort keys, always
+ending in the primary key so the order is total. The cursor is the last
+row's sort-key values, encoded as an opaque URL-safe string; the next page
+is the rows strictly after it. Unlike OFFSET, each page is a range scan on
+the sort index, and rows inserted while a client pages can't shift or
+repeat what it sees.
+
+List endpoints keep returning a JSON array; the cursor for the next page, if
+there is one, is in the ``X-Next-Cursor`` response header.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+import os
+from datetime import datetime, timezone
+from typing import Any, NamedTuple, Optional, Sequence
+
+from sqlalchemy import Select, and_, or_
+from sqlalchemy.sql import ColumnElement
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+PAGE_DEFAULT_LIMIT = int(os.getenv("PULSECALL_PAGE_DEFAULT_LIMIT", "100"))
+PAGE_MAX_LIMIT = int(os.getenv("PULSECALL_PAGE_MAX_LIMIT", "500"))
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class SortKey(NamedTuple):
+    column: ColumnElement
+    descending: bool = False
+
+
+# ---------------------------------------------------------------------------
+# Cursors
+# ---------------------------------------------------------------------------
+def encode_cursor(values: Sequence[Any]) -> str:
+    encoded = [{"dt": v.isoformat()} if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(encoded, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, keys: Sequence[SortKey]) -> list[Any]:
+    """Sort-key values from `encode_cursor`; ValueError if it isn't one of ours."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise ValueError
+        return [datetime.fromisoformat(v["dt"]) if isinstance(v, dict) else v for v in values]
+    except (ValueError, TypeError, KeyError, json.JSONDecodeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def iso_utc(value: datetime) -> str:
+    """Date-range bound for the ISO-string timestamp columns (naive = UTC)."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).isoformat()
+
+
+def as_utc_bound(value: datetime) -> datetime:
+    """Date-range bound for DateTime columns, which hold UTC."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+# ---------------------------------------------------------------------------
+# Queries
+# ---------------------------------------------------------------------------
+def _after(keys: Sequence[SortKey], values: Sequence[Any]) -> ColumnElement:
+    # (k1 > v1) OR (k1 = v1 AND k2 > v2) OR ... with each comparison flipped
+    # for descending keys, so mixed directions work on every dialect.
+    clauses = []
+    for i, key in enumerate(keys):
+        beyond = key.column < values[i] if key.descending else key.column > values[i]
+        clauses.append(and_(*(keys[j].column == values[j] for j in range(i)), beyond))
+    return or_(*clauses)
+
+
+def paginate(stmt: Select, keys: Sequence[SortKey], cursor: Optional[str], limit: int) -> Select:
+    """Order `stmt` by `keys`, start after `cursor` and fetch one extra row to detect a next page.
+
+    The statement must select every sort-key column (see `page_of`).
+    """
+    if cursor:
+        stmt = stmt.where(_after(keys, decode_cursor(cursor, keys)))
+    order = [key.column.desc() if key.descending else key.column.asc() for key in keys]
+    return stmt.order_by(*order).limit(limit + 1)
+
+
+def page_of(rows: Sequence[Any], keys: Sequence[SortKey], limit: int) -> tuple[list[Any], Optional[str]]:
+    """Trim the look-ahead row; return (rows, next cursor or None).
+
+    Rows are Core result rows or ORM objects; either way each sort key is read
+    as the attribute named by its column's key (or label).
+    """
+    if len(rows) <= limit:
+        return list(rows), None
+    rows = list(rows[:limit])
+    return rows, encode_cursor([getattr(rows[-1], key.column.key) for key in keys])
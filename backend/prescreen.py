@@ -0,0 +1,269 @@
+"""Local pre-screen that decides how much LLM analysis a transcript needs.
+
+Every speech-detected call used to go to the full analysis model, including
+"I'm fine, thanks, bye" check-ins. Before `process_transcript` runs, the
+patient's side of the transcript is screened locally with:
+
+- the keyword automaton (distress keywords plus the campaign's escalation keywords),
+- the negative sentiment markers `fallback_sentiment` also uses, plus negated
+  wellbeing ("not doing well", "don't feel good"),
+- the patient's word count,
+- TF-IDF similarity (NumPy) to small sets of concerning and routine exemplar replies,
+- how many of the patient's content words the routine exemplars know.
+
+Short, clearly routine calls get a locally generated summary; longer calls
+that still look routine go to a cheaper model; anything concerning or
+ambiguous still gets full analysis. Words the exemplars don't know drop out
+of the TF-IDF vectors, so "good thanks, my ankle is purple and numb" scores as
+routine; a call only counts as routine when most of its content words are
+routine vocabulary and it is clearly closer to the routine exemplars. `prescreen_stats` counts the LLM calls
+and the seconds of LLM time this saves.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import threading
+from collections import Counter
+from typing import Any, Optional
+
+import numpy as np
+
+from keywords import compile_keywords
+from models import PrescreenResult
+from triage import DISTRESS_KEYWORDS
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+PRESCREEN_ENABLED = os.getenv("PULSECALL_PRESCREEN", "true").lower() in ("1", "true", "yes")
+PRESCREEN_CHEAP_MODEL = os.getenv("PULSECALL_PRESCREEN_CHEAP_MODEL", "openai/gpt-4o-mini")  # "" = no cheap tier
+PRESCREEN_LOCAL_MAX_WORDS = int(os.getenv("PULSECALL_PRESCREEN_LOCAL_MAX_WORDS", "40"))
+PRESCREEN_CHEAP_MAX_WORDS = int(os.getenv("PULSECALL_PRESCREEN_CHEAP_MAX_WORDS", "250"))
+PRESCREEN_CONCERN_MAX = 0.35        # similarity to a concerning exemplar at/above this → full analysis
+PRESCREEN_ROUTINE_MIN = 0.3         # routine similarity needed for local / cheap analysis
+PRESCREEN_ROUTINE_MARGIN = 1.5      # ... and routine must be at least this many times concern
+PRESCREEN_COVERAGE_MIN = 0.6        # ... and this share of content words in the routine vocabulary
+FULL_ANALYSIS_SEC_ESTIMATE = 6.0    # assumed full-analysis latency until one has been measured
+LATENCY_SMOOTHING = 0.2             # EWMA weight of each measured LLM latency
+
+NEGATIVE_MARKERS = ("angry", "upset", "cancel", "frustrated", "bad", "hate")
+POSITIVE_MARKERS = ("thank", "great")
+
+# "not / no / never / -n't", up to two filler words, then a wellbeing word:
+# "not good", "I'm not doing too well", "don't feel fine". Idioms that negate
+# into a positive ("never been better") are removed before matching.
+_NEGATED_WELLBEING = re.compile(
+    r"\b(?:not|no|never|\w+n't)"
+    r"(?:\s+(?:feeling|feel|felt|doing|do|been|be|getting|going|so|too|very|that|really|all|quite|as))?"
+    r"(?:\s+(?:feeling|feel|felt|doing|do|been|be|getting|going|so|too|very|that|really|all|quite|as))?"
+    r"\s+(?:well|good|great|fine|better|okay|ok|alright)\b"
+)
+_POSITIVE_IDIOMS = re.compile(r"\b(?:never (?:been|felt) better|(?:couldn't|could not|can't) (?:be|feel) better)\b")
+
+# Exemplar patient replies the TF-IDF screen compares against.
+CONCERN_EXEMPLARS = (
+    "the pain is getting worse and I can't sleep",
+    "my leg is swollen red and hot to the touch",
+    "I have a fever and chills",
+    "the wound is leaking and it smells",
+    "I feel dizzy and short of breath",
+    "I stopped taking my medication",
+    "I'm scared something is wrong",
+    "I can't walk or put any weight on it",
+    "I feel confused and very tired all the time",
+    "there is blood on the bandage",
+    "my chest feels tight",
+    "I feel sick and I threw up",
+    "I'm worried it's not healing",
+    "I don't feel well at all",
+)
+ROUTINE_EXEMPLARS = (
+    "I'm fine thanks",
+    "doing well today thank you",
+    "everything is good no problems",
+    "yes I did my exercises",
+    "I'm taking my medication as prescribed",
+    "feeling better every day",
+    "no questions thanks bye",
+    "all good see you next week",
+    "yes that's right",
+    "okay sounds good",
+    "the swelling is going down",
+    "I'm walking a bit more each day",
+    "I walked around the house and did my exercises",
+    "my therapist showed me some new stretches",
+)
+
+# Function words left out of the routine-vocabulary coverage check.
+STOPWORDS = frozenset((
+    "i", "i'm", "i've", "me", "my", "you", "your", "we", "it", "it's", "a", "an", "the", "and", "or", "but",
+    "is", "am", "are", "was", "were", "be", "been", "have", "has", "had", "to", "of", "in", "on", "at",
+    "for", "with", "so", "just", "that", "this", "some", "oh", "um", "uh",
+))
+
+_TOKEN = re.compile(r"[a-z']+")
+
+
+# ---------------------------------------------------------------------------
+# TF-IDF screen
+# ---------------------------------------------------------------------------
+def _tokens(text: str) -> list[str]:
+    return _TOKEN.findall(text.lower())
+
+
+def negated_wellbeing(lowered: str) -> list[str]:
+    """Phrases like "not doing well" in lower-cased patient text."""
+    lowered = _POSITIVE_IDIOMS.sub(" ", lowered.replace("\u2019", "'"))
+    return [m.group(0) for m in _NEGATED_WELLBEING.finditer(lowered)]
+
+
+class TfidfScreen:
+    """Nearest-exemplar cosine similarity over a TF-IDF space built from the exemplars."""
+
+    def __init__(self, concerning: tuple[str, ...], routine: tuple[str, ...]) -> None:
+        docs = [_tokens(t) for t in concerning + routine]
+        self.vocab = {tok: i for i, tok in enumerate(sorted({tok for doc in docs for tok in doc}))}
+        counts = np.stack([self._counts(doc) for doc in docs])
+        df = np.count_nonzero(counts, axis=0)
+        self.idf = np.log((1 + len(docs)) / (1 + df)) + 1.0
+        matrix = self._normalize(counts * self.idf)
+        self.concerning = matrix[: len(concerning)]
+        self.routine = matrix[len(concerning):]
+
+    def _counts(self, tokens: list[str]) -> np.ndarray:
+        vec = np.zeros(len(self.vocab))
+        idx = [self.vocab[t] for t in tokens if t in self.vocab]
+        np.add.at(vec, idx, 1.0)
+        return vec
+
+    @staticmethod
+    def _normalize(m: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(m, axis=-1, keepdims=True)
+        return np.divide(m, norms, out=np.zeros_like(m), where=norms > 0)
+
+    def score(self, text: str) -> tuple[float, float]:
+        """(concerning, routine) similarity in [0, 1]; both 0 if no known words."""
+        vec = self._normalize(self._counts(_tokens(text)) * self.idf)
+        return float((self.concerning @ vec).max()), float((self.routine @ vec).max())
+
+
+_tfidf = TfidfScreen(CONCERN_EXEMPLARS, ROUTINE_EXEMPLARS)
+_ROUTINE_VOCAB = frozenset(tok for text in ROUTINE_EXEMPLARS for tok in _tokens(text))
+
+
+def routine_coverage(text: str) -> float:
+    """Share of the content words in `text` that the routine exemplars use; 0 if none."""
+    content = [tok for tok in _tokens(text) if tok not in STOPWORDS]
+    if not content:
+        return 0.0
+    return sum(tok in _ROUTINE_VOCAB for tok in content) / len(content)
+_DISTRESS_AUTOMATON = compile_keywords(tuple(sorted(DISTRESS_KEYWORDS)))
+
+
+# ---------------------------------------------------------------------------
+# Pre-screen
+# ---------------------------------------------------------------------------
+def prescreen_transcript(history: list[dict[str, str]], escalation_keywords: list[str]) -> PrescreenResult:
+    """Decide whether a transcript needs local, cheap-model or full analysis."""
+    patient = [t["content"] for t in history if t.get("role") == "user"]
+    text = " ".join(patient)
+    words = len(text.split())
+    concern, routine = _tfidf.score(text)
+    coverage = routine_coverage(text)
+    hits = {hit.keyword for hit in _DISTRESS_AUTOMATON.scan_segments(patient)}
+    if escalation_keywords:
+        hits |= {hit.keyword for hit in compile_keywords(tuple(escalation_keywords)).scan_segments(patient)}
+    lowered = text.lower()
+    markers = [m for m in NEGATIVE_MARKERS if m in lowered] + negated_wellbeing(lowered)
+
+    def result(route: str, reason: str) -> PrescreenResult:
+        return PrescreenResult(
+            route=route,
+            reason=reason,
+            user_words=words,
+            concern_score=round(concern, 3),
+            routine_score=round(routine, 3),
+            routine_coverage=round(coverage, 3),
+            keyword_hits=sorted(hits),
+            negative_markers=markers,
+        )
+
+    if not PRESCREEN_ENABLED:
+        return result("full", "Pre-screen disabled")
+    if hits:
+        return result("full", f"Keywords: {', '.join(sorted(hits))}")
+    if markers:
+        return result("full", f"Negative sentiment markers: {', '.join(markers)}")
+    if not patient or words == 0:
+        return result("full", "No patient speech to screen")
+    if concern >= PRESCREEN_CONCERN_MAX or routine < PRESCREEN_ROUTINE_MIN or routine < PRESCREEN_ROUTINE_MARGIN * concern:
+        return result("full", f"Ambiguous or concerning content (concern={concern:.2f}, routine={routine:.2f})")
+    if coverage < PRESCREEN_COVERAGE_MIN:
+        return result("full", f"Unfamiliar wording ({coverage:.0%} routine vocabulary)")
+    if words <= PRESCREEN_LOCAL_MAX_WORDS:
+        return result("local", f"Short routine call ({words} patient words)")
+    if PRESCREEN_CHEAP_MODEL and words <= PRESCREEN_CHEAP_MAX_WORDS:
+        return result("cheap", f"Routine call ({words} patient words)")
+    return result("full", f"Long call ({words} patient words)")
+
+
+def local_analysis(history: list[dict[str, str]]) -> dict[str, Any]:
+    """`process_transcript`-shaped result for a call the pre-screen found routine."""
+    patient = [t["content"] for t in history if t.get("role") == "user"]
+    lowered = " ".join(patient).lower()
+    quote = " / ".join(patient)
+    if len(quote) > 160:
+        quote = quote[:157] + "..."
+    return {
+        "summary": f"Routine check-in with no concerns raised (local pre-screen). Patient: \"{quote}\"",
+        "sentiment_score": 4 if any(m in lowered for m in POSITIVE_MARKERS) and not negated_wellbeing(lowered) else 3,
+        "detected_flags": [],
+        "recommended_action": "No escalation required. Follow up in normal workflow.",
+    }
+
+
+# ---------------------------------------------------------------------------
+# Savings counters
+# ---------------------------------------------------------------------------
+class PrescreenStats:
+    """Routes taken, LLM calls avoided and LLM seconds saved (thread-safe)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.routes: Counter[str] = Counter()
+        self.llm_calls_saved = 0
+        self.seconds_saved = 0.0
+        self._latency: dict[str, Optional[float]] = {"full": None, "cheap": None}
+
+    def observe_llm(self, route: str, seconds: float) -> None:
+        """Record how long a cheap or full analysis took."""
+        with self._lock:
+            prev = self._latency[route]
+            self._latency[route] = seconds if prev is None else prev + LATENCY_SMOOTHING * (seconds - prev)
+
+    def record(self, route: str) -> None:
+        with self._lock:
+            self.routes[route] += 1
+            full = self._latency["full"] if self._latency["full"] is not None else FULL_ANALYSIS_SEC_ESTIMATE
+            if route == "local":
+                self.llm_calls_saved += 1
+                self.seconds_saved += full
+            elif route == "cheap" and self._latency["cheap"] is not None:
+                self.seconds_saved += max(0.0, full - self._latency["cheap"])
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "screened": sum(self.routes.values()),
+                "routes": {r: self.routes[r] for r in ("local", "cheap", "full")},
+                "llm_calls_saved": self.llm_calls_saved,
+                "full_model_calls_saved": self.routes["local"] + self.routes["cheap"],
+                "seconds_saved": round(self.seconds_saved, 3),
+                "avg_full_analysis_sec": self._latency["full"],
+                "avg_cheap_analysis_sec": self._latency["cheap"],
+            }
+
+
+prescreen_stats = PrescreenStats()
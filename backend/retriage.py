@@ -0,0 +1,258 @@
+"""Re-triage stored calls against the current triage rules.
+
+After tuning the triage rule table (triage_rules.py), run this to see how calls
+already in `call_history` would be classified now, each under its campaign's
+rule overrides. Rows are streamed in
+keyset-paginated chunks (ordered by id), so memory stays bounded however long
+the history is; chunks can be fanned out to worker processes. Every call whose classification
+or escalation decision changes is written to a JSONL diff report.
+
+Progress is checkpointed after each chunk, so an interrupted run picks up
+where it stopped with ``--resume``. With ``--apply`` the new classification
+and reason are written back; call state is left alone, so calls that would now
+(or no longer) escalate are only reported for an operator to review.
+
+Usage:
+    python retriage.py                           # dry run → retriage_report.jsonl
+    python retriage.py --apply                   # also write results back
+    python retriage.py --resume                  # continue an interrupted run
+    python retriage.py --workers 4 --chunk-size 1000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional
+
+from sqlalchemy.orm import Session
+
+import database
+import rollups  # registers the flush hook that keeps analytics rollups in step with call writes
+from database import CallRecord, CallTranscript, decompress_text
+from models import CallState, RetriageProgress
+from triage import analyze_vitals, payload_from_triage_input
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+RETRIAGE_CHUNK_SIZE = int(os.getenv("PULSECALL_RETRIAGE_CHUNK_SIZE", "500"))
+RETRIAGE_WORKERS = int(os.getenv("PULSECALL_RETRIAGE_WORKERS", "1"))
+DEFAULT_REPORT_PATH = "retriage_report.jsonl"
+
+# (id, user_id, compressed triage_input, triage_classification, state, campaign_id)
+Row = tuple[str, str, bytes, Optional[str], CallState, Optional[str]]
+
+
+# ---------------------------------------------------------------------------
+# Streaming reads
+# ---------------------------------------------------------------------------
+def iter_chunks(
+    session_factory: Callable[[], Session],
+    after_id: Optional[str] = None,
+    chunk_size: int = RETRIAGE_CHUNK_SIZE,
+) -> Iterator[list[Row]]:
+    """Yield calls with stored triage input, ``chunk_size`` rows at a time.
+
+    Uses keyset pagination on the primary key (``id > last seen``) rather than
+    OFFSET, so each page is an index range scan and rows inserted mid-run
+    can't shift pages.
+    """
+    while True:
+        db = session_factory()
+        try:
+            query = db.query(
+                CallRecord.id,
+                CallRecord.user_id,
+                CallTranscript.triage_input,
+                CallRecord.triage_classification,
+                CallRecord.state,
+                CallRecord.campaign_id,
+            ).join(CallTranscript).filter(CallTranscript.triage_input.isnot(None))
+            if after_id is not None:
+                query = query.filter(CallRecord.id > after_id)
+            rows = [tuple(r) for r in query.order_by(CallRecord.id).limit(chunk_size).all()]
+        finally:
+            db.close()
+        if not rows:
+            return
+        yield rows
+        after_id = rows[-1][0]
+
+
+# ---------------------------------------------------------------------------
+# Re-triage (runs in worker processes — no DB access here)
+# ---------------------------------------------------------------------------
+def retriage_rows(rows: list[Row]) -> list[dict[str, Any]]:
+    """Re-run triage over a chunk; return one outcome per row."""
+    outcomes = []
+    for call_id, user_id, raw, old_classification, state, campaign_id in rows:
+        outcome: dict[str, Any] = {
+            "call_id": call_id,
+            "user_id": user_id,
+            "old_classification": old_classification,
+            "old_escalate": state == CallState.ESCALATED,
+        }
+        try:
+            result = analyze_vitals(payload_from_triage_input(call_id, user_id, decompress_text(raw), campaign_id))
+        except (ValueError, TypeError) as exc:
+            outcome["error"] = str(exc)
+            outcomes.append(outcome)
+            continue
+        outcome.update(
+            new_classification=result.classification.value,
+            new_escalate=result.escalate,
+            new_reason=result.reason,
+        )
+        outcome["changed"] = (
+            outcome["new_classification"] != old_classification
+            or outcome["new_escalate"] != outcome["old_escalate"]
+        )
+        outcomes.append(outcome)
+    return outcomes
+
+
+# ---------------------------------------------------------------------------
+# Report / apply / checkpoint
+# ---------------------------------------------------------------------------
+def _record(progress: RetriageProgress, outcomes: list[dict[str, Any]], report) -> list[dict[str, Any]]:
+    changed = []
+    for outcome in outcomes:
+        progress.scanned += 1
+        if "error" in outcome:
+            progress.errors += 1
+            logger.warning("Re-triage skipped call %s: %s", outcome["call_id"], outcome["error"])
+            continue
+        if not outcome["changed"]:
+            continue
+        progress.changed += 1
+        if outcome["new_escalate"] and not outcome["old_escalate"]:
+            progress.escalations_added += 1
+        elif outcome["old_escalate"] and not outcome["new_escalate"]:
+            progress.escalations_cleared += 1
+        key = f"{outcome['old_classification']}->{outcome['new_classification']}"
+        progress.transitions[key] = progress.transitions.get(key, 0) + 1
+        report.write(json.dumps({k: v for k, v in outcome.items() if k != "changed"}) + "\n")
+        changed.append(outcome)
+    report.flush()
+    return changed
+
+
+def _apply(session_factory: Callable[[], Session], changed: list[dict[str, Any]]) -> int:
+    if not changed:
+        return 0
+    db = session_factory()
+    try:
+        # Loaded and set through the ORM (not a bulk UPDATE) so the flush hook
+        # moves each call to its new classification in the analytics rollups.
+        outcomes = {outcome["call_id"]: outcome for outcome in changed}
+        for call in db.query(CallRecord).filter(CallRecord.id.in_(list(outcomes))):
+            call.triage_classification = outcomes[call.id]["new_classification"]
+            call.triage_reason = outcomes[call.id]["new_reason"]
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    return len(changed)
+
+
+def _save_checkpoint(path: Path, progress: RetriageProgress) -> None:
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(progress.model_dump_json())
+    os.replace(tmp, path)
+
+
+def _load_checkpoint(path: Path) -> RetriageProgress:
+    if not path.exists():
+        return RetriageProgress()
+    return RetriageProgress.model_validate_json(path.read_text())
+
+
+# ---------------------------------------------------------------------------
+# Job
+# ---------------------------------------------------------------------------
+def run_retriage(
+    report_path: str | Path = DEFAULT_REPORT_PATH,
+    apply: bool = False,
+    resume: bool = False,
+    workers: int = RETRIAGE_WORKERS,
+    chunk_size: int = RETRIAGE_CHUNK_SIZE,
+    checkpoint_path: str | Path | None = None,
+    session_factory: Optional[Callable[[], Session]] = None,
+) -> RetriageProgress:
+    """Re-triage every stored call and write the diff report.
+
+    Chunks are consumed in id order even when workers finish out of order, so
+    the checkpoint's ``last_id`` always marks a fully reported (and applied)
+    prefix of the table.
+    """
+    session_factory = session_factory or database.SessionLocal
+    report_path = Path(report_path)
+    checkpoint_path = Path(checkpoint_path) if checkpoint_path else report_path.with_suffix(".checkpoint.json")
+
+    progress = _load_checkpoint(checkpoint_path) if resume else RetriageProgress()
+    if progress.done:
+        logger.info("Re-triage already complete (%d calls scanned) — nothing to resume", progress.scanned)
+        return progress
+
+    def consume(outcomes: list[dict[str, Any]], last_id: str) -> None:
+        changed = _record(progress, outcomes, report)
+        if apply:
+            progress.applied += _apply(session_factory, changed)
+        progress.last_id = last_id
+        _save_checkpoint(checkpoint_path, progress)
+
+    chunks = iter_chunks(session_factory, progress.last_id, chunk_size)
+    with report_path.open("a" if resume else "w") as report:
+        if workers <= 1:
+            for rows in chunks:
+                consume(retriage_rows(rows), rows[-1][0])
+        else:
+            # Bound in-flight chunks so a huge history never sits in memory.
+            pending: deque[tuple[Future, str]] = deque()
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for rows in chunks:
+                    pending.append((pool.submit(retriage_rows, rows), rows[-1][0]))
+                    if len(pending) >= workers * 2:
+                        future, last_id = pending.popleft()
+                        consume(future.result(), last_id)
+                while pending:
+                    future, last_id = pending.popleft()
+                    consume(future.result(), last_id)
+
+    progress.done = True
+    _save_checkpoint(checkpoint_path, progress)
+    logger.info(
+        "Re-triage finished: scanned=%d changed=%d escalations +%d/-%d errors=%d applied=%d",
+        progress.scanned, progress.changed, progress.escalations_added,
+        progress.escalations_cleared, progress.errors, progress.applied,
+    )
+    return progress
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Re-triage stored calls with the current triage rules")
+    parser.add_argument("--report", default=DEFAULT_REPORT_PATH, help="JSONL diff report path")
+    parser.add_argument("--apply", action="store_true", help="Write new classifications back to call_history")
+    parser.add_argument("--resume", action="store_true", help="Continue from the last checkpoint")
+    parser.add_argument("--workers", type=int, default=RETRIAGE_WORKERS, help="Worker processes (1 = in-process)")
+    parser.add_argument("--chunk-size", type=int, default=RETRIAGE_CHUNK_SIZE, help="Rows per keyset page")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    database.init_db()
+    progress = run_retriage(args.report, apply=args.apply, resume=args.resume, workers=args.workers, chunk_size=args.chunk_size)
+    print(progress.model_dump_json(indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+"""Per-campaign, per-day call analytics, kept current as calls change.
+
+`call_rollups` holds running totals for each (campaign, UTC day): calls
+placed, completed, escalated and rescheduled for a retry, plus summed
+sentiment. `call_triage_rollups` holds the triage classification mix.
+`/analytics` sums these rows, so its cost grows with the days and campaigns
+asked for, not with the number of calls.
+
+Totals are adjusted in the same transaction that writes the call:
+
+- `call_history` rows (outbound calls written by webhooks, the scheduler
+  and re-triage) through a `before_flush` hook on `database.AppSession`.
+  The stored contribution of each new, changed or deleted call is
+  subtracted and its new one added.
+- Ended campaign conversations (`end_call`) through the write hook of the
+  entity store's `calls` bucket.
+
+A call counts on the day it was placed: `created_at`, or `started_at` for
+campaign calls. A webhook that arrives after midnight therefore updates the
+right day. Archiving (archive.py) leaves the totals alone. Writes that bypass
+both hooks, such as hand-run SQL or a restore, are repaired by a rebuild,
+which recomputes everything from call_history, campaign_calls and the archive
+files.
+
+Usage:
+    python rollups.py --rebuild
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+from collections import Counter, defaultdict
+from datetime import date, datetime, timezone
+from typing import Any, Iterable, Literal, Mapping, NamedTuple, Optional
+
+from sqlalchemy import delete, event, func, inspect, select, text
+
+import archive
+import database
+from database import AppSession, CallRecord, CallRollup, CallTriageRollup, CampaignCallRecord, as_utc
+from models import AnalyticsBucket, AnalyticsReport, CallState, RollupRebuildResult
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = ("calls", "completed", "escalated", "retried", "sentiment_total", "sentiment_calls")
+RETRY_STATES = (CallState.BUSY_RETRY, CallState.SILENT_RETRY)
+# call_history columns a call's contribution depends on.
+TRACKED_COLUMNS = ("campaign_id", "created_at", "state", "sentiment_score", "triage_classification")
+REBUILD_CHUNK_ROWS = 1000
+
+GroupBy = Literal["campaign_day", "day", "campaign"]
+
+_rollups = CallRollup.__table__
+_triage = CallTriageRollup.__table__
+_calls = CallRecord.__table__
+_campaign_calls = CampaignCallRecord.__table__
+
+
+class Contribution(NamedTuple):
+    """What one call adds to its (campaign, day) bucket."""
+    campaign_id: str
+    day: str
+    counts: tuple[int, ...]  # in COUNTERS order
+    classification: Optional[str]
+
+
+def _day(value: Any) -> str:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return as_utc(value).strftime("%Y-%m-%d")
+
+
+def _contribution(
+    campaign_id: Optional[str],
+    placed_at: Any,
+    state: Any,
+    sentiment_score: Optional[int],
+    classification: Optional[str],
+) -> Contribution:
+    state = CallState(state or CallState.PENDING)
+    return Contribution(
+        campaign_id or "",
+        _day(placed_at),
+        (
+            1,
+            int(state == CallState.COMPLETED),
+            int(state == CallState.ESCALATED),
+            int(state in RETRY_STATES),  # a rescheduled attempt stays in its retry state
+            sentiment_score or 0,
+            int(sentiment_score is not None),
+        ),
+        classification,
+    )
+
+
+def history_contribution(values: Mapping[str, Any]) -> Contribution:
+    """Contribution of a call_history row, or an archived copy of one."""
+    return _contribution(*(values[name] for name in TRACKED_COLUMNS))
+
+
+def campaign_call_contribution(doc: Mapping[str, Any]) -> Contribution:
+    """Contribution of an ended campaign conversation (a `calls` bucket document)."""
+    return _contribution(
+        doc.get("campaign_id"),
+        doc.get("started_at") or doc.get("ended_at"),
+        CallState.ESCALATED if doc.get("escalation_id") else CallState.COMPLETED,
+        doc.get("sentiment_score"),
+        None,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Applying changes
+# ---------------------------------------------------------------------------
+class RollupDelta:
+    """Net change to the rollup rows from a set of call writes."""
+
+    def __init__(self) -> None:
+        self.buckets: dict[tuple[str, str], list[int]] = defaultdict(lambda: [0] * len(COUNTERS))
+        self.triage: Counter[tuple[str, str, str]] = Counter()
+
+    def add(self, contribution: Optional[Contribution], sign: int = 1) -> None:
+        if contribution is None:
+            return
+        totals = self.buckets[(contribution.campaign_id, contribution.day)]
+        for i, count in enumerate(contribution.counts):
+            totals[i] += sign * count
+        if contribution.classification:
+            self.triage[(contribution.campaign_id, contribution.day, contribution.classification)] += sign
+
+    def write(self, conn) -> None:
+        # Sorted, so concurrent transactions lock bucket rows in the same order.
+        rows = [
+            {"campaign_id": campaign_id, "day": day, **dict(zip(COUNTERS, totals))}
+            for (campaign_id, day), totals in sorted(self.buckets.items())
+            if any(totals)
+        ]
+        if rows:
+            conn.execute(_increment(_rollups, COUNTERS), rows)
+        triage = [
+            {"campaign_id": campaign_id, "day": day, "classification": classification, "calls": calls}
+            for (campaign_id, day, classification), calls in sorted(self.triage.items())
+            if calls
+        ]
+        if triage:
+            conn.execute(_increment(_triage, ("calls",)), triage)
+
+
+def _increment(table, counters: Iterable[str]):
+    stmt = database.conflict_insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=list(table.primary_key.columns),
+        set_={name: table.c[name] + stmt.excluded[name] for name in counters},
+    )
+
+
+def apply_changes(conn, changes: Iterable[tuple[Optional[Contribution], Optional[Contribution]]]) -> None:
+    """Replace each (old, new) contribution pair in the rollups; None is no call."""
+    delta = RollupDelta()
+    for old, new in changes:
+        delta.add(old, -1)
+        delta.add(new)
+    delta.write(conn)
+
+
+def campaign_calls_written(conn, changes: list[tuple[str, Optional[dict[str, Any]], Optional[dict[str, Any]]]]) -> None:
+    """Write hook of the entity store's `calls` bucket: (key, stored, new) document triples."""
+    apply_changes(conn, [
+        (old and campaign_call_contribution(old), new and campaign_call_contribution(new)) for _, old, new in changes
+    ])
+
+
+def _tracked_change(call: CallRecord) -> bool:
+    attrs = inspect(call).attrs
+    return any(attrs[name].history.has_changes() for name in TRACKED_COLUMNS)
+
+
+@event.listens_for(AppSession, "before_flush")
+def _track_call_writes(session, flush_context, instances) -> None:
+    new = [obj for obj in session.new if isinstance(obj, CallRecord)]
+    changed = [obj for obj in session.dirty if isinstance(obj, CallRecord) and _tracked_change(obj)]
+    deleted = [obj for obj in session.deleted if isinstance(obj, CallRecord)]
+    if not (new or changed or deleted):
+        return
+    conn = session.connection()
+    stored: dict[str, Contribution] = {}
+    ids = [obj.id for obj in changed + deleted]
+    if ids:
+        # Read the old values back rather than trusting attribute history, which
+        # is empty for attributes that were expired when they were set.
+        rows = conn.execute(select(_calls.c.id, *(_calls.c[name] for name in TRACKED_COLUMNS)).where(_calls.c.id.in_(ids)))
+        stored = {row.id: history_contribution(row._mapping) for row in rows}
+    changes: list[tuple[Optional[Contribution], Optional[Contribution]]] = []
+    for obj in new:
+        if obj.created_at is None:
+            obj.created_at = datetime.now(timezone.utc)  # fix the day now, not at INSERT
+        changes.append((None, history_contribution(_values(obj))))
+    changes.extend((stored.get(obj.id), history_contribution(_values(obj))) for obj in changed)
+    changes.extend((stored.get(obj.id), None) for obj in deleted)
+    apply_changes(conn, changes)
+
+
+def _values(call: CallRecord) -> dict[str, Any]:
+    return {name: getattr(call, name) for name in TRACKED_COLUMNS}
+
+
+# ---------------------------------------------------------------------------
+# Rebuild
+# ---------------------------------------------------------------------------
+def _chunks(conn, stmt, key):
+    after = None
+    while True:
+        page = stmt if after is None else stmt.where(key > after)
+        rows = conn.execute(page.order_by(key).limit(REBUILD_CHUNK_ROWS)).all()
+        if not rows:
+            return
+        yield rows
+        after = rows[-1].id
+
+
+def _archived(conn) -> Iterable[list[dict[str, Any]]]:
+    """Archived calls, a chunk at a time, without repeats or copies still in the database."""
+    for month in archive.archived_months():
+        seen: set[str] = set()  # a call is only ever archived into its own month's file
+        chunk: list[dict[str, Any]] = []
+        docs = iter(archive.iter_month(month))
+        while True:
+            doc = next(docs, None)
+            if doc is not None and doc["id"] not in seen:
+                seen.add(doc["id"])
+                chunk.append(doc)
+            if chunk and (doc is None or len(chunk) >= REBUILD_CHUNK_ROWS):
+                live = set(conn.execute(select(_calls.c.id).where(_calls.c.id.in_([d["id"] for d in chunk]))).scalars())
+                yield [d for d in chunk if d["id"] not in live]
+                chunk = []
+            if doc is None:
+                break
+
+
+def rebuild_rollups(conn=None) -> RollupRebuildResult:
+    """Recompute every rollup from call_history, campaign_calls and the archive files."""
+    if conn is None:
+        with database.engine.begin() as conn:
+            return rebuild_rollups(conn)
+    if conn.dialect.name == "postgresql":
+        # Writers wait (their hook updates these tables) rather than land between the scan and the swap.
+        conn.execute(text("LOCK TABLE call_rollups, call_triage_rollups IN EXCLUSIVE MODE"))
+    conn.execute(delete(_rollups))
+    conn.execute(delete(_triage))
+    delta, result = RollupDelta(), RollupRebuildResult()
+    history = select(_calls.c.id, *(_calls.c[name] for name in TRACKED_COLUMNS))
+    for rows in _chunks(conn, history, _calls.c.id):
+        for row in rows:
+            delta.add(history_contribution(row._mapping))
+        result.calls += len(rows)
+    for rows in _chunks(conn, select(_campaign_calls.c.id, _campaign_calls.c.data), _campaign_calls.c.id):
+        for row in rows:
+            delta.add(campaign_call_contribution(json.loads(row.data)))
+        result.campaign_calls += len(rows)
+    for docs in _archived(conn):
+        for doc in docs:
+            delta.add(history_contribution(doc))
+        result.archived_calls += len(docs)
+    delta.write(conn)
+    result.buckets = sum(1 for totals in delta.buckets.values() if any(totals))
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+def _bucket(campaign_id: Optional[str], day: Optional[str], sums: Mapping[str, int], triage: dict[str, int]) -> AnalyticsBucket:
+    calls = sums.get("calls", 0)
+    sentiment_calls = sums.get("sentiment_calls", 0)
+    return AnalyticsBucket(
+        campaign_id=campaign_id or None,
+        day=day,
+        calls=calls,
+        completed=sums.get("completed", 0),
+        escalated=sums.get("escalated", 0),
+        retried=sums.get("retried", 0),
+        escalation_rate=round(sums.get("escalated", 0) / calls, 4) if calls else 0.0,
+        avg_sentiment=round(sums.get("sentiment_total", 0) / sentiment_calls, 2) if sentiment_calls else None,
+        triage=triage,
+    )
+
+
+async def query_analytics(
+    campaign_id: Optional[str] = None,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    group_by: GroupBy = "campaign_day",
+) -> AnalyticsReport:
+    """Sum the rollups between `since` (inclusive) and `until` (exclusive), grouped as asked."""
+    def grouped(table, *measures):
+        keys = {"campaign_day": (table.c.campaign_id, table.c.day), "day": (table.c.day,), "campaign": (table.c.campaign_id,)}[group_by]
+        stmt = select(*keys, *measures).group_by(*keys).order_by(*keys)
+        if campaign_id is not None:
+            stmt = stmt.where(table.c.campaign_id == campaign_id)
+        if since is not None:
+            stmt = stmt.where(table.c.day >= since.isoformat())
+        if until is not None:
+            stmt = stmt.where(table.c.day < until.isoformat())
+        return stmt
+
+    def key_of(row) -> tuple[Optional[str], Optional[str]]:
+        mapping = row._mapping
+        return mapping.get("campaign_id"), mapping.get("day")
+
+    async with database.async_engine.connect() as conn:
+        sums = (await conn.execute(grouped(_rollups, *(func.sum(_rollups.c[name]).label(name) for name in COUNTERS)))).all()
+        mix = (await conn.execute(grouped(_triage, _triage.c.classification, func.sum(_triage.c.calls).label("calls"))
+                                  .group_by(_triage.c.classification))).all()
+    triage: dict[tuple[Optional[str], Optional[str]], dict[str, int]] = defaultdict(dict)
+    total_triage: Counter[str] = Counter()
+    for row in mix:
+        if row.calls:
+            triage[key_of(row)][row.classification] = int(row.calls)
+            total_triage[row.classification] += int(row.calls)
+    buckets, totals = [], Counter()
+    for row in sums:
+        counts = {name: int(row._mapping[name] or 0) for name in COUNTERS}
+        if not counts["calls"]:
+            continue  # every call in it was deleted
+        totals.update(counts)
+        buckets.append(_bucket(*key_of(row), counts, triage.get(key_of(row), {})))
+    return AnalyticsReport(group_by=group_by, totals=_bucket(campaign_id, None, totals, dict(total_triage)), buckets=buckets)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Per-campaign, per-day call analytics rollups")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute every rollup from call history and the archive")
+    args = parser.parse_args()
+    if not args.rebuild:
+        parser.error("nothing to do; pass --rebuild")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    database.init_db()
+    print(rebuild_rollups().model_dump_json(indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
 import os
@@ -13,8 +14,12 @@ from uuid import uuid4
 import httpx
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from dotenv import load_dotenv
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import CallRecord, SessionLocal, UserRecord, init_db
+import archive
+import rollups  # registers the flush hook that keeps analytics rollups in step with call writes
+from database import AsyncSessionLocal, CallRecord, UserRecord, as_utc, init_db
 from models import CallState, OutboundCallRequest
 
 # Set .env file path based on current file location
@@ -94,96 +99,121 @@ async def place_outbound_call(request: OutboundCallRequest) -> Optional[str]:
 # ---------------------------------------------------------------------------
 async def process_pending_calls() -> None:
     """Check for users due for a call and place outbound calls."""
-    db = SessionLocal()
-    try:
-        now = datetime.now(timezone.utc)
-
-        # Find users who need a call: either no call record, or retry is due
-        users = db.query(UserRecord).all()
-
-        for user in users:
-            # Get the latest call record for this user
-            latest_call = (
-                db.query(CallRecord)
-                .filter(CallRecord.user_id == user.id)
-                .order_by(CallRecord.created_at.desc())
-                .first()
-            )
+    async with AsyncSessionLocal() as db:
+        try:
+            await _process_pending_calls(db)
+        except Exception:
+            logger.exception("Error in process_pending_calls")
+            await db.rollback()
 
-            should_call = False
 
-            if latest_call is None:
-                # Never called before
-                should_call = True
-            elif latest_call.state == CallState.COMPLETED:
-                # Completed — check if enough time has passed for next check-in
-                if latest_call.ended_at:
-                    next_due = latest_call.ended_at + timedelta(hours=CHECK_INTERVAL_HOURS)
-                    should_call = now >= next_due
-            elif latest_call.state in (CallState.BUSY_RETRY, CallState.SILENT_RETRY):
-                # Retry scheduled — check if retry time has arrived
-                if latest_call.next_retry_at and now >= latest_call.next_retry_at:
-                    if latest_call.retry_count < latest_call.max_retries:
-                        should_call = True
-                    else:
-                        # Max retries exceeded — escalate
-                        latest_call.state = CallState.ESCALATED
-                        latest_call.escalation_reason = f"Max retries ({latest_call.max_retries}) exceeded"
-                        db.commit()
-                        logger.warning("User %s exceeded max retries — escalated", user.id)
-            elif latest_call.state in (CallState.ESCALATED, CallState.PENDING):
-                # Already escalated or pending — skip
-                pass
-
-            if not should_call:
-                continue
-
-            # Create a new call record
-            call_id = f"call_{uuid4().hex[:10]}"
-            call_record = CallRecord(
-                id=call_id,
-                user_id=user.id,
-                campaign_id=user.campaign_id,
-                state=CallState.PENDING,
-                retry_count=0 if latest_call is None else latest_call.retry_count,
-                max_retries=MAX_RETRIES,
-                started_at=now,
-                created_at=now,
-            )
-            db.add(call_record)
-            db.commit()
-
-            # Place the call
-            request = OutboundCallRequest(
-                user_id=user.id,
-                user_name=user.name,
-                phone_number=user.phone,
-                campaign_id=user.campaign_id,
-                system_prompt=DEFAULT_SYSTEM_PROMPT,
-            )
-            smallest_call_id = await place_outbound_call(request)
+async def _process_pending_calls(db: AsyncSession) -> None:
+    now = datetime.now(timezone.utc)
 
-            if smallest_call_id:
-                call_record.smallest_call_id = smallest_call_id
-                db.commit()
-                logger.info("Call queued: id=%s user=%s smallest_id=%s", call_id, user.id, smallest_call_id)
-            else:
-                call_record.state = CallState.BUSY_RETRY
-                call_record.next_retry_at = now + timedelta(minutes=5)
-                db.commit()
-                logger.warning("Call placement failed for user %s — will retry", user.id)
+    # Find users who need a call: either no call record, or retry is due
+    user_ids = (await db.scalars(select(UserRecord.id))).all()
+    await db.commit()
+
+    for user_id in user_ids:
+        claimed = await _claim_due_call(db, user_id, now)
+        if claimed is None:
+            continue
+        user, call_record = claimed
+
+        # Place the call
+        request = OutboundCallRequest(
+            user_id=user.id,
+            user_name=user.name,
+            phone_number=user.phone,
+            campaign_id=user.campaign_id,
+            system_prompt=DEFAULT_SYSTEM_PROMPT,
+        )
+        smallest_call_id = await place_outbound_call(request)
+
+        if smallest_call_id:
+            call_record.smallest_call_id = smallest_call_id
+            await db.commit()
+            logger.info("Call queued: id=%s user=%s smallest_id=%s", call_record.id, user.id, smallest_call_id)
+        else:
+            call_record.state = CallState.BUSY_RETRY
+            call_record.next_retry_at = now + timedelta(minutes=5)
+            await db.commit()
+            logger.warning("Call placement failed for user %s — will retry", user.id)
+
+
+async def _claim_due_call(
+    db: AsyncSession, user_id: str, now: datetime
+) -> Optional[tuple[UserRecord, CallRecord]]:
+    """Decide whether `user_id` is due and, if so, record a PENDING call for it.
+
+    The user row is locked with FOR UPDATE SKIP LOCKED, so when several
+    scheduler nodes share a PostgreSQL database each user is claimed by one
+    of them; the others skip it rather than wait. The PENDING record is
+    committed before the call is placed, which keeps later runs off the user
+    until the webhook settles the call. (SQLite ignores the lock clause; it
+    only ever has one writer.)
+    """
+    user = await db.scalar(select(UserRecord).where(UserRecord.id == user_id).with_for_update(skip_locked=True))
+    if user is None:
+        await db.commit()  # claimed by another node (or deleted)
+        return None
+
+    # Get the latest call record for this user
+    latest_call = await db.scalar(
+        select(CallRecord)
+        .where(CallRecord.user_id == user.id)
+        .order_by(CallRecord.created_at.desc())
+        .limit(1)
+    )
 
-    except Exception:
-        logger.exception("Error in process_pending_calls")
-        db.rollback()
-    finally:
-        db.close()
+    should_call = False
+
+    if latest_call is None:
+        # Never called before
+        should_call = True
+    elif latest_call.state == CallState.COMPLETED:
+        # Completed — check if enough time has passed for next check-in
+        if latest_call.ended_at:
+            next_due = as_utc(latest_call.ended_at) + timedelta(hours=CHECK_INTERVAL_HOURS)
+            should_call = now >= next_due
+    elif latest_call.state in (CallState.BUSY_RETRY, CallState.SILENT_RETRY):
+        # Retry scheduled — check if retry time has arrived
+        if latest_call.next_retry_at and now >= as_utc(latest_call.next_retry_at):
+            if latest_call.retry_count < latest_call.max_retries:
+                should_call = True
+            else:
+                # Max retries exceeded — escalate
+                latest_call.state = CallState.ESCALATED
+                latest_call.escalation_reason = f"Max retries ({latest_call.max_retries}) exceeded"
+                logger.warning("User %s exceeded max retries — escalated", user.id)
+    elif latest_call.state in (CallState.ESCALATED, CallState.PENDING):
+        # Already escalated or pending — skip
+        pass
+
+    if not should_call:
+        await db.commit()
+        return None
+
+    # Create a new call record
+    call_record = CallRecord(
+        id=f"call_{uuid4().hex[:10]}",
+        user_id=user.id,
+        campaign_id=user.campaign_id,
+        state=CallState.PENDING,
+        retry_count=0 if latest_call is None else latest_call.retry_count,
+        max_retries=MAX_RETRIES,
+        started_at=now,
+        created_at=now,
+    )
+    db.add(call_record)
+    await db.commit()
+    return user, call_record
 
 
 # ---------------------------------------------------------------------------
 # Schedule a retry for a specific call
 # ---------------------------------------------------------------------------
-def schedule_retry(call_record: CallRecord, delay_minutes: int, db) -> None:
+async def schedule_retry(call_record: CallRecord, delay_minutes: int, db: AsyncSession) -> None:
     """Update a call record to schedule a retry after the given delay."""
     now = datetime.now(timezone.utc)
     call_record.retry_count += 1
@@ -197,7 +227,18 @@ def schedule_retry(call_record: CallRecord, delay_minutes: int, db) -> None:
         call_record.state = CallState.SILENT_RETRY if "SILENCE" in (call_record.triage_classification or "") else CallState.BUSY_RETRY
         logger.info("Call %s retry #%d scheduled in %d minutes", call_record.id, call_record.retry_count, delay_minutes)
 
-    db.commit()
+    await db.commit()
+
+
+# ---------------------------------------------------------------------------
+# Call history archival
+# ---------------------------------------------------------------------------
+async def archive_old_calls() -> None:
+    """Move calls past the retention window into the monthly archive files (see archive.py)."""
+    try:
+        await asyncio.to_thread(archive.archive_calls)
+    except Exception:
+        logger.exception("Call history archival failed; will retry on the next run")
 
 
 # ---------------------------------------------------------------------------
@@ -214,6 +255,15 @@ def start_scheduler() -> None:
         replace_existing=True,
         next_run_time=datetime.now(timezone.utc) + timedelta(seconds=10),  # first run shortly after startup
     )
+    if archive.ARCHIVE_RETENTION_DAYS > 0:
+        scheduler.add_job(
+            archive_old_calls,
+            "interval",
+            hours=archive.ARCHIVE_INTERVAL_HOURS,
+            id="pulsecall_archive",
+            replace_existing=True,
+            next_run_time=datetime.now(timezone.utc) + timedelta(minutes=5),
+        )
     scheduler.start()
     logger.info("Scheduler started — check-in interval: %.1f hours", CHECK_INTERVAL_HOURS)
 
@@ -0,0 +1,326 @@
+"""Full-text search over call transcripts, summaries and detected flags.
+
+Every call with text has one `search_documents` row of plain text:
+outbound `call_history` calls (kind "outbound") and ended campaign
+conversations (kind "campaign"). Transcripts are stored compressed, so the
+plain text is captured when the call is written. On SQLite the FTS5 table
+`call_search` indexes these rows. It uses external content, so the text is
+stored once, and triggers keep it in step. On PostgreSQL a GIN index over
+`database.search_vector` does the same job.
+
+Rows are written in the same transaction as the call:
+
+- `call_history` through a `before_flush` hook on `database.AppSession`
+  (webhooks, the scheduler, outbound calls).
+- Campaign calls through the write hook of the entity store's `calls` bucket
+  (`end_call`).
+
+Archived calls (archive.py) leave the index along with the database.
+
+`search_statement` ranks matches with bm25 on SQLite and ts_rank on
+PostgreSQL. Hits in flags weigh most, then summary, then transcript. Each hit
+carries a highlighted snippet: HTML-escaped text with matches wrapped in
+`<mark>` tags, safe to render as HTML. A query is words (all must match, with
+stemming), "quoted phrases" and, on SQLite, word* prefixes.
+
+Usage:
+    python search.py --reindex
+"""
+
+from __future__ import annotations
+
+import argparse
+import html
+import json
+import logging
+import os
+import re
+from datetime import datetime, timezone
+from typing import Any, Iterable, Literal, Optional
+
+from sqlalchemy import Float, Select, cast, column, delete, event, func, inspect, literal_column, select, table
+
+import database
+from database import (
+    SEARCH_FTS_TABLE,
+    SEARCH_LANGUAGE,
+    AppSession,
+    CallRecord,
+    CallTranscript,
+    CampaignCallRecord,
+    SearchDocument,
+    as_utc,
+    decompress_text,
+    search_vector,
+)
+from models import SearchHit, SearchReindexResult
+from pagination import SortKey, iso_utc
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+SEARCH_SNIPPET_TOKENS = int(os.getenv("PULSECALL_SEARCH_SNIPPET_TOKENS", "16"))  # words around the match
+HIGHLIGHT_START, HIGHLIGHT_END = "<mark>", "</mark>"
+# The database highlights with private-use characters; `search_hit` escapes the
+# snippet text and only then turns them into the tags above.
+_MATCH_START, _MATCH_END = "\ue000", "\ue001"
+BM25_WEIGHTS = (1.0, 2.0, 4.0)  # transcript, summary, flags (SQLite)
+HEADLINE_OPTIONS = (
+    f"StartSel={_MATCH_START}, StopSel={_MATCH_END}, "
+    f"MaxWords={SEARCH_SNIPPET_TOKENS}, MinWords={max(SEARCH_SNIPPET_TOKENS // 2, 1)}, MaxFragments=1"
+)
+REINDEX_CHUNK_ROWS = 500
+
+SearchKind = Literal["outbound", "campaign"]
+
+_docs = SearchDocument.__table__
+_calls = CallRecord.__table__
+_transcripts = CallTranscript.__table__
+_campaign_calls = CampaignCallRecord.__table__
+_fts = table(SEARCH_FTS_TABLE, column("rowid"))
+
+# call_history columns that end up in a search document (besides the transcript).
+INDEXED_COLUMNS = ("campaign_id", "user_id", "summary", "detected_flags")
+
+
+# ---------------------------------------------------------------------------
+# Documents
+# ---------------------------------------------------------------------------
+def _flags_text(flags: Optional[list[str]]) -> Optional[str]:
+    return "\n".join(flags) if flags else None
+
+
+def outbound_document(call: Any, transcript: Optional[str]) -> dict[str, Any]:
+    """Search row for a call_history record (ORM object or result row)."""
+    return {
+        "call_id": call.id,
+        "kind": "outbound",
+        "campaign_id": call.campaign_id,
+        "user_id": call.user_id,
+        "placed_at": as_utc(call.created_at).isoformat() if call.created_at else None,
+        "transcript": transcript or None,
+        "summary": call.summary,
+        "flags": _flags_text(call.detected_flags),
+    }
+
+
+def campaign_document(call_id: str, doc: dict[str, Any]) -> dict[str, Any]:
+    """Search row for an ended campaign conversation (a `calls` bucket document)."""
+    transcript = "\n".join(f"{m.get('role')}: {m.get('content')}" for m in doc.get("transcript") or [])
+    return {
+        "call_id": call_id,
+        "kind": "campaign",
+        "campaign_id": doc.get("campaign_id"),
+        "user_id": None,
+        "placed_at": doc.get("started_at") or doc.get("ended_at"),
+        "transcript": transcript or None,
+        "summary": doc.get("summary"),
+        "flags": _flags_text(doc.get("detected_flags")),
+    }
+
+
+def save_documents(conn, docs: Iterable[dict[str, Any]], removed: Iterable[str] = ()) -> None:
+    """Upsert `docs` by call id and drop the `removed` calls; calls without any text are dropped too."""
+    docs = list(docs)
+    removed = set(removed) | {doc["call_id"] for doc in docs if not (doc["transcript"] or doc["summary"] or doc["flags"])}
+    docs = [doc for doc in docs if doc["call_id"] not in removed]
+    if removed:
+        conn.execute(delete(_docs).where(_docs.c.call_id.in_(list(removed))))
+    if docs:
+        stmt = database.conflict_insert(_docs)
+        conn.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[_docs.c.call_id],
+                set_={name: stmt.excluded[name] for name in docs[0] if name != "call_id"},
+            ),
+            docs,
+        )
+
+
+def campaign_calls_written(conn, changes: list[tuple[str, Optional[dict[str, Any]], Optional[dict[str, Any]]]]) -> None:
+    """Write hook of the entity store's `calls` bucket: (key, stored, new) document triples."""
+    save_documents(
+        conn,
+        [campaign_document(key, new) for key, _, new in changes if new is not None],
+        [key for key, _, new in changes if new is None],
+    )
+
+
+def _changed(obj: Any, names: Iterable[str]) -> bool:
+    attrs = inspect(obj).attrs
+    return any(attrs[name].history.has_changes() for name in names)
+
+
+def _transcript_changed(session, call: CallRecord) -> bool:
+    transcript = call.__dict__.get("transcript")  # only if loaded; never trigger a load here
+    return transcript is not None and (transcript in session.new or _changed(transcript, ("transcript_text",)))
+
+
+@event.listens_for(AppSession, "before_flush")
+def _index_call_writes(session, flush_context, instances) -> None:
+    calls: dict[str, CallRecord] = {obj.id: obj for obj in session.new if isinstance(obj, CallRecord)}
+    for obj in session.dirty:
+        if isinstance(obj, CallRecord):
+            if _changed(obj, INDEXED_COLUMNS) or _transcript_changed(session, obj):
+                calls[obj.id] = obj
+        elif isinstance(obj, CallTranscript) and obj.call_id not in calls and _changed(obj, ("transcript_text",)):
+            call = session.get(CallRecord, obj.call_id)
+            if call is not None:
+                calls[call.id] = call
+    removed = [obj.id for obj in session.deleted if isinstance(obj, CallRecord)]
+    if not (calls or removed):
+        return
+    conn = session.connection()
+    unloaded = [call.id for call in calls.values() if "transcript" not in call.__dict__ and call not in session.new]
+    stored = {}
+    if unloaded:
+        stored = dict(conn.execute(
+            select(_transcripts.c.call_id, _transcripts.c.transcript_text).where(_transcripts.c.call_id.in_(unloaded))
+        ).all())
+    docs = []
+    for call in calls.values():
+        if call.created_at is None:
+            call.created_at = datetime.now(timezone.utc)  # as rollups.py does, so both see the same day
+        transcript = call.transcript_text if "transcript" in call.__dict__ else decompress_text(stored.get(call.id))
+        docs.append(outbound_document(call, transcript))
+    save_documents(conn, docs, removed)
+
+
+# ---------------------------------------------------------------------------
+# Queries
+# ---------------------------------------------------------------------------
+def fts_query(q: str) -> str:
+    """The FTS5 MATCH expression for a search box query; ValueError if it has no words.
+
+    Every term is quoted, so FTS5 operators and punctuation in the input are
+    taken literally instead of failing as syntax errors.
+    """
+    terms = []
+    for phrase, word in re.findall(r'"([^"]*)"|(\S+)', q):
+        text = phrase or word
+        prefix = not phrase and text.endswith("*")
+        text = text.rstrip("*") if prefix else text
+        if re.search(r"\w", text):
+            terms.append('"' + text.replace('"', '""') + '"' + ("*" if prefix else ""))
+    if not terms:
+        raise ValueError("Search query has no words")
+    return " ".join(terms)
+
+
+def search_statement(
+    q: str,
+    kind: Optional[SearchKind] = None,
+    campaign_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> tuple[Select, list[SortKey]]:
+    """Matching documents with `score` and `snippet` columns, and their keyset sort keys (best first).
+
+    Scores depend on the whole index, so a page boundary can skip or repeat
+    a hit if calls are indexed while a client pages.
+    """
+    match = fts_query(q)
+    fields = [_docs.c[name] for name in ("id", "call_id", "kind", "campaign_id", "user_id", "placed_at", "summary", "flags")]
+    if database.IS_SQLITE:
+        fts = literal_column(SEARCH_FTS_TABLE)
+        stmt = (
+            select(
+                *fields,
+                (-func.bm25(fts, *BM25_WEIGHTS)).label("score"),  # bm25 is lower-is-better
+                func.snippet(fts, -1, _MATCH_START, _MATCH_END, "…", SEARCH_SNIPPET_TOKENS).label("snippet"),
+            )
+            .select_from(_fts.join(_docs, _docs.c.id == _fts.c.rowid))
+            .where(fts.op("MATCH")(match))
+        )
+    else:
+        query = func.websearch_to_tsquery(SEARCH_LANGUAGE, q)
+        vector = search_vector(_docs.c.flags, _docs.c.summary, _docs.c.transcript)
+        text = func.concat_ws(" … ", _docs.c.flags, _docs.c.summary, _docs.c.transcript)
+        stmt = select(
+            *fields,
+            # real -> double: the cursor must carry back exactly the value compared against.
+            cast(func.ts_rank(vector, query), Float).label("score"),
+            func.ts_headline(SEARCH_LANGUAGE, text, query, HEADLINE_OPTIONS).label("snippet"),
+        ).where(vector.op("@@")(query))
+    if kind is not None:
+        stmt = stmt.where(_docs.c.kind == kind)
+    if campaign_id is not None:
+        stmt = stmt.where(_docs.c.campaign_id == campaign_id)
+    if since is not None:
+        stmt = stmt.where(_docs.c.placed_at >= iso_utc(since))
+    if until is not None:
+        stmt = stmt.where(_docs.c.placed_at < iso_utc(until))
+    hits = stmt.subquery("hits")
+    return select(hits), [SortKey(hits.c.score, descending=True), SortKey(hits.c.id, descending=True)]
+
+
+def highlight(snippet: str) -> str:
+    """HTML-escape a database snippet, then mark its matches."""
+    return html.escape(snippet).replace(_MATCH_START, HIGHLIGHT_START).replace(_MATCH_END, HIGHLIGHT_END)
+
+
+def search_hit(row: Any) -> SearchHit:
+    return SearchHit(
+        call_id=row.call_id,
+        kind=row.kind,
+        campaign_id=row.campaign_id,
+        user_id=row.user_id,
+        placed_at=row.placed_at,
+        summary=row.summary,
+        detected_flags=row.flags.split("\n") if row.flags else [],
+        snippet=highlight(row.snippet or ""),
+        score=row.score,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Reindex
+# ---------------------------------------------------------------------------
+def _chunks(conn, stmt, key):
+    after = None
+    while True:
+        page = stmt if after is None else stmt.where(key > after)
+        rows = conn.execute(page.order_by(key).limit(REINDEX_CHUNK_ROWS)).all()
+        if not rows:
+            return
+        yield rows
+        after = rows[-1].id
+
+
+def reindex(conn=None) -> SearchReindexResult:
+    """Rebuild every search document from call_history and campaign_calls."""
+    if conn is None:
+        with database.engine.begin() as conn:
+            return reindex(conn)
+    conn.execute(delete(_docs))
+    result = SearchReindexResult()
+    history = select(
+        *(_calls.c[name] for name in ("id", "created_at", *INDEXED_COLUMNS)), _transcripts.c.transcript_text
+    ).outerjoin(_transcripts, _transcripts.c.call_id == _calls.c.id)
+    for rows in _chunks(conn, history, _calls.c.id):
+        docs = [outbound_document(row, decompress_text(row.transcript_text)) for row in rows]
+        save_documents(conn, docs)
+        result.calls += len(rows)
+    for rows in _chunks(conn, select(_campaign_calls.c.id, _campaign_calls.c.data), _campaign_calls.c.id):
+        save_documents(conn, [campaign_document(row.id, json.loads(row.data)) for row in rows])
+        result.campaign_calls += len(rows)
+    result.documents = conn.execute(select(func.count()).select_from(_docs)).scalar()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Full-text search index over call transcripts and summaries")
+    parser.add_argument("--reindex", action="store_true", help="Rebuild the index from call history and campaign calls")
+    args = parser.parse_args()
+    if not args.reindex:
+        parser.error("nothing to do; pass --reindex")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    database.init_db()
+    print(reindex().model_dump_json(indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Word-timing speech features for triage.
+
+Pulse STT attaches a `WordTimestamp` to every transcribed word. Rather than
+walking those Pydantic objects feature by feature, the patient's words are
+packed once into a few contiguous NumPy columns (:class:`WordTimings`) and all
+features — speech rate, pause distribution, longest silence gap, low-confidence
+ratio — are computed from those arrays in a single vectorized pass.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, NamedTuple
+
+import numpy as np
+
+from models import PackedWords, SpeechFeatures, TranscriptSegment
+
+# ---------------------------------------------------------------------------
+# Configuration (tuneable)
+# ---------------------------------------------------------------------------
+PAUSE_MIN_SEC = 0.25          # inter-word gaps shorter than this are not pauses
+LOW_CONFIDENCE = 0.6          # STT word confidence below this counts as unclear
+
+
+class WordTimings(NamedTuple):
+    """Struct-of-arrays view of word timestamps, in transcript order.
+
+    ``segment`` is the index of the transcript segment each word came from, so
+    gaps are only measured between words of the same turn.
+    """
+    start: np.ndarray
+    end: np.ndarray
+    confidence: np.ndarray
+    segment: np.ndarray
+
+    @property
+    def count(self) -> int:
+        return int(self.start.shape[0])
+
+    @classmethod
+    def from_segments(cls, transcript: Iterable[TranscriptSegment], speaker: str = "user") -> "WordTimings":
+        """Pack the word timestamps of one speaker's segments into arrays.
+
+        Segments decoded on the webhook fast path already hold
+        :class:`PackedWords`; those arrays are viewed without copying.
+        """
+        columns: list[tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        segments: list[np.ndarray] = []
+        for i, seg in enumerate(transcript):
+            words = seg.word_timestamps
+            if seg.speaker != speaker:
+                continue
+            if isinstance(words, PackedWords):
+                if not words.words:
+                    continue
+                cols = tuple(np.frombuffer(a, dtype=np.float64) for a in (words.start, words.end, words.confidence))
+            elif words:
+                cols = tuple(np.array([(w.start, w.end, w.confidence) for w in words], dtype=np.float64).T)
+            else:
+                continue
+            columns.append(cols)
+            segments.append(np.full(cols[0].shape[0], i, dtype=np.int32))
+        if not columns:
+            empty = np.empty(0, dtype=np.float64)
+            return cls(empty, empty, empty, np.empty(0, dtype=np.int32))
+        start, end, confidence = (np.concatenate(col) for col in zip(*columns))
+        return cls(start, end, confidence, np.concatenate(segments))
+
+
+def compute_speech_features(timings: WordTimings) -> SpeechFeatures:
+    """Speech rate, pause statistics and confidence summary for a set of words.
+
+    ``speech_rate_wpm`` is 0.0 (unknown) when the words span no speaking time.
+    """
+    n = timings.count
+    if n == 0:
+        return SpeechFeatures()
+
+    durations = np.clip(timings.end - timings.start, 0.0, None)
+    same_turn = timings.segment[1:] == timings.segment[:-1]
+    gaps = np.clip(timings.start[1:] - timings.end[:-1], 0.0, None)[same_turn]
+    pauses = gaps[gaps >= PAUSE_MIN_SEC]
+
+    # Speaking time spans each turn's words, including its internal pauses,
+    # but not the time the agent is talking between turns.
+    speaking_sec = float(durations.sum() + gaps.sum())
+    return SpeechFeatures(
+        word_count=n,
+        speaking_sec=round(speaking_sec, 3),
+        speech_rate_wpm=round(n / speaking_sec * 60.0, 1) if speaking_sec > 0 else 0.0,
+        pause_count=int(pauses.shape[0]),
+        mean_pause_sec=round(float(pauses.mean()), 3) if pauses.size else 0.0,
+        p90_pause_sec=round(float(np.percentile(pauses, 90)), 3) if pauses.size else 0.0,
+        longest_gap_sec=round(float(gaps.max()), 3) if gaps.size else 0.0,
+        low_confidence_ratio=round(float(np.count_nonzero(timings.confidence < LOW_CONFIDENCE)) / n, 3),
+        mean_confidence=round(float(timings.confidence.mean()), 3),
+    )
+
+
+def transcript_speech_features(transcript: Iterable[TranscriptSegment], speaker: str = "user") -> SpeechFeatures:
+    """Convenience wrapper: pack a transcript's words and compute its features."""
+    return compute_speech_features(WordTimings.from_segments(transcript, speaker))
@@ -176,6 +176,50 @@ def make_fear_emotion_payload() -> SmallestAIPostCallPayload:
     )
 
 
+def _timed_words(text: str, start: float, word_sec: float, gap_sec: float, confidences: list[float]) -> list[WordTimestamp]:
+    words = []
+    t = start
+    for i, word in enumerate(text.split()):
+        words.append(WordTimestamp(word=word, start=t, end=t + word_sec, confidence=confidences[i % len(confidences)]))
+        t += word_sec + gap_sec
+    return words
+
+
+def make_slurred_speech_payload() -> SmallestAIPostCallPayload:
+    """Slow speech with mostly low-confidence words → IMPAIRED_SPEECH + escalate."""
+    text = "I am okay I think just a little tired today and my arm feels heavy"
+    return SmallestAIPostCallPayload(
+        call_id="test_slurred_001",
+        user_id="usr_test_001",
+        campaign_id="cmp_demo_001",
+        status="completed",
+        audio_metrics=AudioMetrics(
+            avg_db=-28.0,
+            peak_db=-12.0,
+            speech_probability=0.7,
+            silence_duration_sec=12.0,
+            call_duration_sec=60.0,
+        ),
+        transcript=[
+            TranscriptSegment(
+                speaker="agent",
+                text="How are you feeling today?",
+                start=0.0,
+                end=2.0,
+            ),
+            TranscriptSegment(
+                speaker="user",
+                text=text,
+                start=3.0,
+                end=27.0,
+                word_timestamps=_timed_words(text, 3.0, 0.6, 1.0, [0.4, 0.5, 0.9]),
+                emotion=EmotionDetection(label="neutral", confidence=0.6),
+            ),
+        ],
+        emotions=[EmotionDetection(label="neutral", confidence=0.6)],
+    )
+
+
 def make_busy_payload() -> SmallestAIPostCallPayload:
     """Call was busy / not answered."""
     return SmallestAIPostCallPayload(
@@ -205,6 +249,7 @@ SCENARIOS = [
     ("Normal Speech", make_normal_speech_payload),
     ("Distress Keywords (fall, pain, help)", make_distress_keyword_payload),
     ("Fear Emotion (low speech)", make_fear_emotion_payload),
+    ("Slurred / Slow Speech (word timings)", make_slurred_speech_payload),
     ("Busy / No Answer", make_busy_payload),
 ]
 
@@ -227,6 +272,7 @@ def run_unit_tests() -> None:
         ("Normal Speech → SPEECH_DETECTED", make_normal_speech_payload, TriageClassification.SPEECH_DETECTED, False),
         ("Distress Keywords → escalate", make_distress_keyword_payload, TriageClassification.SPEECH_DETECTED, True),
         ("Fear Emotion → escalate", make_fear_emotion_payload, TriageClassification.SPEECH_DETECTED, True),
+        ("Slurred Speech → IMPAIRED_SPEECH + escalate", make_slurred_speech_payload, TriageClassification.IMPAIRED_SPEECH, True),
     ]
 
     for name, factory, expected_class, expected_escalate in tests:
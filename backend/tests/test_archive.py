@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import gzip
+import importlib
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import text
+
+from models import CallState
+
+NOW = datetime(2026, 6, 15, tzinfo=timezone.utc)
+
+
+def _add_call(app_ctx, call_id: str, user_id: str, created_at: datetime, state=CallState.COMPLETED, transcript=None):
+    db = app_ctx.SessionLocal()
+    try:
+        record = app_ctx.DBCallRecord(id=call_id, user_id=user_id, state=state, created_at=created_at, summary=f"summary {call_id}")
+        if transcript:
+            record.transcript_text = transcript
+        db.add(record)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _live_ids(app_ctx) -> set[str]:
+    with importlib.import_module("database").engine.connect() as conn:
+        return set(conn.execute(text("SELECT id FROM call_history")).scalars())
+
+
+def _seed_history(app_ctx):
+    # usr_a: three old calls (Jan, Jan, Feb) and one recent; usr_b: a single old escalated call.
+    _add_call(app_ctx, "call_a1", "usr_a", datetime(2025, 1, 5, tzinfo=timezone.utc), transcript="user: knee is sore")
+    _add_call(app_ctx, "call_a2", "usr_a", datetime(2025, 1, 20, tzinfo=timezone.utc), state=CallState.ESCALATED)
+    _add_call(app_ctx, "call_a3", "usr_a", datetime(2025, 2, 2, tzinfo=timezone.utc), state=CallState.BUSY_RETRY)
+    _add_call(app_ctx, "call_a4", "usr_a", NOW - timedelta(days=3))
+    _add_call(app_ctx, "call_b1", "usr_b", datetime(2025, 1, 7, tzinfo=timezone.utc), state=CallState.ESCALATED)
+
+
+def test_old_settled_calls_move_to_monthly_files(app_ctx):
+    archive = importlib.import_module("archive")
+    _seed_history(app_ctx)
+
+    result = archive.archive_calls(retention_days=90, now=NOW)
+
+    assert result.archived == 2 and result.months == {"2025-01": 2}
+    # Unsettled calls and each user's latest call stay: the scheduler decides from the latest one.
+    assert _live_ids(app_ctx) == {"call_a3", "call_a4", "call_b1"}
+    with gzip.open(archive.month_path("2025-01"), "rt") as lines:
+        docs = {doc["id"]: doc for doc in map(json.loads, lines)}
+    assert set(docs) == {"call_a1", "call_a2"}
+    assert docs["call_a1"]["transcript_text"] == "user: knee is sore"
+    assert docs["call_a2"]["state"] == "ESCALATED"
+    with importlib.import_module("database").engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM call_transcripts")).scalar() == 0
+        assert conn.execute(text("SELECT user_id, month FROM call_archive_months")).all() == [("usr_a", "2025-01")]
+
+    # Nothing left to move.
+    assert archive.archive_calls(retention_days=90, now=NOW).archived == 0
+
+
+def test_chunks_append_to_one_readable_file(app_ctx):
+    archive = importlib.import_module("archive")
+    for day in range(1, 6):
+        _add_call(app_ctx, f"call_c{day}", "usr_c", datetime(2025, 3, day, tzinfo=timezone.utc))
+    _add_call(app_ctx, "call_c_latest", "usr_c", NOW)
+
+    result = archive.archive_calls(retention_days=30, chunk_size=2, now=NOW)
+
+    assert result.archived == 5
+    assert [doc["id"] for doc in archive.iter_month("2025-03", "usr_c")] == [f"call_c{day}" for day in range(1, 6)]
+
+
+def test_call_history_pages_continue_into_the_archive(app_ctx, api_request):
+    archive = importlib.import_module("archive")
+    _seed_history(app_ctx)
+    archive.archive_calls(retention_days=90, now=NOW)
+
+    pages, cursor = [], None
+    while True:
+        response = api_request("GET", "/call-history/usr_a", params={"limit": 2, **({"cursor": cursor} if cursor else {})})
+        pages.append([(c["id"], c["archived"]) for c in response.json()])
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            break
+
+    assert pages == [[("call_a4", False), ("call_a3", False)], [("call_a2", True), ("call_a1", True)]]
+    escalated = api_request("GET", "/call-history/usr_a", params={"state": "ESCALATED"}).json()
+    assert [c["id"] for c in escalated] == ["call_a2"]
+    january = api_request("GET", "/call-history/usr_a", params={"since": "2025-01-10", "until": "2025-02-01"}).json()
+    assert [c["id"] for c in january] == ["call_a2"]
+    live_only = api_request("GET", "/call-history/usr_a", params={"include_archived": False}).json()
+    assert [c["id"] for c in live_only] == ["call_a4", "call_a3"]
+
+
+def test_archived_calls_newer_than_a_pending_retry_stay_in_order(app_ctx, api_request, monkeypatch):
+    archive = importlib.import_module("archive")
+    _add_call(app_ctx, "call_retry", "usr_r", datetime(2025, 1, 10, tzinfo=timezone.utc), state=CallState.BUSY_RETRY)
+    _add_call(app_ctx, "call_done", "usr_r", datetime(2025, 2, 10, tzinfo=timezone.utc))
+    _add_call(app_ctx, "call_new", "usr_r", NOW - timedelta(days=1))
+    assert archive.archive_calls(retention_days=90, now=NOW).archived == 1  # the retry is never archived
+
+    reads = []
+    iter_month = archive.iter_month
+    monkeypatch.setattr(archive, "iter_month", lambda *args: reads.append(args) or iter_month(*args))
+    for limit in (1, 2, 10):
+        ids, cursor = [], None
+        while True:
+            response = api_request("GET", "/call-history/usr_r", params={"limit": limit, **({"cursor": cursor} if cursor else {})})
+            ids += [c["id"] for c in response.json()]
+            cursor = response.headers.get("x-next-cursor")
+            if cursor is None:
+                break
+        assert ids == ["call_new", "call_done", "call_retry"]
+    assert reads == [("2025-02", "usr_r")]  # decoded once, then served from the cache
+
+
+def test_calls_interrupted_mid_archive_are_not_duplicated(app_ctx, api_request, monkeypatch):
+    archive = importlib.import_module("archive")
+    _seed_history(app_ctx)
+    delete = archive.delete
+
+    def crash(*args, **kwargs):
+        raise RuntimeError("killed after the files were written")
+
+    monkeypatch.setattr(archive, "delete", crash)
+    with pytest.raises(RuntimeError):
+        archive.archive_calls(retention_days=90, now=NOW)
+    monkeypatch.setattr(archive, "delete", delete)
+
+    # Written to the file but rolled back in the database: shown once, from the database,
+    # even when an earlier run already indexed that month for the user.
+    assert {"call_a1", "call_a2"} <= _live_ids(app_ctx)
+    with importlib.import_module("database").engine.begin() as conn:
+        conn.execute(text("INSERT INTO call_archive_months (user_id, month) VALUES ('usr_a', '2025-01')"))
+    listed = [c["id"] for c in api_request("GET", "/call-history/usr_a").json()]
+    assert listed == ["call_a4", "call_a3", "call_a2", "call_a1"]
+
+    assert archive.archive_calls(retention_days=90, now=NOW).archived == 2
+    listed = api_request("GET", "/call-history/usr_a").json()
+    assert [(c["id"], c["archived"]) for c in listed][2:] == [("call_a2", True), ("call_a1", True)]
+    assert len(list(archive.iter_month("2025-01", "usr_a"))) == 4  # each call written twice, read once
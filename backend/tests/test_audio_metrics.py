@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import importlib
+import json
+
+import numpy as np
+import pytest
+
+from audio import compute_audio_metrics, crosscheck_metrics, encode_wav, metrics_from_recording
+from models import AudioMetrics
+
+
+def _tone_then_silence(rate: int = 16000, tone_sec: float = 1.0, silence_sec: float = 5.0) -> np.ndarray:
+    t = np.arange(int(rate * tone_sec)) / rate
+    tone = 0.4 * np.sin(2 * np.pi * 220 * t)
+    silence = 0.0005 * np.random.default_rng(0).standard_normal(int(rate * silence_sec))
+    return np.concatenate([tone, silence]).astype(np.float32)
+
+
+@pytest.fixture()
+def in_thread_metrics(app_ctx, monkeypatch):
+    """Run metrics on the audio thread pool so tests don't fork workers."""
+    audio = importlib.import_module("audio")
+    monkeypatch.setattr(audio, "METRICS_WORKERS", 0)
+    return audio
+
+
+def test_compute_audio_metrics_from_samples():
+    rate = 16000
+    metrics = compute_audio_metrics(_tone_then_silence(rate), rate)
+
+    # Peak frame is the 0.4-amplitude sine: 20*log10(0.4/sqrt(2)) ≈ -11 dBFS.
+    assert metrics.peak_db == pytest.approx(-11.0, abs=0.5)
+    # Energy average over 1s of tone and 5s of near-silence ≈ peak - 10*log10(6).
+    assert metrics.avg_db == pytest.approx(-18.8, abs=0.5)
+    assert metrics.speech_probability == pytest.approx(1 / 6, abs=0.02)
+    assert metrics.silence_duration_sec == pytest.approx(5.0, abs=0.05)
+    assert metrics.call_duration_sec == pytest.approx(6.0)
+
+
+def test_compute_audio_metrics_handles_empty_audio():
+    metrics = compute_audio_metrics(np.zeros(0, dtype=np.float32), 16000)
+
+    assert metrics.avg_db == metrics.peak_db == -100.0
+    assert metrics.speech_probability == 0.0
+    assert metrics.call_duration_sec == 0.0
+
+
+def test_metrics_from_recording_rejects_undecodable_audio():
+    assert metrics_from_recording(b"not-audio", "audio/wav") is None
+
+
+def test_crosscheck_flags_disagreeing_provider_metrics():
+    local = AudioMetrics(avg_db=-60, peak_db=-55, speech_probability=0.02, silence_duration_sec=40, call_duration_sec=45)
+
+    close = crosscheck_metrics(local.model_copy(update={"avg_db": -58.0}), local)
+    assert close.agrees is True
+    assert close.avg_db_delta == 2.0
+
+    far = crosscheck_metrics(local.model_copy(update={"avg_db": -25.0, "speech_probability": 0.85}), local)
+    assert far.agrees is False
+    assert far.speech_probability_delta == pytest.approx(0.83)
+
+
+def test_post_call_triages_on_local_metrics(app_ctx, api_request, in_thread_metrics, monkeypatch):
+    rate = 16000
+    silent_wav = encode_wav(np.zeros(rate * 30, dtype=np.float32), rate)
+    fetched = []
+
+    async def fake_fetch(url):
+        fetched.append(url)
+        return silent_wav, "audio/wav"
+
+    monkeypatch.setattr(app_ctx, "LOCAL_AUDIO_METRICS", True)
+    monkeypatch.setattr(app_ctx, "_fetch_recording", fake_fetch)
+    monkeypatch.setattr(app_ctx, "send_escalation_sms", lambda **kwargs: None)
+
+    # Provider claims a normal conversation; the recording is dead air.
+    response = api_request(
+        "POST",
+        "/webhooks/smallest/post-call",
+        json={
+            "call_id": "smallest_local_metrics",
+            "user_id": "usr_1",
+            "status": "completed",
+            "audio_metrics": {"avg_db": -25, "peak_db": -10, "speech_probability": 0.85, "call_duration_sec": 30},
+            "recording_url": "https://recordings.example/smallest_local_metrics.wav",
+        },
+    )
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "escalated"
+    assert fetched == ["https://recordings.example/smallest_local_metrics.wav"]
+
+    db = app_ctx.SessionLocal()
+    try:
+        record = db.query(app_ctx.DBCallRecord).filter_by(smallest_call_id="smallest_local_metrics").one()
+        assert record.triage_classification == "CRITICAL_SILENCE"
+        report = json.loads(record.local_audio_metrics)
+        assert report["metrics"]["speech_probability"] == 0.0
+        assert report["crosscheck"]["agrees"] is False
+        # Stored triage input is what triage actually ran on, so re-triage agrees.
+        assert json.loads(record.triage_input)["audio_metrics"]["avg_db"] == -100.0
+    finally:
+        db.close()
+
+
+def test_post_call_falls_back_to_provider_metrics_without_recording(app_ctx, api_request, in_thread_metrics, monkeypatch):
+    async def failed_fetch(url):
+        return None
+
+    monkeypatch.setattr(app_ctx, "LOCAL_AUDIO_METRICS", True)
+    monkeypatch.setattr(app_ctx, "_fetch_recording", failed_fetch)
+
+    response = api_request(
+        "POST",
+        "/webhooks/smallest/post-call",
+        json={
+            "call_id": "smallest_no_recording",
+            "user_id": "usr_1",
+            "status": "completed",
+            "audio_metrics": {"avg_db": -10, "peak_db": -5, "speech_probability": 0.1},
+            "recording_url": "https://recordings.example/missing.wav",
+        },
+    )
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "retry_scheduled"
+
+
+def test_fetch_recording_guards_host_key_redirects_and_size(app_ctx, monkeypatch):
+    import asyncio
+
+    httpx = app_ctx.httpx
+    real_async_client = httpx.AsyncClient
+    seen = []
+
+    def handler(request):
+        seen.append((str(request.url), request.headers.get("authorization")))
+        if request.url.path == "/to-internal":
+            return httpx.Response(302, headers={"location": "https://169.254.169.254/latest/meta-data"})
+        if request.url.path == "/to-cdn":
+            return httpx.Response(302, headers={"location": "https://cdn.recordings.example/call.wav"})
+        if request.url.path == "/huge.wav":
+            return httpx.Response(200, content=b"x" * 2048, headers={"content-type": "audio/wav"})
+        return httpx.Response(200, content=b"RIFF-audio", headers={"content-type": "audio/wav"})
+
+    monkeypatch.setattr(httpx, "AsyncClient", lambda **kwargs: real_async_client(transport=httpx.MockTransport(handler), **kwargs))
+    monkeypatch.setattr(app_ctx, "SMALLEST_AI_API_KEY", "secret-key")
+    monkeypatch.setattr(app_ctx, "RECORDING_HOSTS", ("smallest.ai", "recordings.example"))
+    monkeypatch.setattr(app_ctx, "RECORDING_MAX_BYTES", 1024)
+    fetch = lambda url: asyncio.run(app_ctx._fetch_recording(url))  # noqa: E731
+
+    # Hosts off the allowlist (and plain http) are never contacted.
+    assert fetch("https://attacker.example/steal") is None
+    assert fetch("http://api.smallest.ai/rec.wav") is None
+    assert fetch("https://smallest.ai.attacker.example/rec.wav") is None
+    assert seen == []
+
+    # The key goes to the provider only, not to another allowed host.
+    assert fetch("https://api.smallest.ai/rec.wav") == (b"RIFF-audio", "audio/wav")
+    assert fetch("https://recordings.example/rec.wav") == (b"RIFF-audio", "audio/wav")
+    assert [auth for _, auth in seen] == ["Bearer secret-key", None]
+
+    # Redirects are re-checked hop by hop; the key is not carried off the provider.
+    seen.clear()
+    assert fetch("https://api.smallest.ai/to-internal") is None
+    assert [url for url, _ in seen] == ["https://api.smallest.ai/to-internal"]
+    seen.clear()
+    assert fetch("https://api.smallest.ai/to-cdn") == (b"RIFF-audio", "audio/wav")
+    assert seen == [("https://api.smallest.ai/to-cdn", "Bearer secret-key"), ("https://cdn.recordings.example/call.wav", None)]
+
+    assert fetch("https://api.smallest.ai/huge.wav") is None
+
+
+def test_audio_metrics_endpoint_crosschecks_stored_call(app_ctx, api_request, in_thread_metrics):
+    api_request(
+        "POST",
+        "/webhooks/smallest/post-call",
+        json={
+            "call_id": "smallest_upload",
+            "user_id": "usr_1",
+            "status": "completed",
+            "audio_metrics": {"avg_db": -18, "peak_db": -11, "speech_probability": 0.9},
+        },
+    )
+    db = app_ctx.SessionLocal()
+    try:
+        call_id = db.query(app_ctx.DBCallRecord).filter_by(smallest_call_id="smallest_upload").one().id
+    finally:
+        db.close()
+
+    rate = 16000
+    response = api_request(
+        "POST",
+        f"/calls/{call_id}/audio-metrics",
+        content=encode_wav(_tone_then_silence(rate), rate),
+        headers={"content-type": "audio/wav"},
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["metrics"]["call_duration_sec"] == pytest.approx(6.0)
+    assert body["crosscheck"]["agrees"] is False
+    assert body["crosscheck"]["speech_probability_delta"] > 0.5
+
+
+def test_audio_metrics_endpoint_errors(api_request, in_thread_metrics):
+    assert api_request("POST", "/calls/missing/audio-metrics", content=b"x").status_code == 404
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import numpy as np
+
+from audio import detect_speech_bounds, encode_wav, trim_silence
+
+
+def _padded_tone(rate: int = 16000, lead_sec: float = 2.0, tone_sec: float = 1.0, tail_sec: float = 3.0) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    t = np.arange(int(rate * tone_sec)) / rate
+    tone = 0.4 * np.sin(2 * np.pi * 220 * t)
+    lead = 0.0005 * rng.standard_normal(int(rate * lead_sec))
+    tail = 0.0005 * rng.standard_normal(int(rate * tail_sec))
+    return np.concatenate([lead, tone, tail]).astype(np.float32)
+
+
+def test_detect_speech_bounds_finds_tone():
+    rate = 16000
+    samples = _padded_tone(rate)
+    start, end = detect_speech_bounds(samples, rate)
+
+    # Cut lands within the padding window around the 2.0s–3.0s tone.
+    assert 1.6 * rate <= start <= 2.0 * rate
+    assert 3.0 * rate <= end <= 3.4 * rate
+
+
+def test_detect_speech_bounds_none_for_silence():
+    assert detect_speech_bounds(np.zeros(16000, dtype=np.float32), 16000) is None
+
+
+def test_trim_silence_wav_reports_savings():
+    rate = 16000
+    wav = encode_wav(_padded_tone(rate), rate)
+
+    trimmed, content_type, report = trim_silence(wav, "audio/wav")
+
+    assert content_type == "audio/wav"
+    assert report.trimmed is True
+    assert len(trimmed) == report.forwarded_bytes < len(wav)
+    assert report.bytes_saved == len(wav) - len(trimmed)
+    assert 4.0 < report.seconds_saved < 5.0
+
+
+def test_trim_silence_passes_through_undecodable_audio():
+    audio, content_type, report = trim_silence(b"not-audio", "audio/wav")
+
+    assert audio == b"not-audio"
+    assert content_type == "audio/wav"
+    assert report.trimmed is False
+    assert report.bytes_saved == 0
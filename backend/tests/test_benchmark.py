@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import benchmark
+
+
+def test_benchmarks_run_on_scaled_workloads(app_ctx):
+    results = benchmark.run_benchmarks(app_ctx, quick=True, min_sample_sec=0.0)
+
+    assert set(results["results"]) == set(benchmark.build_benchmarks(app_ctx, quick=True))
+    for result in results["results"].values():
+        assert result["median_us"] > 0
+        assert result["min_us"] <= result["median_us"]
+
+
+def test_long_transcript_workload_times_every_user_word():
+    payload = benchmark.long_transcript_payload(turns=3)
+
+    user_segments = [seg for seg in payload.transcript if seg.speaker == "user"]
+    assert len(payload.transcript) == 6
+    assert all(len(seg.word_timestamps) == len(seg.text.split()) for seg in user_segments)
+
+
+def test_compare_flags_regressions_against_baseline():
+    baseline = {"results": {"a": {"median_us": 100.0}, "b": {"median_us": 100.0}, "c": {"median_us": 100.0}}}
+    current = {"results": {"a": {"median_us": 140.0}, "b": {"median_us": 110.0}, "c": {"median_us": 50.0}, "d": {"median_us": 1.0}}}
+
+    status = {row["name"]: row["status"] for row in benchmark.compare(current, baseline, tolerance=0.25)}
+
+    assert status == {"a": "regression", "b": "ok", "c": "improved", "d": "new"}
+
+
+def test_lookup_scaling_times_indexed_and_scanned_lookups():
+    rows = benchmark.lookup_scaling(sizes=(100, 2000), repeats=1, min_sample_sec=0.0)
+
+    assert [r["rows"] for r in rows] == [100, 2000]
+    assert all(r["indexed_us"] > 0 and r["full_scan_us"] > 0 for r in rows)
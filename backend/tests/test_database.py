@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import asyncio
+import importlib
+import json
+import sqlite3
+import sys
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.dialects import postgresql
+
+from conftest import TEST_DATABASE_URL
+
+sqlite_only = pytest.mark.skipif(bool(TEST_DATABASE_URL), reason="SQLite-specific")
+postgres_only = pytest.mark.skipif(
+    not TEST_DATABASE_URL.startswith("postgresql"), reason="set PULSECALL_TEST_DATABASE_URL to a PostgreSQL URL"
+)
+
+
+@sqlite_only
+def test_connections_use_tuned_pragmas(app_ctx):
+    database = importlib.import_module("database")
+
+    with database.engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == database.SQLITE_PRAGMAS["busy_timeout"]
+
+    async def async_pragmas():
+        async with database.async_engine.connect() as conn:
+            return (
+                (await conn.execute(text("PRAGMA journal_mode"))).scalar(),
+                (await conn.execute(text("PRAGMA cache_size"))).scalar(),
+            )
+
+    assert asyncio.run(async_pragmas()) == ("wal", database.SQLITE_PRAGMAS["cache_size"])
+
+
+@sqlite_only
+def test_reads_are_not_blocked_by_open_write(app_ctx, api_request):
+    api_request("POST", "/users", json={"name": "Ida", "phone": "+1-555-0111"})
+    database = importlib.import_module("database")
+
+    with database.engine.connect() as writer:
+        writer.execute(text("BEGIN EXCLUSIVE"))  # blocks all readers in rollback-journal mode
+        writer.execute(text("INSERT INTO users (id, name, phone) VALUES ('usr_uncommitted', 'Pending', '+1')"))
+
+        # WAL: the dashboard read sees the last committed state instead of waiting.
+        users = api_request("GET", "/users").json()
+        assert [u["name"] for u in users] == ["Ida"]
+        writer.rollback()
+
+
+def test_scheduler_places_first_call_with_async_session(app_ctx, api_request):
+    user = api_request("POST", "/users", json={"name": "Jo", "phone": "+1-555-0112", "campaign_id": "cmp_demo_001"}).json()
+    scheduler = importlib.import_module("scheduler")
+
+    asyncio.run(scheduler.process_pending_calls())
+
+    history = api_request("GET", f"/call-history/{user['id']}").json()
+    assert len(history) == 1
+    assert history[0]["state"] == "PENDING"
+
+
+def _create_legacy_db(path) -> None:
+    """call_history as older builds created it: only the user_id index."""
+    conn = sqlite3.connect(path)
+    conn.executescript(
+        """
+        CREATE TABLE call_history (
+            id VARCHAR PRIMARY KEY, user_id VARCHAR NOT NULL, campaign_id VARCHAR,
+            state VARCHAR(12) NOT NULL, retry_count INTEGER, max_retries INTEGER,
+            triage_classification VARCHAR, triage_reason VARCHAR, transcript_text TEXT,
+            summary TEXT, sentiment_score INTEGER, detected_flags TEXT, recommended_action TEXT,
+            escalation_reason TEXT, smallest_call_id VARCHAR, started_at DATETIME, ended_at DATETIME,
+            next_retry_at DATETIME, created_at DATETIME, updated_at DATETIME
+        );
+        CREATE INDEX ix_call_history_user_id ON call_history (user_id);
+        INSERT INTO call_history (id, user_id, state, smallest_call_id, transcript_text) VALUES
+            ('call_a', 'usr_1', 'COMPLETED', 'smallest_dup', 'user: my knee is sore'),
+            ('call_b', 'usr_1', 'COMPLETED', 'smallest_dup', NULL),
+            ('call_c', 'usr_2', 'PENDING', 'smallest_other', NULL);
+        """
+    )
+    conn.commit()
+    conn.close()
+
+
+@sqlite_only
+def test_entity_rows_written_before_versioning_stay_writable(app_ctx):
+    database = importlib.import_module("database")
+    escalation_id = "esc_legacy"
+    app_ctx.store["escalations"][escalation_id] = {"id": escalation_id, "status": "open", "detected_flags": []}
+    with database.engine.begin() as conn:
+        conn.execute(text("ALTER TABLE escalations DROP COLUMN version"))
+        conn.execute(text("PRAGMA user_version = 6"))
+
+    assert database.migrate() == database.SCHEMA_VERSION
+    store = importlib.import_module("entity_store").create_store()
+    store["escalations"].modify(escalation_id, lambda e: e.update(status="acknowledged"))
+    store.flush()
+
+    with database.engine.connect() as conn:
+        row = conn.execute(text("SELECT data, version FROM escalations WHERE id = :id"), {"id": escalation_id}).one()
+    assert (json.loads(row.data)["status"], row.version) == ("acknowledged", 1)
+
+
+@sqlite_only
+def test_migration_upgrades_existing_database(tmp_path, monkeypatch):
+    db_path = tmp_path / "legacy.db"
+    _create_legacy_db(db_path)
+    monkeypatch.setenv("PULSECALL_DB_PATH", str(db_path))
+    monkeypatch.delitem(sys.modules, "database", raising=False)
+    database = importlib.import_module("database")
+
+    database.init_db()
+
+    with database.engine.connect() as conn:
+        indexes = {row[1]: row[2] for row in conn.execute(text("PRAGMA index_list(call_history)"))}
+        assert indexes["ix_call_history_smallest_call_id"] == 1  # unique
+        assert {"ix_call_history_user_created", "ix_call_history_state_next_retry"} <= set(indexes)
+        assert "ix_call_history_user_id" not in indexes
+        assert conn.execute(text("PRAGMA user_version")).scalar() == database.SCHEMA_VERSION
+        # Columns added after the table was first created are there too; transcripts moved out.
+        columns = {row[1] for row in conn.execute(text("PRAGMA table_info(call_history)"))}
+        assert "local_audio_metrics" in columns
+        assert not {"transcript_text", "triage_input"} & columns
+        moved = conn.execute(text("SELECT call_id, transcript_text FROM call_transcripts")).all()
+        assert [(call_id, database.decompress_text(blob)) for call_id, blob in moved] == [("call_a", "user: my knee is sore")]
+        # The first of the duplicate provider ids keeps it; the other is detached.
+        ids = dict(conn.execute(text("SELECT id, smallest_call_id FROM call_history")).all())
+        assert ids == {"call_a": "smallest_dup", "call_b": None, "call_c": "smallest_other"}
+
+    # Running again is a no-op.
+    assert database.migrate() == database.SCHEMA_VERSION
+    database.engine.dispose()
+
+
+@sqlite_only
+def test_webhook_and_scheduler_queries_use_indexes(app_ctx):
+    database = importlib.import_module("database")
+
+    def plan(sql: str) -> str:
+        with database.engine.connect() as conn:
+            return " ".join(row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+
+    assert "ix_call_history_smallest_call_id" in plan("SELECT * FROM call_history WHERE smallest_call_id = 'x'")
+    assert "ix_call_history_user_created" in plan(
+        "SELECT * FROM call_history WHERE user_id = 'u' ORDER BY created_at DESC LIMIT 1"
+    )
+    assert "ix_call_history_state_next_retry" in plan(
+        "SELECT * FROM call_history WHERE state = 'BUSY_RETRY' AND next_retry_at <= '2026-01-01'"
+    )
+
+
+def test_database_urls_pick_async_drivers():
+    database = importlib.import_module("database")
+
+    assert database._engine_urls("sqlite:///pulsecall.db") == ("sqlite:///pulsecall.db", "sqlite+aiosqlite:///pulsecall.db")
+    assert database._engine_urls("postgresql://pc:secret@db:5432/pulsecall") == (
+        "postgresql+psycopg://pc:secret@db:5432/pulsecall",
+        "postgresql+psycopg://pc:secret@db:5432/pulsecall",
+    )
+    with pytest.raises(ValueError):
+        database._engine_urls("mysql://db/pulsecall")
+
+
+def test_postgres_claims_users_with_skip_locked():
+    database = importlib.import_module("database")
+    stmt = select(database.UserRecord).where(database.UserRecord.id == "u").with_for_update(skip_locked=True)
+
+    assert "FOR UPDATE SKIP LOCKED" in str(stmt.compile(dialect=postgresql.dialect()))
+    ddl = str(database.CallRecord.__table__.c.detected_flags.type.compile(dialect=postgresql.dialect()))
+    assert ddl == "JSONB"
+
+
+def test_detected_flags_round_trip_as_lists(app_ctx, api_request, monkeypatch):
+    monkeypatch.setattr(app_ctx, "send_escalation_sms", lambda **kwargs: None)
+    monkeypatch.setattr(
+        app_ctx,
+        "process_transcript",
+        lambda history, keywords, model="analysis": {
+            "summary": "s", "sentiment_score": 2, "detected_flags": ["fever"], "recommended_action": "a",
+        },
+    )
+    user = api_request("POST", "/users", json={"name": "Flo", "phone": "+1-555-0113"}).json()
+    api_request(
+        "POST",
+        "/webhooks/smallest/post-call",
+        json={
+            "call_id": "smallest_flags",
+            "user_id": user["id"],
+            "status": "completed",
+            "audio_metrics": {"avg_db": -20, "peak_db": -8, "speech_probability": 0.8},
+            "transcript": [{"speaker": "user", "text": "I have a fever and chills since yesterday", "start": 0, "end": 3}],
+        },
+    )
+
+    history = api_request("GET", f"/call-history/{user['id']}").json()
+    assert history[0]["detected_flags"] == ["fever"]
+
+
+@postgres_only
+def test_scheduler_nodes_skip_users_claimed_elsewhere(app_ctx, api_request):
+    for name in ("Gus", "Hal"):
+        api_request("POST", "/users", json={"name": name, "phone": "+1-555-0114"})
+    database = importlib.import_module("database")
+    scheduler = importlib.import_module("scheduler")
+    locked_id = api_request("GET", "/users").json()[0]["id"]
+
+    # Another node is mid-claim on the first user.
+    with database.engine.connect() as other_node:
+        other_node.execute(text("SELECT id FROM users WHERE id = :id FOR UPDATE"), {"id": locked_id})
+        asyncio.run(scheduler.process_pending_calls())
+        other_node.rollback()
+
+    with database.engine.connect() as conn:
+        called = set(conn.execute(text("SELECT user_id FROM call_history")).scalars())
+        assert locked_id not in called and len(called) == 1
+        assert conn.execute(text(
+            "SELECT data_type, udt_name FROM information_schema.columns "
+            "WHERE table_name = 'call_history' AND column_name IN ('state', 'detected_flags') ORDER BY column_name"
+        )).all() == [("jsonb", "jsonb"), ("USER-DEFINED", "call_state")]
+
+
+def test_transcript_compression_round_trips(monkeypatch):
+    database = importlib.import_module("database")
+    text_in = "user: the swelling is a bit better today\n" * 50
+
+    monkeypatch.setattr(database, "TRANSCRIPT_CODEC", "zlib")
+    blob = database.compress_text(text_in)
+    assert len(blob) < len(text_in) / 10
+    assert database.decompress_text(blob) == text_in
+    assert database.compress_text(None) is None and database.decompress_text(None) is None
+
+    if database.zstandard is not None:
+        monkeypatch.setattr(database, "TRANSCRIPT_CODEC", "zstd")
+        assert database.decompress_text(database.compress_text(text_in)) == text_in
+
+
+def test_post_call_transcript_is_stored_compressed_off_the_hot_row(app_ctx, api_request):
+    long_line = "The swelling is a bit better today and I did my exercises twice but the knee is still stiff"
+    api_request(
+        "POST",
+        "/webhooks/smallest/post-call",
+        json={
+            "call_id": "smallest_compressed",
+            "user_id": "usr_1",
+            "status": "completed",
+            "audio_metrics": {"avg_db": -40, "peak_db": -30, "speech_probability": 0.1},
+            "transcript": [{"speaker": "user", "text": long_line, "start": i, "end": i + 1} for i in range(20)],
+        },
+    )
+    database = importlib.import_module("database")
+
+    with database.engine.connect() as conn:
+        hot_columns = {c["name"] for c in database.inspect(conn).get_columns("call_history")}
+        blob = conn.execute(text("SELECT transcript_text FROM call_transcripts")).scalar()
+    assert not {"transcript_text", "triage_input"} & hot_columns
+    assert len(blob) < len(long_line) * 2
+
+    db = app_ctx.SessionLocal()
+    try:
+        record = db.query(app_ctx.DBCallRecord).filter_by(smallest_call_id="smallest_compressed").one()
+        assert record.transcript_text.splitlines() == [f"user: {long_line}"] * 20
+        assert json.loads(record.triage_input)["audio_metrics"]["avg_db"] == -40
+    finally:
+        db.close()
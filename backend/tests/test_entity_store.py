@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import importlib
+import json
+
+import pytest
+from sqlalchemy import text
+
+from test_main import make_campaign_payload
+
+
+def _row(app_ctx, table: str, key: str):
+    database = importlib.import_module("database")
+    with database.engine.connect() as conn:
+        data = conn.execute(text(f"SELECT data FROM {table} WHERE id = :id"), {"id": key}).scalar()
+    return json.loads(data) if data is not None else None
+
+
+def test_entities_survive_a_restart(app_ctx, api_request):
+    campaign_id = api_request("POST", "/campaigns/create", json=make_campaign_payload()).json()["id"]
+    conversation_id = api_request("POST", "/campaigns/conversations/create", params={"campaign_id": campaign_id}).json()["id"]
+    api_request("POST", f"/campaigns/{campaign_id}/{conversation_id}", params={"message": "I might cancel this"})
+    call = api_request("POST", f"/campaigns/{campaign_id}/{conversation_id}/end").json()
+    app_ctx.store.flush()
+
+    # A fresh process: new store, empty caches, same database file.
+    restarted = importlib.import_module("entity_store").create_store()
+
+    assert restarted["campaigns"][campaign_id]["name"] == make_campaign_payload()["name"]
+    conversation = restarted["conversations"][conversation_id]
+    assert conversation["status"] == "inactive"
+    assert [m["role"] for m in conversation["history"]] == ["user", "assistant"]
+    assert restarted["calls"][call["call_id"]]["detected_flags"] == ["cancel"]
+    assert restarted["escalations"][call["escalation_id"]]["status"] == "open"
+    assert restarted["trends"][campaign_id].calls == 1
+
+
+def test_mutations_are_batched_behind_the_cache(app_ctx, api_request, monkeypatch):
+    entity_store = importlib.import_module("entity_store")
+    monkeypatch.setattr(entity_store, "STORE_FLUSH_INTERVAL_SEC", 60)
+    app_ctx.store.flush()  # seeding's trend updates
+    campaign_id = api_request("POST", "/campaigns/create", json=make_campaign_payload()).json()["id"]
+    conversation_id = api_request("POST", "/campaigns/conversations/create", params={"campaign_id": campaign_id}).json()["id"]
+
+    for message in ("one", "two", "three"):
+        api_request("POST", f"/campaigns/{campaign_id}/{conversation_id}", params={"message": message})
+
+    # Served from the cache; the database still has the row as created.
+    assert len(app_ctx.store["conversations"][conversation_id]["history"]) == 6
+    assert _row(app_ctx, "conversations", conversation_id)["history"] == []
+
+    flushes = app_ctx.store.flushes
+    assert app_ctx.store.flush() == 1
+    assert app_ctx.store.flushes == flushes + 1
+    assert len(_row(app_ctx, "conversations", conversation_id)["history"]) == 6
+
+
+def test_lists_include_pending_writes(app_ctx, api_request, monkeypatch):
+    monkeypatch.setattr(importlib.import_module("entity_store"), "STORE_FLUSH_INTERVAL_SEC", 60)
+    campaign_id = api_request("POST", "/campaigns/create", json=make_campaign_payload()).json()["id"]
+    conversation_id = api_request("POST", "/campaigns/conversations/create", params={"campaign_id": campaign_id}).json()["id"]
+    api_request("POST", f"/campaigns/{campaign_id}/{conversation_id}", params={"message": "I want to cancel"})
+    escalation_id = api_request("POST", f"/campaigns/{campaign_id}/{conversation_id}/end").json()["escalation_id"]
+
+    api_request("PATCH", f"/escalations/{escalation_id}/acknowledge")
+
+    listed = {e["id"]: e for e in api_request("GET", "/escalations").json()}
+    assert listed[escalation_id]["status"] == "acknowledged"
+    assert _row(app_ctx, "escalations", escalation_id)["status"] == "acknowledged"
+
+
+def test_cache_expires_so_other_workers_writes_are_seen(app_ctx, monkeypatch):
+    entity_store = importlib.import_module("entity_store")
+    campaigns = app_ctx.store["campaigns"]
+    assert campaigns["cmp_demo_001"]["name"] != "Renamed"
+
+    # Another worker updates the row behind this process's cache.
+    other = entity_store.create_store()
+    other["campaigns"]["cmp_demo_001"] = dict(campaigns["cmp_demo_001"], name="Renamed")
+
+    assert campaigns["cmp_demo_001"]["name"] != "Renamed"  # still cached
+    monkeypatch.setattr(entity_store, "STORE_CACHE_TTL_SEC", 0)
+    assert campaigns["cmp_demo_001"]["name"] == "Renamed"
+
+
+def test_lists_prefer_rows_newer_than_the_cache(app_ctx, api_request):
+    entity_store = importlib.import_module("entity_store")
+    campaigns = app_ctx.store["campaigns"]
+    assert campaigns["cmp_demo_001"]["name"] != "Renamed"  # now cached
+
+    other = entity_store.create_store()
+    other["campaigns"]["cmp_demo_001"] = dict(campaigns["cmp_demo_001"], name="Renamed")
+
+    listed = {c["id"]: c for c in api_request("GET", "/campaigns").json()}
+    assert listed["cmp_demo_001"]["name"] == "Renamed"
+    assert campaigns["cmp_demo_001"]["name"] == "Renamed"  # the cache was refreshed from the row
+
+    other["campaigns"]["cmp_demo_001"] = dict(campaigns["cmp_demo_001"], name="Renamed again")
+    assert {c["id"]: c for c in campaigns.values()}["cmp_demo_001"]["name"] == "Renamed again"
+    assert campaigns["cmp_demo_001"]["name"] == "Renamed again"
+
+
+def test_seeding_is_idempotent(app_ctx):
+    trend_calls = app_ctx.store["trends"]["cmp_demo_001"].calls
+
+    app_ctx.seed_example_data()
+
+    assert app_ctx.store["trends"]["cmp_demo_001"].calls == trend_calls
+    assert len(app_ctx.store["campaigns"]) == len(app_ctx.SEED_PATIENTS)
+
+
+def test_concurrent_workers_do_not_lose_updates(app_ctx, api_request, monkeypatch):
+    entity_store = importlib.import_module("entity_store")
+    monkeypatch.setattr(entity_store, "STORE_FLUSH_INTERVAL_SEC", 60)
+    campaign_id = api_request("POST", "/campaigns/create", json=make_campaign_payload()).json()["id"]
+    conversation_id = api_request("POST", "/campaigns/conversations/create", params={"campaign_id": campaign_id}).json()["id"]
+    app_ctx.store.flush()
+
+    # Two more workers, each with the conversation cached.
+    a, b = entity_store.create_store(), entity_store.create_store()
+    a["conversations"].modify(conversation_id, lambda c: c["history"].append("from A"))
+    b["conversations"].modify(conversation_id, lambda c: c["history"].append("from B"))
+    a.flush()
+    b.flush()
+
+    assert _row(app_ctx, "conversations", conversation_id)["history"] == ["from A", "from B"]
+    assert b["conversations"].conflicts == 1
+    assert b["conversations"][conversation_id]["history"] == ["from A", "from B"]  # the replayed copy is cached
+
+
+def test_acknowledgement_survives_a_stale_cache(app_ctx, api_request, monkeypatch):
+    entity_store = importlib.import_module("entity_store")
+    campaign_id = api_request("POST", "/campaigns/create", json=make_campaign_payload()).json()["id"]
+    conversation_id = api_request("POST", "/campaigns/conversations/create", params={"campaign_id": campaign_id}).json()["id"]
+    api_request("POST", f"/campaigns/{campaign_id}/{conversation_id}", params={"message": "I want to cancel"})
+    escalation_id = api_request("POST", f"/campaigns/{campaign_id}/{conversation_id}/end").json()["escalation_id"]
+    app_ctx.store.flush()
+
+    other = entity_store.create_store()
+    assert other["escalations"][escalation_id]["status"] == "open"  # cached by the other worker
+
+    api_request("PATCH", f"/escalations/{escalation_id}/acknowledge")
+    app_ctx.store.flush()
+    other["escalations"].modify(escalation_id, lambda e: e["detected_flags"].append("fever"))
+    other.flush()
+
+    stored = _row(app_ctx, "escalations", escalation_id)
+    assert stored["status"] == "acknowledged"
+    assert stored["detected_flags"] == ["cancel", "fever"]
+
+
+def test_setdefault_keeps_the_first_writer(app_ctx):
+    entity_store = importlib.import_module("entity_store")
+    other = entity_store.create_store()
+
+    first = app_ctx.store["campaigns"].setdefault("cmp_race", {"name": "first"})
+    second = other["campaigns"].setdefault("cmp_race", {"name": "second"})
+
+    assert first["name"] == second["name"] == "first"
+    assert app_ctx.store["campaigns"].modify("cmp_race", lambda c: c.update(name="edited")) is None
+    with pytest.raises(KeyError):
+        app_ctx.store["campaigns"].modify("cmp_missing", lambda c: None)
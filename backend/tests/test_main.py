@@ -147,3 +147,11 @@ def test_list_conversations_returns_created_conversation(api_request):
     assert response.status_code == 200
     conversations = response.json()
     assert any(c.get("id") == conversation_id for c in conversations)
+
+
+def test_fallback_flags_matches_whole_words(app_ctx):
+    transcript = [
+        {"role": "user", "content": "That was a popular show"},
+        {"role": "user", "content": "I heard a Pop in my hip"},
+    ]
+    assert app_ctx.fallback_flags(transcript, ["popping", "pop", "Hip"]) == ["pop", "Hip"]
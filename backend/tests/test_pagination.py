@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import importlib
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import text
+
+from models import CallState
+from test_database import sqlite_only
+
+
+def _add_calls(app_ctx, count: int, **fields) -> list[str]:
+    demo = app_ctx.store["calls"]["call_demo_001"]
+    ids = []
+    for i in range(count):
+        call_id = f"call_page_{i:03d}"
+        app_ctx.store["calls"][call_id] = dict(
+            demo, id=call_id, call_id=call_id, ended_at=f"2026-03-01T00:00:{i:02d}+00:00", **fields
+        )
+        ids.append(call_id)
+    return ids
+
+
+def _all_pages(api_request, path: str, **params) -> list[list[dict]]:
+    pages, cursor = [], None
+    while True:
+        response = api_request("GET", path, params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        pages.append(response.json())
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            return pages
+        assert len(pages) < 20, "cursor is not advancing"
+
+
+def test_calls_page_newest_first_without_gaps(app_ctx, api_request):
+    ids = _add_calls(app_ctx, 7)
+
+    pages = _all_pages(api_request, "/calls", limit=3, since="2026-03-01T00:00:00Z", until="2026-03-02T00:00:00Z")
+
+    assert [len(p) for p in pages] == [3, 3, 1]
+    assert [c["id"] for p in pages for c in p] == ids[::-1]
+
+
+def test_new_rows_do_not_shift_later_pages(app_ctx, api_request):
+    ids = _add_calls(app_ctx, 4)
+    first = api_request("GET", "/calls", params={"limit": 2, "campaign_id": "cmp_demo_001", "until": "2026-04-01T00:00:00"})
+
+    app_ctx.store["calls"]["call_page_new"] = dict(app_ctx.store["calls"][ids[0]], id="call_page_new", ended_at="2026-03-31T00:00:00+00:00")
+    second = api_request(
+        "GET",
+        "/calls",
+        params={"limit": 2, "campaign_id": "cmp_demo_001", "until": "2026-04-01T00:00:00", "cursor": first.headers["x-next-cursor"]},
+    )
+
+    assert [c["id"] for c in first.json()] == [ids[3], ids[2]]
+    assert [c["id"] for c in second.json()] == [ids[1], ids[0]]
+    assert "x-next-cursor" not in second.headers
+
+
+def test_calls_filter_on_escalation(app_ctx, api_request):
+    _add_calls(app_ctx, 2)
+    app_ctx.store["calls"]["call_page_esc"] = dict(app_ctx.store["calls"]["call_page_000"], id="call_page_esc", escalation_id="esc_x")
+
+    escalated = api_request("GET", "/calls", params={"escalated": True}).json()
+    calm = api_request("GET", "/calls", params={"escalated": False}).json()
+
+    assert [c["id"] for c in escalated] == ["call_page_esc"]
+    assert "call_page_esc" not in {c["id"] for c in calm} and len(calm) == 3
+
+
+def test_escalations_page_by_priority_then_age(app_ctx, api_request):
+    escalations = app_ctx.store["escalations"]
+    for i, priority in enumerate(["low", "high", "medium", "high", "low"]):
+        escalations[f"esc_{i}"] = {
+            "id": f"esc_{i}", "campaign_id": "cmp_demo_001", "priority": priority,
+            "status": "acknowledged" if i == 3 else "open", "created_at": f"2026-03-01T00:00:0{i}+00:00",
+        }
+
+    pages = _all_pages(api_request, "/escalations", limit=2)
+    open_high = api_request("GET", "/escalations", params={"status": "open", "priority": "high"}).json()
+
+    assert [e["id"] for p in pages for e in p] == ["esc_1", "esc_3", "esc_2", "esc_0", "esc_4"]
+    assert [e["id"] for e in open_high] == ["esc_1"]
+
+
+def test_conversations_filter_by_campaign_and_status(app_ctx, api_request):
+    campaign_id = "cmp_demo_001"
+    created = [
+        api_request("POST", "/campaigns/conversations/create", params={"campaign_id": campaign_id}).json()["id"]
+        for _ in range(3)
+    ]
+    api_request("POST", f"/campaigns/{campaign_id}/{created[0]}/end")
+
+    active = _all_pages(api_request, "/conversations", limit=1, campaign_id=campaign_id, status="active")
+
+    assert [c["id"] for p in active for c in p] == created[:0:-1]
+
+
+def test_users_and_call_history_pages(app_ctx, api_request):
+    for i in range(3):
+        api_request("POST", "/users", json={"name": f"U{i}", "phone": "+1-555-0120", "campaign_id": "cmp_demo_001"})
+    api_request("POST", "/users", json={"name": "Other", "phone": "+1-555-0121"})
+
+    pages = _all_pages(api_request, "/users", limit=2, campaign_id="cmp_demo_001")
+    assert [u["name"] for p in pages for u in p] == ["U2", "U1", "U0"]
+
+    user_id = pages[0][0]["id"]
+    database = importlib.import_module("database")
+    with database.engine.begin() as conn:
+        conn.execute(
+            database.CallRecord.__table__.insert(),
+            [
+                {"id": f"call_h{i}", "user_id": user_id, "state": state, "created_at": datetime(2026, 3, i + 1, tzinfo=timezone.utc)}
+                for i, state in enumerate([CallState.COMPLETED, CallState.ESCALATED, CallState.COMPLETED])
+            ],
+        )
+
+    completed = _all_pages(api_request, f"/call-history/{user_id}", limit=1, state="COMPLETED")
+    assert [r["id"] for p in completed for r in p] == ["call_h2", "call_h0"]
+    march_2 = api_request("GET", f"/call-history/{user_id}", params={"since": "2026-03-02", "until": "2026-03-03"}).json()
+    assert [r["id"] for r in march_2] == ["call_h1"]
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "WzFd"])  # garbage; a one-key cursor for a two-key sort
+def test_bad_cursor_is_rejected(app_ctx, api_request, cursor):
+    response = api_request("GET", "/campaigns", params={"cursor": cursor})
+
+    assert response.status_code == 400
+
+
+def test_limit_is_bounded(app_ctx, api_request):
+    pagination = importlib.import_module("pagination")
+
+    assert api_request("GET", "/campaigns", params={"limit": pagination.PAGE_MAX_LIMIT + 1}).status_code == 422
+    assert api_request("GET", "/campaigns", params={"limit": 0}).status_code == 422
+
+
+def test_migration_backfills_call_escalation_ids(app_ctx):
+    _add_calls(app_ctx, 1, escalation_id="esc_old")
+    database = importlib.import_module("database")
+
+    with database.engine.begin() as conn:
+        conn.execute(text("UPDATE campaign_calls SET escalation_id = NULL"))
+        database._add_list_indexes(conn)
+        backfilled = dict(conn.execute(text("SELECT id, escalation_id FROM campaign_calls")).all())
+
+    assert backfilled == {"call_demo_001": None, "call_page_000": "esc_old"}
+
+
+@sqlite_only
+def test_user_pages_use_the_created_index(app_ctx):
+    database = importlib.import_module("database")
+
+    with database.engine.connect() as conn:
+        plan = " ".join(row[-1] for row in conn.execute(text(
+            "EXPLAIN QUERY PLAN SELECT * FROM users WHERE campaign_id = 'c' ORDER BY created_at DESC, id DESC LIMIT 3"
+        )))
+    assert "ix_users_campaign_created" in plan
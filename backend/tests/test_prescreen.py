@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import pytest
+
+from models import TriageClassification, TriageResult
+from prescreen import PrescreenStats, TfidfScreen, local_analysis, prescreen_transcript
+
+
+def _history(*patient_lines: str) -> list[dict[str, str]]:
+    history = []
+    for line in patient_lines:
+        history.append({"role": "assistant", "content": "How are you feeling today?"})
+        history.append({"role": "user", "content": line})
+    return history
+
+
+@pytest.mark.parametrize(
+    ("lines", "route"),
+    [
+        (("I'm fine, thanks, bye",), "local"),
+        (("Yes I did my exercises", "The swelling is going down, thank you"), "local"),
+        (("I am doing okay. I walked to the mailbox and did the exercises my therapist showed me. " * 4,), "cheap"),
+        (("My leg is swollen and hot to the touch",), "full"),
+        (("I'm upset nobody called me back",), "full"),
+        (("I fell last night but I'm fine",), "full"),
+        (("Hmm",), "full"),
+        (("I am not doing well today",), "full"),
+        (("Not good, thanks",), "full"),
+        (("I don't feel so good",), "full"),
+        (("Never been better, thanks",), "local"),
+        (("good thanks. my ankle is purple and numb",), "full"),
+        (("fine thanks, I haven't eaten in three days",), "full"),
+        ((), "full"),
+    ],
+)
+def test_prescreen_routes(lines, route):
+    assert prescreen_transcript(_history(*lines), []).route == route
+
+
+def test_prescreen_flags_negated_wellbeing():
+    screen = prescreen_transcript(_history("Not good, thanks"), [])
+
+    assert screen.negative_markers == ["not good"]
+    assert screen.reason == "Negative sentiment markers: not good"
+    assert local_analysis(_history("Not good, thanks"))["sentiment_score"] == 3
+
+
+def test_prescreen_needs_routine_vocabulary_and_margin():
+    unfamiliar = prescreen_transcript(_history("fine thanks, I haven't eaten in three days"), [])
+    assert unfamiliar.route == "full"
+    assert unfamiliar.routine_score > 2 * unfamiliar.concern_score  # TF-IDF alone would call it routine
+    assert unfamiliar.routine_coverage < 0.5
+    assert unfamiliar.reason.startswith("Unfamiliar wording")
+
+    close = prescreen_transcript(_history("good thanks. my ankle is purple and numb"), [])
+    assert close.route == "full" and close.reason.startswith("Ambiguous")
+
+    routine = prescreen_transcript(_history("All good, see you next week"), [])
+    assert (routine.route, routine.routine_coverage) == ("local", 1.0)
+
+
+def test_prescreen_checks_campaign_keywords():
+    screen = prescreen_transcript(_history("All good, a little fever yesterday"), ["fever"])
+
+    assert screen.route == "full"
+    assert screen.keyword_hits == ["fever"]
+
+
+def test_tfidf_screen_scores_nearest_exemplar():
+    screen = TfidfScreen(("chest pain",), ("all good",))
+
+    assert screen.score("chest pain") == pytest.approx((1.0, 0.0))
+    assert screen.score("unknown words") == (0.0, 0.0)
+
+
+def test_local_analysis_matches_process_transcript_shape():
+    result = local_analysis(_history("Doing great, thanks"))
+
+    assert set(result) == {"summary", "sentiment_score", "detected_flags", "recommended_action"}
+    assert result["sentiment_score"] == 4
+    assert result["detected_flags"] == []
+
+
+def test_stats_estimate_seconds_saved():
+    stats = PrescreenStats()
+    stats.record("local")
+    stats.observe_llm("full", 4.0)
+    stats.record("full")
+    stats.observe_llm("cheap", 1.0)
+    stats.record("cheap")
+    stats.record("local")
+
+    snap = stats.snapshot()
+    assert snap["routes"] == {"local": 2, "cheap": 1, "full": 1}
+    assert snap["llm_calls_saved"] == 2
+    assert snap["full_model_calls_saved"] == 3
+    # 6.0 s estimate before any measurement, then 3.0 (cheap vs full) and 4.0 (measured full).
+    assert snap["seconds_saved"] == pytest.approx(13.0)
+
+
+def _post_speech_call(api_request, call_id: str, text: str):
+    return api_request(
+        "POST",
+        "/webhooks/smallest/post-call",
+        json={
+            "call_id": call_id,
+            "user_id": "usr_prescreen",
+            "campaign_id": "cmp_demo_001",
+            "status": "completed",
+            "audio_metrics": {"avg_db": -20, "peak_db": -8, "speech_probability": 0.8},
+            "transcript": [
+                {"speaker": "agent", "text": "How are you feeling today?", "start": 0, "end": 2},
+                {"speaker": "user", "text": text, "start": 2, "end": 4},
+            ],
+        },
+    )
+
+
+@pytest.fixture()
+def speech_triage(app_ctx, monkeypatch):
+    monkeypatch.setattr(
+        app_ctx,
+        "analyze_vitals",
+        lambda payload: TriageResult(
+            classification=TriageClassification.SPEECH_DETECTED,
+            reason="Speech present",
+            action="ANALYZE_TRANSCRIPT",
+            escalate=False,
+        ),
+    )
+    models = []
+
+    def fake_process_transcript(history, keywords, model="analysis"):
+        models.append(model)
+        return {"summary": "LLM summary", "sentiment_score": 3, "detected_flags": [], "recommended_action": "Follow up"}
+
+    monkeypatch.setattr(app_ctx, "process_transcript", fake_process_transcript)
+    return models
+
+
+def test_routine_call_skips_llm(app_ctx, api_request, speech_triage):
+    response = _post_speech_call(api_request, "smallest_prescreen_local", "I'm fine, thanks, bye")
+
+    assert response.status_code == 200
+    assert "local pre-screen" in response.json()["summary"]
+    assert speech_triage == []
+
+    stats = api_request("GET", "/debug/prescreen").json()
+    assert stats["routes"]["local"] == 1
+    assert stats["llm_calls_saved"] == 1
+    assert stats["seconds_saved"] > 0
+
+
+def test_concerning_call_gets_full_analysis(app_ctx, api_request, speech_triage):
+    response = _post_speech_call(api_request, "smallest_prescreen_full", "I have a fever and chills")
+
+    assert response.json()["summary"] == "LLM summary"
+    assert speech_triage == ["analysis"]
+    assert api_request("GET", "/debug/prescreen").json()["routes"]["full"] == 1
+
+
+def test_long_routine_call_uses_cheap_model(app_ctx, api_request, speech_triage):
+    text = "I am doing okay. I walked to the mailbox and did the exercises my therapist showed me. " * 4
+    _post_speech_call(api_request, "smallest_prescreen_cheap", text)
+
+    assert speech_triage == [app_ctx.PRESCREEN_CHEAP_MODEL]
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+import triage
+from database import CallRecord
+from models import CallState, TriageRuleConfig
+from triage_rules import DEFAULT_CONFIG, DEFAULT_PARAMS, DEFAULT_RULE_SET, CompiledRules, rule_registry
+from test_webhooks import (
+    make_distress_keyword_payload,
+    make_normal_speech_payload,
+    make_shower_noise_payload,
+    make_silent_emergency_payload,
+)
+
+
+@pytest.fixture()
+def raised_speech_threshold():
+    # Raising the speech threshold turns the normal-speech calls into ambiguous retries.
+    tuned = DEFAULT_RULE_SET.model_copy(update={"params": {**DEFAULT_PARAMS, "speech_probability": 0.9}})
+    rule_registry.install(TriageRuleConfig(default=tuned))
+    yield
+    rule_registry.install(DEFAULT_CONFIG)
+
+
+def _seed_calls(app_ctx, count: int = 12, campaign_id=None) -> None:
+    factories = [make_shower_noise_payload, make_silent_emergency_payload, make_normal_speech_payload, make_distress_keyword_payload]
+    db = app_ctx.SessionLocal()
+    try:
+        for i in range(count):
+            payload = factories[i % len(factories)]()
+            result = triage.analyze_vitals(payload, CompiledRules(DEFAULT_RULE_SET))
+            db.add(
+                CallRecord(
+                    id=f"call_{i:04d}",
+                    user_id="usr_retriage",
+                    campaign_id=campaign_id,
+                    state=CallState.ESCALATED if result.escalate else CallState.COMPLETED,
+                    triage_classification=result.classification.value,
+                    triage_reason=result.reason,
+                    triage_input=triage.triage_input_json(payload),
+                )
+            )
+        # Calls triaged before inputs were stored are skipped.
+        db.add(CallRecord(id="call_legacy", user_id="usr_retriage", state=CallState.COMPLETED))
+        db.commit()
+    finally:
+        db.close()
+
+
+def _read_report(path) -> list[dict]:
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_retriage_unchanged_rules_report_nothing(app_ctx, tmp_path):
+    import retriage
+
+    _seed_calls(app_ctx)
+    progress = retriage.run_retriage(tmp_path / "report.jsonl", chunk_size=5)
+
+    assert progress.scanned == 12
+    assert progress.changed == 0
+    assert progress.done is True
+    assert _read_report(tmp_path / "report.jsonl") == []
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_retriage_reports_and_applies_threshold_change(app_ctx, tmp_path, raised_speech_threshold, workers):
+    import retriage
+
+    _seed_calls(app_ctx)
+
+    progress = retriage.run_retriage(tmp_path / "report.jsonl", apply=True, workers=workers, chunk_size=4)
+
+    report = _read_report(tmp_path / "report.jsonl")
+    assert progress.changed == len(report) == 3
+    assert progress.transitions == {"SPEECH_DETECTED->BACKGROUND_NOISE": 3}
+    assert progress.escalations_added == progress.escalations_cleared == 0
+    assert [r["call_id"] for r in report] == ["call_0002", "call_0006", "call_0010"]
+
+    db = app_ctx.SessionLocal()
+    try:
+        rec = db.query(CallRecord).filter(CallRecord.id == "call_0002").one()
+        assert rec.triage_classification == "BACKGROUND_NOISE"
+        assert rec.state == CallState.COMPLETED
+    finally:
+        db.close()
+
+
+def test_retriage_applies_campaign_overrides(app_ctx, tmp_path):
+    import retriage
+
+    _seed_calls(app_ctx, count=4, campaign_id="cmp_strict")
+    rule_registry.install(TriageRuleConfig(default=DEFAULT_RULE_SET, campaigns={"cmp_strict": {"speech_probability": 0.9}}))
+    try:
+        progress = retriage.run_retriage(tmp_path / "report.jsonl")
+    finally:
+        rule_registry.install(DEFAULT_CONFIG)
+
+    assert progress.transitions == {"SPEECH_DETECTED->BACKGROUND_NOISE": 1}
+    assert [r["call_id"] for r in _read_report(tmp_path / "report.jsonl")] == ["call_0002"]
+
+
+def test_retriage_resumes_after_interruption(app_ctx, tmp_path, monkeypatch, raised_speech_threshold):
+    import retriage
+
+    _seed_calls(app_ctx)
+
+    real_rows = retriage.retriage_rows
+    calls = {"n": 0}
+
+    def flaky_rows(rows):
+        calls["n"] += 1
+        if calls["n"] == 3:
+            raise KeyboardInterrupt
+        return real_rows(rows)
+
+    monkeypatch.setattr(retriage, "retriage_rows", flaky_rows)
+    with pytest.raises(KeyboardInterrupt):
+        retriage.run_retriage(tmp_path / "report.jsonl", chunk_size=4)
+
+    checkpoint = json.loads((tmp_path / "report.checkpoint.json").read_text())
+    assert checkpoint["last_id"] == "call_0007"
+    assert checkpoint["done"] is False
+
+    monkeypatch.setattr(retriage, "retriage_rows", real_rows)
+    progress = retriage.run_retriage(tmp_path / "report.jsonl", resume=True, chunk_size=4)
+
+    assert progress.scanned == 12
+    assert [r["call_id"] for r in _read_report(tmp_path / "report.jsonl")] == ["call_0002", "call_0006", "call_0010"]
+
+
+def test_post_call_webhook_stores_triage_input(app_ctx, api_request):
+    payload = make_shower_noise_payload()
+    response = api_request("POST", "/webhooks/smallest/post-call", json=payload.model_dump(mode="json"))
+    assert response.status_code == 200
+
+    db = app_ctx.SessionLocal()
+    try:
+        rec = db.query(CallRecord).filter(CallRecord.smallest_call_id == payload.call_id).one()
+        stored = json.loads(rec.triage_input)
+    finally:
+        db.close()
+    assert stored["audio_metrics"]["avg_db"] == payload.audio_metrics.avg_db
+    assert triage.analyze_vitals(triage.payload_from_triage_input(rec.id, rec.user_id, rec.triage_input)).classification.value == rec.triage_classification
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import asyncio
+import importlib
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, text
+
+from models import CallState
+
+TODAY = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+BUSY_METRICS = {"avg_db": 0, "peak_db": 0, "speech_probability": 0, "silence_duration_sec": 0, "call_duration_sec": 0}
+
+
+def _add_call(app_ctx, call_id: str, created_at=None, campaign_id="cmp_roll", **fields):
+    db = app_ctx.SessionLocal()
+    try:
+        db.add(app_ctx.DBCallRecord(id=call_id, user_id="usr_roll", campaign_id=campaign_id, created_at=created_at, **fields))
+        db.commit()
+    finally:
+        db.close()
+
+
+def _analytics(api_request, **params) -> dict:
+    response = api_request("GET", "/analytics", params=params)
+    assert response.status_code == 200
+    return response.json()
+
+
+def _rebuilt(app_ctx, api_request, **params) -> dict:
+    importlib.import_module("rollups").rebuild_rollups()
+    return _analytics(api_request, **params)
+
+
+def test_webhook_and_scheduler_writes_move_calls_between_buckets(app_ctx, api_request):
+    _add_call(app_ctx, "call_roll_1", smallest_call_id="smallest_roll_1")
+    _add_call(app_ctx, "call_roll_2", sentiment_score=4, state=CallState.COMPLETED)
+
+    bucket = _analytics(api_request, campaign_id="cmp_roll")["buckets"]
+    assert [(b["day"], b["calls"], b["completed"], b["retried"]) for b in bucket] == [(TODAY, 2, 1, 0)]
+
+    busy = api_request("POST", "/webhooks/smallest/post-call", json={
+        "call_id": "smallest_roll_1", "user_id": "usr_roll", "status": "busy", "audio_metrics": BUSY_METRICS,
+    })
+    assert busy.json()["status"] == "retry_scheduled"
+    report = _analytics(api_request, campaign_id="cmp_roll")
+    assert report["totals"]["retried"] == 1 and report["totals"]["completed"] == 1
+
+    # The scheduler escalates a call whose retries ran out.
+    scheduler = importlib.import_module("scheduler")
+
+    async def exhaust():
+        async with scheduler.AsyncSessionLocal() as db:
+            call = await db.scalar(select(scheduler.CallRecord).where(scheduler.CallRecord.id == "call_roll_1"))
+            call.retry_count = call.max_retries - 1
+            await scheduler.schedule_retry(call, 5, db)
+            await db.commit()
+
+    asyncio.run(exhaust())
+    totals = _analytics(api_request, campaign_id="cmp_roll")["totals"]
+    assert (totals["calls"], totals["completed"], totals["escalated"], totals["retried"]) == (2, 1, 1, 0)
+    assert totals["escalation_rate"] == 0.5 and totals["avg_sentiment"] == 4.0
+
+    # Incremental totals match a rebuild from history.
+    before = _analytics(api_request)
+    assert _rebuilt(app_ctx, api_request) == before
+
+
+def test_ended_campaign_conversations_are_counted(app_ctx, api_request):
+    campaign_id = next(iter(app_ctx.store["campaigns"]))
+    before = _analytics(api_request, campaign_id=campaign_id, group_by="campaign")["totals"]
+
+    for message in ("Emergency and chest pain", "Feeling fine today"):
+        conversation_id = api_request("POST", "/campaigns/conversations/create", params={"campaign_id": campaign_id}).json()["id"]
+        api_request("POST", f"/campaigns/{campaign_id}/{conversation_id}", params={"message": message})
+        api_request("POST", f"/campaigns/{campaign_id}/{conversation_id}/end")
+
+    after = _analytics(api_request, campaign_id=campaign_id, group_by="campaign")
+    assert [b["campaign_id"] for b in after["buckets"]] == [campaign_id]
+    assert after["totals"]["calls"] == before["calls"] + 2
+    assert after["totals"]["escalated"] == before["escalated"] + 1
+    assert after["totals"]["completed"] == before["completed"] + 1
+    assert _rebuilt(app_ctx, api_request, campaign_id=campaign_id, group_by="campaign") == after
+
+
+def test_triage_mix_grouping_and_day_filters(app_ctx, api_request):
+    day_one = datetime(2026, 3, 1, 9, tzinfo=timezone.utc)
+    _add_call(app_ctx, "call_mix_1", day_one, triage_classification="SPEECH_DETECTED", state=CallState.COMPLETED)
+    _add_call(app_ctx, "call_mix_2", day_one, triage_classification="CRITICAL_SILENCE", state=CallState.ESCALATED)
+    _add_call(app_ctx, "call_mix_3", day_one + timedelta(days=1), campaign_id="cmp_other", triage_classification="SPEECH_DETECTED")
+
+    report = _analytics(api_request, since="2026-03-01", until="2026-03-03", group_by="day")
+    assert [(b["day"], b["campaign_id"], b["calls"], b["triage"]) for b in report["buckets"]] == [
+        ("2026-03-01", None, 2, {"CRITICAL_SILENCE": 1, "SPEECH_DETECTED": 1}),
+        ("2026-03-02", None, 1, {"SPEECH_DETECTED": 1}),
+    ]
+    assert report["totals"]["triage"] == {"CRITICAL_SILENCE": 1, "SPEECH_DETECTED": 2}
+    first_day = _analytics(api_request, since="2026-03-01", until="2026-03-02")
+    assert [(b["campaign_id"], b["day"]) for b in first_day["buckets"]] == [("cmp_roll", "2026-03-01")]
+    assert api_request("GET", "/analytics", params={"group_by": "week"}).status_code == 422
+
+
+def test_rebuild_counts_archived_calls_once(app_ctx, api_request):
+    archive = importlib.import_module("archive")
+    now = datetime.now(timezone.utc)
+    _add_call(app_ctx, "call_old_1", now - timedelta(days=400), state=CallState.COMPLETED, sentiment_score=2)
+    _add_call(app_ctx, "call_old_2", now - timedelta(days=399), state=CallState.ESCALATED)
+    _add_call(app_ctx, "call_new", now)
+    incremental = _analytics(api_request, campaign_id="cmp_roll")
+
+    assert archive.archive_calls(retention_days=365).archived == 2
+    assert _analytics(api_request, campaign_id="cmp_roll") == incremental  # archiving keeps the totals
+
+    # Drifted totals (a hand-run UPDATE) are repaired from the database plus the archive.
+    with importlib.import_module("database").engine.begin() as conn:
+        conn.execute(text("UPDATE call_rollups SET calls = calls + 7"))
+    result = importlib.import_module("rollups").rebuild_rollups()
+    assert result.archived_calls == 2
+    assert _analytics(api_request, campaign_id="cmp_roll") == incremental
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import importlib
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import selectinload
+
+from models import CallState
+
+
+def _add_call(app_ctx, call_id: str, transcript=None, summary=None, flags=None, campaign_id="cmp_search", created_at=None):
+    db = app_ctx.SessionLocal()
+    try:
+        record = app_ctx.DBCallRecord(
+            id=call_id, user_id="usr_search", campaign_id=campaign_id, summary=summary, detected_flags=flags,
+            created_at=created_at, state=CallState.COMPLETED,
+        )
+        if transcript:
+            record.transcript_text = transcript
+        db.add(record)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _search(api_request, q: str, **params) -> list[dict]:
+    response = api_request("GET", "/search", params={"q": q, **params})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_outbound_calls_are_indexed_as_they_are_written(app_ctx, api_request):
+    _add_call(app_ctx, "call_s1", transcript="agent: How are you?\nuser: I have chest pain since last night")
+    _add_call(app_ctx, "call_s2", transcript="user: my knee is stiff", summary="Knee soreness, improving")
+
+    hits = _search(api_request, "chest pain")
+    assert [(h["call_id"], h["kind"], h["campaign_id"]) for h in hits] == [("call_s1", "outbound", "cmp_search")]
+    assert "<mark>chest</mark>" in hits[0]["snippet"] or "<mark>chest pain</mark>" in hits[0]["snippet"]
+
+    # A later summary update keeps the stored transcript searchable.
+    db = app_ctx.SessionLocal()
+    try:
+        call = db.get(app_ctx.DBCallRecord, "call_s1")
+        call.summary = "Reports chest pain"
+        call.detected_flags = ["chest pain"]
+        db.commit()
+    finally:
+        db.close()
+    hit = _search(api_request, "night")[0]
+    assert (hit["call_id"], hit["summary"], hit["detected_flags"]) == ("call_s1", "Reports chest pain", ["chest pain"])
+
+    # Replacing the transcript alone re-indexes it.
+    db = app_ctx.SessionLocal()
+    try:
+        call = db.scalar(
+            select(app_ctx.DBCallRecord).where(app_ctx.DBCallRecord.id == "call_s2").options(selectinload(app_ctx.DBCallRecord.transcript))
+        )
+        call.transcript_text = "user: the swelling in my ankle is worse"
+        db.commit()
+    finally:
+        db.close()
+    assert [h["call_id"] for h in _search(api_request, "ankle swelling")] == ["call_s2"]
+    assert [h["call_id"] for h in _search(api_request, "stiff")] == []
+    assert [h["call_id"] for h in _search(api_request, "knee", kind="outbound")] == ["call_s2"]  # still in the summary
+
+
+def test_ended_campaign_conversations_are_searchable(app_ctx, api_request):
+    campaign_id = next(iter(app_ctx.store["campaigns"]))
+    conversation_id = api_request("POST", "/campaigns/conversations/create", params={"campaign_id": campaign_id}).json()["id"]
+    api_request("POST", f"/campaigns/{campaign_id}/{conversation_id}", params={"message": "Emergency and chest pain"})
+    ended = api_request("POST", f"/campaigns/{campaign_id}/{conversation_id}/end").json()
+
+    hits = _search(api_request, "emergency", kind="campaign")
+    assert ended["call_id"] in [h["call_id"] for h in hits]
+    hit = next(h for h in hits if h["call_id"] == ended["call_id"])
+    assert hit["campaign_id"] == campaign_id and "chest pain" in hit["detected_flags"]
+    assert _search(api_request, "emergency", kind="outbound") == []
+
+
+def test_ranking_filters_and_pages(app_ctx, api_request):
+    now = datetime.now(timezone.utc)
+    _add_call(app_ctx, "call_mention", transcript="user: the fever broke yesterday, no other news", created_at=now - timedelta(days=2))
+    _add_call(app_ctx, "call_flagged", transcript="user: fever again", summary="Fever returned", flags=["fever"], created_at=now)
+    for i in range(3):
+        _add_call(app_ctx, f"call_other_{i}", transcript=f"user: slight fever number {i}", campaign_id="cmp_other", created_at=now)
+
+    hits = _search(api_request, "fever")
+    assert hits[0]["call_id"] == "call_flagged"  # flags and summary outweigh a transcript mention
+    assert [h["score"] for h in hits] == sorted((h["score"] for h in hits), reverse=True)
+
+    paged, cursor = [], None
+    while True:
+        response = api_request("GET", "/search", params={"q": "fever", "limit": 2, **({"cursor": cursor} if cursor else {})})
+        paged.extend(h["call_id"] for h in response.json())
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            break
+    assert paged == [h["call_id"] for h in hits] and len(paged) == 5
+
+    assert {h["call_id"] for h in _search(api_request, "fever", campaign_id="cmp_search")} == {"call_mention", "call_flagged"}
+    since = (now - timedelta(days=1)).isoformat()
+    assert "call_mention" not in {h["call_id"] for h in _search(api_request, "fever", since=since)}
+
+
+def test_query_syntax_is_taken_literally(app_ctx, api_request):
+    _add_call(app_ctx, "call_q", transcript="user: pain in my chest, short of breath")
+
+    assert [h["call_id"] for h in _search(api_request, 'chest: "pain^')] == ["call_q"]
+    assert [h["call_id"] for h in _search(api_request, "breath)(*")] == ["call_q"]
+    assert _search(api_request, '"breath pain"') == []  # phrases must appear in order
+    assert api_request("GET", "/search", params={"q": '"" ***'}).status_code == 400
+    assert api_request("GET", "/search", params={"q": "pain", "cursor": "nope"}).status_code == 400
+
+
+def test_snippets_escape_transcript_markup(app_ctx, api_request):
+    _add_call(app_ctx, "call_html", transcript='user: <script>alert("x")</script> my <b>wound</b> & stitches hurt')
+
+    snippet = _search(api_request, "wound")[0]["snippet"]
+
+    # SQLite keeps the tags as text (escaped); PostgreSQL's headline parser drops them.
+    assert "<script>" not in snippet and "<b>" not in snippet and "&amp;" in snippet
+    assert snippet.replace("<mark>", "").replace("</mark>", "").count("<") == 0
+    assert "<mark>wound</mark>" in snippet
+
+
+def test_archived_calls_leave_the_index_and_reindex_rebuilds_it(app_ctx, api_request):
+    archive = importlib.import_module("archive")
+    search = importlib.import_module("search")
+    now = datetime.now(timezone.utc)
+    _add_call(app_ctx, "call_arch_old", transcript="user: dizzy spells", created_at=now - timedelta(days=400))
+    _add_call(app_ctx, "call_arch_new", transcript="user: dizzy again", created_at=now)
+
+    assert archive.archive_calls(retention_days=365).archived == 1
+    assert [h["call_id"] for h in _search(api_request, "dizzy")] == ["call_arch_new"]
+
+    with importlib.import_module("database").engine.begin() as conn:
+        conn.execute(text("DELETE FROM search_documents"))
+    assert _search(api_request, "dizzy") == []
+    result = search.reindex()
+    assert result.calls >= 1 and result.documents >= 2  # the demo campaign call is indexed too
+    assert [h["call_id"] for h in _search(api_request, "dizzy")] == ["call_arch_new"]
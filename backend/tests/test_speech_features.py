@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import pytest
+
+from models import TranscriptSegment, TriageClassification, WordTimestamp
+from speech_features import WordTimings, compute_speech_features, transcript_speech_features
+from test_webhooks import make_normal_speech_payload, make_slurred_speech_payload
+from triage import analyze_vitals
+
+
+def _segment(speaker: str, words: list[tuple[float, float, float]]) -> TranscriptSegment:
+    return TranscriptSegment(
+        speaker=speaker,
+        text=" ".join("w" for _ in words),
+        word_timestamps=[WordTimestamp(word="w", start=s, end=e, confidence=c) for s, e, c in words],
+    )
+
+
+def test_word_timings_pack_only_patient_words():
+    transcript = [
+        _segment("agent", [(0.0, 0.5, 1.0), (0.6, 1.0, 1.0)]),
+        _segment("user", [(2.0, 2.4, 0.9), (2.5, 3.0, 0.3)]),
+    ]
+    timings = WordTimings.from_segments(transcript)
+
+    assert timings.count == 2
+    assert timings.start.tolist() == [2.0, 2.5]
+    assert timings.segment.tolist() == [1, 1]
+
+
+def test_features_measure_rate_pauses_and_confidence():
+    transcript = [
+        _segment("user", [(0.0, 0.5, 0.9), (0.5, 1.0, 0.9), (3.0, 3.5, 0.2), (3.6, 4.0, 0.9)]),
+        _segment("agent", [(5.0, 6.0, 1.0)]),
+        # The gap between turns (4.0s → 10.0s) is the agent talking, not a pause.
+        _segment("user", [(10.0, 10.5, 0.5), (11.5, 12.0, 0.9)]),
+    ]
+    features = transcript_speech_features(transcript)
+
+    assert features.word_count == 6
+    assert features.speaking_sec == pytest.approx(6.0)
+    assert features.speech_rate_wpm == pytest.approx(60.0)
+    assert features.pause_count == 2
+    assert features.longest_gap_sec == pytest.approx(2.0)
+    assert features.mean_pause_sec == pytest.approx(1.5)
+    assert features.low_confidence_ratio == pytest.approx(2 / 6, abs=1e-3)
+
+
+def test_features_empty_without_word_timestamps():
+    features = compute_speech_features(WordTimings.from_segments(make_normal_speech_payload().transcript))
+
+    assert features.word_count == 0
+    assert features.speech_rate_wpm == 0.0
+
+
+def test_slurred_speech_escalates_with_features():
+    result = analyze_vitals(make_slurred_speech_payload())
+
+    assert result.classification == TriageClassification.IMPAIRED_SPEECH
+    assert result.escalate is True
+    assert result.speech_features is not None
+    assert result.speech_features.low_confidence_ratio > 0.4
+
+
+def test_short_answers_do_not_trip_speech_rules():
+    payload = make_normal_speech_payload()
+    payload.transcript[1] = _segment("user", [(4.0, 4.5, 0.2), (6.0, 6.5, 0.2), (8.0, 8.5, 0.2)])
+
+    result = analyze_vitals(payload)
+
+    assert result.classification == TriageClassification.SPEECH_DETECTED
+    assert result.speech_features.word_count == 3
+
+
+def test_zero_length_word_timings_are_not_slow_speech():
+    payload = make_normal_speech_payload()
+    # Twelve words all stamped at the same instant: no speaking time, so no rate.
+    payload.transcript[1] = _segment("user", [(4.0, 4.0, 0.9)] * 12)
+
+    result = analyze_vitals(payload)
+
+    assert result.speech_features.word_count == 12
+    assert result.speech_features.speech_rate_wpm == 0.0
+    assert result.classification == TriageClassification.SPEECH_DETECTED
+    assert result.escalate is False
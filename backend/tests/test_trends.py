@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import pytest
+
+from models import TriageClassification, TriageResult
+from trends import extract_pain_level, record_call, update_series
+
+
+def test_update_series_tracks_level_and_slope():
+    series = None
+    for value in (3, 5, 7):
+        series = update_series(series, value)
+
+    assert series.count == 3
+    assert series.last == 7
+    assert series.level == pytest.approx(5.75)
+    assert series.slope == pytest.approx(1.125)
+
+
+def test_extract_pain_level_takes_last_mention():
+    assert extract_pain_level(["It was 3/10 yesterday", "today it's about a 6 out of 10"]) == 6
+    assert extract_pain_level(["Feeling fine, thanks"]) is None
+    assert extract_pain_level(["10/10, the worst ever"]) == 10
+
+
+def test_record_call_alerts_once_per_episode():
+    trends = {}
+    raised = [record_call(trends, "p1", sentiment=s, pain=p, flags=0) for s, p in [(4, 3), (3, 5), (2, 7)]]
+
+    assert raised[:2] == [[], []]
+    assert set(raised[2]) == {"pain_rising", "sentiment_declining"}
+    # Still deteriorating: no second escalation for the same episode.
+    assert record_call(trends, "p1", sentiment=1, pain=9, flags=0) == []
+    assert trends["p1"].calls == 4
+    assert trends["p1"].active_alerts == ["pain_rising", "sentiment_declining"]
+
+
+def test_record_call_skips_missing_measurements():
+    trends = {}
+    record_call(trends, "p1", pain=5)
+    record_call(trends, "p1", sentiment=4)
+
+    assert trends["p1"].pain.count == 1
+    assert trends["p1"].sentiment.count == 1
+    assert trends["p1"].flags is None
+
+
+def test_seeded_pain_history_is_folded_in(app_ctx, api_request):
+    response = api_request("GET", "/trends/cmp_demo_001")
+
+    assert response.status_code == 200
+    trend = response.json()
+    # Two previous calls (7/10, 5/10) plus the demo call (4/10).
+    assert trend["pain"]["count"] == 3
+    assert trend["pain"]["slope"] < 0
+    assert trend["active_alerts"] == []
+    assert api_request("GET", "/trends/unknown").status_code == 404
+
+
+def test_end_call_escalates_on_rising_pain(app_ctx, api_request):
+    campaign_id = "cmp_demo_002"  # seeded with one previous call at 6/10
+    ends = []
+    for pain in (8, 10):
+        conv = api_request("POST", "/campaigns/conversations/create", params={"campaign_id": campaign_id}).json()
+        api_request("POST", f"/campaigns/{campaign_id}/{conv['id']}", params={"message": f"My pain is {pain}/10 today"})
+        ends.append(api_request("POST", f"/campaigns/{campaign_id}/{conv['id']}/end").json())
+
+    assert ends[0]["escalation_id"] is None
+    assert ends[1]["escalation_id"] is not None
+    escalation = app_ctx.store["escalations"][ends[1]["escalation_id"]]
+    assert escalation["detected_flags"] == ["pain_rising"]
+    assert escalation["reason"].startswith("Deteriorating trend: Pain rising")
+
+    trends = api_request("GET", "/trends").json()
+    assert trends[0]["patient_id"] == campaign_id
+    assert trends[0]["active_alerts"] == ["pain_rising"]
+
+
+def test_post_call_webhook_updates_user_trend(app_ctx, api_request, monkeypatch):
+    user = api_request("POST", "/users", json={"name": "Ada", "phone": "+1-555-0101", "campaign_id": "cmp_demo_001"}).json()
+    sms = []
+    monkeypatch.setattr(app_ctx, "send_escalation_sms", lambda **kwargs: sms.append(kwargs))
+    monkeypatch.setattr(
+        app_ctx,
+        "analyze_vitals",
+        lambda payload: TriageResult(
+            classification=TriageClassification.SPEECH_DETECTED,
+            reason="Speech present",
+            action="ANALYZE_TRANSCRIPT",
+            escalate=False,
+        ),
+    )
+    scores = iter([5, 3, 1])
+    monkeypatch.setattr(
+        app_ctx,
+        "process_transcript",
+        lambda history, keywords: {
+            "summary": "Check-in",
+            "sentiment_score": next(scores),
+            "detected_flags": [],
+            "recommended_action": "Follow up",
+        },
+    )
+
+    for i in range(3):
+        response = api_request(
+            "POST",
+            "/webhooks/smallest/post-call",
+            json={
+                "call_id": f"smallest_trend_{i}",
+                "user_id": user["id"],
+                "campaign_id": "cmp_demo_001",
+                "status": "completed",
+                "audio_metrics": {"avg_db": -20, "peak_db": -8, "speech_probability": 0.8},
+                "transcript": [{"speaker": "user", "text": "I feel worse than last time", "start": 0, "end": 2}],
+            },
+        )
+        assert response.status_code == 200
+
+    trend = api_request("GET", f"/trends/{user['id']}").json()
+    assert trend["sentiment"]["count"] == 3
+    assert trend["pain"] is None
+    assert trend["active_alerts"] == ["sentiment_declining"]
+    assert len(sms) == 1
+    assert "Sentiment declining" in sms[0]["triage_reason"]
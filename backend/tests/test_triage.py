@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import itertools
+
+import numpy as np
+
+from keywords import KeywordAutomaton, KeywordHit, compile_keywords
+from models import AudioMetrics, EmotionDetection, SmallestAIPostCallPayload, TranscriptSegment
+from test_webhooks import SCENARIOS
+from triage import (
+    DISTRESS_KEYWORDS,
+    LiveDistressMatcher,
+    _check_distress_keywords,
+    analyze_vitals,
+    analyze_vitals_batch,
+    payloads_to_columns,
+)
+
+
+def test_live_matcher_catches_keyword_split_across_feeds():
+    matcher = LiveDistressMatcher(DISTRESS_KEYWORDS)
+
+    assert matcher.feed("I feel like I can't") == []
+    assert matcher.feed("breathe very well") == ["can't breathe"]
+
+
+def test_live_matcher_tail_keeps_word_boundaries():
+    matcher = LiveDistressMatcher(DISTRESS_KEYWORDS)
+
+    # "whelp" ends the first turn; its tail must not read as "help" next turn.
+    assert matcher.feed("the dog is a whelp at homes") == []
+    assert matcher.feed("I am doing great today") == []
+
+    split = LiveDistressMatcher(["chest pain", "help"])
+    assert split.feed("there is a whelp and some chest") == []
+    assert split.feed("pain now") == ["chest pain"]
+    assert split.feed("a whelping box") == []
+
+
+def test_live_matcher_reports_each_keyword_once():
+    matcher = LiveDistressMatcher(["bleeding", "fever"])
+
+    assert matcher.feed("there is some bleeding") == ["bleeding"]
+    assert matcher.feed("still bleeding, and a fever now") == ["fever"]
+    assert matcher.feed("bleeding and fever") == []
+    assert matcher.matched == ["bleeding", "fever"]
+
+
+def test_automaton_respects_word_boundaries():
+    automaton = KeywordAutomaton(["pop", "help", "hurt"])
+
+    assert automaton.scan("a popular and helpful app") == []
+    assert [h.keyword for h in automaton.scan("It hurts when I hear a pop. Help!")] == ["hurt", "pop", "help"]
+
+
+def test_automaton_reports_overlapping_hits_with_segment_positions():
+    automaton = KeywordAutomaton(["pain", "chest pain", "fever"])
+
+    hits = automaton.scan_segments(["No fever today.", "Some Chest Pain though"])
+
+    assert hits == [
+        KeywordHit("fever", 0, 3, 8),
+        KeywordHit("chest pain", 1, 5, 15),
+        KeywordHit("pain", 1, 11, 15),
+    ]
+
+
+def test_compile_keywords_is_cached_per_keyword_tuple():
+    assert compile_keywords(("fever", "911")) is compile_keywords(("fever", "911"))
+
+
+def test_distress_keywords_returns_earliest_hit():
+    transcript = [
+        TranscriptSegment(speaker="agent", text="Anything helpful I can do?"),
+        TranscriptSegment(speaker="user", text="I fell and now I’m bleeding"),
+    ]
+    assert _check_distress_keywords(transcript) == "fell"
+
+
+def _grid_payloads() -> list[SmallestAIPostCallPayload]:
+    payloads = []
+    grid = itertools.product(
+        [-65.0, -50.0, -42.0, -35.0, -30.0, -20.0, -15.0, 0.0],   # avg_db (incl. exact thresholds)
+        [-1.0, 5.0, 5.5, 12.0],                                     # peak_db offset above avg_db
+        [0.0, 0.01, 0.05, 0.2, 0.3, 0.85],                          # speech_probability
+        [None, ("fear", 0.5), ("pain", 0.51), ("joy", 0.9)],        # segment emotion
+        ["", "I am fine", "I fell down"],                           # user text
+    )
+    for i, (avg, peak_off, speech, emotion, text) in enumerate(grid):
+        segment = TranscriptSegment(
+            speaker="user",
+            text=text,
+            emotion=EmotionDetection(label=emotion[0], confidence=emotion[1]) if emotion else None,
+        )
+        payloads.append(
+            SmallestAIPostCallPayload(
+                call_id=f"grid_{i}",
+                user_id="usr_grid",
+                status="completed",
+                audio_metrics=AudioMetrics(avg_db=avg, peak_db=avg + peak_off, speech_probability=speech),
+                transcript=[segment],
+            )
+        )
+    return payloads
+
+
+def test_batch_triage_matches_scalar_path():
+    payloads = _grid_payloads() + [factory() for _, factory in SCENARIOS]
+
+    batch = analyze_vitals_batch(**payloads_to_columns(payloads))
+
+    for i, payload in enumerate(payloads):
+        expected = analyze_vitals(payload)
+        assert batch.classification[i] == expected.classification.value, payload.call_id
+        assert batch.action[i] == expected.action, payload.call_id
+        assert batch.retry_delay_minutes[i] == (expected.retry_delay_minutes or 0), payload.call_id
+        assert bool(batch.escalate[i]) == expected.escalate, payload.call_id
+
+
+def test_batch_triage_accepts_bare_metric_columns():
+    batch = analyze_vitals_batch(
+        avg_db=np.array([-15.0, -65.0, -25.0]),
+        peak_db=np.array([-8.0, -60.0, -10.0]),
+        speech_probability=np.array([0.08, 0.01, 0.85]),
+    )
+    assert batch.classification.tolist() == ["BACKGROUND_NOISE", "CRITICAL_SILENCE", "SPEECH_DETECTED"]
+    assert batch.retry_delay_minutes.tolist() == [20, 0, 0]
+    assert batch.escalate.tolist() == [False, True, False]
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import os
+
+import pytest
+
+import triage_rules
+from models import TriageClassification, TriageRuleConfig
+from test_webhooks import make_distress_keyword_payload, make_normal_speech_payload, make_shower_noise_payload
+from triage import analyze_vitals
+from triage_rules import DEFAULT_CONFIG, DEFAULT_PARAMS, DEFAULT_RULE_SET, CompiledRules, TriageRuleRegistry, rule_registry
+
+
+@pytest.fixture()
+def restore_rules():
+    yield
+    rule_registry.install(DEFAULT_CONFIG)
+
+
+def _config(**campaigns) -> TriageRuleConfig:
+    return TriageRuleConfig(default=DEFAULT_RULE_SET, campaigns=campaigns)
+
+
+def test_campaign_overrides_apply_only_to_that_campaign(restore_rules):
+    rule_registry.install(_config(cmp_noisy={"retry_noise_min": 45, "emotion_confidence": 0.9}))
+
+    payload = make_shower_noise_payload()
+    assert analyze_vitals(payload).retry_delay_minutes == 20
+
+    payload.campaign_id = "cmp_noisy"
+    assert analyze_vitals(payload).retry_delay_minutes == 45
+
+
+def test_campaigns_can_tune_the_emotion_and_keyword_bypasses(restore_rules):
+    from triage import analyze_vitals_batch, payloads_to_columns
+
+    calm = {"emotion_confidence": 1.0}  # the payload's pain emotion (0.7) no longer escalates on its own
+    rule_registry.install(_config(
+        cmp_default_kw=calm,
+        cmp_no_kw={**calm, "distress_keyword_min_hits": 0},
+        cmp_many_kw={**calm, "distress_keyword_min_hits": 4},
+    ))
+    payload = make_distress_keyword_payload()  # "fell", "pain" and "help"
+
+    assert analyze_vitals(payload).reason.startswith("Distress emotion")
+    payload.campaign_id = "cmp_default_kw"
+    assert analyze_vitals(payload).reason == "Distress keyword detected in transcript: 'fell'"
+    for campaign_id in ("cmp_no_kw", "cmp_many_kw"):
+        payload.campaign_id = campaign_id
+        result = analyze_vitals(payload)
+        assert (result.classification, result.escalate) == (TriageClassification.SPEECH_DETECTED, False)
+        batch = analyze_vitals_batch(**payloads_to_columns([payload]), rules=rule_registry.for_campaign(campaign_id))
+        assert batch.escalate.tolist() == [False]
+
+    three = CompiledRules(DEFAULT_RULE_SET, {**calm, "distress_keyword_min_hits": 3})
+    assert analyze_vitals(payload, three).reason == "Distress keyword detected in transcript: 'fell, pain, help'"
+    assert analyze_vitals_batch(**payloads_to_columns([payload]), rules=three).escalate.tolist() == [True]
+
+
+def test_unknown_override_keys_are_rejected(app_ctx, api_request, restore_rules):
+    with pytest.raises(ValueError, match="distres_keywords"):
+        _config(cmp_typo={"distres_keywords": 2})
+
+    current = api_request("GET", "/triage/rules").json()
+    current["campaigns"] = {"cmp_typo": {"distres_keywords": 2}}
+    response = api_request("PUT", "/triage/rules", json=current)
+    assert response.status_code == 422
+    assert "distres_keywords" in response.text
+    assert rule_registry.config.campaigns == {}
+
+
+def test_invalid_rule_sets_are_rejected():
+    no_fallback = DEFAULT_RULE_SET.model_copy(update={"rules": DEFAULT_RULE_SET.rules[:-1]})
+    with pytest.raises(ValueError, match="fallback"):
+        CompiledRules(no_fallback)
+
+    bad_param = DEFAULT_RULE_SET.model_copy(deep=True)
+    bad_param.rules[0].when[0].value = "no_such_param"
+    with pytest.raises(ValueError, match="no_such_param"):
+        CompiledRules(bad_param)
+
+    bad_reason = DEFAULT_RULE_SET.model_copy(deep=True)
+    bad_reason.rules[0].reason = "noise at {decibels}"
+    with pytest.raises(ValueError, match="reason template"):
+        CompiledRules(bad_reason)
+
+
+def test_rule_file_is_hot_reloaded(tmp_path, monkeypatch):
+    monkeypatch.setattr(triage_rules, "RULES_POLL_SEC", 0.0)
+    path = tmp_path / "rules.json"
+    path.write_text(_config().model_dump_json())
+    registry = TriageRuleRegistry(str(path))
+    payload = make_normal_speech_payload()
+
+    assert analyze_vitals(payload, registry.for_campaign(None)).classification == TriageClassification.SPEECH_DETECTED
+
+    tuned = DEFAULT_RULE_SET.model_copy(update={"version": "v2", "params": {**DEFAULT_PARAMS, "speech_probability": 0.9}})
+    path.write_text(TriageRuleConfig(default=tuned).model_dump_json())
+    os.utime(path, (1, 1))
+    rules = registry.for_campaign(None)
+    assert rules.version == "v2"
+    assert analyze_vitals(payload, rules).classification == TriageClassification.BACKGROUND_NOISE
+
+    # A broken edit keeps the last good rules in service.
+    path.write_text("{not json")
+    os.utime(path, (2, 2))
+    assert registry.for_campaign(None).version == "v2"
+
+
+def test_rules_endpoints_install_and_reject(app_ctx, api_request, restore_rules):
+    current = api_request("GET", "/triage/rules").json()
+    assert current["default"]["params"]["retry_ambiguous_min"] == 15
+
+    current["default"]["version"] = "v-api"
+    current["default"]["params"]["retry_ambiguous_min"] = 30
+    response = api_request("PUT", "/triage/rules", json=current)
+    assert response.status_code == 200
+    assert rule_registry.for_campaign(None).outcomes[-1].retry_delay_minutes == 30
+
+    current["default"]["rules"] = current["default"]["rules"][:-1]
+    response = api_request("PUT", "/triage/rules", json=current)
+    assert response.status_code == 400
+    assert rule_registry.for_campaign(None).version == "v-api"
+
+    assert api_request("POST", "/triage/rules/reload").status_code == 400
+
+
+def test_batch_path_uses_campaign_rules():
+    from triage import analyze_vitals_batch, payloads_to_columns
+
+    rules = CompiledRules(DEFAULT_RULE_SET, {"retry_noise_min": 45})
+    batch = analyze_vitals_batch(**payloads_to_columns([make_shower_noise_payload()]), rules=rules)
+    assert batch.retry_delay_minutes.tolist() == [45]
@@ -1,24 +1,60 @@
 from __future__ import annotations
 
+import base64
 import json
 
 
 class FakeResponse:
-    def __init__(self, status_code: int, json_body=None, text: str = "", content: bytes = b""):
+    def __init__(self, status_code: int, json_body=None, text: str = "", content: bytes = b"", chunks=None):
         self.status_code = status_code
         self._json_body = json_body
         self.text = text
         self.content = content
+        self.chunks = chunks if chunks is not None else [content]
 
     def json(self):
         if self._json_body is None:
             raise ValueError("No JSON body")
         return self._json_body
 
+    async def aread(self):
+        return self.content
+
+    async def aiter_bytes(self):
+        for chunk in self.chunks:
+            yield chunk
+
+    async def aiter_lines(self):
+        for line in self.text.splitlines():
+            yield line
+
+
+class FakeStream:
+    def __init__(self, response):
+        self.response = response
+
+    async def __aenter__(self):
+        if isinstance(self.response, Exception):
+            raise self.response
+        return self.response
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+
+def llm_stream(*deltas: str) -> FakeResponse:
+    """A streamed OpenRouter completion delivering `deltas` as SSE chunks."""
+    lines = [": OPENROUTER PROCESSING", ""]
+    for delta in deltas:
+        lines += ["data: " + json.dumps({"choices": [{"delta": {"content": delta}}]}), ""]
+    lines.append("data: [DONE]")
+    return FakeResponse(200, text="\n".join(lines))
+
 
 class FakeAsyncClient:
-    def __init__(self, queue):
+    def __init__(self, queue, sent=None):
         self.queue = queue
+        self.sent = sent if sent is not None else []
 
     async def __aenter__(self):
         return self
@@ -27,11 +63,20 @@ class FakeAsyncClient:
         return False
 
     async def post(self, url, headers=None, json=None, content=None):
+        self.sent.append({"url": url, "json": json})
         assert self.queue, f"No fake response queued for URL: {url}"
-        return self.queue.pop(0)
+        response = self.queue.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    def stream(self, method, url, headers=None, json=None):
+        self.sent.append({"url": url, "json": json})
+        assert self.queue, f"No fake response queued for URL: {url}"
+        return FakeStream(self.queue.pop(0))
 
 
-def patch_async_client(app_ctx, monkeypatch, queued):
+def patch_async_client(app_ctx, monkeypatch, queued, sent=None):
     """Patch httpx.AsyncClient without breaking ASGI test transport usage."""
     real_async_client = app_ctx.httpx.AsyncClient
 
@@ -40,7 +85,7 @@ def patch_async_client(app_ctx, monkeypatch, queued):
         if "transport" in kwargs:
             return real_async_client(*args, **kwargs)
         # Use fake client for outbound HTTP made by the endpoint itself.
-        return FakeAsyncClient(queued)
+        return FakeAsyncClient(queued, sent)
 
     monkeypatch.setattr(app_ctx.httpx, "AsyncClient", factory)
 
@@ -50,10 +95,7 @@ def test_voice_chat_initial_success(app_ctx, api_request, monkeypatch):
     app_ctx.SMALLEST_AI_API_KEY = "smallest-test"
 
     queued = [
-        FakeResponse(
-            200,
-            json_body={"choices": [{"message": {"content": "Hi there"}}]},
-        ),
+        llm_stream("Hi there"),
         FakeResponse(200, content=b"fake-mp3-bytes"),
     ]
 
@@ -143,3 +185,366 @@ def test_voice_summary_parses_json_from_model(app_ctx, api_request, monkeypatch)
     body = response.json()
     assert body["painLevel"] == 4
     assert body["summary"] == "Patient improving."
+
+
+def test_voice_session_keeps_history_server_side(app_ctx, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    app_ctx.OPENROUTER_API_KEY = "openrouter-test"
+    app_ctx.SMALLEST_AI_API_KEY = "smallest-test"
+
+    queued = [
+        llm_stream("Hi, how are you?"),
+        FakeResponse(200, content=b"greeting-mp3"),
+        FakeResponse(200, json_body={"transcription": "my knee is stiff"}),
+        llm_stream("Rate it 1 to 10?"),
+        FakeResponse(200, content=b"reply-mp3"),
+    ]
+    patch_async_client(app_ctx, monkeypatch, queued)
+
+    campaign_id = next(iter(app_ctx.store["campaigns"]))
+    client = TestClient(app_ctx.app)
+    with client.websocket_connect(f"/voice/session/{campaign_id}") as ws:
+        ws.send_json({"type": "start"})
+        greeting = ws.receive_json()
+        assert greeting == {"type": "reply", "text": "Hi, how are you?", "isEnding": False, "audio": True, "contentType": "audio/mpeg"}
+        assert ws.receive_bytes() == b"greeting-mp3"
+
+        ws.send_bytes(b"chunk-1")
+        ws.send_bytes(b"chunk-2")
+        ws.send_json({"type": "audio_end", "content_type": "audio/webm"})
+        assert ws.receive_json() == {"type": "transcription", "text": "my knee is stiff", "vad": None}
+        reply = ws.receive_json()
+        assert reply["text"] == "Rate it 1 to 10?"
+        assert ws.receive_bytes() == b"reply-mp3"
+
+        ws.send_json({"type": "end"})
+        ended = ws.receive_json()
+
+    assert ended["type"] == "ended"
+    assert [m["role"] for m in ended["history"]] == ["assistant", "user", "assistant"]
+    assert ended["history"][1]["content"] == "my knee is stiff"
+    assert not queued
+
+
+def test_voice_session_survives_upstream_timeout(app_ctx, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    app_ctx.OPENROUTER_API_KEY = "openrouter-test"
+    app_ctx.SMALLEST_AI_API_KEY = "smallest-test"
+
+    queued = [
+        app_ctx.httpx.ReadTimeout("LLM timed out"),
+        llm_stream("Hi, how are you?"),
+        FakeResponse(200, content=b"greeting-mp3"),
+    ]
+    patch_async_client(app_ctx, monkeypatch, queued)
+
+    campaign_id = next(iter(app_ctx.store["campaigns"]))
+    client = TestClient(app_ctx.app)
+    with client.websocket_connect(f"/voice/session/{campaign_id}") as ws:
+        ws.send_json({"type": "start"})
+        assert ws.receive_json() == {"type": "error", "detail": "Upstream request failed: ReadTimeout"}
+        ws.send_json({"type": "start"})
+        assert ws.receive_json()["text"] == "Hi, how are you?"
+        assert ws.receive_bytes() == b"greeting-mp3"
+        ws.send_json({"type": "end"})
+        assert ws.receive_json()["type"] == "ended"
+
+
+def test_voice_session_unknown_campaign(app_ctx):
+    from fastapi.testclient import TestClient
+
+    client = TestClient(app_ctx.app)
+    with client.websocket_connect("/voice/session/cmp_missing") as ws:
+        assert ws.receive_json() == {"type": "error", "detail": "Campaign not found"}
+
+
+def test_voice_transcribe_with_vad_reports_savings(app_ctx, api_request, monkeypatch):
+    import numpy as np
+
+    from audio import encode_wav
+
+    app_ctx.SMALLEST_AI_API_KEY = "smallest-test"
+    queued = [FakeResponse(200, json_body={"transcription": "hello"})]
+    patch_async_client(app_ctx, monkeypatch, queued)
+
+    rate = 16000
+    tone = 0.4 * np.sin(2 * np.pi * 220 * np.arange(rate) / rate)
+    samples = np.concatenate([np.zeros(2 * rate), tone, np.zeros(2 * rate)]).astype(np.float32)
+
+    response = api_request(
+        "POST",
+        "/voice/transcribe",
+        params={"vad": "true"},
+        headers={"content-type": "audio/wav"},
+        content=encode_wav(samples, rate),
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["transcription"] == "hello"
+    assert body["vad"]["trimmed"] is True
+    assert body["vad"]["bytes_saved"] > 0
+    assert body["vad"]["seconds_saved"] > 3.0
+
+
+def test_voice_chat_records_latency_trace(app_ctx, api_request, monkeypatch):
+    app_ctx.OPENROUTER_API_KEY = "openrouter-test"
+    app_ctx.SMALLEST_AI_API_KEY = "smallest-test"
+
+    sent: list[dict] = []
+    queued = [
+        llm_stream("Hi", " there"),
+        FakeResponse(200, chunks=[b"fake-", b"mp3-", b"bytes"]),
+    ]
+    patch_async_client(app_ctx, monkeypatch, queued, sent)
+
+    campaign_id = next(iter(app_ctx.store["campaigns"]))
+    reply = api_request(
+        "POST",
+        "/voice/chat",
+        json={"campaign_id": campaign_id, "trigger": "initial", "history": [], "conversation_id": "conv_trace_1"},
+    ).json()
+    assert reply["reply"] == "Hi there"
+    assert reply["audio"] == base64.b64encode(b"fake-mp3-bytes").decode()
+    assert sent[0]["json"]["stream"] is True
+
+    response = api_request("GET", "/debug/latency", params={"conversation_id": "conv_trace_1"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["stages"]["llm_total"]["count"] == 1
+    assert body["stages"]["tts_total"]["count"] == 1
+    turn = body["recent_turns"][0]
+    assert turn["campaign_id"] == campaign_id
+    spans = turn["spans"]
+    assert {"prompt_build", "llm_first_token", "llm_total", "tts_first_byte", "tts_total", "serialization"} <= set(spans)
+    assert spans["llm_first_token"] <= spans["llm_total"]
+    assert spans["tts_first_byte"] <= spans["tts_total"]
+    assert list(body["stages"]).index("llm_first_token") < list(body["stages"]).index("llm_total")
+
+
+def test_voice_chat_streamed_reply_detects_split_end_marker(app_ctx, api_request, monkeypatch):
+    app_ctx.OPENROUTER_API_KEY = "openrouter-test"
+    app_ctx.SMALLEST_AI_API_KEY = "smallest-test"
+
+    queued = [
+        llm_stream("Thanks, that's all for today. ", "[END_", "CALL]"),
+        FakeResponse(200, content=b"bye-mp3"),
+    ]
+    patch_async_client(app_ctx, monkeypatch, queued)
+
+    campaign_id = next(iter(app_ctx.store["campaigns"]))
+    body = api_request(
+        "POST", "/voice/chat", json={"campaign_id": campaign_id, "transcription": "I'm fine", "history": []},
+    ).json()
+    assert body["reply"] == "Thanks, that's all for today."
+    assert body["isEnding"] is True
+
+
+def test_voice_chat_surfaces_upstream_errors(app_ctx, api_request, monkeypatch):
+    app_ctx.OPENROUTER_API_KEY = "openrouter-test"
+    app_ctx.SMALLEST_AI_API_KEY = "smallest-test"
+
+    queued = [FakeResponse(429, text="rate limited")]
+    patch_async_client(app_ctx, monkeypatch, queued)
+    campaign_id = next(iter(app_ctx.store["campaigns"]))
+    response = api_request("POST", "/voice/chat", json={"campaign_id": campaign_id, "trigger": "initial"})
+    assert response.status_code == 429
+    assert response.json()["detail"] == "rate limited"
+
+    # A failed synthesis still returns the reply, without audio.
+    queued += [llm_stream("Hello"), FakeResponse(500, text="tts down")]
+    response = api_request("POST", "/voice/chat", json={"campaign_id": campaign_id, "trigger": "initial"})
+    assert response.status_code == 200
+    assert response.json()["reply"] == "Hello"
+    assert response.json()["audio"] is None
+
+
+def test_slow_turn_logged_with_breakdown(caplog, monkeypatch):
+    import tracing
+
+    monkeypatch.setattr(tracing, "SLOW_TURN_MS", 0.0)
+    tracer = tracing.LatencyTracer()
+    trace = tracer.start_turn("chat", "cmp_x", "conv_x")
+    trace.record("llm_total", 1234.0)
+
+    with caplog.at_level("WARNING", logger="tracing"):
+        tracer.finish(trace)
+
+    assert tracer.slow_turns == 1
+    assert "llm_total=1234ms" in caplog.text
+    snapshot = tracer.snapshot(campaign_id="cmp_x")
+    assert list(snapshot["stages"]) == ["llm_total", "turn_total"]
+    assert snapshot["stages"]["llm_total"]["p50_ms"] == 2000.0
+
+
+def test_tracer_snapshots_while_turns_finish(monkeypatch):
+    import sys
+    import threading
+
+    import tracing
+
+    monkeypatch.setattr(tracing, "SLOW_TURN_MS", float("inf"))
+    interval = sys.getswitchinterval()
+    tracer = tracing.LatencyTracer()
+    errors: list[BaseException] = []
+    done = threading.Event()
+
+    def finish_turns():
+        for i in range(2000):
+            trace = tracer.start_turn("chat", f"cmp_{i % 5}", f"conv_{i}")
+            trace.record("llm_total", float(i % 300))
+            tracer.finish(trace)
+
+    def snapshot_until_done():
+        try:
+            while not done.is_set():
+                tracer.snapshot(campaign_id="cmp_1")
+                tracer.snapshot()
+        except BaseException as e:  # pragma: no cover - only on a race
+            errors.append(e)
+
+    reader = threading.Thread(target=snapshot_until_done)
+    writers = [threading.Thread(target=finish_turns) for _ in range(4)]
+    sys.setswitchinterval(1e-6)  # switch threads often enough to interleave with the ring
+    try:
+        reader.start()
+        for t in writers:
+            t.start()
+        for t in writers:
+            t.join()
+        done.set()
+        reader.join()
+    finally:
+        sys.setswitchinterval(interval)
+
+    assert not errors
+    assert tracer.snapshot()["stages"]["turn_total"]["count"] == 8000
+
+
+def test_voice_chat_uses_campaign_audio_profile_and_cache(app_ctx, api_request, monkeypatch):
+    app_ctx.OPENROUTER_API_KEY = "openrouter-test"
+    app_ctx.SMALLEST_AI_API_KEY = "smallest-test"
+
+    created = api_request(
+        "POST",
+        "/campaigns/create",
+        json={
+            "name": "Phone campaign",
+            "agent_persona": "Nurse",
+            "conversation_goal": "Check in",
+            "system_prompt": "Be brief",
+            "recipients": [{"name": "Pat"}],
+            "audio_profile": "telephony",
+            "speech_speed": 1.2,
+        },
+    )
+    assert created.status_code == 200
+    campaign_id = created.json()["id"]
+
+    sent: list[dict] = []
+    queued = [
+        llm_stream("Hello"),
+        FakeResponse(200, content=b"mulaw-bytes"),
+        llm_stream("Hello"),
+        llm_stream("Hello"),
+        FakeResponse(200, content=b"mp3-bytes"),
+    ]
+    patch_async_client(app_ctx, monkeypatch, queued, sent)
+
+    for i in range(2):
+        response = api_request(
+            "POST", "/voice/chat",
+            json={"campaign_id": campaign_id, "trigger": "initial", "caller": "phone", "conversation_id": f"conv_phone_{i}"},
+        )
+        assert response.status_code == 200
+        assert response.json()["audioContentType"] == "audio/basic"
+
+    tts_requests = [r["json"] for r in sent if "get_speech" in r["url"]]
+    assert len(tts_requests) == 1  # second identical reply served from the TTS cache
+    assert tts_requests[0]["sample_rate"] == 8000
+    assert tts_requests[0]["output_format"] == "mulaw"
+    assert tts_requests[0]["speed"] == 1.2
+    spans = [api_request("GET", "/debug/latency", params={"conversation_id": f"conv_phone_{i}"}).json()["recent_turns"][0]["spans"] for i in range(2)]
+    assert "tts_total" in spans[0] and "tts_cache_hit" not in spans[0]
+    assert "tts_cache_hit" in spans[1] and "tts_total" not in spans[1]
+
+    # The browser simulate page cannot play mu-law; it gets 8 kHz mp3 instead.
+    response = api_request("POST", "/voice/chat", json={"campaign_id": campaign_id, "trigger": "initial"})
+    assert response.json()["audioContentType"] == "audio/mpeg"
+    assert sent[-1]["json"]["output_format"] == "mp3" and sent[-1]["json"]["sample_rate"] == 8000
+
+
+def test_create_campaign_rejects_unknown_audio_profile(api_request):
+    response = api_request(
+        "POST",
+        "/campaigns/create",
+        json={
+            "name": "Bad profile",
+            "agent_persona": "Nurse",
+            "conversation_goal": "Check in",
+            "system_prompt": "Be brief",
+            "recipients": [],
+            "audio_profile": "hifi",
+        },
+    )
+    assert response.status_code == 422
+
+
+def test_voice_chat_escalates_live_distress_once_per_conversation(app_ctx, api_request, monkeypatch):
+    app_ctx.OPENROUTER_API_KEY = "openrouter-test"
+    app_ctx.SMALLEST_AI_API_KEY = "smallest-test"
+
+    sent_sms: list[str] = []
+    monkeypatch.setattr(app_ctx, "send_escalation_sms", lambda **kwargs: sent_sms.append(kwargs["triage_reason"]) or True)
+
+    queued = [
+        llm_stream("Please call 911."),
+        FakeResponse(200, content=b"a1"),
+        llm_stream("Help is coming."),
+        FakeResponse(200, content=b"a2"),
+    ]
+    patch_async_client(app_ctx, monkeypatch, queued)
+
+    campaign_id = "cmp_demo_001"
+    first = api_request(
+        "POST",
+        "/voice/chat",
+        json={"campaign_id": campaign_id, "transcription": "I can't breathe", "conversation_id": "conv_live_1"},
+    ).json()
+    second = api_request(
+        "POST",
+        "/voice/chat",
+        json={"campaign_id": campaign_id, "transcription": "and I have a fever", "conversation_id": "conv_live_1"},
+    ).json()
+
+    assert first["escalationId"] is not None
+    assert second["escalationId"] == first["escalationId"]
+    escalation = app_ctx.store["escalations"][first["escalationId"]]
+    assert escalation["priority"] == "high"
+    assert escalation["conversation_id"] == "conv_live_1"
+    assert escalation["detected_flags"] == ["can't breathe", "fever"]
+    assert len(sent_sms) == 1
+
+
+def test_concurrent_live_checks_open_one_escalation(app_ctx, monkeypatch):
+    import sys
+    from concurrent.futures import ThreadPoolExecutor
+
+    monkeypatch.setattr(app_ctx, "send_escalation_sms", lambda **kwargs: True)
+    campaign = app_ctx.store["campaigns"]["cmp_demo_001"]
+    texts = ["I can't breathe", "I have a fever", "my chest pain is bad", "I feel dizzy"] * 4
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            ids = set(pool.map(lambda t: app_ctx.check_live_distress(campaign, "conv_race", t), texts)) - {None}
+    finally:
+        sys.setswitchinterval(interval)
+
+    assert len(ids) == 1
+    escalation = app_ctx.store["escalations"][ids.pop()]
+    assert sorted(escalation["detected_flags"]) == sorted(set(escalation["detected_flags"]))
+    assert {"can't breathe", "fever"} <= set(escalation["detected_flags"])
+    assert "conv_race" in app_ctx.live_monitors
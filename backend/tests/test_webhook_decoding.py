@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import pytest
+from fastapi.exceptions import RequestValidationError
+
+from benchmark import long_transcript_payload
+from models import FastPostCallPayload, PackedWords, SmallestAIPostCallPayload
+from speech_features import transcript_speech_features
+from test_webhooks import SCENARIOS, make_slurred_speech_payload
+from triage import analyze_vitals, triage_input_json
+
+
+def test_fast_decoding_packs_word_timestamps(app_ctx):
+    body = make_slurred_speech_payload().model_dump_json().encode()
+
+    payload = app_ctx.decode_webhook_body(body, FastPostCallPayload, SmallestAIPostCallPayload)
+
+    words = payload.transcript[1].word_timestamps
+    assert isinstance(words, PackedWords)
+    assert words.words[:3] == ("I", "am", "okay")
+    assert list(words.start[:2]) == [3.0, 4.6]
+
+
+def test_fast_and_full_decoding_triage_identically(app_ctx):
+    payloads = [factory() for _, factory in SCENARIOS] + [long_transcript_payload(turns=10)]
+    for original in payloads:
+        body = original.model_dump_json().encode()
+        fast = app_ctx.decode_webhook_body(body, FastPostCallPayload, SmallestAIPostCallPayload)
+        full = SmallestAIPostCallPayload.model_validate_json(body)
+
+        assert analyze_vitals(fast) == analyze_vitals(full), original.call_id
+        assert transcript_speech_features(fast.transcript) == transcript_speech_features(full.transcript)
+        # Stored triage input round-trips through the full model (re-triage reads it back).
+        assert triage_input_json(fast) == triage_input_json(full)
+
+
+def test_fast_decoding_reports_errors_like_fastapi(app_ctx):
+    with pytest.raises(RequestValidationError) as invalid_json:
+        app_ctx.decode_webhook_body(b"{not json", FastPostCallPayload, SmallestAIPostCallPayload)
+    assert invalid_json.value.errors()[0]["type"] == "json_invalid"
+
+    with pytest.raises(RequestValidationError) as missing:
+        app_ctx.decode_webhook_body(b'{"call_id": "c", "user_id": "u", "status": "completed"}', FastPostCallPayload, SmallestAIPostCallPayload)
+    assert missing.value.errors()[0]["loc"] == ("body", "audio_metrics")
+
+
+def test_post_call_webhook_rejects_bad_word_timestamps(api_request):
+    response = api_request(
+        "POST",
+        "/webhooks/smallest/post-call",
+        json={
+            "call_id": "smallest_bad_words",
+            "user_id": "usr_1",
+            "status": "completed",
+            "audio_metrics": {"avg_db": -25, "speech_probability": 0.8},
+            "transcript": [{"speaker": "user", "text": "hi", "word_timestamps": [{"word": "hi"}]}],
+        },
+    )
+
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"][:3] == ["body", "transcript", 0]
+
+
+def test_fast_decoding_segment_without_word_timestamps(app_ctx):
+    body = b'{"call_id": "c", "user_id": "u", "status": "completed", "audio_metrics": {"avg_db": -20, "speech_probability": 0.8}, "transcript": [{"speaker": "user", "text": "hi"}]}'
+
+    payload = app_ctx.decode_webhook_body(body, FastPostCallPayload, SmallestAIPostCallPayload)
+
+    assert payload.transcript[0].word_timestamps.words == ()
+    assert '"word_timestamps":[]' in triage_input_json(payload)
+
+
+def test_webhook_bodies_are_documented_in_openapi(api_request):
+    paths = api_request("GET", "/openapi.json").json()["paths"]
+
+    post_call = paths["/webhooks/smallest/post-call"]["post"]["requestBody"]["content"]["application/json"]["schema"]
+    assert {"call_id", "user_id", "status", "audio_metrics", "transcript"} <= set(post_call["properties"])
+    assert "avg_db" in post_call["properties"]["audio_metrics"]["properties"]  # nested models are inlined
+    analytics = paths["/webhooks/smallest/analytics"]["post"]["requestBody"]["content"]["application/json"]["schema"]
+    assert {"call_id", "audio_metrics"} <= set(analytics["properties"])
+    assert "$ref" not in str(post_call) + str(analytics)
@@ -193,3 +193,40 @@ def test_analytics_webhook_ignored_for_completed_call(app_ctx, api_request):
 
     assert response.status_code == 200
     assert response.json()["status"] == "already_processed"
+
+
+def test_analytics_webhook_triages_with_campaign_rules(app_ctx, api_request):
+    from models import TriageRuleConfig
+    from triage_rules import DEFAULT_CONFIG, DEFAULT_RULE_SET, rule_registry
+
+    user = api_request("POST", "/users", json={"name": "Lee", "phone": "+1-555-7777", "campaign_id": "cmp_demo_001"}).json()
+    _create_db_call(app_ctx, user["id"], "smallest_rules_001")
+    rule_registry.install(TriageRuleConfig(default=DEFAULT_RULE_SET, campaigns={"cmp_demo_001": {"speech_probability": 0.9}}))
+    try:
+        response = api_request(
+            "POST",
+            "/webhooks/smallest/analytics",
+            json={
+                "call_id": "smallest_rules_001",
+                "user_id": user["id"],
+                "audio_metrics": {
+                    "avg_db": -24,
+                    "peak_db": -10,
+                    "speech_probability": 0.7,
+                    "silence_duration_sec": 2,
+                    "call_duration_sec": 40,
+                },
+                "transcript": [],
+                "emotions": [],
+            },
+        )
+    finally:
+        rule_registry.install(DEFAULT_CONFIG)
+
+    assert response.status_code == 200
+    db = app_ctx.SessionLocal()
+    try:
+        rec = db.get(CallRecord, "call_db_001")
+        assert rec.triage_classification != TriageClassification.SPEECH_DETECTED.value  # 0.7 < the campaign's 0.9
+    finally:
+        db.close()
@@ -0,0 +1,206 @@
+"""Per-stage latency tracing for voice turns.
+
+Each `/voice/chat`, `/voice/transcribe` or voice-session turn gets a
+:class:`TurnTrace` whose spans (STT upload, STT, prompt build, LLM first token
+and total, TTS first byte and total, serialization) are folded into
+fixed-bucket latency histograms, globally and per campaign. Recent turns are kept in a bounded ring so a slow call can be
+looked up by campaign and conversation from the debug endpoint.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+TURN_STAGES = (
+    "stt_upload",
+    "vad_trim",
+    "stt",
+    "prompt_build",
+    "llm_first_token",
+    "llm_total",
+    "tts_first_byte",
+    "tts_total",
+    "tts_cache_hit",
+    "serialization",
+    "turn_total",
+)
+HISTOGRAM_BUCKETS_MS = (50, 100, 250, 500, 1000, 2000, 5000, 10000)
+SLOW_TURN_MS = float(os.getenv("PULSECALL_SLOW_TURN_MS", "3000"))
+RECENT_TURNS = int(os.getenv("PULSECALL_TRACE_RECENT_TURNS", "200"))
+
+
+# ---------------------------------------------------------------------------
+# Histogram
+# ---------------------------------------------------------------------------
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (milliseconds)."""
+
+    def __init__(self) -> None:
+        self.buckets = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms: float) -> None:
+        idx = len(HISTOGRAM_BUCKETS_MS)
+        for i, bound in enumerate(HISTOGRAM_BUCKETS_MS):
+            if ms <= bound:
+                idx = i
+                break
+        self.buckets[idx] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Upper bucket bound containing the q-th percentile (max for the overflow bucket)."""
+        if self.count == 0:
+            return None
+        rank = q / 100.0 * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank and n:
+                return float(HISTOGRAM_BUCKETS_MS[i]) if i < len(HISTOGRAM_BUCKETS_MS) else round(self.max_ms, 1)
+        return round(self.max_ms, 1)
+
+    def to_dict(self) -> dict[str, Any]:
+        labels = [f"<={b}" for b in HISTOGRAM_BUCKETS_MS] + [f">{HISTOGRAM_BUCKETS_MS[-1]}"]
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 1) if self.count else None,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "max_ms": round(self.max_ms, 1),
+            "buckets": dict(zip(labels, self.buckets)),
+        }
+
+
+# ---------------------------------------------------------------------------
+# Per-turn trace
+# ---------------------------------------------------------------------------
+class TurnTrace:
+    """Span timings for one voice turn."""
+
+    def __init__(self, kind: str, campaign_id: Optional[str], conversation_id: Optional[str]) -> None:
+        self.kind = kind
+        self.campaign_id = campaign_id
+        self.conversation_id = conversation_id
+        self.spans: dict[str, float] = {}
+        self._started = time.perf_counter()
+        self.total_ms: Optional[float] = None
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - start) * 1000.0)
+
+    def record(self, name: str, ms: float) -> None:
+        self.spans[name] = self.spans.get(name, 0.0) + ms
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self._started) * 1000.0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "campaign_id": self.campaign_id,
+            "conversation_id": self.conversation_id,
+            "total_ms": round(self.total_ms if self.total_ms is not None else self.elapsed_ms(), 1),
+            "spans": {k: round(v, 1) for k, v in self.spans.items()},
+        }
+
+
+# ---------------------------------------------------------------------------
+# Aggregator
+# ---------------------------------------------------------------------------
+class LatencyTracer:
+    """Aggregates finished turn traces into histograms and a recent-turns ring.
+
+    Turns finish on the event loop while the sync debug route snapshots from
+    a threadpool worker, so the histograms and the ring are guarded by a lock.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stages: dict[str, LatencyHistogram] = {}
+            self._by_campaign: dict[str, dict[str, LatencyHistogram]] = {}
+            self._recent: deque[dict[str, Any]] = deque(maxlen=RECENT_TURNS)
+            self.slow_turns = 0
+
+    def start_turn(
+        self,
+        kind: str,
+        campaign_id: Optional[str] = None,
+        conversation_id: Optional[str] = None,
+    ) -> TurnTrace:
+        return TurnTrace(kind, campaign_id, conversation_id)
+
+    def finish(self, trace: TurnTrace) -> None:
+        trace.total_ms = trace.elapsed_ms()
+        observed = dict(trace.spans, turn_total=trace.total_ms)
+        entry = trace.to_dict()
+        slow = trace.total_ms >= SLOW_TURN_MS
+        with self._lock:
+            campaign_hists = self._by_campaign.setdefault(trace.campaign_id or "_none", {})
+            for name, ms in observed.items():
+                self._stages.setdefault(name, LatencyHistogram()).observe(ms)
+                campaign_hists.setdefault(name, LatencyHistogram()).observe(ms)
+            self._recent.append(entry)
+            if slow:
+                self.slow_turns += 1
+
+        if slow:
+            breakdown = ", ".join(f"{k}={v:.0f}ms" for k, v in trace.spans.items())
+            logger.warning(
+                "Slow voice turn: kind=%s campaign=%s conversation=%s total=%.0fms [%s]",
+                trace.kind, trace.campaign_id, trace.conversation_id, trace.total_ms, breakdown,
+            )
+
+    def snapshot(
+        self,
+        campaign_id: Optional[str] = None,
+        conversation_id: Optional[str] = None,
+        limit: int = 50,
+    ) -> dict[str, Any]:
+        with self._lock:
+            if campaign_id is not None:
+                hists = self._by_campaign.get(campaign_id, {})
+            else:
+                hists = self._stages
+            recent = [
+                t for t in self._recent
+                if (campaign_id is None or t["campaign_id"] == campaign_id)
+                and (conversation_id is None or t["conversation_id"] == conversation_id)
+            ]
+            return {
+                "slow_turn_threshold_ms": SLOW_TURN_MS,
+                "slow_turns": self.slow_turns,
+                "stages": {name: hists[name].to_dict() for name in sorted(hists, key=_stage_order)},
+                "recent_turns": recent[-limit:][::-1] if limit > 0 else [],
+            }
+
+
+def _stage_order(name: str) -> tuple[int, str]:
+    return (TURN_STAGES.index(name) if name in TURN_STAGES else len(TURN_STAGES), name)
+
+
+tracer = LatencyTracer()
@@ -0,0 +1,132 @@
+"""Per-patient trends — incremental deterioration detection.
+
+Triage looks at one call at a time. This module keeps, for every patient, a
+smoothed level and per-call slope of the sentiment score, the reported pain
+level and the number of detected flags (Holt's double exponential smoothing).
+Folding a completed call into that state is O(1) — no call history is
+re-read — and the same state is what the dashboard shows.
+
+Alerts are edge-triggered: a trend that crosses its threshold raises an alert
+once, and can raise it again only after it has recovered.
+"""
+
+from __future__ import annotations
+
+import functools
+import os
+import re
+from typing import Iterable, MutableMapping, Optional
+
+from models import PatientTrend, TrendSeries
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+TREND_ALPHA = float(os.getenv("PULSECALL_TREND_ALPHA", "0.5"))   # level smoothing (1 = last call only)
+TREND_BETA = float(os.getenv("PULSECALL_TREND_BETA", "0.5"))     # slope smoothing
+TREND_MIN_CALLS = int(os.getenv("PULSECALL_TREND_MIN_CALLS", "3"))  # calls before a series can alert
+
+PAIN_RISE_PER_CALL = 1.0          # smoothed pain rising at least this much per call
+PAIN_ALERT_LEVEL = 5.0            # ... while the smoothed pain is at least this
+SENTIMENT_DROP_PER_CALL = -0.5    # smoothed sentiment falling at least this much per call
+SENTIMENT_ALERT_LEVEL = 3.0       # ... while the smoothed sentiment is at most this
+FLAGS_ALERT_LEVEL = 1.0           # smoothed flags per call at or above this → recurring flags
+
+ALERT_REASONS = {
+    "pain_rising": "Pain rising {slope:+.1f}/call (now {level:.1f}/10)",
+    "sentiment_declining": "Sentiment declining {slope:+.1f}/call (now {level:.1f}/5)",
+    "recurring_flags": "Distress flags on recent calls ({level:.1f}/call)",
+}
+
+_PAIN_PATTERN = re.compile(r"\b(10|[0-9])\s*(?:/|out of)\s*10\b", re.IGNORECASE)
+
+
+# ---------------------------------------------------------------------------
+# Smoothing
+# ---------------------------------------------------------------------------
+def update_series(series: Optional[TrendSeries], value: float) -> TrendSeries:
+    """Fold one observation into a level/slope pair."""
+    if series is None:
+        return TrendSeries(level=value, slope=0.0, last=value)
+    level = TREND_ALPHA * value + (1 - TREND_ALPHA) * (series.level + series.slope)
+    slope = TREND_BETA * (level - series.level) + (1 - TREND_BETA) * series.slope
+    return TrendSeries(level=round(level, 4), slope=round(slope, 4), last=value, count=series.count + 1)
+
+
+def extract_pain_level(texts: Iterable[str]) -> Optional[int]:
+    """The last "N/10" or "N out of 10" the patient said, if any."""
+    level = None
+    for text in texts:
+        for match in _PAIN_PATTERN.finditer(text):
+            level = int(match.group(1))
+    return level
+
+
+# ---------------------------------------------------------------------------
+# Alerts
+# ---------------------------------------------------------------------------
+def _alerts(trend: PatientTrend) -> list[str]:
+    alerts = []
+    pain, sentiment, flags = trend.pain, trend.sentiment, trend.flags
+    if pain and pain.count >= TREND_MIN_CALLS and pain.slope >= PAIN_RISE_PER_CALL and pain.level >= PAIN_ALERT_LEVEL:
+        alerts.append("pain_rising")
+    if (
+        sentiment
+        and sentiment.count >= TREND_MIN_CALLS
+        and sentiment.slope <= SENTIMENT_DROP_PER_CALL
+        and sentiment.level <= SENTIMENT_ALERT_LEVEL
+    ):
+        alerts.append("sentiment_declining")
+    if flags and flags.count >= TREND_MIN_CALLS and flags.level >= FLAGS_ALERT_LEVEL:
+        alerts.append("recurring_flags")
+    return alerts
+
+
+def alert_reason(trend: PatientTrend, alerts: list[str]) -> str:
+    series = {"pain_rising": trend.pain, "sentiment_declining": trend.sentiment, "recurring_flags": trend.flags}
+    return "Deteriorating trend: " + "; ".join(
+        ALERT_REASONS[a].format(level=series[a].level, slope=series[a].slope) for a in alerts
+    )
+
+
+def fold_call(
+    trend: PatientTrend,
+    *,
+    call_id: Optional[str] = None,
+    sentiment: Optional[float] = None,
+    pain: Optional[float] = None,
+    flags: Optional[int] = None,
+    at: Optional[str] = None,
+) -> list[str]:
+    """Fold a completed call into `trend` in place; return newly raised alerts.
+
+    Measurements that weren't taken on this call (None) leave their series as is.
+    """
+    trend.calls += 1
+    if sentiment is not None:
+        trend.sentiment = update_series(trend.sentiment, float(sentiment))
+    if pain is not None:
+        trend.pain = update_series(trend.pain, float(pain))
+    if flags is not None:
+        trend.flags = update_series(trend.flags, float(flags))
+    trend.last_call_id = call_id
+    trend.updated_at = at
+
+    active = _alerts(trend)
+    raised = [a for a in active if a not in trend.active_alerts]
+    trend.active_alerts = active
+    return raised
+
+
+def record_call(trends: MutableMapping[str, PatientTrend], patient_id: str, **measurements) -> list[str]:
+    """`fold_call` on the patient's trend in `trends`, creating it if needed.
+
+    A store bucket gets the fold through `modify`, so a call another worker
+    folded in meanwhile is kept rather than overwritten.
+    """
+    trends.setdefault(patient_id, PatientTrend(patient_id=patient_id))
+    fold = functools.partial(fold_call, **measurements)
+    modify = getattr(trends, "modify", None)
+    if modify is not None:
+        return modify(patient_id, fold)
+    return fold(trends[patient_id])
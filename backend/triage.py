@@ -6,49 +6,60 @@ to decide whether to retry, escalate, or proceed with transcript analysis.
 
 from __future__ import annotations
 
+import json
 import logging
-from typing import Optional
+import threading
+from typing import Iterable, NamedTuple, Optional, Union
 
+import numpy as np
+
+from keywords import compile_keywords
 from models import (
     AudioMetrics,
     EmotionDetection,
     SmallestAIPostCallPayload,
+    SpeechFeatures,
     TriageClassification,
     TriageResult,
     TranscriptSegment,
 )
+from speech_features import transcript_speech_features
+from triage_rules import CompiledRules, RuleOutcome, rule_registry
 
 logger = logging.getLogger(__name__)
 
 # ---------------------------------------------------------------------------
-# Thresholds (tuneable)
+# Thresholds and retry delays live in the triage rule table (triage_rules.py),
+# which can be changed per campaign and reloaded without a restart.
 # ---------------------------------------------------------------------------
-SILENCE_DB_THRESHOLD = -50.0        # avg_db below this → near-zero audio
-BACKGROUND_NOISE_DB_THRESHOLD = -20.0  # avg_db above this with low speech → noisy env
-SPEECH_PROBABILITY_THRESHOLD = 0.3  # above this → speech detected
-SLEEPING_PEAK_DB = -35.0            # low avg_db with minor peaks → rhythmic/sleeping
-
 DISTRESS_KEYWORDS = {"help", "fall", "fell", "pain", "hurt", "emergency", "can't breathe", "bleeding"}
 DISTRESS_EMOTIONS = {"fear", "pain"}
 
+_DISTRESS_AUTOMATON = compile_keywords(tuple(sorted(DISTRESS_KEYWORDS)))
+
 
 # ---------------------------------------------------------------------------
 # Core triage function
 # ---------------------------------------------------------------------------
-def analyze_vitals(payload: SmallestAIPostCallPayload) -> TriageResult:
+def analyze_vitals(
+    payload: SmallestAIPostCallPayload,
+    rules: Optional[CompiledRules] = None,
+) -> TriageResult:
     """Classify the call environment and decide on next action.
 
     Priority order:
     1. Emotion-based immediate escalation (fear/pain detected)
     2. Distress keyword detection in transcript
-    3. Acoustic environment classification
+    3. Acoustic environment classification (the campaign's rule table)
+    4. Word-timing speech features (slurred / very slow speech)
     """
+    rules = rules or rule_registry.for_campaign(payload.campaign_id)
     metrics = payload.audio_metrics
 
     # -----------------------------------------------------------------------
     # 1. Emotion bypass — if fear/pain detected, escalate immediately
     # -----------------------------------------------------------------------
-    distress_emotion = _check_distress_emotions(payload.emotions, payload.transcript)
+    distress_emotion = _check_distress_emotions(payload.emotions, payload.transcript, rules.emotion_confidence)
     if distress_emotion is not None:
         return TriageResult(
             classification=TriageClassification.SPEECH_DETECTED,
@@ -60,7 +71,7 @@ def analyze_vitals(payload: SmallestAIPostCallPayload) -> TriageResult:
     # -----------------------------------------------------------------------
     # 2. Distress keyword scan in transcript
     # -----------------------------------------------------------------------
-    keyword_hit = _check_distress_keywords(payload.transcript)
+    keyword_hit = _check_distress_keywords(payload.transcript, rules.distress_keyword_min_hits)
     if keyword_hit:
         return TriageResult(
             classification=TriageClassification.SPEECH_DETECTED,
@@ -70,64 +81,41 @@ def analyze_vitals(payload: SmallestAIPostCallPayload) -> TriageResult:
         )
 
     # -----------------------------------------------------------------------
-    # 3. Acoustic environment classification
+    # 3. Acoustic environment classification — background noise, total
+    #    silence, likely sleeping, speech detected, ambiguous fallback
     # -----------------------------------------------------------------------
+    outcome = rules.outcomes[rules.select(metrics)]
 
-    # Case A: High noise, low speech → background noise (shower, TV, etc.)
-    if (
-        metrics.avg_db > BACKGROUND_NOISE_DB_THRESHOLD
-        and metrics.speech_probability < SPEECH_PROBABILITY_THRESHOLD
-    ):
-        return TriageResult(
-            classification=TriageClassification.BACKGROUND_NOISE,
-            reason=f"High ambient noise (avg_db={metrics.avg_db:.1f}) with low speech probability ({metrics.speech_probability:.2f})",
-            action="SCHEDULE_RETRY",
-            retry_delay_minutes=20,
-            escalate=False,
-        )
-
-    # Case B: Total silence → critical, possible emergency
-    if (
-        metrics.avg_db < SILENCE_DB_THRESHOLD
-        and metrics.speech_probability < 0.05
-    ):
-        return TriageResult(
-            classification=TriageClassification.CRITICAL_SILENCE,
-            reason=f"Total silence detected (avg_db={metrics.avg_db:.1f}, speech_prob={metrics.speech_probability:.2f})",
-            action="IMMEDIATE_ESCALATION",
-            escalate=True,
-        )
-
-    # Case C: Low rhythmic noise → likely sleeping
-    if (
-        metrics.avg_db < SLEEPING_PEAK_DB
-        and metrics.peak_db > metrics.avg_db + 5  # minor peaks above baseline
-        and metrics.speech_probability < SPEECH_PROBABILITY_THRESHOLD
-    ):
-        return TriageResult(
-            classification=TriageClassification.LIKELY_SLEEPING,
-            reason=f"Low rhythmic noise pattern (avg_db={metrics.avg_db:.1f}, peak_db={metrics.peak_db:.1f})",
-            action="SCHEDULE_RETRY",
-            retry_delay_minutes=60,
-            escalate=False,
-        )
-
-    # Case D: Speech detected → proceed with LLM transcript analysis
-    if metrics.speech_probability >= SPEECH_PROBABILITY_THRESHOLD:
-        return TriageResult(
-            classification=TriageClassification.SPEECH_DETECTED,
-            reason=f"Speech detected (probability={metrics.speech_probability:.2f})",
-            action="ANALYZE_TRANSCRIPT",
-            escalate=False,
-        )
+    # -----------------------------------------------------------------------
+    # 4. Speech detected → check how the patient spoke before handing the
+    #    transcript to LLM analysis
+    # -----------------------------------------------------------------------
+    features = None
+    if outcome.check_speech_features:
+        features = transcript_speech_features(payload.transcript)
+        impairment = _check_impaired_speech(features, rules)
+        if impairment is not None:
+            return TriageResult(
+                classification=TriageClassification.IMPAIRED_SPEECH,
+                reason=impairment,
+                action="IMMEDIATE_ESCALATION",
+                escalate=True,
+                speech_features=features,
+            )
 
-    # Fallback: ambiguous — schedule a short retry
     return TriageResult(
-        classification=TriageClassification.BACKGROUND_NOISE,
-        reason=f"Ambiguous audio (avg_db={metrics.avg_db:.1f}, speech_prob={metrics.speech_probability:.2f})",
-        action="SCHEDULE_RETRY",
-        retry_delay_minutes=15,
-        escalate=False,
+        classification=outcome.classification,
+        reason=outcome.reason.format(
+            avg_db=metrics.avg_db,
+            peak_db=metrics.peak_db,
+            speech_probability=metrics.speech_probability,
+            silence_duration_sec=metrics.silence_duration_sec,
+            call_duration_sec=metrics.call_duration_sec,
+        ),
+        action=outcome.action,
+        retry_delay_minutes=outcome.retry_delay_minutes,
+        escalate=outcome.escalate,
+        speech_features=features if features is not None and features.word_count else None,
     )
 
 
@@ -137,26 +125,277 @@ def analyze_vitals(payload: SmallestAIPostCallPayload) -> TriageResult:
 def _check_distress_emotions(
     emotions: list[EmotionDetection],
     transcript: list[TranscriptSegment],
+    min_confidence: float,
 ) -> Optional[EmotionDetection]:
     """Return the first distress emotion found, or None."""
     # Check top-level emotions list
     for em in emotions:
-        if em.label.lower() in DISTRESS_EMOTIONS and em.confidence > 0.5:
+        if em.label.lower() in DISTRESS_EMOTIONS and em.confidence > min_confidence:
             return em
 
     # Check per-segment emotions from Pulse STT
     for seg in transcript:
-        if seg.emotion and seg.emotion.label.lower() in DISTRESS_EMOTIONS and seg.emotion.confidence > 0.5:
+        if seg.emotion and seg.emotion.label.lower() in DISTRESS_EMOTIONS and seg.emotion.confidence > min_confidence:
             return seg.emotion
 
     return None
 
 
-def _check_distress_keywords(transcript: list[TranscriptSegment]) -> Optional[str]:
-    """Return the first distress keyword found in the transcript, or None."""
-    for seg in transcript:
-        text_lower = seg.text.lower()
-        for kw in DISTRESS_KEYWORDS:
-            if kw in text_lower:
-                return kw
-    return None
+def _check_distress_keywords(transcript: list[TranscriptSegment], min_hits: int = 1) -> Optional[str]:
+    """Return the earliest distress keyword in the transcript, or None.
+
+    With ``min_hits`` above 1, return the distinct keywords (comma-separated)
+    only when at least that many occur; ``min_hits`` 0 disables the check.
+    """
+    if min_hits <= 0:
+        return None
+    if min_hits == 1:
+        hit = _DISTRESS_AUTOMATON.first(seg.text for seg in transcript)
+        return hit.keyword if hit else None
+    found = list(dict.fromkeys(hit.keyword for hit in _DISTRESS_AUTOMATON.scan_segments(seg.text for seg in transcript)))
+    return ", ".join(found) if len(found) >= min_hits else None
+
+
+def _count_distress_keywords(transcript: list[TranscriptSegment]) -> int:
+    return len({hit.keyword for hit in _DISTRESS_AUTOMATON.scan_segments(seg.text for seg in transcript)})
+
+
+def _is_impaired_speech(
+    rules: CompiledRules,
+    word_count: Union[int, np.ndarray],
+    speech_rate_wpm: Union[float, np.ndarray],
+    low_confidence_ratio: Union[float, np.ndarray],
+) -> Union[bool, np.ndarray]:
+    """Impaired-speech rule over scalars or NumPy columns alike.
+
+    A zero rate means the words carried no usable timings (no speaking time),
+    so it is treated as unknown and only the confidence check applies.
+    """
+    slow = (speech_rate_wpm > 0) & (speech_rate_wpm < rules.slow_speech_wpm)
+    return (word_count >= rules.min_words_for_speech_rules) & (
+        slow | (low_confidence_ratio > rules.slurred_low_confidence_ratio)
+    )
+
+
+def _check_impaired_speech(features: SpeechFeatures, rules: CompiledRules) -> Optional[str]:
+    """Return a reason if the patient's word timings suggest slurred or very slow speech."""
+    if not _is_impaired_speech(rules, features.word_count, features.speech_rate_wpm, features.low_confidence_ratio):
+        return None
+    if features.low_confidence_ratio > rules.slurred_low_confidence_ratio:
+        rate = f"{features.speech_rate_wpm:.0f} wpm" if features.speech_rate_wpm > 0 else "unknown"
+        return (
+            f"Possible slurred speech: {features.low_confidence_ratio:.0%} of words low-confidence "
+            f"(rate {rate}, longest pause {features.longest_gap_sec:.1f}s)"
+        )
+    return (
+        f"Very slow speech: {features.speech_rate_wpm:.0f} wpm over {features.word_count} words "
+        f"(longest pause {features.longest_gap_sec:.1f}s)"
+    )
+
+
+# ---------------------------------------------------------------------------
+# Stored triage input (for re-triage)
+# ---------------------------------------------------------------------------
+TRIAGE_INPUT_FIELDS = {"audio_metrics", "transcript", "emotions"}
+
+
+def triage_input_json(payload: SmallestAIPostCallPayload) -> str:
+    """Serialize the parts of a payload the triage rules read."""
+    return payload.model_dump_json(include=TRIAGE_INPUT_FIELDS)
+
+
+def payload_from_triage_input(
+    call_id: str, user_id: str, raw: str, campaign_id: Optional[str] = None
+) -> SmallestAIPostCallPayload:
+    """Rebuild a completed-call payload from :func:`triage_input_json` output.
+
+    Pass the call's `campaign_id` so its campaign's rule overrides apply.
+    """
+    return SmallestAIPostCallPayload(
+        call_id=call_id, user_id=user_id, campaign_id=campaign_id, status="completed", **json.loads(raw)
+    )
+
+
+# ---------------------------------------------------------------------------
+# Batch (columnar) triage
+# ---------------------------------------------------------------------------
+_CLASS_LABELS = np.array([c.value for c in TriageClassification])
+_CLASS_CODE = {c: i for i, c in enumerate(TriageClassification)}
+_ACTION_LABELS = np.array(["IMMEDIATE_ESCALATION", "SCHEDULE_RETRY", "ANALYZE_TRANSCRIPT"])
+_ACTION_CODE = {a: i for i, a in enumerate(_ACTION_LABELS.tolist())}
+
+
+class TriageBatch(NamedTuple):
+    """Column-wise triage results, aligned with the input arrays.
+
+    ``retry_delay_minutes`` is 0 where the scalar path returns None.
+    """
+    classification: np.ndarray
+    action: np.ndarray
+    retry_delay_minutes: np.ndarray
+    escalate: np.ndarray
+
+
+def analyze_vitals_batch(
+    avg_db: np.ndarray,
+    peak_db: np.ndarray,
+    speech_probability: np.ndarray,
+    silence_duration_sec: Optional[np.ndarray] = None,
+    distress_emotion_confidence: Optional[np.ndarray] = None,
+    distress_keyword: Optional[np.ndarray] = None,
+    word_count: Optional[np.ndarray] = None,
+    speech_rate_wpm: Optional[np.ndarray] = None,
+    low_confidence_ratio: Optional[np.ndarray] = None,
+    call_duration_sec: Optional[np.ndarray] = None,
+    rules: Optional[CompiledRules] = None,
+) -> TriageBatch:
+    """Vectorized :func:`analyze_vitals` over columnar call metrics.
+
+    Evaluates the same rule table (the default one unless ``rules`` is given)
+    with its compiled NumPy masks; ``np.select`` picks the first matching rule
+    per row, exactly like the scalar early returns.
+
+    ``distress_emotion_confidence`` is the highest confidence among distress
+    emotions on each call (0 when none), and ``distress_keyword`` counts the
+    distinct distress keywords in each transcript (a boolean column reads as
+    0/1) — see :func:`payloads_to_columns`.
+    The word-timing columns default to "no timed words", which never trips the
+    impaired-speech rule; a zero speech rate counts as unknown.
+    Missing ``silence_duration_sec`` / ``call_duration_sec`` columns are zeros.
+    """
+    rules = rules or rule_registry.for_campaign(None)
+    avg_db = np.asarray(avg_db, dtype=np.float64)
+    peak_db = np.asarray(peak_db, dtype=np.float64)
+    speech = np.asarray(speech_probability, dtype=np.float64)
+    n = avg_db.shape[0]
+    emotion = (
+        np.zeros(n) if distress_emotion_confidence is None
+        else np.asarray(distress_emotion_confidence, dtype=np.float64)
+    )
+    keyword = np.zeros(n, dtype=np.int64) if distress_keyword is None else np.asarray(distress_keyword, dtype=np.int64)
+    words = np.zeros(n, dtype=np.int64) if word_count is None else np.asarray(word_count, dtype=np.int64)
+    rate = np.zeros(n) if speech_rate_wpm is None else np.asarray(speech_rate_wpm, dtype=np.float64)
+    unclear = np.zeros(n) if low_confidence_ratio is None else np.asarray(low_confidence_ratio, dtype=np.float64)
+    silence = np.zeros(n) if silence_duration_sec is None else np.asarray(silence_duration_sec, dtype=np.float64)
+    duration = np.zeros(n) if call_duration_sec is None else np.asarray(call_duration_sec, dtype=np.float64)
+
+    # (classification, action, retry delay, escalate) per condition.
+    min_hits = rules.distress_keyword_min_hits
+    conditions = [emotion > rules.emotion_confidence, (keyword >= min_hits) & (min_hits > 0)]
+    table = [
+        (TriageClassification.SPEECH_DETECTED, "IMMEDIATE_ESCALATION", 0, True),
+        (TriageClassification.SPEECH_DETECTED, "IMMEDIATE_ESCALATION", 0, True),
+    ]
+    impaired = _is_impaired_speech(rules, words, rate, unclear)
+    for mask, outcome in zip(rules.masks(avg_db, peak_db, speech, silence, duration), rules.outcomes):
+        if outcome.check_speech_features:
+            conditions.append(mask & impaired)
+            table.append((TriageClassification.IMPAIRED_SPEECH, "IMMEDIATE_ESCALATION", 0, True))
+        conditions.append(mask)
+        table.append(_batch_outcome(outcome))
+    fallback = rules.outcomes[-1]
+    if fallback.check_speech_features:
+        conditions.append(impaired)
+        table.append((TriageClassification.IMPAIRED_SPEECH, "IMMEDIATE_ESCALATION", 0, True))
+    table.append(_batch_outcome(fallback))
+
+    rule = np.select(conditions, list(range(len(conditions))), default=len(conditions))
+    class_codes = np.array([_CLASS_CODE[o[0]] for o in table])
+    action_codes = np.array([_ACTION_CODE[o[1]] for o in table])
+    delays = np.array([o[2] for o in table], dtype=np.int64)
+    escalates = np.array([o[3] for o in table], dtype=bool)
+
+    return TriageBatch(
+        classification=_CLASS_LABELS[class_codes[rule]],
+        action=_ACTION_LABELS[action_codes[rule]],
+        retry_delay_minutes=delays[rule],
+        escalate=escalates[rule],
+    )
+
+
+def _batch_outcome(outcome: RuleOutcome) -> tuple[TriageClassification, str, int, bool]:
+    return (outcome.classification, outcome.action, outcome.retry_delay_minutes or 0, outcome.escalate)
+
+
+def payloads_to_columns(payloads: Iterable[SmallestAIPostCallPayload]) -> dict[str, np.ndarray]:
+    """Flatten post-call payloads into the columns :func:`analyze_vitals_batch` takes."""
+    avg_db: list[float] = []
+    peak_db: list[float] = []
+    speech: list[float] = []
+    silence: list[float] = []
+    duration: list[float] = []
+    emotion: list[float] = []
+    keyword: list[int] = []
+    words: list[int] = []
+    rate: list[float] = []
+    unclear: list[float] = []
+    for p in payloads:
+        m = p.audio_metrics
+        avg_db.append(m.avg_db)
+        peak_db.append(m.peak_db)
+        speech.append(m.speech_probability)
+        silence.append(m.silence_duration_sec)
+        duration.append(m.call_duration_sec)
+        detections = list(p.emotions) + [seg.emotion for seg in p.transcript if seg.emotion]
+        emotion.append(max(
+            (em.confidence for em in detections if em.label.lower() in DISTRESS_EMOTIONS),
+            default=0.0,
+        ))
+        keyword.append(_count_distress_keywords(p.transcript))
+        features = transcript_speech_features(p.transcript)
+        words.append(features.word_count)
+        rate.append(features.speech_rate_wpm)
+        unclear.append(features.low_confidence_ratio)
+    return {
+        "avg_db": np.array(avg_db, dtype=np.float64),
+        "peak_db": np.array(peak_db, dtype=np.float64),
+        "speech_probability": np.array(speech, dtype=np.float64),
+        "silence_duration_sec": np.array(silence, dtype=np.float64),
+        "call_duration_sec": np.array(duration, dtype=np.float64),
+        "distress_emotion_confidence": np.array(emotion, dtype=np.float64),
+        "distress_keyword": np.array(keyword, dtype=np.int64),
+        "word_count": np.array(words, dtype=np.int64),
+        "speech_rate_wpm": np.array(rate, dtype=np.float64),
+        "low_confidence_ratio": np.array(unclear, dtype=np.float64),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Live (in-call) distress detection
+# ---------------------------------------------------------------------------
+class LiveDistressMatcher:
+    """Incremental keyword matcher fed one transcription or segment at a time.
+
+    Keeps just enough trailing text to catch a keyword split across two
+    feeds, and reports each keyword only the first time it is heard, so a
+    conversation can be monitored turn by turn without rescanning history.
+    Callers feeding one matcher from several threads hold its `lock`.
+    """
+
+    def __init__(self, keywords: Iterable[str]) -> None:
+        self.automaton = compile_keywords(tuple(sorted(set(keywords))))
+        # One extra character so the left word boundary of a carried-over
+        # keyword can still be checked.
+        self._tail_len = self.automaton.max_len + 1 if self.automaton.max_len else 0
+        self._tail = ""
+        self.matched: list[str] = []
+        self.escalation_id: Optional[str] = None
+        self.lock = threading.Lock()
+
+    def feed(self, text: str) -> list[str]:
+        """Scan the next piece of patient speech; return keywords not seen before.
+
+        Only hits that end in `text` count: anything wholly inside the carried
+        tail was already reported, or rejected, when it was fed.
+        """
+        window = f"{self._tail} {text}" if self._tail else text
+        offset = len(window) - len(text)
+        self._tail = window[-self._tail_len:] if self._tail_len > 0 else ""
+        hits: list[str] = []
+        for hit in self.automaton.scan(window):
+            if hit.end <= offset:
+                continue
+            if hit.keyword not in self.matched and hit.keyword not in hits:
+                hits.append(hit.keyword)
+        self.matched.extend(hits)
+        return hits
@@ -0,0 +1,290 @@
+"""Triage rule table — the acoustic cascade as data, compiled to Python.
+
+The thresholds and retry delays `analyze_vitals` applies live in a rule set
+(`TriageRuleSet`): named parameters plus an ordered list of rules, each a
+conjunction of metric comparisons. Campaigns can override any parameter of
+the default rule set, including the emotion and distress-keyword bypasses;
+overriding an unknown parameter is rejected.
+
+Each rule set is compiled by generating the source of a plain ``if`` cascade
+with every threshold inlined as a literal, so choosing a rule costs the same
+as the hand-written branches it replaced. A NumPy twin of the cascade is
+generated from the same rules for batch triage.
+
+The registry swaps compiled rules in with a single reference assignment, so a
+rule update (via the API or by editing ``PULSECALL_TRIAGE_RULES``) takes effect
+on the next call without a restart and a call in flight never sees a mix of
+old and new rules.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, NamedTuple, Optional
+
+import numpy as np
+
+from models import TriageClassification, TriageRule, TriageRuleConfig, TriageRuleSet
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+TRIAGE_RULES_PATH = os.getenv("PULSECALL_TRIAGE_RULES", "")
+RULES_POLL_SEC = float(os.getenv("PULSECALL_TRIAGE_RULES_POLL_SEC", "5"))
+
+# Parameters outside the acoustic cascade that analyze_vitals also reads.
+REQUIRED_PARAMS = (
+    "emotion_confidence",
+    "min_words_for_speech_rules",
+    "slow_speech_wpm",
+    "slurred_low_confidence_ratio",
+)
+# Parameters added after rule files were first saved; files without them get these values.
+OPTIONAL_PARAMS: dict[str, float] = {
+    "distress_keyword_min_hits": 1,
+}
+
+_METRIC_FIELDS = ("avg_db", "peak_db", "speech_probability", "silence_duration_sec", "call_duration_sec")
+
+# ---------------------------------------------------------------------------
+# Built-in rule table (what used to be hard-coded in triage.py)
+# ---------------------------------------------------------------------------
+DEFAULT_PARAMS: dict[str, float] = {
+    "silence_db": -50.0,                     # avg_db below this → near-zero audio
+    "background_noise_db": -20.0,            # avg_db above this with low speech → noisy env
+    "speech_probability": 0.3,               # at/above this → speech detected
+    "sleeping_peak_db": -35.0,               # low avg_db with minor peaks → rhythmic/sleeping
+    "sleeping_peak_margin_db": 5.0,          # peaks this far above avg_db → minor rhythmic peaks
+    "critical_speech_probability": 0.05,     # below this with near-zero audio → total silence
+    "emotion_confidence": 0.5,               # distress emotions above this confidence escalate (1 = off)
+    "distress_keyword_min_hits": 1,          # distinct distress keywords that escalate (0 = off)
+    "min_words_for_speech_rules": 12,        # fewer timed words than this → speech rules skipped
+    "slow_speech_wpm": 70.0,                 # patient speech rate below this → very slow speech
+    "slurred_low_confidence_ratio": 0.4,     # share of low-confidence words above this → slurred
+    "retry_noise_min": 20,                   # background noise → retry after
+    "retry_sleeping_min": 60,                # likely sleeping → retry after
+    "retry_ambiguous_min": 15,               # ambiguous audio → retry after
+}
+
+DEFAULT_RULE_SET = TriageRuleSet.model_validate({
+    "version": "default",
+    "params": DEFAULT_PARAMS,
+    "rules": [
+        {
+            "name": "background_noise",
+            "when": [
+                {"field": "avg_db", "op": ">", "value": "background_noise_db"},
+                {"field": "speech_probability", "op": "<", "value": "speech_probability"},
+            ],
+            "classification": "BACKGROUND_NOISE",
+            "action": "SCHEDULE_RETRY",
+            "retry_delay_minutes": "retry_noise_min",
+            "reason": "High ambient noise (avg_db={avg_db:.1f}) with low speech probability ({speech_probability:.2f})",
+        },
+        {
+            "name": "critical_silence",
+            "when": [
+                {"field": "avg_db", "op": "<", "value": "silence_db"},
+                {"field": "speech_probability", "op": "<", "value": "critical_speech_probability"},
+            ],
+            "classification": "CRITICAL_SILENCE",
+            "action": "IMMEDIATE_ESCALATION",
+            "escalate": True,
+            "reason": "Total silence detected (avg_db={avg_db:.1f}, speech_prob={speech_probability:.2f})",
+        },
+        {
+            "name": "likely_sleeping",
+            "when": [
+                {"field": "avg_db", "op": "<", "value": "sleeping_peak_db"},
+                {"field": "peak_db", "op": ">", "value": "sleeping_peak_margin_db", "relative_to": "avg_db"},
+                {"field": "speech_probability", "op": "<", "value": "speech_probability"},
+            ],
+            "classification": "LIKELY_SLEEPING",
+            "action": "SCHEDULE_RETRY",
+            "retry_delay_minutes": "retry_sleeping_min",
+            "reason": "Low rhythmic noise pattern (avg_db={avg_db:.1f}, peak_db={peak_db:.1f})",
+        },
+        {
+            "name": "speech_detected",
+            "when": [{"field": "speech_probability", "op": ">=", "value": "speech_probability"}],
+            "classification": "SPEECH_DETECTED",
+            "action": "ANALYZE_TRANSCRIPT",
+            "reason": "Speech detected (probability={speech_probability:.2f})",
+            "check_speech_features": True,
+        },
+        {
+            "name": "ambiguous",
+            "classification": "BACKGROUND_NOISE",
+            "action": "SCHEDULE_RETRY",
+            "retry_delay_minutes": "retry_ambiguous_min",
+            "reason": "Ambiguous audio (avg_db={avg_db:.1f}, speech_prob={speech_probability:.2f})",
+        },
+    ],
+})
+
+DEFAULT_CONFIG = TriageRuleConfig(default=DEFAULT_RULE_SET)
+
+
+# ---------------------------------------------------------------------------
+# Compilation
+# ---------------------------------------------------------------------------
+class RuleOutcome(NamedTuple):
+    name: str
+    classification: TriageClassification
+    action: str
+    retry_delay_minutes: Optional[int]
+    escalate: bool
+    reason: str
+    check_speech_features: bool
+
+
+class CompiledRules:
+    """A rule set with its parameters resolved and its cascade compiled."""
+
+    def __init__(self, rule_set: TriageRuleSet, overrides: Optional[dict[str, float]] = None) -> None:
+        self.version = rule_set.version
+        self.params = {**OPTIONAL_PARAMS, **rule_set.params, **(overrides or {})}
+        missing = [p for p in REQUIRED_PARAMS if p not in self.params]
+        if missing:
+            raise ValueError(f"Rule set {rule_set.version!r} is missing parameters: {', '.join(missing)}")
+        if not rule_set.rules or rule_set.rules[-1].when:
+            raise ValueError(f"Rule set {rule_set.version!r} must end with an unconditional fallback rule")
+
+        self.emotion_confidence = self.params["emotion_confidence"]
+        self.distress_keyword_min_hits = int(self.params["distress_keyword_min_hits"])
+        self.min_words_for_speech_rules = self.params["min_words_for_speech_rules"]
+        self.slow_speech_wpm = self.params["slow_speech_wpm"]
+        self.slurred_low_confidence_ratio = self.params["slurred_low_confidence_ratio"]
+
+        self.outcomes = [self._outcome(rule) for rule in rule_set.rules]
+        self.select: Callable[[Any], int] = self._compile(rule_set.rules, vectorized=False)
+        self.masks: Callable[..., list] = self._compile(rule_set.rules[:-1], vectorized=True)
+
+    def _value(self, value: float | str, rule: TriageRule) -> float:
+        if isinstance(value, str):
+            if value not in self.params:
+                raise ValueError(f"Rule {rule.name!r} references unknown parameter {value!r}")
+            value = self.params[value]
+        value = float(value)
+        if not math.isfinite(value):
+            raise ValueError(f"Rule {rule.name!r} has a non-finite threshold")
+        return value
+
+    def _outcome(self, rule: TriageRule) -> RuleOutcome:
+        delay = rule.retry_delay_minutes
+        if delay is not None:
+            delay = int(self._value(delay, rule))
+        try:
+            rule.reason.format(**{f: 0.0 for f in _METRIC_FIELDS})
+        except (KeyError, IndexError, ValueError) as exc:
+            raise ValueError(f"Rule {rule.name!r} has an invalid reason template: {exc}") from exc
+        return RuleOutcome(
+            rule.name, rule.classification, rule.action, delay, rule.escalate, rule.reason, rule.check_speech_features,
+        )
+
+    def _expression(self, rule: TriageRule, vectorized: bool) -> str:
+        terms = []
+        for cond in rule.when:
+            bound = repr(self._value(cond.value, rule))
+            if cond.relative_to is not None:
+                bound = f"{cond.relative_to} + {bound}"
+            terms.append(f"({cond.field} {cond.op} {bound})")
+        if not terms:
+            return "_always(avg_db)" if vectorized else "True"
+        return (" & " if vectorized else " and ").join(terms)
+
+    def _compile(self, rules: list[TriageRule], vectorized: bool) -> Callable:
+        """Generate and exec the cascade. Only whitelisted field names,
+        comparison operators and float literals ever reach the source."""
+        if vectorized:
+            lines = [f"def masks({', '.join(_METRIC_FIELDS)}):", "    return ["]
+            lines += [f"        {self._expression(rule, True)}," for rule in rules]
+            lines.append("    ]")
+        else:
+            lines = ["def select(m):"]
+            lines += [f"    {f} = m.{f}" for f in _METRIC_FIELDS]
+            for i, rule in enumerate(rules[:-1]):
+                lines.append(f"    if {self._expression(rule, False)}:")
+                lines.append(f"        return {i}")
+            lines.append(f"    return {len(rules) - 1}")
+        namespace: dict[str, Any] = {"_always": lambda a: np.ones(np.shape(a), dtype=bool)}
+        exec(compile("\n".join(lines), f"<triage rules {self.version}>", "exec"), namespace)
+        return namespace["masks" if vectorized else "select"]
+
+
+# ---------------------------------------------------------------------------
+# Registry (hot reload)
+# ---------------------------------------------------------------------------
+class TriageRuleRegistry:
+    """Holds the compiled default and per-campaign rules; swaps them atomically."""
+
+    def __init__(self, path: str = "") -> None:
+        self.path = Path(path) if path else None
+        self._mtime: Optional[float] = None
+        self._next_poll = 0.0
+        self._lock = threading.Lock()
+        self.install(DEFAULT_CONFIG)
+        if self.path is not None and self.path.exists():
+            self.reload()
+
+    def install(self, config: TriageRuleConfig) -> None:
+        """Compile every rule set first, then publish them in one assignment."""
+        default = CompiledRules(config.default)
+        campaigns = {cid: CompiledRules(config.default, overrides) for cid, overrides in config.campaigns.items()}
+        self._state = (config, default, campaigns)
+        logger.info("Installed triage rules version=%s (%d campaign overrides)", default.version, len(campaigns))
+
+    @property
+    def config(self) -> TriageRuleConfig:
+        return self._state[0]
+
+    def for_campaign(self, campaign_id: Optional[str] = None) -> CompiledRules:
+        if self.path is not None and time.monotonic() >= self._next_poll:
+            self._poll()
+        _, default, campaigns = self._state
+        return campaigns.get(campaign_id, default) if campaign_id else default
+
+    def reload(self) -> None:
+        """(Re)load the rule file. Raises ValueError if it is invalid."""
+        if self.path is None:
+            raise ValueError("No triage rules file configured (PULSECALL_TRIAGE_RULES)")
+        with self._lock:
+            mtime = self.path.stat().st_mtime
+            self.install(TriageRuleConfig.model_validate_json(self.path.read_text()))
+            self._mtime = mtime
+
+    def save(self, config: TriageRuleConfig) -> None:
+        """Install a config and, if a rule file is configured, persist it there."""
+        with self._lock:
+            self.install(config)
+            if self.path is not None:
+                tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+                tmp.write_text(json.dumps(config.model_dump(mode="json"), indent=2))
+                os.replace(tmp, self.path)
+                self._mtime = self.path.stat().st_mtime
+
+    def _poll(self) -> None:
+        self._next_poll = time.monotonic() + RULES_POLL_SEC
+        try:
+            mtime = self.path.stat().st_mtime
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            self.reload()
+        except (OSError, ValueError):
+            # Keep serving the last good rules; a bad edit must not stop triage.
+            self._mtime = mtime
+            logger.exception("Ignoring invalid triage rules file %s", self.path)
+
+
+rule_registry = TriageRuleRegistry(TRIAGE_RULES_PATH)
@@ -0,0 +1,273 @@
+"""Bulk user enrolment from a streamed CSV or NDJSON upload.
+
+`POST /users/import` hands the request body stream to `import_users`, which
+decodes it incrementally, validates each row as it arrives and inserts valid
+rows `IMPORT_BATCH_ROWS` at a time: one transaction and one executemany per
+batch instead of a commit per user. Memory is bounded by one batch, one row
+of at most `IMPORT_MAX_ROW_CHARS` and the first `IMPORT_MAX_ERRORS` row
+errors, whatever the size of the file: a longer line, or a CSV record that
+runs on (an unterminated quote), is dropped and reported as a failed row.
+
+Re-uploading is idempotent. Each row's import key — its `external_id`, or
+its phone number and name when it has none, within its campaign — is stored
+hashed in the unique `users.import_key` column, and rows whose key is already
+there (from an earlier upload, or earlier in the same file) are skipped. An
+upload that stops part way (a dropped connection, bytes that aren't UTF-8)
+keeps the batches already committed, so the fix is to send the file again.
+
+CSV needs a header row with at least `name` and `phone`; `email`,
+`campaign_id` and `external_id` are optional and other columns are ignored.
+NDJSON is one JSON object per line with the same fields.
+"""
+
+from __future__ import annotations
+
+import codecs
+import csv
+import hashlib
+import json
+import logging
+import os
+import re
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, Literal, Optional
+from uuid import uuid4
+
+from pydantic import BaseModel, ValidationError, field_validator
+from sqlalchemy import select
+
+import database
+from database import UserRecord
+from models import UserImportError, UserImportReport
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+IMPORT_BATCH_ROWS = int(os.getenv("PULSECALL_IMPORT_BATCH_ROWS", "1000"))  # users per transaction
+IMPORT_MAX_ERRORS = int(os.getenv("PULSECALL_IMPORT_MAX_ERRORS", "1000"))  # row errors listed in the report
+IMPORT_MAX_ROW_CHARS = int(os.getenv("PULSECALL_IMPORT_MAX_ROW_CHARS", "65536"))  # per line / CSV record
+
+ImportFormat = Literal["csv", "ndjson"]
+REQUIRED_COLUMNS = ("name", "phone")
+
+_users = UserRecord.__table__
+
+
+class UserImportRow(BaseModel):
+    name: str
+    phone: str
+    email: Optional[str] = None
+    campaign_id: Optional[str] = None
+    external_id: Optional[str] = None
+
+    @field_validator("name", "phone")
+    @classmethod
+    def _not_blank(cls, value: str) -> str:
+        value = value.strip()
+        if not value:
+            raise ValueError("must not be empty")
+        return value
+
+    @field_validator("email", "campaign_id", "external_id", mode="before")
+    @classmethod
+    def _blank_is_none(cls, value: Any) -> Any:
+        if isinstance(value, str):
+            return value.strip() or None
+        return value
+
+
+def import_format(content_type: str) -> Optional[ImportFormat]:
+    """Upload format from a Content-Type header, or None if it isn't one we take."""
+    content_type = content_type.lower()
+    if "csv" in content_type:
+        return "csv"
+    if "ndjson" in content_type or "jsonl" in content_type or "jsonlines" in content_type:
+        return "ndjson"
+    return None
+
+
+def import_key(row: UserImportRow, campaign_id: Optional[str]) -> str:
+    if row.external_id:
+        basis = f"external\0{campaign_id or ''}\0{row.external_id}"
+    else:
+        phone = re.sub(r"[^\d+]", "", row.phone)
+        basis = f"contact\0{campaign_id or ''}\0{phone}\0{row.name.casefold()}"
+    return hashlib.sha256(basis.encode()).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Incremental decoding
+# ---------------------------------------------------------------------------
+def _too_long() -> str:
+    return f"row is longer than {IMPORT_MAX_ROW_CHARS} characters"
+
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Optional[str]]:
+    """The body's lines; None stands in for a line over `IMPORT_MAX_ROW_CHARS`, which is dropped."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()  # strict; drops a leading BOM
+    pending = ""
+    overlong = False  # discarding the rest of a line that is already too long
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *complete, pending = pending.split("\n")
+        for line in complete:
+            if overlong or len(line) > IMPORT_MAX_ROW_CHARS:
+                overlong = False
+                yield None
+            else:
+                yield line.rstrip("\r")
+        if len(pending) > IMPORT_MAX_ROW_CHARS:
+            pending, overlong = "", True
+    pending += decoder.decode(b"", final=True)
+    if overlong or len(pending) > IMPORT_MAX_ROW_CHARS:
+        yield None
+    elif pending:
+        yield pending.rstrip("\r")
+
+
+# (line number, fields, error): fields is None when the record couldn't be parsed.
+Record = tuple[int, Optional[dict[str, Any]], Optional[str]]
+
+
+async def _csv_records(lines: AsyncIterator[Optional[str]]) -> AsyncIterator[Record]:
+    header: Optional[list[str]] = None
+    record: list[str] = []
+    quotes = size = start = line_no = 0
+    async for line in lines:
+        line_no += 1
+        if not record:
+            start = line_no
+        if line is not None:
+            record.append(line)
+            quotes += line.count('"')
+            size += len(line) + 1
+        if line is None or size > IMPORT_MAX_ROW_CHARS:
+            if header is None:
+                raise ValueError(f"CSV header is longer than {IMPORT_MAX_ROW_CHARS} characters")
+            record, quotes, size = [], 0, 0
+            yield start, None, _too_long()  # parsing starts afresh on the next line
+            continue
+        if quotes % 2:
+            continue  # a quoted field runs on to the next line
+        text, record, quotes, size = "\n".join(record), [], 0, 0
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [column.strip().lower() for column in values]
+            missing = [column for column in REQUIRED_COLUMNS if column not in header]
+            if missing:
+                raise ValueError(f"CSV header is missing column(s): {', '.join(missing)}")
+            continue
+        yield start, dict(zip(header, values)), None
+    if record:
+        yield start, None, "unterminated quoted field"
+
+
+async def _ndjson_records(lines: AsyncIterator[Optional[str]]) -> AsyncIterator[Record]:
+    line_no = 0
+    async for line in lines:
+        line_no += 1
+        if line is None:
+            yield line_no, None, _too_long()
+            continue
+        if not line.strip():
+            continue
+        try:
+            fields = json.loads(line)
+        except ValueError:
+            yield line_no, None, "invalid JSON"
+            continue
+        if not isinstance(fields, dict):
+            yield line_no, None, "expected a JSON object"
+            continue
+        yield line_no, fields, None
+
+
+# ---------------------------------------------------------------------------
+# Import
+# ---------------------------------------------------------------------------
+def _validation_message(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc']) or 'row'}: {err['msg']}" for err in exc.errors(include_url=False)
+    )
+
+
+def _fail(report: UserImportReport, line: int, error: str) -> None:
+    report.failed += 1
+    if len(report.errors) < IMPORT_MAX_ERRORS:
+        report.errors.append(UserImportError(line=line, error=error))
+
+
+async def _insert_batch(batch: dict[str, dict[str, Any]], report: UserImportReport) -> None:
+    async with database.async_engine.begin() as conn:
+        existing = set(
+            (await conn.execute(select(_users.c.import_key).where(_users.c.import_key.in_(list(batch))))).scalars()
+        )
+        new = [row for key, row in batch.items() if key not in existing]
+        created = 0
+        if new:
+            # DO NOTHING covers a concurrent upload of the same file racing this batch;
+            # RETURNING lists only the rows this batch actually inserted.
+            insert = database.conflict_insert(_users).on_conflict_do_nothing(index_elements=[_users.c.import_key])
+            created = len((await conn.execute(insert.returning(_users.c.import_key), new)).all())
+    report.created += created
+    report.skipped += len(batch) - created
+
+
+async def import_users(
+    chunks: AsyncIterator[bytes],
+    fmt: ImportFormat,
+    default_campaign_id: Optional[str] = None,
+    campaign_exists: Callable[[str], bool] = lambda campaign_id: True,
+) -> UserImportReport:
+    """Validate and insert users from an uploaded body stream; return the per-row report.
+
+    Raises ValueError if the upload as a whole can't be read (no usable CSV
+    header, bytes that aren't UTF-8).
+    """
+    records = _csv_records(_lines(chunks)) if fmt == "csv" else _ndjson_records(_lines(chunks))
+    report = UserImportReport()
+    campaigns: dict[str, bool] = {}
+    batch: dict[str, dict[str, Any]] = {}
+    async for line, fields, error in records:
+        report.rows += 1
+        if error is not None:
+            _fail(report, line, error)
+            continue
+        try:
+            row = UserImportRow.model_validate(fields)
+        except ValidationError as exc:
+            _fail(report, line, _validation_message(exc))
+            continue
+        campaign_id = row.campaign_id or default_campaign_id
+        if campaign_id is not None:
+            if campaign_id not in campaigns:
+                campaigns[campaign_id] = campaign_exists(campaign_id)
+            if not campaigns[campaign_id]:
+                _fail(report, line, f"unknown campaign_id {campaign_id!r}")
+                continue
+        key = import_key(row, campaign_id)
+        if key in batch:
+            report.skipped += 1
+            continue
+        batch[key] = {
+            "id": f"usr_{uuid4().hex[:10]}",
+            "name": row.name,
+            "phone": row.phone,
+            "email": row.email,
+            "campaign_id": campaign_id,
+            "created_at": datetime.now(timezone.utc),
+            "import_key": key,
+        }
+        if len(batch) >= IMPORT_BATCH_ROWS:
+            await _insert_batch(batch, report)
+            batch = {}
+    if batch:
+        await _insert_batch(batch, report)
+    logger.info(
+        "User import: %d rows, %d created, %d skipped, %d failed", report.rows, report.created, report.skipped, report.failed
+    )
+    return report
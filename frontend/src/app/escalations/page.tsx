@@ -1,7 +1,7 @@
 "use client";
 
 import { useEffect, useState } from "react";
-import { listEscalations, acknowledgeEscalation } from "@/lib/api";
+import { acknowledgeEscalation, listAllPages, listEscalationsPage } from "@/lib/api";
 import type { Escalation } from "@/lib/api";
 import { AlertTriangle, CheckCircle } from "lucide-react";
 import { SentimentBadge } from "@/components/SentimentBadge";
@@ -11,7 +11,9 @@ export default function EscalationsPage() {
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
-    listEscalations()
+    // The whole open queue: with no status filter, new open escalations sort
+    // behind older acknowledged ones and fall off the first page.
+    listAllPages(listEscalationsPage, { status: "open", limit: 500 })
       .then(setEscalations)
       .catch(() => {})
       .finally(() => setLoading(false));
@@ -36,7 +38,7 @@ export default function EscalationsPage() {
     <div className="mx-auto max-w-4xl px-6 py-8">
       <h1 className="text-2xl font-bold text-white">Escalation Queue</h1>
       <p className="mt-1 mb-8 text-sm text-zinc-400">
-        Flagged calls requiring human attention, sorted by priority.
+        Open flagged calls requiring human attention, sorted by priority.
       </p>
 
       {escalations.length === 0 ? (
@@ -2,33 +2,48 @@
 
 import { useEffect, useState } from "react";
 import Link from "next/link";
-import { listCampaigns, listCalls, listEscalations } from "@/lib/api";
-import type { Campaign, CallRecord, Escalation } from "@/lib/api";
+import {
+  getAnalytics,
+  listAllPages,
+  listCalls,
+  listCampaignsPage,
+  listEscalationsPage,
+} from "@/lib/api";
+import type { AnalyticsReport, Campaign, CallRecord } from "@/lib/api";
 import { Phone, AlertTriangle, TrendingUp, Plus } from "lucide-react";
 import { SentimentBadge } from "@/components/SentimentBadge";
 
 export default function Dashboard() {
   const [campaigns, setCampaigns] = useState<Campaign[]>([]);
   const [calls, setCalls] = useState<CallRecord[]>([]);
-  const [escalations, setEscalations] = useState<Escalation[]>([]);
+  const [analytics, setAnalytics] = useState<AnalyticsReport | null>(null);
+  const [openEscalations, setOpenEscalations] = useState(0);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
-    Promise.all([listCampaigns(), listCalls(), listEscalations()])
-      .then(([c, cl, e]) => {
+    // Stats come from the analytics rollups and every page of open
+    // escalations, not from the first page of each list.
+    Promise.all([
+      listAllPages(listCampaignsPage, { limit: 500 }),
+      listCalls({ limit: 10 }),
+      getAnalytics({ group_by: "campaign" }),
+      listAllPages(listEscalationsPage, { status: "open", limit: 500 }),
+    ])
+      .then(([c, cl, a, e]) => {
         setCampaigns(c);
         setCalls(cl);
-        setEscalations(e);
+        setAnalytics(a);
+        setOpenEscalations(e.length);
       })
       .catch(() => {})
       .finally(() => setLoading(false));
   }, []);
 
-  const openEscalations = escalations.filter((e) => e.status === "open");
-  const avgSentiment =
-    calls.length > 0
-      ? (calls.reduce((s, c) => s + c.sentiment_score, 0) / calls.length).toFixed(1)
-      : "—";
+  const totalCalls = analytics?.totals.calls ?? 0;
+  const avgSentiment = analytics?.totals.avg_sentiment?.toFixed(1) ?? "—";
+  const campaignCallCounts = new Map(
+    (analytics?.buckets ?? []).map((b) => [b.campaign_id, b.calls]),
+  );
 
   if (loading) {
     return (
@@ -65,7 +80,7 @@ export default function Dashboard() {
         />
         <StatCard
           label="Total Calls"
-          value={calls.length}
+          value={totalCalls}
           icon={<Phone className="h-5 w-5 text-blue-400" />}
         />
         <StatCard
@@ -75,7 +90,7 @@ export default function Dashboard() {
         />
         <StatCard
           label="Open Escalations"
-          value={openEscalations.length}
+          value={openEscalations}
           icon={<AlertTriangle className="h-5 w-5 text-red-400" />}
         />
       </div>
@@ -93,9 +108,7 @@ export default function Dashboard() {
         ) : (
           <div className="grid gap-4 sm:grid-cols-2 lg:grid-cols-3">
             {campaigns.map((c) => {
-              const campaignCalls = calls.filter(
-                (cl) => cl.campaign_id === c.id
-              );
+              const campaignCalls = campaignCallCounts.get(c.id) ?? 0;
               return (
                 <div
                   key={c.id}
@@ -107,8 +120,8 @@ export default function Dashboard() {
                   </p>
                   <div className="mt-3 flex items-center justify-between">
                     <span className="text-xs text-zinc-400">
-                      {campaignCalls.length} call
-                      {campaignCalls.length !== 1 ? "s" : ""}
+                      {campaignCalls} call
+                      {campaignCalls !== 1 ? "s" : ""}
                     </span>
                     <Link
                       href={`/simulate/${c.id}`}
@@ -154,7 +167,7 @@ export default function Dashboard() {
                 </tr>
               </thead>
               <tbody>
-                {calls.slice(0, 10).map((call) => (
+                {calls.map((call) => (
                   <tr
                     key={call.call_id}
                     className="border-b border-zinc-800/50 hover:bg-zinc-900/40"
@@ -77,6 +77,7 @@ export default function SimulateVoicePage() {
   const callTimerRef = useRef<ReturnType<typeof setInterval> | null>(null);
   const mimeTypeRef = useRef<string>("audio/webm");
   const messagesRef = useRef<ChatMessage[]>([]);
+  const conversationIdRef = useRef<string>("");
   const callStateRef = useRef<CallState>("home");
   const silenceTimerRef = useRef<ReturnType<typeof setTimeout> | null>(null);
   const analyserRef = useRef<AnalyserNode | null>(null);
@@ -219,10 +220,10 @@ export default function SimulateVoicePage() {
   }, []);
 
   // --- Play audio then continue ---
-  const playAudioAndContinue = useCallback((audioBase64: string, isEnding: boolean) => {
+  const playAudioAndContinue = useCallback((audioBase64: string, isEnding: boolean, contentType = "audio/mpeg") => {
     setStatus("speaking");
     const audioBytes = Uint8Array.from(atob(audioBase64), (c) => c.charCodeAt(0));
-    const audioBlob = new Blob([audioBytes], { type: "audio/mp3" });
+    const audioBlob = new Blob([audioBytes], { type: contentType });
     const audioUrl = URL.createObjectURL(audioBlob);
     const audio = new Audio(audioUrl);
     audioPlayerRef.current = audio;
@@ -278,6 +279,7 @@ export default function SimulateVoicePage() {
           campaign_id: campaignId,
           transcription: text,
           history: currentHistory,
+          conversation_id: conversationIdRef.current,
         }),
       });
       const chatData = await chatRes.json();
@@ -296,7 +298,7 @@ export default function SimulateVoicePage() {
       const isEnding = chatData.isEnding === true;
 
       if (chatData.audio) {
-        playAudioAndContinue(chatData.audio, isEnding);
+        playAudioAndContinue(chatData.audio, isEnding, chatData.audioContentType);
       } else if (isEnding) {
         setCallState("ended");
         setStatus("idle");
@@ -365,6 +367,7 @@ export default function SimulateVoicePage() {
   const answerCall = useCallback(async () => {
     setCallState("connected");
     setStatus("thinking");
+    conversationIdRef.current = crypto.randomUUID();
 
     const ringInterval = startRinging();
 
@@ -372,7 +375,12 @@ export default function SimulateVoicePage() {
       const res = await fetch(`${API_URL}/voice/chat`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ campaign_id: campaignId, trigger: "initial", history: [] }),
+        body: JSON.stringify({
+          campaign_id: campaignId,
+          trigger: "initial",
+          history: [],
+          conversation_id: conversationIdRef.current,
+        }),
       });
 
       const data = await res.json();
@@ -391,7 +399,7 @@ export default function SimulateVoicePage() {
         setMessages([aiMsg]);
 
         if (data.audio) {
-          playAudioAndContinue(data.audio, false);
+          playAudioAndContinue(data.audio, false, data.audioContentType);
         } else {
           startRecordingLoop();
         }
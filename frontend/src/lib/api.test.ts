@@ -2,7 +2,10 @@ import {
   createCampaign,
   getCall,
   listCalls,
+  listCallsPage,
+  listAllPages,
   listCampaigns,
+  listEscalationsPage,
 } from "./api";
 
 describe("api client", () => {
@@ -72,6 +75,48 @@ describe("api client", () => {
     expect(call.call_id).toBe("call_456");
   });
 
+  it("pages calls with filters and returns the next cursor", async () => {
+    const fetchMock = jest.fn().mockResolvedValue({
+      ok: true,
+      headers: new Headers({ "X-Next-Cursor": "abc" }),
+      json: async () => [{ id: "call_789" }],
+    });
+    global.fetch = fetchMock as unknown as typeof fetch;
+
+    const page = await listCallsPage({ limit: 1, campaign_id: "cmp_1", escalated: true });
+
+    expect(page.items[0].call_id).toBe("call_789");
+    expect(page.nextCursor).toBe("abc");
+    expect(fetchMock).toHaveBeenCalledWith(
+      "http://localhost:8000/calls?limit=1&campaign_id=cmp_1&escalated=true",
+      expect.anything(),
+    );
+  });
+
+  it("follows cursors through every page", async () => {
+    const fetchMock = jest
+      .fn()
+      .mockResolvedValueOnce({
+        ok: true,
+        headers: new Headers({ "X-Next-Cursor": "next" }),
+        json: async () => [{ id: "esc_1" }],
+      })
+      .mockResolvedValueOnce({
+        ok: true,
+        headers: new Headers(),
+        json: async () => [{ id: "esc_2" }],
+      });
+    global.fetch = fetchMock as unknown as typeof fetch;
+
+    const escalations = await listAllPages(listEscalationsPage, { status: "open", limit: 500 });
+
+    expect(escalations.map((e) => e.id)).toEqual(["esc_1", "esc_2"]);
+    expect(fetchMock.mock.calls.map(([url]) => url)).toEqual([
+      "http://localhost:8000/escalations?status=open&limit=500",
+      "http://localhost:8000/escalations?status=open&limit=500&cursor=next",
+    ]);
+  });
+
   it("throws backend detail on non-ok response", async () => {
     const fetchMock = jest.fn().mockResolvedValue({
       ok: false,
@@ -17,6 +17,8 @@ export interface Campaign {
   created_at: string;
 }
 
+export type AudioProfile = "standard" | "wideband" | "narrowband" | "telephony";
+
 export interface CampaignCreate {
   name: string;
   agent_persona: string;
@@ -27,6 +29,8 @@ export interface CampaignCreate {
   patient_context?: string;
   patient_data?: Record<string, unknown>;
   voice_id?: string;
+  audio_profile?: AudioProfile;
+  speech_speed?: number;
 }
 
 export interface Conversation {
@@ -56,7 +60,8 @@ export interface CallRecord {
 
 export interface Escalation {
   id: string;
-  call_id: string;
+  call_id: string | null;
+  conversation_id?: string | null;
   campaign_id: string;
   priority: "high" | "medium" | "low";
   status: "open" | "acknowledged";
@@ -66,7 +71,142 @@ export interface Escalation {
   acknowledged_at: string | null;
 }
 
-async function request<T>(path: string, options?: RequestInit): Promise<T> {
+export interface TrendSeries {
+  level: number;
+  slope: number;
+  last: number;
+  count: number;
+}
+
+export interface PatientTrend {
+  patient_id: string;
+  calls: number;
+  sentiment: TrendSeries | null;
+  pain: TrendSeries | null;
+  flags: TrendSeries | null;
+  active_alerts: string[];
+  last_call_id: string | null;
+  updated_at: string | null;
+}
+
+export interface User {
+  id: string;
+  name: string;
+  phone: string;
+  email: string | null;
+  campaign_id: string | null;
+}
+
+export interface CallHistoryEntry {
+  id: string;
+  user_id: string;
+  state: "PENDING" | "BUSY_RETRY" | "SILENT_RETRY" | "ESCALATED" | "COMPLETED" | null;
+  retry_count: number;
+  triage_classification: string | null;
+  triage_reason: string | null;
+  summary: string | null;
+  sentiment_score: number | null;
+  detected_flags: string[];
+  escalation_reason: string | null;
+  started_at: string | null;
+  ended_at: string | null;
+  created_at: string | null;
+}
+
+// List endpoints return one page at a time; pass `nextCursor` back as
+// `cursor` until it comes back null. `since` / `until` are ISO timestamps.
+export interface PageParams {
+  limit?: number;
+  cursor?: string | null;
+  since?: string;
+  until?: string;
+}
+
+export interface Page<T> {
+  items: T[];
+  nextCursor: string | null;
+}
+
+export type CampaignFilters = PageParams;
+
+export interface ConversationFilters extends PageParams {
+  campaign_id?: string;
+  status?: Conversation["status"];
+}
+
+export interface CallFilters extends PageParams {
+  campaign_id?: string;
+  escalated?: boolean;
+}
+
+export interface EscalationFilters extends PageParams {
+  campaign_id?: string;
+  status?: Escalation["status"];
+  priority?: Escalation["priority"];
+}
+
+export interface UserFilters extends PageParams {
+  campaign_id?: string;
+}
+
+export interface CallHistoryFilters extends PageParams {
+  state?: NonNullable<CallHistoryEntry["state"]>;
+}
+
+export interface AnalyticsBucket {
+  campaign_id: string | null;
+  day: string | null;
+  calls: number;
+  completed: number;
+  escalated: number;
+  retried: number;
+  escalation_rate: number;
+  avg_sentiment: number | null;
+  triage: Record<string, number>;
+}
+
+export interface AnalyticsReport {
+  group_by: "campaign_day" | "day" | "campaign";
+  totals: AnalyticsBucket;
+  buckets: AnalyticsBucket[];
+}
+
+export interface AnalyticsFilters {
+  campaign_id?: string;
+  since?: string; // YYYY-MM-DD, inclusive
+  until?: string; // YYYY-MM-DD, exclusive
+  group_by?: AnalyticsReport["group_by"];
+}
+
+export interface SearchHit {
+  call_id: string;
+  kind: "outbound" | "campaign";
+  campaign_id: string | null;
+  user_id: string | null;
+  placed_at: string | null;
+  summary: string | null;
+  detected_flags: string[];
+  snippet: string; // HTML-escaped by the backend, matches wrapped in <mark></mark>
+  score: number;
+}
+
+export interface SearchFilters extends PageParams {
+  kind?: SearchHit["kind"];
+  campaign_id?: string;
+}
+
+type QueryParams = { [key: string]: string | number | boolean | null | undefined };
+
+function withQuery(path: string, params?: QueryParams): string {
+  const query = new URLSearchParams();
+  for (const [key, value] of Object.entries(params ?? {})) {
+    if (value !== undefined && value !== null) query.set(key, String(value));
+  }
+  const qs = query.toString();
+  return qs ? `${path}?${qs}` : path;
+}
+
+async function send(path: string, options?: RequestInit): Promise<Response> {
   const res = await fetch(`${API_URL}${path}`, {
     headers: { "Content-Type": "application/json" },
     ...options,
@@ -75,9 +215,35 @@ async function request<T>(path: string, options?: RequestInit): Promise<T> {
     const err = await res.json().catch(() => ({ detail: res.statusText }));
     throw new Error(err.detail || "Request failed");
   }
+  return res;
+}
+
+async function request<T>(path: string, options?: RequestInit): Promise<T> {
+  const res = await send(path, options);
   return res.json();
 }
 
+async function requestPage<T>(path: string, params?: QueryParams): Promise<Page<T>> {
+  const res = await send(withQuery(path, params));
+  return { items: await res.json(), nextCursor: res.headers.get("X-Next-Cursor") };
+}
+
+// Follow `nextCursor` through every page of a `*Page` helper, e.g.
+// `listAllPages(listEscalationsPage, { status: "open" })`.
+export async function listAllPages<T, F extends PageParams>(
+  listPage: (filters?: F) => Promise<Page<T>>,
+  filters?: F,
+): Promise<T[]> {
+  const items: T[] = [];
+  let cursor: string | null = null;
+  do {
+    const page: Page<T> = await listPage({ ...filters, cursor } as F);
+    items.push(...page.items);
+    cursor = page.nextCursor;
+  } while (cursor);
+  return items;
+}
+
 // Campaigns
 export const createCampaign = (data: CampaignCreate) =>
   request<Campaign>("/campaigns/create", {
@@ -85,7 +251,11 @@ export const createCampaign = (data: CampaignCreate) =>
     body: JSON.stringify(data),
   });
 
-export const listCampaigns = () => request<Campaign[]>("/campaigns");
+export const listCampaigns = (filters?: CampaignFilters) =>
+  request<Campaign[]>(withQuery("/campaigns", { ...filters }));
+
+export const listCampaignsPage = (filters?: CampaignFilters) =>
+  requestPage<Campaign>("/campaigns", { ...filters });
 
 export const getCampaign = (id: string) =>
   request<Campaign>(`/campaigns/${id}`);
@@ -106,23 +276,56 @@ export const endCall = (campaignId: string, conversationId: string) =>
     method: "POST",
   });
 
+export const listConversationsPage = (filters?: ConversationFilters) =>
+  requestPage<Conversation>("/conversations", { ...filters });
+
 // Calls
 function normalizeCall(c: any): CallRecord {
   return { ...c, call_id: c.call_id || c.id };
 }
 
-export const listCalls = async () => {
-  const raw = await request<any[]>("/calls");
+export const listCalls = async (filters?: CallFilters) => {
+  const raw = await request<any[]>(withQuery("/calls", { ...filters }));
   return raw.map(normalizeCall);
 };
 
+export const listCallsPage = async (filters?: CallFilters): Promise<Page<CallRecord>> => {
+  const page = await requestPage<any>("/calls", { ...filters });
+  return { ...page, items: page.items.map(normalizeCall) };
+};
+
 export const getCall = async (id: string) => {
   const raw = await request<any>(`/calls/${id}`);
   return normalizeCall(raw);
 };
 
 // Escalations
-export const listEscalations = () => request<Escalation[]>("/escalations");
+export const listEscalations = (filters?: EscalationFilters) =>
+  request<Escalation[]>(withQuery("/escalations", { ...filters }));
+
+export const listEscalationsPage = (filters?: EscalationFilters) =>
+  requestPage<Escalation>("/escalations", { ...filters });
 
 export const acknowledgeEscalation = (id: string) =>
   request<Escalation>(`/escalations/${id}/acknowledge`, { method: "PATCH" });
+
+// Patient trends
+export const listTrends = () => request<PatientTrend[]>("/trends");
+
+export const getTrend = (patientId: string) =>
+  request<PatientTrend>(`/trends/${patientId}`);
+
+// Per-campaign, per-day call analytics
+export const getAnalytics = (filters?: AnalyticsFilters) =>
+  request<AnalyticsReport>(withQuery("/analytics", { ...filters }));
+
+// Full-text search over transcripts, summaries and flags
+export const searchCallsPage = (q: string, filters?: SearchFilters) =>
+  requestPage<SearchHit>("/search", { q, ...filters });
+
+// Outbound users and their call history
+export const listUsersPage = (filters?: UserFilters) =>
+  requestPage<User>("/users", { ...filters });
+
+export const listCallHistoryPage = (userId: string, filters?: CallHistoryFilters) =>
+  requestPage<CallHistoryEntry>(`/call-history/${userId}`, { ...filters });